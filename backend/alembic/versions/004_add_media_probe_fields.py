@@ -0,0 +1,33 @@
+"""add source media info to jobs
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Add header-probed media info columns to jobs table
+    op.add_column('jobs', sa.Column('duration_seconds', sa.Float(), nullable=True))
+    op.add_column('jobs', sa.Column('sample_rate', sa.Integer(), nullable=True))
+    op.add_column('jobs', sa.Column('channels', sa.Integer(), nullable=True))
+    op.add_column('jobs', sa.Column('codec', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    # Remove media info columns
+    op.drop_column('jobs', 'codec')
+    op.drop_column('jobs', 'channels')
+    op.drop_column('jobs', 'sample_rate')
+    op.drop_column('jobs', 'duration_seconds')
@@ -0,0 +1,29 @@
+"""add (created_at, id) index for job listing
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Composite index for newest-first listing with keyset pagination;
+    # it also serves every query the created_at index did
+    op.create_index('ix_jobs_created_at_id', 'jobs', ['created_at', 'id'], unique=False)
+    op.drop_index('ix_jobs_created_at', table_name='jobs')
+
+
+def downgrade() -> None:
+    # Restore the single-column index
+    op.create_index('ix_jobs_created_at', 'jobs', ['created_at'], unique=False)
+    op.drop_index('ix_jobs_created_at_id', table_name='jobs')
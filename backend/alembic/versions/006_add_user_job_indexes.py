@@ -0,0 +1,41 @@
+"""add per-user job listing indexes
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_STATUS_CLAUSE = "status IN ('PENDING', 'CONVERTING', 'ANALYZING', 'SEPARATING', 'FINALIZING', 'PACKAGING')"
+
+
+def upgrade() -> None:
+    # A user's jobs, newest first (replaces the single-column user_id index)
+    op.create_index(
+        'ix_jobs_user_id_created_at', 'jobs',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')]
+    )
+    # Partial index over unfinished jobs only, for the processing queue
+    op.create_index(
+        'ix_jobs_active_user_id_created_at', 'jobs',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        postgresql_where=sa.text(ACTIVE_STATUS_CLAUSE)
+    )
+    op.drop_index('ix_jobs_user_id', table_name='jobs')
+
+
+def downgrade() -> None:
+    # Restore the single-column user_id index
+    op.create_index('ix_jobs_user_id', 'jobs', ['user_id'])
+    op.drop_index('ix_jobs_active_user_id_created_at', table_name='jobs')
+    op.drop_index('ix_jobs_user_id_created_at', table_name='jobs')
@@ -0,0 +1,26 @@
+"""add storage size to jobs
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bytes a completed job keeps in storage (admin stats, retention)
+    op.add_column('jobs', sa.Column('storage_bytes', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('jobs', 'storage_bytes')
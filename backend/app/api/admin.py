@@ -7,10 +7,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_
 from typing import Optional
 from uuid import UUID
+from datetime import datetime
+from redis import Redis
 
-from app.core.database import get_db
+from app.core.database import get_db, get_redis
+from app.core.security import set_user_inactive
 from app.models.user import User
 from app.schemas.user import UserResponse
+from app.services.admin_stats import get_admin_stats, invalidate_admin_stats
 from pydantic import BaseModel
 
 
@@ -58,6 +62,26 @@ class UserStatsResponse(BaseModel):
     email_users: int
 
 
+class JobsPerDay(BaseModel):
+    date: str  # YYYY-MM-DD (UTC)
+    count: int
+
+
+class JobStats(BaseModel):
+    """Aggregate job statistics"""
+    total_jobs: int
+    by_status: dict[str, int]
+    per_day: list[JobsPerDay]  # Jobs created per day, oldest first, ADMIN_STATS_DAYS days
+    avg_real_time_factor: Optional[float] = None  # Creation to completion time per second of audio
+    storage_bytes: int  # Stored by jobs of any status (set on completion, so jobs being reprocessed count too)
+
+
+class AdminStatsResponse(UserStatsResponse):
+    """Response for the admin dashboard statistics"""
+    jobs: JobStats
+    generated_at: datetime  # Statistics are cached for up to ADMIN_STATS_CACHE_SECONDS
+
+
 class UserActionResponse(BaseModel):
     """Response for user action (approve, deactivate, etc.)"""
     success: bool
@@ -122,63 +146,24 @@ async def list_users(
     )
 
 
-@router.get("/stats", response_model=UserStatsResponse)
+@router.get("/stats", response_model=AdminStatsResponse)
 async def get_user_stats(
     db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis),
     current_admin: User = Depends(get_current_admin_user)
 ):
     """
-    Get user statistics
+    Get user and job statistics
     Admin only endpoint
     """
-    # Total users
-    total_result = await db.execute(select(func.count()).select_from(User))
-    total_users = total_result.scalar()
-
-    # Active users
-    active_result = await db.execute(
-        select(func.count()).select_from(User).where(User.is_active == True)
-    )
-    active_users = active_result.scalar()
-
-    # Pending users
-    pending_result = await db.execute(
-        select(func.count()).select_from(User).where(User.is_active == False)
-    )
-    pending_users = pending_result.scalar()
-
-    # Admin users
-    admin_result = await db.execute(
-        select(func.count()).select_from(User).where(User.is_admin == True)
-    )
-    admin_users = admin_result.scalar()
-
-    # Google OAuth users
-    google_result = await db.execute(
-        select(func.count()).select_from(User).where(User.oauth_provider == "google")
-    )
-    google_oauth_users = google_result.scalar()
-
-    # Email users
-    email_result = await db.execute(
-        select(func.count()).select_from(User).where(User.oauth_provider == "email")
-    )
-    email_users = email_result.scalar()
-
-    return UserStatsResponse(
-        total_users=total_users,
-        active_users=active_users,
-        pending_users=pending_users,
-        admin_users=admin_users,
-        google_oauth_users=google_oauth_users,
-        email_users=email_users
-    )
+    return await get_admin_stats(db, redis_client)
 
 
 @router.patch("/users/{user_id}/approve", response_model=UserActionResponse)
 async def approve_user(
     user_id: UUID,
     db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis),
     current_admin: User = Depends(get_current_admin_user)
 ):
     """
@@ -206,6 +191,8 @@ async def approve_user(
     user.is_active = True
     await db.commit()
     await db.refresh(user)
+    invalidate_admin_stats(redis_client)
+    set_user_inactive(redis_client, str(user.id), False)
 
     return UserActionResponse(
         success=True,
@@ -218,6 +205,7 @@ async def approve_user(
 async def deactivate_user(
     user_id: UUID,
     db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis),
     current_admin: User = Depends(get_current_admin_user)
 ):
     """
@@ -252,6 +240,8 @@ async def deactivate_user(
     user.is_active = False
     await db.commit()
     await db.refresh(user)
+    invalidate_admin_stats(redis_client)
+    set_user_inactive(redis_client, str(user.id), True)
 
     return UserActionResponse(
         success=True,
@@ -264,6 +254,7 @@ async def deactivate_user(
 async def make_user_admin(
     user_id: UUID,
     db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis),
     current_admin: User = Depends(get_current_admin_user)
 ):
     """
@@ -292,6 +283,8 @@ async def make_user_admin(
     user.is_active = True
     await db.commit()
     await db.refresh(user)
+    invalidate_admin_stats(redis_client)
+    set_user_inactive(redis_client, str(user.id), False)
 
     return UserActionResponse(
         success=True,
@@ -304,6 +297,7 @@ async def make_user_admin(
 async def remove_admin_privileges(
     user_id: UUID,
     db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis),
     current_admin: User = Depends(get_current_admin_user)
 ):
     """
@@ -338,6 +332,7 @@ async def remove_admin_privileges(
     user.is_admin = False
     await db.commit()
     await db.refresh(user)
+    invalidate_admin_stats(redis_client)
 
     return UserActionResponse(
         success=True,
@@ -11,15 +11,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import Optional
 from uuid import UUID
+from redis import Redis
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
-from app.core.database import get_db
+from app.core.database import get_db, get_redis
 from app.core.config import settings
 from app.core.security import (
     create_access_token, create_refresh_token, decode_token, verify_token_type,
-    blacklist_token, is_token_blacklisted, revoke_user_tokens, is_user_revoked
+    blacklist_token, is_token_blacklisted, revoke_user_tokens, is_user_revoked, set_user_inactive
 )
 from app.core.oauth import google_oauth
 from app.core.exceptions import (
@@ -27,6 +28,7 @@ from app.core.exceptions import (
     create_structured_error_response
 )
 from app.models.user import User
+from app.services.admin_stats import invalidate_admin_stats
 from app.schemas.user import (
     Token, UserResponse, GoogleAuthRequest, UserLogin, UserRegister,
     RefreshTokenRequest, UserUpdate
@@ -151,7 +153,8 @@ async def get_current_user_optional(
 async def google_auth(
     request: Request,
     auth_request: GoogleAuthRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis)
 ):
     """
     Authenticate user with Google OAuth
@@ -183,6 +186,8 @@ async def google_auth(
         )
     )
     user = result.scalar_one_or_none()
+    # New or newly linked accounts change the admin user counts
+    counts_changed = user is None
     
     if not user:
         # Check if user exists by email
@@ -221,6 +226,9 @@ async def google_auth(
     
     await db.commit()
     await db.refresh(user)
+    if counts_changed:
+        invalidate_admin_stats(redis_client)
+    set_user_inactive(redis_client, str(user.id), not user.is_active)
     
     # Generate tokens
     access_token = create_access_token({"sub": str(user.id), "email": user.email})
@@ -234,7 +242,8 @@ async def google_auth(
 async def register(
     request: Request,
     user_data: UserRegister,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis)
 ):
     """
     Register new user with email/password (optional feature)
@@ -261,12 +270,14 @@ async def register(
         is_admin=is_admin,
         is_active=is_whitelisted or is_admin  # Auto-approve whitelisted domains or admin
     )
-    user.set_password(user_data.password)
+    await user.set_password_async(user_data.password)
     user.update_last_login()
     
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    invalidate_admin_stats(redis_client)
+    set_user_inactive(redis_client, str(user.id), not user.is_active)
     
     # Generate tokens
     access_token = create_access_token({"sub": str(user.id), "email": user.email})
@@ -289,7 +300,7 @@ async def login(
     result = await db.execute(select(User).where(User.email == credentials.email))
     user = result.scalar_one_or_none()
     
-    if not user or not user.verify_password(credentials.password):
+    if not user or not await user.verify_password_async(credentials.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -301,6 +312,10 @@ async def login(
             detail="User account is inactive"
         )
     
+    # Upgrade hashes created with a different bcrypt cost factor
+    if user.password_needs_rehash():
+        await user.set_password_async(credentials.password)
+    
     # Update last login
     user.update_last_login()
     await db.commit()
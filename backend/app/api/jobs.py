@@ -1,21 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Header, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, func, tuple_
 from typing import Optional
 from uuid import UUID
-from app.core.database import get_db
-from app.models.job import Job, JobStatus, InputType, QualityMode
+from datetime import datetime
+from redis import Redis, RedisError
+from app.core.database import get_db, get_redis
+from app.models.job import Job, JobStatus, InputType, QualityMode, ACTIVE_STATUSES, TERMINAL_STATUSES
 from app.models.user import User
-from app.schemas.job import JobResponse, JobListResponse, JobCreate
-from app.tasks.audio_processing import process_audio_job
+from app.schemas.job import (
+    JobResponse, JobListResponse, JobChangesResponse, JobStatusBatchRequest, JobStatusBatchResponse, JobCreate
+)
+from app.tasks.audio_processing import process_audio_job, publish_job_progress
 from app.services.storage import StorageService
+from app.services.uploads import ResumableUploadService, UploadError, SUPPORTED_FORMATS
+from app.services.ingest import start_ingest
+from app.services.media_probe import probe_media, MediaProbeError
+from app.services.peaks import peaks_filename
+from app.services.transcode import (
+    FORMATS as TRANSCODE_FORMATS, TranscodeError, get_rendition, resolve_bitrate, touch_rendition
+)
+from app.services.mixdown import (
+    STEM_NAMES as MIX_STEMS, MixdownError, resolve_gains, mixdown_path, open_mixdown, stream_mixdown,
+    multitrack_path, open_multitrack, stream_multitrack, get_cached_mixdown, get_cached_multitrack,
+    read_wav_layout
+)
+from app.services.hls import SEGMENT_RE as HLS_SEGMENT_RE, hls_rendition, get_hls_rendition
+from app.services.job_changes import (
+    CURSOR_RE as CHANGES_CURSOR_RE, record_job_change, current_cursor, is_expired, read_changes,
+    job_change_watcher
+)
+from app.services.progress_events import (
+    EVENT_ID_RE, progress_broker, read_history as read_progress_history, event_stream as progress_event_stream
+)
+from app.services.retention import referenced_sources, remove_job_files
 from app.core.config import settings
+from app.core.responses import AudioFileResponse
 import os
+import base64
+import asyncio
 import aiofiles
 
 router = APIRouter()
 
+MULTITRACK_FORMATS = ["wav", "flac"]
+
 # Import optional auth dependency
 def get_current_user_optional_for_jobs():
     """Lazy import to avoid circular dependency"""
@@ -33,13 +63,18 @@ async def create_job(
     manual_bpm: Optional[float] = Form(None),
     trim_start: Optional[float] = Form(None),
     trim_end: Optional[float] = Form(None),
+    upload_id: Optional[str] = Form(None),
     file: Optional[UploadFile] = File(None),
     db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis),
     current_user: Optional[User] = Depends(get_current_user_optional_for_jobs()),
 ):
-    """Create a new audio processing job (supports both authenticated and anonymous users)"""
+    """Create a new audio processing job (supports both authenticated and anonymous users)
+    
+    Audio comes from a multipart `file`, a completed resumable upload
+    (`upload_id`, see /api/uploads), or a YouTube URL/preview.
+    """
 
-    from app.core.database import get_redis
     from app.services.youtube_preview import YouTubePreviewService
 
     # Block pending users from creating jobs
@@ -51,20 +86,56 @@ async def create_job(
         )
 
     # Determine input type
+    upload_service = None
+    media = None
     if file:
         actual_input_type = InputType.upload
-        # Support MP3, WAV, and FLAC formats
-        SUPPORTED_FORMATS = ['.flac', '.mp3', '.wav']
         file_ext = os.path.splitext(file.filename)[1].lower()
         if file_ext not in SUPPORTED_FORMATS:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Unsupported format. Supported formats: {', '.join(SUPPORTED_FORMATS)}"
             )
+        try:
+            media = await asyncio.to_thread(probe_media, file.file)
+        except MediaProbeError:
+            raise HTTPException(status_code=400, detail="Could not read audio file")
+    elif upload_id:
+        actual_input_type = InputType.upload
+        upload_service = ResumableUploadService(redis_client)
+        upload = upload_service.get_upload(upload_id)
+        if not upload:
+            raise HTTPException(status_code=404, detail="Upload not found or expired")
+        if not upload["complete"]:
+            raise HTTPException(
+                status_code=409,
+                detail="Upload is incomplete",
+                headers={"Upload-Offset": str(upload["offset"])}
+            )
+        try:
+            media = await asyncio.to_thread(upload_service.probe, upload_id)
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
     elif input_url:
         actual_input_type = InputType.youtube
+        if youtube_preview_id:
+            # Probed by the preview task when it downloaded the audio
+            preview = YouTubePreviewService(redis_client).get_preview(youtube_preview_id)
+            media = preview.get("media") if preview else None
     else:
-        raise HTTPException(status_code=400, detail="Either file or input_url must be provided")
+        raise HTTPException(status_code=400, detail="Either file, upload_id or input_url must be provided")
+    
+    # Admission control: reject sources that are too long before they take a worker slot.
+    # Only the trimmed section is processed, so that is what counts.
+    media = media or {}
+    max_duration = settings.MAX_SOURCE_DURATION_SECONDS
+    duration = media.get("duration_seconds") or 0
+    processed = min(trim_end or duration, duration) - (trim_start or 0)
+    if max_duration and processed > max_duration:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Audio is longer than the maximum of {max_duration // 60} minutes"
+        )
     
     # Create job in database
     job = Job(
@@ -77,6 +148,10 @@ async def create_job(
         trim_end=trim_end,
         status=JobStatus.PENDING,
         user_id=current_user.id if current_user else None,  # Associate with user if authenticated
+        duration_seconds=media.get("duration_seconds"),
+        sample_rate=media.get("sample_rate"),
+        channels=media.get("channels"),
+        codec=media.get("codec"),
     )
     
     db.add(job)
@@ -86,36 +161,44 @@ async def create_job(
     # Handle file upload - save_upload returns relative path
     if file:
         storage = StorageService()
-        file_path = await storage.save_upload(file, job.id)
+        # Optionally decode/analyze while the upload is written to storage
+        ingest = start_ingest(str(job.id))
+        file_path = await storage.save_upload(file, job.id, ingest=ingest)
+        if ingest:
+            # Analysis runs after the response; the worker waits for it
+            ingest.finish_later()
         job.source_file_path = file_path  # Now stores relative path
         await db.commit()
         await db.refresh(job)
     
+    # Handle completed resumable upload
+    elif upload_service:
+        try:
+            job.source_file_path = await upload_service.finalize(upload_id, job.id)
+        except UploadError as e:
+            await db.delete(job)
+            await db.commit()
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        await db.commit()
+        await db.refresh(job)
+    
     # Handle YouTube preview (file already downloaded)
     elif youtube_preview_id:
-        import shutil
-        redis = get_redis()
-        youtube_service = YouTubePreviewService(redis)
-        preview_file = youtube_service.get_preview_file_path(youtube_preview_id)
+        youtube_service = YouTubePreviewService(redis_client)
+        preview_path = youtube_service.get_preview_storage_path(youtube_preview_id)
         
-        if preview_file and os.path.exists(preview_file):
-            # Move preview file to permanent storage
+        if preview_path:
+            # Copy the preview (written by an I/O worker) to permanent storage;
+            # relative path locally, gs:// in GCS mode
             storage = StorageService()
-            dest_path = os.path.join(
-                settings.LOCAL_STORAGE_PATH,
-                "uploads",
-                f"{job.id}_source.wav"
-            )
-            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-            shutil.copy2(preview_file, dest_path)
-            
-            # Store relative path in database
-            job.source_file_path = storage.to_relative_path(dest_path)
+            job.source_file_path = await asyncio.to_thread(storage.copy_to_source, preview_path, job.id)
             await db.commit()
             await db.refresh(job)
             
             # Cleanup preview
-            youtube_service.cleanup_preview(youtube_preview_id)
+            await asyncio.to_thread(youtube_service.cleanup_preview, youtube_preview_id)
+    
+    record_job_change(redis_client, job.id, job.user_id)
     
     # Queue processing task
     process_audio_job.delay(str(job.id))
@@ -123,36 +206,176 @@ async def create_job(
     return job
 
 
+def _encode_cursor(job: Job) -> str:
+    """Opaque keyset cursor: the (created_at, id) of the last job on a page"""
+    raw = f"{job.created_at.isoformat()}|{job.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, job_id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _scope_filters(scope: str, current_user: Optional[User]) -> list:
+    """Job filters for `scope=mine` (the caller's, or anonymous, jobs) or admin-only `scope=all`"""
+    if scope == "mine":
+        return [Job.user_id == current_user.id if current_user else Job.user_id.is_(None)]
+    if scope == "all":
+        if not current_user or not current_user.is_admin:
+            raise HTTPException(status_code=403, detail="Listing all jobs requires admin access")
+        return []
+    raise HTTPException(status_code=400, detail="Invalid scope. Must be one of: ['mine', 'all']")
+
+
 @router.get("", response_model=JobListResponse)
 async def list_jobs(
-    page: int = 1,
-    page_size: int = 20,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    scope: str = "mine",
+    status: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_user_optional_for_jobs()),
 ):
-    """List all jobs with pagination"""
-    
-    # Get total count
-    count_query = select(Job)
-    result = await db.execute(count_query)
-    total = len(result.scalars().all())
-    
-    # Get paginated jobs
-    offset = (page - 1) * page_size
-    query = (
-        select(Job)
-        .order_by(desc(Job.created_at))
-        .offset(offset)
-        .limit(page_size)
-    )
+    """List jobs, newest first
     
-    result = await db.execute(query)
+    `scope=mine` (default) lists the caller's jobs, or anonymous jobs for
+    unauthenticated callers; `scope=all` lists every job and is admin-only.
+    `status=active|finished` filters on whether jobs are still processing.
+    
+    Pages can be fetched by number (`page`) or, cheaper for deep pages, by
+    passing the previous response's `next_cursor` as `cursor`, which seeks
+    on the (user_id, created_at, id) index instead of skipping rows. Pass
+    `include_total=false` to skip the COUNT when polling.
+    """
+    
+    filters = _scope_filters(scope, current_user)
+    
+    # Same predicate as the partial index on unfinished jobs, so the planner can use it
+    if status == "active":
+        filters.append(Job.status.in_(ACTIVE_STATUSES))
+    elif status == "finished":
+        filters.append(Job.status.in_(TERMINAL_STATUSES))
+    elif status is not None:
+        raise HTTPException(status_code=400, detail="Invalid status. Must be one of: ['active', 'finished']")
+    
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(Job).where(*filters))
+    
+    # id breaks ties between jobs created in the same instant, so pages never overlap
+    query = select(Job).where(*filters).order_by(desc(Job.created_at), desc(Job.id))
+    if cursor:
+        created_at, job_id = _decode_cursor(cursor)
+        query = query.where(tuple_(Job.created_at, Job.id) < tuple_(created_at, job_id))
+    else:
+        query = query.offset((page - 1) * page_size)
+    
+    # One extra row tells whether there is a next page
+    result = await db.execute(query.limit(page_size + 1))
     jobs = result.scalars().all()
+    next_cursor = _encode_cursor(jobs[page_size - 1]) if len(jobs) > page_size else None
     
     return JobListResponse(
-        jobs=jobs,
+        jobs=jobs[:page_size],
         total=total,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/changes", response_model=JobChangesResponse)
+async def list_job_changes(
+    since: Optional[str] = None,
+    wait: int = Query(0, ge=0, le=settings.JOB_CHANGES_MAX_WAIT_SECONDS),
+    scope: str = "mine",
+    db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis),
+    current_user: Optional[User] = Depends(get_current_user_optional_for_jobs()),
+):
+    """Jobs that changed since a cursor, for keeping a job list in sync
+    
+    Call without `since` to get the current cursor, load the list with
+    GET /api/jobs, then pass each response's `cursor` as `since`. Only jobs
+    created, updated or deleted after the cursor are returned. With
+    `wait=N` the request is held for up to N seconds until something
+    changes (long-polling). If `reset` is true the cursor is too old to
+    catch up; reload the list and continue from the new `cursor`.
+    
+    `scope` works as for GET /api/jobs.
+    """
+    filters = _scope_filters(scope, current_user)
+    owner_id = current_user.id if current_user else None
+    
+    if since is None:
+        return JobChangesResponse(cursor=current_cursor(redis_client))
+    if not CHANGES_CURSOR_RE.match(since):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if is_expired(redis_client, since):
+        return JobChangesResponse(cursor=current_cursor(redis_client), reset=True)
+    
+    # Don't hold a database connection while long-polling
+    await db.commit()
+    
+    cursor = since
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        generation = job_change_watcher.generation
+        changes = read_changes(redis_client, cursor, settings.JOB_CHANGES_BATCH_SIZE)
+        if changes:
+            cursor = changes[-1].cursor
+        # Later entries for the same job supersede earlier ones
+        latest = {
+            change.job_id: change for change in changes
+            if scope == "all" or change.user_id == owner_id
+        }
+        if latest or len(changes) == settings.JOB_CHANGES_BATCH_SIZE:
+            break
+        remaining = deadline - loop.time()
+        if remaining <= 0 or not await job_change_watcher.wait(generation, remaining):
+            break
+    
+    jobs = []
+    changed_ids = [job_id for job_id, change in latest.items() if not change.deleted]
+    if changed_ids:
+        result = await db.execute(
+            select(Job).where(Job.id.in_(changed_ids), *filters).order_by(desc(Job.created_at), desc(Job.id))
+        )
+        jobs = result.scalars().all()
+    # Jobs deleted after their last change entry are gone as well
+    found = {job.id for job in jobs}
+    deleted = [job_id for job_id in latest if job_id not in found]
+    
+    return JobChangesResponse(jobs=jobs, deleted=deleted, cursor=cursor)
+
+
+@router.post("/status:batch", response_model=JobStatusBatchResponse)
+async def get_job_statuses(
+    request: JobStatusBatchRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """Status and progress of many jobs in one round trip
+    
+    Accepts up to JOB_STATUS_BATCH_MAX_IDS job IDs and reads them with a
+    single primary-key query, for refreshing a page of job cards.
+    """
+    job_ids = list(dict.fromkeys(request.job_ids))
+    result = await db.execute(
+        select(Job.id, Job.status, Job.progress_percent).where(Job.id.in_(job_ids))
+    )
+    jobs = {job_id: (job_status, progress or 0) for job_id, job_status, progress in result}
+    
+    return JobStatusBatchResponse(
+        jobs=jobs,
+        missing=[job_id for job_id in job_ids if job_id not in jobs],
     )
 
 
@@ -173,10 +396,69 @@ async def get_job(
     return job
 
 
+@router.get("/{job_id}/events")
+async def stream_job_events(
+    job_id: UUID,
+    last_event_id: Optional[str] = Query(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis),
+):
+    """Job progress as Server-Sent Events
+    
+    For clients that can't use the WebSocket service (e.g. behind proxies
+    that drop WebSockets). Each event carries a progress update in the
+    WebSocket message format, with its `event_id` as the SSE event ID.
+    
+    New streams start with the job's latest update; reconnecting EventSource
+    clients send the `Last-Event-ID` header and get every update after it.
+    `last_event_id` does the same for clients that can't set the header.
+    The stream ends after the job finishes. Reconnecting to a finished job
+    with nothing left to send returns 204, which stops EventSource retries.
+    """
+    resume_from = last_event_id_header or last_event_id
+    if resume_from and not EVENT_ID_RE.match(resume_from):
+        raise HTTPException(status_code=400, detail="Invalid event ID")
+    
+    result = await db.execute(select(Job.status).where(Job.id == job_id))
+    job_status = result.scalar_one_or_none()
+    if job_status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # Don't hold a database connection for the life of the stream
+    await db.commit()
+    
+    if job_status in TERMINAL_STATUSES:
+        # Nothing live to wait for; send what the client missed, if anything
+        history = read_progress_history(redis_client, job_id, resume_from)
+        if not history:
+            return Response(status_code=204)
+        queue = None
+    else:
+        # Subscribe before reading history, so no update falls in between
+        queue = await progress_broker.subscribe(job_id)
+        history = read_progress_history(redis_client, job_id, resume_from)
+    
+    async def body():
+        try:
+            async for event in progress_event_stream(queue, history, settings.JOB_EVENTS_KEEPALIVE_SECONDS):
+                yield event
+        finally:
+            if queue is not None:
+                progress_broker.unsubscribe(job_id, queue)
+    
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        # Keep proxies (nginx) from buffering events
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/{job_id}/cancel")
 async def cancel_job(
     job_id: UUID,
     db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis),
 ):
     """Cancel a running job"""
     
@@ -188,13 +470,23 @@ async def cancel_job(
         raise HTTPException(status_code=404, detail="Job not found")
     
     # Can only cancel jobs that are not completed or already cancelled
-    if job.status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED]:
+    if job.status in TERMINAL_STATUSES:
         raise HTTPException(status_code=400, detail=f"Cannot cancel job with status {job.status}")
     
     # Update job status to CANCELLED
     job.status = JobStatus.CANCELLED
     await db.commit()
     await db.refresh(job)
+    record_job_change(redis_client, job.id, job.user_id)
+    # Ends SSE streams and tells WebSocket clients; the worker doesn't report cancellations
+    try:
+        publish_job_progress(redis_client, str(job.id), {
+            "job_id": str(job.id),
+            "status": job.status.value,
+            "progress_percent": job.progress_percent or 0,
+        }, user_id=job.user_id)
+    except RedisError as e:
+        print(f"Warning: Could not publish cancellation of job {job.id}: {e}")
     
     # TODO: Send signal to Celery to terminate the task
     # For now, the worker will complete but the job is marked as cancelled
@@ -207,6 +499,7 @@ async def reprocess_job(
     job_id: UUID,
     quality_mode: str = "high",
     db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis),
 ):
     """
     Reprocess an existing job with different quality settings
@@ -228,11 +521,13 @@ async def reprocess_job(
             detail="Can only reprocess completed jobs"
         )
     
-    # Resolve relative path to absolute for file existence check
-    storage = StorageService()
-    abs_source_path = storage.get_local_path(original_job.source_file_path) if original_job.source_file_path else None
+    # Only checks that the source still exists, without fetching it in GCS mode
+    source_size = (
+        await asyncio.to_thread(StorageService().file_size, original_job.source_file_path)
+        if original_job.source_file_path else 0
+    )
     
-    if not abs_source_path or not os.path.exists(abs_source_path):
+    if not source_size:
         raise HTTPException(
             status_code=400,
             detail="Source file no longer available for reprocessing"
@@ -254,6 +549,7 @@ async def reprocess_job(
     db.add(new_job)
     await db.commit()
     await db.refresh(new_job)
+    record_job_change(redis_client, new_job.id, new_job.user_id)
     
     # Queue processing task (will skip download/upload since source file exists)
     from app.tasks.audio_processing import process_audio_job
@@ -266,6 +562,7 @@ async def reprocess_job(
 async def delete_job(
     job_id: UUID,
     db: AsyncSession = Depends(get_db),
+    redis_client: Redis = Depends(get_redis),
 ):
     """Delete a job and its associated files"""
     
@@ -276,21 +573,46 @@ async def delete_job(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    # TODO: Delete files from storage
+    # A worker may still be writing the job's files
+    if job.status not in TERMINAL_STATUSES:
+        raise HTTPException(status_code=409, detail="Job is still processing; cancel it first")
+    
+    # Files first, so a failure leaves the job to delete again; a source
+    # shared with reprocessed jobs stays until the last of them is deleted
+    shared = await referenced_sources(db, [job.source_file_path], [job.id])
+    await asyncio.to_thread(remove_job_files, job, StorageService(), job.source_file_path in shared)
     
     # Delete job from database
+    owner_id = job.user_id
     await db.delete(job)
     await db.commit()
+    record_job_change(redis_client, job_id, owner_id, deleted=True)
     
     return {"message": "Job deleted successfully"}
 
 
-@router.get("/{job_id}/source")
+async def _local_file(path: str) -> Optional[str]:
+    """Resolve a stored file to a local path, or None if it is missing
+
+    Runs off the event loop: in GCS mode the blob cache may have to
+    revalidate or download the file first.
+    """
+    def resolve():
+        try:
+            local_path = StorageService().get_local_path(path)
+        except FileNotFoundError:
+            return None
+        return local_path if os.path.exists(local_path) else None
+
+    return await asyncio.to_thread(resolve)
+
+
+@router.api_route("/{job_id}/source", methods=["GET", "HEAD"])
 async def get_source_audio(
     job_id: UUID,
     db: AsyncSession = Depends(get_db),
 ):
-    """Get the source audio file for preview"""
+    """Get the source audio file for preview (supports Range requests)"""
     
     query = select(Job).where(Job.id == job_id)
     result = await db.execute(query)
@@ -302,32 +624,33 @@ async def get_source_audio(
     if not job.source_file_path:
         raise HTTPException(status_code=404, detail="Source file not found")
     
-    # For local mode, serve the file directly
-    if settings.STORAGE_MODE == "local":
-        # Resolve relative path to absolute
-        storage = StorageService()
-        abs_path = storage.get_local_path(job.source_file_path)
-        
-        if not os.path.exists(abs_path):
-            raise HTTPException(status_code=404, detail="Source file not found on disk")
-        
-        return FileResponse(
-            path=abs_path,
-            media_type="audio/mpeg",  # Browser can handle multiple audio types
-            filename=f"{job.project_name}_source.wav"
-        )
-    else:
-        # For GCS mode, generate signed URL
-        raise HTTPException(status_code=501, detail="GCS source preview not implemented")
+    # Resolve to a local file (from the blob cache in GCS mode)
+    abs_path = await _local_file(job.source_file_path)
+    if not abs_path:
+        raise HTTPException(status_code=404, detail="Source file not found on disk")
+    
+    # Content type follows the stored format (flac/mp3/wav)
+    file_ext = os.path.splitext(abs_path)[1]
+    return AudioFileResponse(
+        path=abs_path,
+        filename=f"{job.project_name}_source{file_ext}"
+    )
 
 
-@router.get("/{job_id}/stems/{stem_type}")
+@router.api_route("/{job_id}/stems/{stem_type}", methods=["GET", "HEAD"])
 async def get_stem(
     job_id: UUID,
     stem_type: str,
+    output_format: Optional[str] = Query(None, alias="format"),
+    bitrate: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    """Get individual stem file for mixing preview"""
+    """Get individual stem file for mixing preview (supports Range requests)
+    
+    Without `format` the stored 24-bit WAV is served. `format=opus|mp3|flac`
+    (with an optional `bitrate` in kbps) serves a compressed rendition,
+    transcoded on first request and cached.
+    """
     
     valid_stems = ["vocals", "drums", "bass", "other"]
     if stem_type not in valid_stems:
@@ -346,23 +669,315 @@ async def get_stem(
     if not job.stems_folder_path:
         raise HTTPException(status_code=404, detail="Stems not found")
     
-    # Resolve relative path to absolute
-    storage = StorageService()
-    abs_stems_path = storage.get_local_path(job.stems_folder_path)
-    
-    # Find the stem file
-    stem_file = os.path.join(abs_stems_path, f"{stem_type}.wav")
-    
-    if not os.path.exists(stem_file):
+    stem_file = await _local_file(f"{job.stems_folder_path}/{stem_type}.wav")
+    if not stem_file:
         raise HTTPException(status_code=404, detail=f"Stem file not found: {stem_type}")
     
-    return FileResponse(
+    if output_format and output_format != "wav":
+        try:
+            rendition = await get_rendition(stem_file, output_format, bitrate)
+        except TranscodeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        spec = TRANSCODE_FORMATS[output_format]
+        return AudioFileResponse(
+            path=rendition,
+            media_type=spec.media_type,
+            filename=f"{stem_type}{spec.extension}"
+        )
+    
+    return AudioFileResponse(
         path=stem_file,
         media_type="audio/wav",
         filename=f"{stem_type}.wav"
     )
 
 
+async def _local_stem_paths(job: Job) -> dict[str, str]:
+    """Resolve all four stems of a job to local files (from the blob cache in GCS mode)"""
+    stem_files = await asyncio.gather(
+        *(_local_file(f"{job.stems_folder_path}/{stem_type}.wav") for stem_type in MIX_STEMS)
+    )
+    stem_paths = {}
+    for stem_type, stem_file in zip(MIX_STEMS, stem_files):
+        if not stem_file:
+            raise HTTPException(status_code=404, detail=f"Stem file not found: {stem_type}")
+        stem_paths[stem_type] = stem_file
+    return stem_paths
+
+
+@router.api_route("/{job_id}/stems", methods=["GET", "HEAD"])
+async def get_multitrack(
+    job_id: UUID,
+    output_format: str = Query("wav", alias="format"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get all stems in one multichannel file, for loading the stem mixer in one request
+
+    Channels are grouped per stem in the order given by X-Stem-Order (vocals,
+    drums, bass, other), X-Stem-Channels each: 8 channels for stereo stems.
+    `format=wav` (default) streams while it is rendered on first request, so
+    clients can decode as it downloads; `format=flac` is lossless and about
+    half the size, but waits for the full render and encode.
+    """
+
+    if output_format not in MULTITRACK_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Must be one of: {MULTITRACK_FORMATS}")
+
+    query = select(Job).where(Job.id == job_id)
+    result = await db.execute(query)
+    job = result.scalar_one_or_none()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(status_code=400, detail="Job not yet completed")
+
+    if not job.stems_folder_path:
+        raise HTTPException(status_code=404, detail="Stems not found")
+
+    stem_paths = await _local_stem_paths(job)
+    multitrack_file = multitrack_path(stem_paths)
+    filename = f"{job.project_name}_stems"
+
+    if output_format == "flac":
+        try:
+            multitrack_file = await get_cached_multitrack(stem_paths)
+        except MixdownError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        layout = await asyncio.to_thread(read_wav_layout, multitrack_file)
+        rendition = await get_rendition(multitrack_file, "flac")
+        return AudioFileResponse(
+            path=rendition,
+            media_type=TRANSCODE_FORMATS["flac"].media_type,
+            filename=f"{filename}.flac",
+            headers={
+                "x-stem-order": ",".join(MIX_STEMS),
+                "x-stem-channels": str(layout.channels // len(MIX_STEMS)),
+            }
+        )
+
+    try:
+        _, _, size, stem_channels = open_multitrack(stem_paths)
+    except MixdownError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stem_headers = {"x-stem-order": ",".join(MIX_STEMS), "x-stem-channels": str(stem_channels)}
+
+    if os.path.exists(multitrack_file):
+        touch_rendition(multitrack_file)
+        return AudioFileResponse(
+            path=multitrack_file, media_type="audio/wav", filename=f"{filename}.wav", headers=stem_headers
+        )
+
+    # First request: stream while it is rendered in the pool, which caches it
+    return StreamingResponse(
+        stream_multitrack(stem_paths),
+        media_type="audio/wav",
+        headers={
+            **stem_headers,
+            "content-length": str(size),
+            "content-disposition": f'inline; filename="{filename}.wav"',
+        },
+    )
+
+
+@router.get("/{job_id}/mixdown")
+async def get_mixdown(
+    job_id: UUID,
+    vocals: float = 0.0,
+    drums: float = 0.0,
+    bass: float = 0.0,
+    other: float = 0.0,
+    mute: list[str] = Query([]),
+    output_format: Optional[str] = Query(None, alias="format"),
+    bitrate: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Render a practice mix of the stems with per-stem gains (dB) and mutes
+
+    The mix is rendered server-side and streamed as a 24-bit WAV; identical
+    mixes are then served from the cache (with Range support). `format` and
+    `bitrate` work as for single stems.
+    """
+
+    query = select(Job).where(Job.id == job_id)
+    result = await db.execute(query)
+    job = result.scalar_one_or_none()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(status_code=400, detail="Job not yet completed")
+
+    if not job.stems_folder_path:
+        raise HTTPException(status_code=404, detail="Stems not found")
+
+    try:
+        gains = resolve_gains({"vocals": vocals, "drums": drums, "bass": bass, "other": other}, mute)
+    except MixdownError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    stem_paths = await _local_stem_paths(job)
+    mix_file = mixdown_path(stem_paths, gains)
+    filename = f"{job.project_name}_mix"
+
+    if output_format and output_format != "wav":
+        try:
+            resolve_bitrate(output_format, bitrate)
+            rendition = await get_rendition(await get_cached_mixdown(stem_paths, gains), output_format, bitrate)
+        except (MixdownError, TranscodeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        spec = TRANSCODE_FORMATS[output_format]
+        return AudioFileResponse(
+            path=rendition,
+            media_type=spec.media_type,
+            filename=f"{filename}{spec.extension}"
+        )
+
+    if os.path.exists(mix_file):
+        touch_rendition(mix_file)
+        return AudioFileResponse(path=mix_file, media_type="audio/wav", filename=f"{filename}.wav")
+
+    try:
+        _, _, size = open_mixdown(stem_paths, gains)
+    except MixdownError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # First request for this mix: stream while it is rendered in the pool, which caches it
+    return StreamingResponse(
+        stream_mixdown(stem_paths, gains),
+        media_type="audio/wav",
+        headers={
+            "content-length": str(size),
+            "content-disposition": f'inline; filename="{filename}.wav"',
+        },
+    )
+
+
+@router.api_route("/{job_id}/peaks/{stem_type}", methods=["GET", "HEAD"])
+async def get_peaks(
+    job_id: UUID,
+    stem_type: str,
+    level: int = 0,
+    db: AsyncSession = Depends(get_db),
+):
+    """Get precomputed waveform peaks for a stem or the source
+    
+    Level 0 is the finest (PEAKS_BASE_SAMPLES_PER_PIXEL samples per min/max
+    pair); each higher level halves the resolution. The body is an
+    audiowaveform .dat file.
+    """
+    
+    valid_names = ["vocals", "drums", "bass", "other", "source"]
+    if stem_type not in valid_names:
+        raise HTTPException(status_code=400, detail=f"Invalid stem type. Must be one of: {valid_names}")
+    if not 0 <= level < settings.PEAKS_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Level must be between 0 and {settings.PEAKS_LEVELS - 1}")
+    
+    query = select(Job).where(Job.id == job_id)
+    result = await db.execute(query)
+    job = result.scalar_one_or_none()
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job.status != JobStatus.COMPLETED or not job.stems_folder_path:
+        raise HTTPException(status_code=404, detail="Peaks not available")
+    
+    peaks_file = await _local_file(f"{job.stems_folder_path}/peaks/{peaks_filename(stem_type, level)}")
+    
+    # Jobs processed before peaks existed have none; clients fall back to decoding audio
+    if not peaks_file:
+        raise HTTPException(status_code=404, detail="Peaks not available")
+    
+    return AudioFileResponse(
+        path=peaks_file,
+        media_type="application/octet-stream",
+        max_age=86400
+    )
+
+
+async def _hls_source_file(job_id: UUID, name: str, db: AsyncSession) -> str:
+    """Resolve the audio file behind an HLS stream: the source, or a stem of a completed job"""
+
+    valid_names = ["source", "vocals", "drums", "bass", "other"]
+    if name not in valid_names:
+        raise HTTPException(status_code=400, detail=f"Invalid stream. Must be one of: {valid_names}")
+
+    query = select(Job).where(Job.id == job_id)
+    result = await db.execute(query)
+    job = result.scalar_one_or_none()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if name == "source":
+        path = job.source_file_path
+    elif job.status == JobStatus.COMPLETED and job.stems_folder_path:
+        path = f"{job.stems_folder_path}/{name}.wav"
+    else:
+        path = None
+    if not path:
+        raise HTTPException(status_code=404, detail="Audio not available")
+
+    local_path = await _local_file(path)
+    if not local_path:
+        raise HTTPException(status_code=404, detail="Audio not available")
+    return local_path
+
+
+@router.api_route("/{job_id}/hls/{name}/playlist.m3u8", methods=["GET", "HEAD"])
+async def get_hls_playlist(
+    job_id: UUID,
+    name: str,
+    db: AsyncSession = Depends(get_db),
+):
+    """Get an HLS playlist for the source or a stem
+
+    Segments are encoded on the first request. The playlist is revalidated
+    on every use; its segment URLs are versioned and never change content.
+    """
+
+    rendition = await get_hls_rendition(await _hls_source_file(job_id, name, db))
+    return AudioFileResponse(
+        path=rendition.playlist,
+        media_type="application/vnd.apple.mpegurl",
+        max_age=0
+    )
+
+
+@router.api_route("/{job_id}/hls/{name}/{version}/{segment}", methods=["GET", "HEAD"])
+async def get_hls_segment(
+    job_id: UUID,
+    name: str,
+    version: str,
+    segment: str,
+    db: AsyncSession = Depends(get_db),
+):
+    """Get one HLS segment (cacheable indefinitely)"""
+
+    if not HLS_SEGMENT_RE.match(segment):
+        raise HTTPException(status_code=404, detail="Segment not found")
+
+    source_file = await _hls_source_file(job_id, name, db)
+    if hls_rendition(source_file).version != version:
+        # The audio changed (e.g. reprocessed); the player must reload the playlist
+        raise HTTPException(status_code=404, detail="Segment not found")
+
+    # Rebuilt if the segments were evicted from the cache since the playlist was served
+    rendition = await get_hls_rendition(source_file)
+    segment_file = rendition.segment(segment)
+    if not os.path.exists(segment_file):
+        raise HTTPException(status_code=404, detail="Segment not found")
+
+    return AudioFileResponse(
+        path=segment_file,
+        media_type="video/mp2t",
+        max_age=31536000
+    )
+
+
 @router.get("/{job_id}/download")
 async def download_package(
     job_id: UUID,
@@ -386,10 +1001,9 @@ async def download_package(
     # For local mode, serve the file directly
     if settings.STORAGE_MODE == "local":
         # Resolve relative path to absolute
-        storage = StorageService()
-        abs_path = storage.get_local_path(job.package_path)
+        abs_path = await _local_file(job.package_path)
         
-        if not os.path.exists(abs_path):
+        if not abs_path:
             raise HTTPException(status_code=404, detail="Package file not found on disk")
         
         return FileResponse(
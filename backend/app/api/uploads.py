@@ -0,0 +1,77 @@
+"""
+Resumable upload endpoints
+
+Large files are sent as a sequence of chunks so a dropped connection only
+costs the chunk in flight:
+
+    POST /api/uploads                      -> {upload_id, offset: 0}
+    PUT  /api/uploads/{id}?offset=N        (raw bytes)  -> {offset}
+    GET  /api/uploads/{id}                 -> {offset} (resume point)
+    POST /api/jobs/create (upload_id=...)  -> finalizes into a job
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from redis import Redis
+
+from app.core.database import get_redis
+from app.schemas.upload import UploadInitRequest, UploadStatusResponse
+from app.services.uploads import ResumableUploadService, UploadError
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+
+def raise_upload_error(error: UploadError):
+    """Translate an UploadError into an HTTP error carrying the resume offset"""
+    headers = {"Upload-Offset": str(error.offset)} if error.offset is not None else None
+    raise HTTPException(status_code=error.status_code, detail=str(error), headers=headers)
+
+
+@router.post("", response_model=UploadStatusResponse, status_code=201)
+async def init_upload(
+    upload_request: UploadInitRequest,
+    redis_client: Redis = Depends(get_redis)
+):
+    """Start a resumable upload session"""
+    upload_service = ResumableUploadService(redis_client)
+    try:
+        return upload_service.init_upload(upload_request.filename, upload_request.total_size)
+    except UploadError as e:
+        raise_upload_error(e)
+
+
+@router.get("/{upload_id}", response_model=UploadStatusResponse)
+async def get_upload(
+    upload_id: str,
+    redis_client: Redis = Depends(get_redis)
+):
+    """Get the current offset of an upload (used to resume after a disconnect)"""
+    upload_service = ResumableUploadService(redis_client)
+    upload = upload_service.get_upload(upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+    return upload
+
+
+@router.put("/{upload_id}", response_model=UploadStatusResponse)
+async def append_upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="Byte offset of this chunk"),
+    redis_client: Redis = Depends(get_redis)
+):
+    """Append a chunk (raw request body) at the given offset"""
+    upload_service = ResumableUploadService(redis_client)
+    try:
+        return await upload_service.append_chunk(upload_id, offset, request.stream())
+    except UploadError as e:
+        raise_upload_error(e)
+
+
+@router.delete("/{upload_id}")
+async def abort_upload(
+    upload_id: str,
+    redis_client: Redis = Depends(get_redis)
+):
+    """Discard an upload session"""
+    upload_service = ResumableUploadService(redis_client)
+    await upload_service.abort(upload_id)
+    return {"message": "Upload aborted"}
@@ -1,52 +1,92 @@
 import os
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse
 from redis import Redis
-from app.schemas.youtube import YouTubePreviewRequest, YouTubePreviewResponse
+from app.schemas.youtube import YouTubePreviewRequest, YouTubePreviewStatusResponse
 from app.services.youtube_preview import YouTubePreviewService
+from app.tasks.youtube_preview import create_youtube_preview as create_youtube_preview_task
 from app.core.database import get_redis
+from app.core.responses import AudioFileResponse
+from app.core.config import settings
 
 router = APIRouter(prefix="/youtube", tags=["youtube"])
 
 
-@router.post("/preview", response_model=YouTubePreviewResponse)
+@router.post("/preview", response_model=YouTubePreviewStatusResponse, status_code=202)
 async def create_youtube_preview(
     request: YouTubePreviewRequest,
     redis_client: Redis = Depends(get_redis)
 ):
     """
-    Download YouTube audio and create a preview
-    Returns preview ID and metadata for display
+    Queue a YouTube audio download for preview
+    Returns the preview ID immediately; progress is published on
+    youtube_preview:{id}:progress and available from GET /preview/{id}
     """
-    try:
-        youtube_service = YouTubePreviewService(redis_client)
-        preview_data = youtube_service.download_and_preview(str(request.url))
+    youtube_service = YouTubePreviewService(redis_client)
+    preview_status = youtube_service.create_preview(str(request.url))
         
-        return YouTubePreviewResponse(**preview_data)
+    create_youtube_preview_task.delay(preview_status["preview_id"], str(request.url))
         
-    except Exception as e:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Failed to download YouTube audio: {str(e)}"
-        )
+    return YouTubePreviewStatusResponse(**preview_status)
+
+
+@router.get("/preview/{preview_id}", response_model=YouTubePreviewStatusResponse)
+async def get_preview_status(
+    preview_id: str,
+    redis_client: Redis = Depends(get_redis)
+):
+    """Get the status, progress and metadata of a preview"""
+    youtube_service = YouTubePreviewService(redis_client)
+    preview_status = youtube_service.get_status(preview_id)
+    
+    if not preview_status:
+        raise HTTPException(status_code=404, detail="Preview not found or expired")
+    
+    return YouTubePreviewStatusResponse(**preview_status)
 
 
-@router.get("/preview/{preview_id}/audio")
+@router.api_route("/preview/{preview_id}/audio", methods=["GET", "HEAD"])
 async def get_preview_audio(
     preview_id: str,
     redis_client: Redis = Depends(get_redis)
 ):
     """Stream the preview audio file"""
     youtube_service = YouTubePreviewService(redis_client)
-    file_path = youtube_service.get_preview_file_path(preview_id)
+    # Off the event loop: in GCS mode the file may be downloaded first
+    file_path = await asyncio.to_thread(youtube_service.get_preview_file_path, preview_id)
     
     if not file_path or not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Preview not found or expired")
     
-    return FileResponse(
+    # Previews are short-lived, so caches must revalidate
+    return AudioFileResponse(
         path=file_path,
         media_type="audio/wav",
-        filename="preview.wav"
+        filename="preview.wav",
+        max_age=0
+    )
+
+
+@router.api_route("/preview/{preview_id}/peaks", methods=["GET", "HEAD"])
+async def get_preview_peaks(
+    preview_id: str,
+    level: int = 0,
+    redis_client: Redis = Depends(get_redis)
+):
+    """Get precomputed waveform peaks for the preview audio (audiowaveform .dat)"""
+    if not 0 <= level < settings.PEAKS_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Level must be between 0 and {settings.PEAKS_LEVELS - 1}")
+    
+    youtube_service = YouTubePreviewService(redis_client)
+    peaks_path = await asyncio.to_thread(youtube_service.get_preview_peaks_path, preview_id, level)
+    
+    if not peaks_path or not os.path.exists(peaks_path):
+        raise HTTPException(status_code=404, detail="Peaks not found or expired")
+    
+    return AudioFileResponse(
+        path=peaks_path,
+        media_type="application/octet-stream",
+        max_age=0
     )
 
 
@@ -57,7 +97,7 @@ async def delete_preview(
 ):
     """Delete a preview (optional - Redis TTL handles this automatically)"""
     youtube_service = YouTubePreviewService(redis_client)
-    youtube_service.cleanup_preview(preview_id)
+    await asyncio.to_thread(youtube_service.cleanup_preview, preview_id)
     
     return {"message": "Preview deleted"}
 
@@ -5,7 +5,7 @@ celery_app = Celery(
     "rehearsekit",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=["app.tasks.audio_processing"],
+    include=["app.tasks.audio_processing", "app.tasks.youtube_preview", "app.tasks.retention"],
 )
 
 # Celery configuration
@@ -19,5 +19,20 @@ celery_app.conf.update(
     task_time_limit=3600,  # 1 hour max per task
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=10,
+    # Network-bound work goes to a dedicated queue so it never waits behind
+    # (or blocks) stem separation: celery -A app.celery_app worker -Q io
+    task_routes={
+        "app.tasks.youtube_preview.*": {"queue": "io"},
+        "app.tasks.retention.*": {"queue": "io"},
+    },
+    # Periodic tasks, sent by one scheduler: celery -A app.celery_app beat
+    beat_schedule={
+        "sweep-expired-jobs": {
+            "task": "app.tasks.retention.sweep_expired_jobs",
+            "schedule": settings.JOB_RETENTION_SWEEP_INTERVAL,
+            # A sweep still queued when the next is due is redundant
+            "options": {"expires": settings.JOB_RETENTION_SWEEP_INTERVAL},
+        },
+    },
 )
 
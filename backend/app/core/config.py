@@ -24,12 +24,40 @@ class Settings(BaseSettings):
     GCS_BUCKET_UPLOADS: str = "rehearsekit-uploads"
     GCS_BUCKET_STEMS: str = "rehearsekit-stems"
     GCS_BUCKET_PACKAGES: str = "rehearsekit-packages"
+    GCS_CACHE_DIR: str = "/tmp/rehearsekit-blob-cache"  # Local copies of blobs read in GCS mode
+    GCS_CACHE_MAX_BYTES: int = 10 * 1024 * 1024 * 1024  # 10 GB, least recently used evicted first
+    GCS_CACHE_REVALIDATE_SECONDS: int = 60  # Cached blobs are served without asking GCS for this long
+    GCS_UPLOAD_CONCURRENCY: int = 8  # Files (or composite parts) uploaded in parallel
+    GCS_COMPOSITE_UPLOAD_THRESHOLD: int = 256 * 1024 * 1024  # Parallel composite upload at or above this size (0 = never)
+    GCS_COMPOSITE_PART_SIZE: int = 64 * 1024 * 1024  # Minimum part size; at most 32 parts per object
     GOOGLE_APPLICATION_CREDENTIALS: Optional[str] = None
     
     # Storage mode
     STORAGE_MODE: str = "local"  # "local" or "gcs"
     LOCAL_STORAGE_PATH: str = "/tmp/storage"
     
+    # Uploads
+    UPLOAD_MAX_SIZE: int = 1024 * 1024 * 1024  # 1 GB (large FLACs)
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024  # Streaming read/write size; multiple of 256 KB for GCS
+    UPLOAD_SESSION_TTL: int = 24 * 3600  # Resumable upload sessions expire after a day
+    PIPELINED_INGEST: bool = False  # Decode uploads while they arrive (local storage mode only)
+    INGEST_MAX_DECODERS: int = 4  # Uploads decoded at once; others are converted by the worker
+    INGEST_MANIFEST_WAIT: int = 120  # Seconds the worker waits for an upload's ingest to finish
+    MAX_SOURCE_DURATION_SECONDS: int = 3600  # Reject longer sources at upload time (0 = no limit)
+    
+    # Waveform peaks (precomputed for stems, sources and previews)
+    PEAKS_BASE_SAMPLES_PER_PIXEL: int = 256  # Resolution of level 0; each level halves it
+    PEAKS_LEVELS: int = 6  # Levels 0..5 = 256..8192 samples per min/max pair
+    PEAKS_BITS: int = 8  # 8 or 16-bit peak values
+    
+    # On-demand stem transcoding (Opus/MP3/FLAC renditions)
+    TRANSCODE_WORKERS: int = 2  # Encodes running at once, so playback requests can't starve the API
+    TRANSCODE_MAX_PENDING: int = 8  # Queued + running encodes before returning 503
+    TRANSCODE_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # 2 GB incl. mixdowns, least recently used evicted first
+    MIXDOWN_BLOCK_FRAMES: int = 65536  # Frames per stem read when rendering a mixdown
+    HLS_SEGMENT_SECONDS: int = 6  # Duration of each HLS segment
+    HLS_BITRATE: int = 128  # AAC kbps for HLS segments
+    
     # CORS
     CORS_ORIGINS: list[str] = [
         "http://localhost:3000",
@@ -42,8 +70,33 @@ class Settings(BaseSettings):
         "https://rehearsekit-backend-748316872223.us-central1.run.app"
     ]
     
-    # Job retention
-    JOB_RETENTION_DAYS: int = 7
+    # YouTube previews (downloaded by the "io" Celery queue)
+    YOUTUBE_PREVIEW_MAX_CONCURRENT: int = 3  # Simultaneous downloads across all workers
+    YOUTUBE_PREVIEW_RETRY_DELAY: int = 5  # Seconds before a queued preview retries for a slot
+    YOUTUBE_PREVIEW_MAX_RETRIES: int = 120  # Slot retries before a queued preview fails (10 min)
+    YOUTUBE_PREVIEW_SLOT_TTL: int = 900  # Reclaim slots leaked by crashed workers
+    
+    # Job change feed (GET /api/jobs/changes)
+    JOB_CHANGES_RETENTION_SECONDS: int = 3600  # Older cursors get `reset` and must reload the list
+    JOB_CHANGES_MAX_WAIT_SECONDS: int = 55  # Longest long-poll, below common 60 s proxy timeouts
+    JOB_CHANGES_BATCH_SIZE: int = 500  # Change log entries read per call
+    JOB_STATUS_BATCH_MAX_IDS: int = 100  # Job IDs per POST /api/jobs/status:batch
+    
+    # Job progress event streams (snapshot and replay for WebSocket and SSE clients)
+    JOB_EVENTS_MAX_LENGTH: int = 100  # Latest progress updates kept per job
+    JOB_EVENTS_TTL: int = 24 * 3600  # Streams of jobs without updates expire after a day
+    JOB_EVENTS_KEEPALIVE_SECONDS: int = 15  # SSE comment sent on quiet streams, below proxy idle timeouts
+    JOB_EVENTS_STREAM_BUFFER: int = 100  # Live updates queued per SSE stream before it is ended
+    
+    # Admin dashboard (GET /api/admin/stats)
+    ADMIN_STATS_CACHE_SECONDS: int = 60  # Job counts may lag this long; user changes invalidate at once
+    ADMIN_STATS_DAYS: int = 30  # Days covered by jobs per day
+    
+    # Job retention (swept by Celery beat: celery -A app.celery_app beat)
+    JOB_RETENTION_DAYS: int = 7  # Finished jobs older than this are deleted with their files; 0 keeps them
+    JOB_RETENTION_SWEEP_INTERVAL: int = 3600  # Seconds between sweeps
+    JOB_RETENTION_BATCH_SIZE: int = 100  # Jobs deleted per transaction
+    JOB_RETENTION_MAX_BATCHES: int = 50  # Per sweep; a larger backlog is worked off by later sweeps
     
     # JWT Authentication
     JWT_SECRET_KEY: str = ""  # Must be set via environment variable
@@ -51,6 +104,11 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60  # 1 hour (reduced from 24 hours for better security)
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
+    # Password hashing (bcrypt runs in a dedicated, bounded thread pool)
+    BCRYPT_ROUNDS: int = 12  # Existing hashes with a different cost are upgraded on login
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32  # Queued + running hashes before returning 503
+    
     # Google OAuth
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
@@ -79,6 +79,27 @@ class RateLimitError(HTTPException):
         self.retry_after = retry_after
 
 
+class ServiceUnavailableError(HTTPException):
+    """Raised when a bounded resource pool is saturated"""
+    
+    def __init__(
+        self,
+        detail: str = "Service temporarily unavailable",
+        status_code: int = status.HTTP_503_SERVICE_UNAVAILABLE,
+        retry_after: Optional[int] = None
+    ):
+        headers = {}
+        if retry_after:
+            headers["Retry-After"] = str(retry_after)
+        
+        super().__init__(
+            status_code=status_code,
+            detail=detail,
+            headers=headers
+        )
+        self.retry_after = retry_after
+
+
 def create_structured_error_response(
     error_type: str,
     message: str,
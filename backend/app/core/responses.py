@@ -0,0 +1,62 @@
+"""
+Responses for serving audio files
+"""
+import os
+from typing import Optional
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+
+class AudioFileResponse(FileResponse):
+    """
+    FileResponse for audio playback and seeking
+
+    Starlette's FileResponse already answers Range requests with 206 (single
+    and multipart/byteranges, including suffix ranges like bytes=-1000) and
+    honours If-Range against the ETag/Last-Modified validators. On top of
+    that this adds:
+
+    - If-None-Match revalidation (304 Not Modified)
+    - Cache-Control, so browsers and proxies can keep (partial) responses
+    - inline Content-Disposition, since players stream rather than download
+    """
+
+    # Headers a 304 must repeat (RFC 9110, section 15.4.5)
+    NOT_MODIFIED_HEADERS = ("etag", "last-modified", "cache-control")
+
+    def __init__(
+        self,
+        path: str,
+        media_type: Optional[str] = None,
+        filename: Optional[str] = None,
+        max_age: int = 3600,
+        headers: Optional[dict[str, str]] = None,
+    ):
+        cache_control = f"public, max-age={max_age}" if max_age else "no-cache"
+        super().__init__(
+            path,
+            media_type=media_type,
+            filename=filename,
+            headers={**(headers or {}), "cache-control": cache_control},
+            stat_result=os.stat(path),
+            content_disposition_type="inline",
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, self.headers["etag"]):
+            headers = {
+                name: self.headers[name] for name in self.NOT_MODIFIED_HEADERS if name in self.headers
+            }
+            await Response(status_code=304, headers=headers)(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match list against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
@@ -1,15 +1,28 @@
 """
 Security utilities for authentication
-- Password hashing using bcrypt
+- Password hashing using bcrypt (off the event loop, bounded concurrency)
 - JWT token generation and validation
 - Token blacklisting/revocation
 """
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, TypeVar
 from jose import JWTError, jwt
 import bcrypt
 import redis
 from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+
+T = TypeVar("T")
+
+# bcrypt takes ~100-300 ms per call, so it must never run on the event loop.
+# Hashes run in a dedicated pool; _pending_hashes counts queued + running work
+# so a login burst is rejected with 503 instead of queueing without bound.
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_lock = threading.Lock()
+_pending_hashes = 0
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -19,11 +32,83 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """Hash a password for storage"""
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a bcrypt hash was created with a different cost factor
+    
+    Args:
+        hashed_password: Stored bcrypt hash ("$2b$<rounds>$<salt+hash>")
+        
+    Returns:
+        True if the hash should be regenerated with settings.BCRYPT_ROUNDS
+    """
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return False
+    return rounds != settings.BCRYPT_ROUNDS
+
+
+def get_hash_executor() -> ThreadPoolExecutor:
+    """Get (lazily create) the thread pool dedicated to password hashing"""
+    global _hash_executor
+    with _hash_lock:
+        if _hash_executor is None:
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="password-hash",
+            )
+        return _hash_executor
+
+
+def shutdown_hash_executor() -> None:
+    """Shut down the password hashing pool (called on application shutdown)"""
+    global _hash_executor
+    with _hash_lock:
+        executor, _hash_executor = _hash_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run_in_hash_pool(func: Callable[..., T], *args) -> T:
+    """
+    Run a bcrypt call in the hashing pool without blocking the event loop
+    
+    Raises:
+        ServiceUnavailableError: If PASSWORD_HASH_MAX_PENDING hashes are already in flight
+    """
+    global _pending_hashes
+    with _hash_lock:
+        if _pending_hashes >= settings.PASSWORD_HASH_MAX_PENDING:
+            raise ServiceUnavailableError(
+                detail="Authentication service is busy, please retry shortly",
+                retry_after=1
+            )
+        _pending_hashes += 1
+    
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hash_executor(), func, *args)
+    finally:
+        with _hash_lock:
+            _pending_hashes -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the hashing pool (use from async request handlers)"""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the hashing pool (use from async request handlers)"""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT access token
@@ -189,6 +274,31 @@ def revoke_user_tokens(user_id: str) -> bool:
         return False
 
 
+def set_user_inactive(redis_client: redis.Redis, user_id: str, inactive: bool) -> bool:
+    """
+    Record whether a user is inactive (pending approval or deactivated)
+    
+    Services without database access, like the WebSocket service, check
+    user_inactive:{user_id} instead of User.is_active.
+    
+    Args:
+        redis_client: Redis client
+        user_id: User ID whose status changed
+        inactive: True if the user is not active
+        
+    Returns:
+        True if the status was recorded, False otherwise
+    """
+    try:
+        if inactive:
+            redis_client.set(f"user_inactive:{user_id}", 1)
+        else:
+            redis_client.delete(f"user_inactive:{user_id}")
+        return True
+    except Exception:
+        return False
+
+
 def is_user_revoked(user_id: str, token_issued_at: int) -> bool:
     """
     Check if a user's tokens were revoked after a token was issued
@@ -6,7 +6,11 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from app.core.config import settings
 from app.core.database import engine, Base
-from app.api import jobs, health, youtube, auth, admin
+from app.core.security import shutdown_hash_executor
+from app.services.transcode import shutdown_transcode_executor
+from app.services.job_changes import job_change_watcher
+from app.services.progress_events import progress_broker
+from app.api import jobs, health, youtube, auth, admin, uploads
 
 
 @asynccontextmanager
@@ -20,6 +24,11 @@ async def lifespan(app: FastAPI):
     
     yield
     
+    shutdown_hash_executor()
+    shutdown_transcode_executor()
+    await job_change_watcher.stop()
+    await progress_broker.stop()
+    
     try:
         await engine.dispose()
     except Exception:
@@ -49,6 +58,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Stem-Order", "X-Stem-Channels"],  # Multitrack stem layout (GET /api/jobs/{id}/stems)
     max_age=3600,
 )
 
@@ -58,6 +68,7 @@ app.include_router(admin.router, prefix="/api", tags=["admin"])
 app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
 app.include_router(health.router, prefix="/api", tags=["health"])
 app.include_router(youtube.router, prefix="/api", tags=["youtube"])
+app.include_router(uploads.router, prefix="/api", tags=["uploads"])
 
 
 @app.get("/")
@@ -1,7 +1,7 @@
 import enum
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Float, Text, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Text, DateTime, Enum, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -20,6 +20,12 @@ class JobStatus(str, enum.Enum):
     CANCELLED = "CANCELLED"
 
 
+# Jobs in these states will not change again
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+ACTIVE_STATUSES = tuple(status for status in JobStatus if status not in TERMINAL_STATUSES)
+ACTIVE_STATUS_CLAUSE = "status IN ({})".format(", ".join(f"'{status.value}'" for status in ACTIVE_STATUSES))
+
+
 class InputType(enum.Enum):
     upload = "upload"
     youtube = "youtube"
@@ -32,12 +38,25 @@ class QualityMode(enum.Enum):
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Newest-first listing and keyset pagination on (created_at, id)
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+        Index("ix_jobs_status", "status"),
+        # Per-user listing: "my jobs", newest first
+        Index("ix_jobs_user_id_created_at", "user_id", text("created_at DESC"), text("id DESC")),
+        # "My active jobs" only touches the (few) unfinished rows
+        Index(
+            "ix_jobs_active_user_id_created_at", "user_id", text("created_at DESC"), text("id DESC"),
+            postgresql_where=text(ACTIVE_STATUS_CLAUSE),
+            sqlite_where=text(ACTIVE_STATUS_CLAUSE),
+        ),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     status = Column(Enum(JobStatus), default=JobStatus.PENDING, nullable=False)
     
     # User relationship (nullable for backward compatibility)
-    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='SET NULL'), nullable=True, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
     
     # Input configuration
     input_type = Column(Enum(InputType), nullable=False)
@@ -45,6 +64,12 @@ class Job(Base):
     project_name = Column(String, nullable=False)
     quality_mode = Column(Enum(QualityMode), default=QualityMode.fast, nullable=False)
     
+    # Source media info (probed from file headers at upload time)
+    duration_seconds = Column(Float, nullable=True)
+    sample_rate = Column(Integer, nullable=True)
+    channels = Column(Integer, nullable=True)
+    codec = Column(String, nullable=True)
+    
     # Processing results
     detected_bpm = Column(Float, nullable=True)
     manual_bpm = Column(Float, nullable=True)
@@ -57,6 +82,7 @@ class Job(Base):
     source_file_path = Column(String, nullable=True)
     stems_folder_path = Column(String, nullable=True)
     package_path = Column(String, nullable=True)
+    storage_bytes = Column(BigInteger, nullable=True)  # Source, stems, peaks and package, set on completion
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
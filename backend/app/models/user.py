@@ -7,7 +7,10 @@ from sqlalchemy import Column, String, Boolean, DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from app.core.database import Base
-from app.core.security import verify_password, get_password_hash
+from app.core.security import (
+    verify_password, get_password_hash, verify_password_async, get_password_hash_async,
+    password_needs_rehash
+)
 
 
 class User(Base):
@@ -48,6 +51,35 @@ class User(Base):
         """
         self.hashed_password = get_password_hash(password)
     
+    async def verify_password_async(self, password: str) -> bool:
+        """
+        Verify a password without blocking the event loop
+        
+        Args:
+            password: Plain text password to verify
+            
+        Returns:
+            True if password matches, False otherwise
+        """
+        if not self.hashed_password:
+            return False
+        return await verify_password_async(password, self.hashed_password)
+    
+    async def set_password_async(self, password: str) -> None:
+        """
+        Set the user's password without blocking the event loop
+        
+        Args:
+            password: Plain text password to hash and store
+        """
+        self.hashed_password = await get_password_hash_async(password)
+    
+    def password_needs_rehash(self) -> bool:
+        """Check if the stored hash uses an outdated bcrypt cost factor"""
+        if not self.hashed_password:
+            return False
+        return password_needs_rehash(self.hashed_password)
+    
     def update_last_login(self) -> None:
         """Update the last login timestamp to current time"""
         self.last_login_at = datetime.utcnow()
@@ -2,6 +2,9 @@ from app.schemas.job import (
     JobCreate,
     JobResponse,
     JobListResponse,
+    JobChangesResponse,
+    JobStatusBatchRequest,
+    JobStatusBatchResponse,
     JobStatus,
     InputType,
     QualityMode,
@@ -11,6 +14,9 @@ __all__ = [
     "JobCreate",
     "JobResponse",
     "JobListResponse",
+    "JobChangesResponse",
+    "JobStatusBatchRequest",
+    "JobStatusBatchResponse",
     "JobStatus",
     "InputType",
     "QualityMode",
@@ -2,6 +2,7 @@ from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, Field, UUID4
 from enum import Enum
+from app.core.config import settings
 
 
 class JobStatus(str, Enum):
@@ -44,6 +45,10 @@ class JobResponse(BaseModel):
     input_url: Optional[str] = None
     project_name: str
     quality_mode: QualityMode
+    duration_seconds: Optional[float] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    codec: Optional[str] = None
     detected_bpm: Optional[float] = None
     manual_bpm: Optional[float] = None
     trim_start: Optional[float] = None
@@ -62,7 +67,24 @@ class JobResponse(BaseModel):
 
 class JobListResponse(BaseModel):
     jobs: list[JobResponse]
-    total: int
+    total: Optional[int] = None  # None when include_total=false
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as `cursor` for the next page; None on the last page
 
+
+
+class JobChangesResponse(BaseModel):
+    jobs: list[JobResponse] = []  # Current state of each job that changed
+    deleted: list[UUID4] = []
+    cursor: str  # Pass as `since` for the next call
+    reset: bool = False  # `since` expired: reload the job list, then continue from `cursor`
+
+
+class JobStatusBatchRequest(BaseModel):
+    job_ids: list[UUID4] = Field(..., min_length=1, max_length=settings.JOB_STATUS_BATCH_MAX_IDS)
+
+
+class JobStatusBatchResponse(BaseModel):
+    jobs: dict[UUID4, tuple[JobStatus, int]]  # Job ID -> (status, progress_percent)
+    missing: list[UUID4] = []  # Requested IDs that don't exist
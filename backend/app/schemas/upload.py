@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+
+
+class UploadInitRequest(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    total_size: int = Field(..., gt=0, description="Total upload size in bytes")
+
+
+class UploadStatusResponse(BaseModel):
+    upload_id: str
+    filename: str
+    total_size: int
+    offset: int  # Bytes received so far; the next chunk must start here
+    complete: bool
+    chunk_size: int  # Recommended chunk size in bytes
@@ -12,3 +12,14 @@ class YouTubePreviewResponse(BaseModel):
     duration: float
     thumbnail: str | None = None
 
+
+
+class YouTubePreviewStatusResponse(BaseModel):
+    preview_id: str
+    status: str  # queued, downloading, converting, ready, failed
+    progress_percent: int = 0
+    preview_url: str | None = None
+    title: str | None = None
+    duration: float | None = None
+    thumbnail: str | None = None
+    error_message: str | None = None
@@ -0,0 +1,100 @@
+"""
+Admin dashboard statistics (GET /api/admin/stats)
+
+User counts come from one aggregate query (COUNT(*) FILTER (WHERE ...)),
+job statistics from one grouped query plus one for jobs per day. Results are
+cached in Redis for ADMIN_STATS_CACHE_SECONDS; user changes drop the cache
+right away, job counts are allowed to lag by up to the cache lifetime.
+"""
+import json
+from datetime import datetime, timedelta, timezone
+from redis import Redis, RedisError
+from sqlalchemy import select, func, case, and_, extract
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.job import Job, JobStatus
+from app.models.user import User
+
+CACHE_KEY = "admin:stats"
+
+
+async def compute_admin_stats(db: AsyncSession) -> dict:
+    """User and job statistics, as returned by GET /api/admin/stats"""
+    users = (await db.execute(select(
+        func.count().label("total_users"),
+        func.count().filter(User.is_active == True).label("active_users"),
+        func.count().filter(User.is_active == False).label("pending_users"),
+        func.count().filter(User.is_admin == True).label("admin_users"),
+        func.count().filter(User.oauth_provider == "google").label("google_oauth_users"),
+        func.count().filter(User.oauth_provider == "email").label("email_users"),
+    ).select_from(User))).one()
+
+    # Processing time per second of audio; > 1 means slower than real time
+    real_time_factor = case(
+        (
+            and_(Job.completed_at.isnot(None), Job.duration_seconds > 0),
+            (extract("epoch", Job.completed_at) - extract("epoch", Job.created_at)) / Job.duration_seconds,
+        ),
+    )
+    by_status = (await db.execute(
+        select(
+            Job.status,
+            func.count(),
+            func.coalesce(func.sum(Job.storage_bytes), 0),
+            func.avg(real_time_factor),
+        ).group_by(Job.status)
+    )).all()
+
+    today = datetime.now(timezone.utc).date()
+    first_day = today - timedelta(days=settings.ADMIN_STATS_DAYS - 1)
+    day = func.date(Job.created_at)
+    per_day = {
+        str(created_on): count
+        for created_on, count in (await db.execute(
+            select(day, func.count())
+            .where(Job.created_at >= datetime.combine(first_day, datetime.min.time(), timezone.utc))
+            .group_by(day)
+        )).all()
+    }
+
+    completed_rtf = next((rtf for job_status, _, _, rtf in by_status if job_status == JobStatus.COMPLETED), None)
+    return {
+        **users._asdict(),
+        "jobs": {
+            "total_jobs": sum(count for _, count, _, _ in by_status),
+            "by_status": {job_status.value: count for job_status, count, _, _ in by_status},
+            "per_day": [
+                {"date": str(first_day + timedelta(days=offset)),
+                 "count": per_day.get(str(first_day + timedelta(days=offset)), 0)}
+                for offset in range(settings.ADMIN_STATS_DAYS)
+            ],
+            "avg_real_time_factor": round(float(completed_rtf), 3) if completed_rtf is not None else None,
+            "storage_bytes": int(sum(storage for _, _, storage, _ in by_status)),
+        },
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def get_admin_stats(db: AsyncSession, redis_client: Redis) -> dict:
+    """Cached statistics, computed on a miss; works without Redis, just uncached"""
+    try:
+        cached = redis_client.get(CACHE_KEY)
+    except RedisError:
+        cached = None
+    if cached:
+        return json.loads(cached)
+
+    stats = await compute_admin_stats(db)
+    try:
+        redis_client.setex(CACHE_KEY, settings.ADMIN_STATS_CACHE_SECONDS, json.dumps(stats))
+    except RedisError as e:
+        print(f"Warning: Could not cache admin stats: {e}")
+    return stats
+
+
+def invalidate_admin_stats(redis_client: Redis):
+    """Drop cached statistics after users are created or changed (best effort)"""
+    try:
+        redis_client.delete(CACHE_KEY)
+    except RedisError as e:
+        print(f"Warning: Could not invalidate admin stats: {e}")
@@ -144,6 +144,21 @@ class AudioService:
         
         return round(tempo, 2)
     
+    def detect_tempo_from_onset_envelope(self, onset_envelope_path: str, sr: int) -> float:
+        """Detect tempo/BPM from a precomputed onset envelope (see app.services.ingest)"""
+        import numpy as np
+        
+        onset_envelope = np.load(onset_envelope_path)
+        tempo, _ = librosa.beat.beat_track(onset_envelope=onset_envelope, sr=sr)
+        
+        # Handle array return (newer librosa versions)
+        if hasattr(tempo, '__iter__'):
+            tempo = float(tempo[0])
+        else:
+            tempo = float(tempo)
+        
+        return round(tempo, 2)
+    
     def separate_stems(
         self,
         audio_path: str,
@@ -0,0 +1,293 @@
+"""
+Local disk cache for GCS blobs
+
+In GCS mode every read used to download the blob again. BlobCache keeps
+downloads in GCS_CACHE_DIR and reuses them while the blob's generation is
+unchanged:
+
+- Revalidated: a copy checked against the blob's generation within the last
+  GCS_CACHE_REVALIDATE_SECONDS is served without any request to GCS
+- Size-bounded: least recently used entries are evicted above GCS_CACHE_MAX_BYTES
+- Checksum-validated: downloads are checked against the blob's MD5 (or CRC32C
+  for composite objects) before they enter the cache
+- De-duplicated: a per-blob file lock means parallel requests (threads or
+  worker processes) trigger a single download; the others wait and hit
+
+Recency is the metadata file's mtime, so every process sharing the directory
+sees the same LRU order, while the data file's mtime (and so the ETag it is
+served with) only changes when the blob is downloaded again. Hit/miss counters are per process.
+"""
+import os
+import json
+import base64
+import fcntl
+import hashlib
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+import google_crc32c
+from google.api_core.exceptions import NotFound
+from app.core.config import settings
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class BlobChecksumError(Exception):
+    """Raised when a downloaded blob does not match its stored checksum"""
+
+
+class BlobCache:
+    """Size-bounded, LRU-evicted local copies of GCS blobs"""
+
+    def __init__(self, root: str, max_bytes: int, eviction_grace: float = 60.0, revalidate_after: float = 60.0):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        # Entries used this recently are kept, so a path handed out by fetch()
+        # is not deleted before the caller has opened it
+        self.eviction_grace = eviction_grace
+        os.makedirs(root, exist_ok=True)
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes_downloaded": 0}
+
+    def _key(self, bucket_name: str, blob_name: str) -> str:
+        return hashlib.sha256(f"{bucket_name}/{blob_name}".encode()).hexdigest()
+
+    def _data_path(self, key: str, blob_name: str) -> str:
+        # Keep the extension; format detection downstream relies on it
+        return os.path.join(self.root, key + os.path.splitext(blob_name)[1])
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def _lock_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.lock")
+
+    @contextmanager
+    def _locked(self, key: str, blocking: bool = True):
+        """
+        Hold the per-blob lock; yields False if non-blocking and busy
+
+        The lock file is removed with its entry, so a lock taken on a file
+        that was unlinked meanwhile is dropped and taken again.
+        """
+        lock_path = self._lock_path(key)
+        flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+        while True:
+            lock_file = open(lock_path, "a")
+            try:
+                fcntl.flock(lock_file, flags)
+            except BlockingIOError:
+                lock_file.close()
+                yield False
+                return
+            try:
+                current = os.stat(lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                break
+            lock_file.close()  # Releases the lock on the unlinked file
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def _remove_entry(self, key: str, data_path: str) -> int:
+        """Delete an entry's files while holding its lock; returns bytes freed"""
+        freed = 0
+        for path in (data_path, self._meta_path(key), self._lock_path(key)):
+            try:
+                freed += os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                pass
+        return freed
+
+    def _count(self, field: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[field] += amount
+
+    def fetch(self, blob) -> str:
+        """
+        Get a local path holding the blob's current contents
+
+        Args:
+            blob: google.cloud.storage Blob
+
+        Returns:
+            Path inside the cache directory
+
+        Raises:
+            FileNotFoundError: If the blob does not exist
+            BlobChecksumError: If the download is corrupt
+        """
+        key = self._key(blob.bucket.name, blob.name)
+        data_path = self._data_path(key, blob.name)
+
+        with self._locked(key):
+            meta = self._read_meta(key)
+            cached = (
+                meta is not None
+                and os.path.exists(data_path)
+                and os.path.getsize(data_path) == meta["size"]
+            )
+            if cached and time.time() - meta.get("validated_at", 0) < self.revalidate_after:
+                os.utime(self._meta_path(key))  # Mark as most recently used
+                self._count("hits")
+                return data_path
+
+            # One metadata request: generation, size and checksums
+            try:
+                blob.reload()
+            except NotFound:
+                raise FileNotFoundError(f"gs://{blob.bucket.name}/{blob.name}")
+
+            if cached and meta["generation"] == blob.generation:
+                meta["validated_at"] = time.time()
+                self._write_meta(key, meta)  # Also marks it as most recently used
+                self._count("hits")
+                return data_path
+
+            self._count("misses")
+            self._download(blob, key, data_path)
+
+        self._evict(keep=key)
+        return data_path
+
+    def _download(self, blob, key: str, data_path: str):
+        """Download to a temp file, verify it, then move it into place"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".download")
+        os.close(fd)
+        try:
+            blob.download_to_filename(tmp_path)
+            _verify_checksum(tmp_path, blob)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, data_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        meta = {
+            "bucket": blob.bucket.name,
+            "name": blob.name,
+            "generation": blob.generation,
+            "size": size,
+            "path": data_path,
+            "validated_at": time.time(),
+        }
+        self._write_meta(key, meta)
+        self._count("bytes_downloaded", size)
+
+    def _write_meta(self, key: str, meta: dict):
+        with open(self._meta_path(key), "w") as f:
+            json.dump(meta, f)
+
+    def _read_meta(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._meta_path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _entries(self) -> list[tuple[float, int, str, dict]]:
+        """All cache entries as (last_used, size, key, meta)"""
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-5]
+            meta = self._read_meta(key)
+            if not meta:
+                continue
+            try:
+                last_used = os.path.getmtime(self._meta_path(key))
+            except OSError:
+                continue
+            entries.append((last_used, meta["size"], key, meta))
+        return entries
+
+    def _evict(self, keep: Optional[str] = None):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _, _ in entries)
+        now = time.time()
+
+        for last_used, size, key, meta in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep or now - last_used < self.eviction_grace:
+                continue
+            # Skip entries another request is downloading or reading right now
+            with self._locked(key, blocking=False) as acquired:
+                if not acquired:
+                    continue
+                self._remove_entry(key, meta["path"])
+            total -= size
+            self._count("evictions")
+
+    def cached_path(self, bucket_name: str, blob_name: str) -> Optional[str]:
+        """Local copy of a blob, if one is cached (it may be stale)"""
+        data_path = self._data_path(self._key(bucket_name, blob_name), blob_name)
+        return data_path if os.path.exists(data_path) else None
+
+    def discard(self, bucket_name: str, blob_name: str) -> int:
+        """Remove a blob's cached copy (after the blob is deleted); returns bytes freed"""
+        key = self._key(bucket_name, blob_name)
+        with self._locked(key):
+            return self._remove_entry(key, self._data_path(key, blob_name))
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process plus current cache usage"""
+        entries = self._entries()
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _, _ in entries),
+            "max_bytes": self.max_bytes,
+        })
+        return stats
+
+
+def _verify_checksum(path: str, blob):
+    """Compare a downloaded file with the blob's MD5, or CRC32C if it has none"""
+    if blob.md5_hash:
+        digest = hashlib.md5()
+        expected = blob.md5_hash
+    elif blob.crc32c:
+        digest = google_crc32c.Checksum()
+        expected = blob.crc32c
+    else:
+        return
+
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+
+    if base64.b64encode(digest.digest()).decode() != expected:
+        raise BlobChecksumError(f"Checksum mismatch downloading gs://{blob.bucket.name}/{blob.name}")
+
+
+_blob_cache: Optional[BlobCache] = None
+_blob_cache_lock = threading.Lock()
+
+
+def get_blob_cache() -> BlobCache:
+    """Process-wide blob cache, so stats survive across StorageService instances"""
+    global _blob_cache
+    with _blob_cache_lock:
+        if _blob_cache is None:
+            _blob_cache = BlobCache(
+                settings.GCS_CACHE_DIR,
+                settings.GCS_CACHE_MAX_BYTES,
+                revalidate_after=settings.GCS_CACHE_REVALIDATE_SECONDS,
+            )
+        return _blob_cache
@@ -0,0 +1,118 @@
+"""
+Segmented (HLS) audio streaming
+
+Long WAVs need large buffers before a player can start, and seeking means
+new range requests into a big file. For HLS, an audio file is cut into
+HLS_SEGMENT_SECONDS AAC segments (MPEG-TS) plus a VOD playlist, so playback
+starts after the first segment and a seek fetches one small segment.
+
+Segments are built lazily on the first playlist request, in the transcoding
+pool and the rendition cache (see app.services.transcode), as one
+`{key}.hls` directory per source version. The playlist references its
+segments as `{version}/seg-NNNNN.ts`; the version is derived from the source
+file's identity, so segment URLs never change content and can be cached
+by any HTTP cache indefinitely. Only the playlist needs revalidation.
+"""
+import os
+import re
+import fcntl
+import hashlib
+import tempfile
+import shutil
+from typing import NamedTuple
+import av
+from app.core.config import settings
+from app.services.transcode import (
+    DEFAULT_LAYOUTS, HLS_PLAYLIST, get_cache_dir, evict_renditions, run_single_flight, touch_rendition
+)
+
+SEGMENT_PATTERN = "seg-%05d.ts"
+SEGMENT_RE = re.compile(r"^seg-\d{5}\.ts$")
+VERSION_LENGTH = 16
+
+
+class HLSRendition(NamedTuple):
+    directory: str
+    version: str
+
+    @property
+    def playlist(self) -> str:
+        return os.path.join(self.directory, HLS_PLAYLIST)
+
+    def segment(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+
+def hls_rendition(source_path: str) -> HLSRendition:
+    """Cache location and version of a source's segments; changes whenever the source does"""
+    stat = os.stat(source_path)
+    identity = (
+        f"{os.path.abspath(source_path)}:{stat.st_size}:{stat.st_mtime_ns}:"
+        f"hls:{settings.HLS_SEGMENT_SECONDS}:{settings.HLS_BITRATE}"
+    )
+    key = hashlib.sha256(identity.encode()).hexdigest()
+    return HLSRendition(os.path.join(get_cache_dir(), f"{key}.hls"), key[:VERSION_LENGTH])
+
+
+def segment_audio(source_path: str, dest_dir: str, version: str):
+    """Encode an audio file into AAC segments and a VOD playlist"""
+    options = {
+        "hls_time": str(settings.HLS_SEGMENT_SECONDS),
+        "hls_playlist_type": "vod",
+        "hls_segment_type": "mpegts",
+        "hls_segment_filename": os.path.join(dest_dir, SEGMENT_PATTERN),
+        "hls_base_url": f"{version}/",
+        "hls_flags": "independent_segments",
+    }
+    with av.open(source_path, mode="r") as source:
+        in_stream = source.streams.audio[0]
+        with av.open(os.path.join(dest_dir, HLS_PLAYLIST), mode="w", format="hls", options=options) as dest:
+            layout = DEFAULT_LAYOUTS.get(in_stream.channels, in_stream.layout.name)
+            out_stream = dest.add_stream("aac", rate=in_stream.rate, layout=layout)
+            out_stream.bit_rate = settings.HLS_BITRATE * 1000
+
+            for frame in source.decode(in_stream):
+                frame.pts = None
+                for packet in out_stream.encode(frame):
+                    dest.mux(packet)
+            for packet in out_stream.encode(None):
+                dest.mux(packet)
+
+
+def _build_hls(source_path: str, rendition: HLSRendition):
+    """Segment into the cache unless another process already did (runs in the pool)"""
+    cache_dir = get_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+
+    with open(rendition.directory + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(rendition.playlist):
+                return
+            tmp_dir = tempfile.mkdtemp(dir=cache_dir, suffix=".partial")
+            try:
+                segment_audio(source_path, tmp_dir, rendition.version)
+                os.rename(tmp_dir, rendition.directory)
+            except BaseException:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    evict_renditions(keep=rendition.directory)
+
+
+async def get_hls_rendition(source_path: str) -> HLSRendition:
+    """
+    Get the cached segments of an audio file, building them on first request
+
+    Raises:
+        ServiceUnavailableError: If TRANSCODE_MAX_PENDING encodes are already queued
+    """
+    rendition = hls_rendition(source_path)
+    if os.path.exists(rendition.playlist):
+        touch_rendition(rendition.playlist)
+        return rendition
+
+    await run_single_flight(rendition.directory, _build_hls, source_path, rendition)
+    return rendition
@@ -0,0 +1,306 @@
+"""
+Pipelined ingest: decode audio while the upload is still being written
+
+Upload chunks are teed into an IngestPipeline (see start_ingest), which
+decodes them on a background thread with PyAV as they arrive. Once the
+upload is stored, the pipeline is finished after the API has responded
+(finish_later) and produces:
+
+- converted_48k.wav   normalized 24-bit/48kHz stereo PCM (what convert_to_wav makes)
+- onset_envelope.npy  librosa onset strength for tempo detection
+- ingest.json         manifest with duration, sample rate and file paths
+                      (relative to LOCAL_STORAGE_PATH)
+
+process_audio_job picks these up via load_ingest_manifest(), waiting for
+a pipeline that is still finishing, and skips conversion/analysis.
+Anything that goes wrong just discards the pipeline; the worker then
+falls back to the regular conversion path.
+"""
+import os
+import json
+import shutil
+import asyncio
+import itertools
+import threading
+import time
+from typing import Optional
+import av
+import numpy as np
+import soundfile as sf
+from app.core.config import settings
+
+TARGET_SAMPLE_RATE = 48000
+TARGET_CHANNELS = 2
+ANALYSIS_SAMPLE_RATE = 22050  # librosa's default rate for onset/beat analysis
+MANIFEST_PATH_FIELDS = ("wav_path", "onset_envelope_path")
+
+_decoder_lock = threading.Lock()
+_active_decoders = 0
+# Pipelines finishing after the request that fed them has returned
+_finishing: set[asyncio.Task] = set()
+
+
+def ingest_enabled() -> bool:
+    """Pipelined ingest needs the worker to see the API's local storage"""
+    return settings.PIPELINED_INGEST and settings.STORAGE_MODE == "local"
+
+
+def get_ingest_dir(key: str) -> str:
+    """Directory holding ingest artifacts for a job (or an in-flight upload)"""
+    return os.path.join(settings.LOCAL_STORAGE_PATH, "ingest", key)
+
+
+def start_ingest(key: str) -> Optional["IngestPipeline"]:
+    """
+    Start decoding an upload, if pipelined ingest is enabled
+
+    At most INGEST_MAX_DECODERS uploads are decoded at once; beyond that
+    None is returned and the worker converts the upload as usual.
+    """
+    global _active_decoders
+    if not ingest_enabled():
+        return None
+    with _decoder_lock:
+        if _active_decoders >= settings.INGEST_MAX_DECODERS:
+            return None
+        _active_decoders += 1
+    try:
+        return IngestPipeline(key)
+    except BaseException:
+        _release_decoder()
+        raise
+
+
+def _release_decoder():
+    global _active_decoders
+    with _decoder_lock:
+        _active_decoders -= 1
+
+
+def load_ingest_manifest(job_id: str) -> Optional[dict]:
+    """
+    Get precomputed ingest results for a job, if the pipeline completed (blocking)
+
+    The API finishes pipelines after responding, so while the job's ingest
+    directory exists without a manifest, this waits up to
+    INGEST_MANIFEST_WAIT seconds for one.
+    """
+    ingest_dir = get_ingest_dir(job_id)
+    manifest_path = os.path.join(ingest_dir, "ingest.json")
+    deadline = time.monotonic() + settings.INGEST_MANIFEST_WAIT
+    while not os.path.exists(manifest_path):
+        if not os.path.isdir(ingest_dir) or time.monotonic() >= deadline:
+            return None
+        time.sleep(0.2)
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    for field in MANIFEST_PATH_FIELDS:
+        manifest[field] = os.path.join(settings.LOCAL_STORAGE_PATH, manifest.get(field, ""))
+    if not os.path.exists(manifest["wav_path"]):
+        return None
+    return manifest
+
+
+def _write_manifest(output_dir: str, manifest: dict):
+    """Write a manifest atomically, so a waiting worker never reads it half-written"""
+    tmp_path = os.path.join(output_dir, "ingest.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(output_dir, "ingest.json"))
+
+
+def _ingest_files(key: str) -> list[os.stat_result]:
+    files = []
+    for dirpath, _, filenames in os.walk(get_ingest_dir(key)):
+        for filename in filenames:
+            try:
+                files.append(os.stat(os.path.join(dirpath, filename)))
+            except OSError:
+                pass
+    return files
+
+
+def ingest_last_written(key: str) -> float:
+    """When ingest artifacts for a job or upload were last written (0 if there are none)"""
+    return max((stat.st_mtime for stat in _ingest_files(key)), default=0.0)
+
+
+def discard_ingest(key: str) -> int:
+    """Remove ingest artifacts for a job or upload; returns bytes freed"""
+    freed = sum(stat.st_size for stat in _ingest_files(key))
+    shutil.rmtree(get_ingest_dir(key), ignore_errors=True)
+    return freed
+
+
+class IngestPipeline:
+    """Decode an audio byte stream on a background thread as chunks are fed in"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.output_dir = get_ingest_dir(key)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.wav_path = os.path.join(self.output_dir, "converted_48k.wav")
+        self.analysis_path = os.path.join(self.output_dir, "analysis_22k.f32")
+
+        self.bytes_fed = 0
+        self.last_fed = time.monotonic()
+        self.failed = False
+        self._error: Optional[BaseException] = None
+
+        # The decoder reads from a pipe, so it blocks until the next chunk lands
+        read_fd, write_fd = os.pipe()
+        self._reader = os.fdopen(read_fd, "rb")
+        self._writer = os.fdopen(write_fd, "wb")
+        self._thread = threading.Thread(
+            target=self._decode, name=f"ingest-{key}", daemon=True
+        )
+        self._thread.start()
+
+    def _decode(self):
+        """Decoder thread: resample to the pipeline's PCM and analysis formats"""
+        try:
+            with av.open(self._reader, mode="r") as container:
+                stream = container.streams.audio[0]
+                pcm_resampler = av.AudioResampler(
+                    format="s32", layout="stereo", rate=TARGET_SAMPLE_RATE
+                )
+                analysis_resampler = av.AudioResampler(
+                    format="flt", layout="mono", rate=ANALYSIS_SAMPLE_RATE
+                )
+
+                with sf.SoundFile(
+                    self.wav_path, "w",
+                    samplerate=TARGET_SAMPLE_RATE,
+                    channels=TARGET_CHANNELS,
+                    subtype="PCM_24",
+                ) as wav, open(self.analysis_path, "wb") as analysis:
+                    # A trailing None flushes samples buffered in the resamplers
+                    for frame in itertools.chain(container.decode(stream), [None]):
+                        for out in pcm_resampler.resample(frame):
+                            wav.write(out.to_ndarray().reshape(-1, TARGET_CHANNELS))
+                        for out in analysis_resampler.resample(frame):
+                            analysis.write(out.to_ndarray().tobytes())
+        except BaseException as e:
+            self._error = e
+        finally:
+            # Closing the read end makes any pending feed() fail fast
+            self._reader.close()
+            _release_decoder()
+
+    async def feed(self, chunk: bytes):
+        """Pass the next chunk of the upload to the decoder (never raises)"""
+        if self.failed or not chunk:
+            return
+        try:
+            await asyncio.to_thread(self._writer.write, chunk)
+            self.bytes_fed += len(chunk)
+            self.last_fed = time.monotonic()
+        except (OSError, ValueError):
+            await self.abort()
+
+    async def finish(self) -> Optional[dict]:
+        """
+        Signal end of input, wait for decoding and run tempo pre-analysis
+
+        Returns the ingest manifest, or None if decoding failed.
+        """
+        if self.failed:
+            return None
+        try:
+            await asyncio.to_thread(self._writer.close)
+        except OSError:
+            pass
+        await asyncio.to_thread(self._thread.join)
+
+        if self._error is not None:
+            await self.abort()
+            return None
+
+        try:
+            manifest = await asyncio.to_thread(self._analyze)
+        except Exception:
+            await self.abort()
+            return None
+        return manifest
+
+    def _analyze(self) -> dict:
+        """Compute the onset envelope and write the manifest"""
+        import librosa
+
+        info = sf.info(self.wav_path)
+        analysis = np.fromfile(self.analysis_path, dtype=np.float32)
+        onset_envelope = librosa.onset.onset_strength(y=analysis, sr=ANALYSIS_SAMPLE_RATE)
+        onset_path = os.path.join(self.output_dir, "onset_envelope.npy")
+        np.save(onset_path, onset_envelope)
+        os.remove(self.analysis_path)
+
+        manifest = {
+            "wav_path": os.path.relpath(self.wav_path, settings.LOCAL_STORAGE_PATH),
+            "duration": info.frames / info.samplerate,
+            "sample_rate": info.samplerate,
+            "channels": info.channels,
+            "onset_envelope_path": os.path.relpath(onset_path, settings.LOCAL_STORAGE_PATH),
+            "analysis_sample_rate": ANALYSIS_SAMPLE_RATE,
+        }
+        _write_manifest(self.output_dir, manifest)
+        return manifest
+
+    def finish_later(self, key: Optional[str] = None):
+        """
+        Finish the pipeline after the caller has responded, then rekey it to `key`
+
+        A worker loading the manifest of `key` meanwhile waits for it; the
+        key's directory is created now to tell it so.
+        """
+        if key and key != self.key:
+            os.makedirs(get_ingest_dir(key), exist_ok=True)
+        task = asyncio.get_running_loop().create_task(self._finish_and_rekey(key))
+        _finishing.add(task)
+        task.add_done_callback(_finishing.discard)
+
+    async def _finish_and_rekey(self, key: Optional[str]):
+        try:
+            manifest = await self.finish()
+            if key and key != self.key:
+                if manifest:
+                    await asyncio.to_thread(self.rekey, key)
+                else:
+                    discard_ingest(key)  # Stops the worker waiting
+        except Exception:
+            await self.abort()
+            if key:
+                discard_ingest(key)
+
+    def rekey(self, key: str):
+        """Move finished artifacts to a new key (upload ID -> job ID)"""
+        new_dir = get_ingest_dir(key)
+        manifest_path = os.path.join(self.output_dir, "ingest.json")
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        for field in MANIFEST_PATH_FIELDS:
+            manifest[field] = os.path.relpath(
+                os.path.join(new_dir, os.path.basename(manifest[field])), settings.LOCAL_STORAGE_PATH
+            )
+        _write_manifest(self.output_dir, manifest)
+
+        # Replacing an empty directory is atomic, so a waiting worker sees
+        # either no manifest or the complete output
+        if os.path.isdir(new_dir) and os.listdir(new_dir):
+            shutil.rmtree(new_dir, ignore_errors=True)
+        os.replace(self.output_dir, new_dir)
+
+        self.key, self.output_dir = key, new_dir
+
+    async def abort(self):
+        """Stop decoding and discard partial output"""
+        self.failed = True
+        try:
+            await asyncio.to_thread(self._writer.close)
+        except OSError:
+            pass
+        await asyncio.to_thread(self._thread.join)
+        discard_ingest(self.key)
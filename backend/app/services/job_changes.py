@@ -0,0 +1,173 @@
+"""
+Job change log for delta sync (GET /api/jobs/changes)
+
+Every change to a job (created, progressed, finished, cancelled, deleted)
+appends an entry to the `jobs:changes` Redis stream after the database
+commit. Stream IDs are assigned by Redis and strictly increasing, so an
+entry ID is a cursor: a client that has seen everything up to a cursor only
+needs the entries after it, and loads the jobs they name from the database.
+
+Entries older than JOB_CHANGES_RETENTION_SECONDS are trimmed. A cursor older
+than that can no longer be caught up, and the client must reload its list.
+
+Long-polling clients wait on one blocking XREAD per API process
+(JobChangeWatcher), which wakes them whenever a new entry arrives.
+"""
+import re
+import asyncio
+from typing import Optional
+from uuid import UUID
+from redis import Redis, RedisError
+from redis import asyncio as aioredis
+from app.core.config import settings
+
+STREAM_KEY = "jobs:changes"
+ANONYMOUS_OWNER = "anonymous"
+CURSOR_RE = re.compile(r"^\d+-\d+$")
+WATCH_BLOCK_MS = 30_000
+WATCH_RETRY_SECONDS = 5
+
+
+class JobChange:
+    """One entry of the change log"""
+    __slots__ = ("cursor", "job_id", "user_id", "deleted")
+
+    def __init__(self, cursor: str, fields: dict):
+        self.cursor = cursor
+        self.job_id = UUID(_text(fields["job_id"]))
+        owner = _text(fields["user_id"])
+        self.user_id = None if owner == ANONYMOUS_OWNER else UUID(owner)
+        self.deleted = _text(fields.get("deleted", "0")) == "1"
+
+
+def _text(value) -> str:
+    # The API client decodes responses, the worker's client does not
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _cursor_ms(cursor: str) -> int:
+    return int(cursor.split("-")[0])
+
+
+def record_job_change(redis_client: Redis, job_id, user_id=None, deleted: bool = False) -> Optional[str]:
+    """
+    Append a job change to the log (after the change is committed)
+
+    Best effort: the database stays the source of truth, so a Redis outage
+    only delays clients until the job changes again or they reload.
+
+    Returns:
+        The entry's ID, or None if Redis was unavailable
+    """
+    retention_ms = settings.JOB_CHANGES_RETENTION_SECONDS * 1000
+    try:
+        seconds, microseconds = redis_client.time()
+        now_ms = seconds * 1000 + microseconds // 1000
+        entry_id = redis_client.xadd(
+            STREAM_KEY,
+            {
+                "job_id": str(job_id),
+                "user_id": str(user_id) if user_id else ANONYMOUS_OWNER,
+                "deleted": "1" if deleted else "0",
+            },
+            minid=now_ms - retention_ms,
+            approximate=True,
+        )
+    except RedisError as e:
+        print(f"Warning: Could not record change of job {job_id}: {e}")
+        return None
+    return _text(entry_id)
+
+
+def current_cursor(redis_client: Redis) -> str:
+    """Cursor of the newest entry, i.e. "nothing seen after now" """
+    latest = redis_client.xrevrange(STREAM_KEY, count=1)
+    if latest:
+        return _text(latest[0][0])
+    seconds, microseconds = redis_client.time()
+    # New entries get IDs from the current millisecond on
+    return f"{seconds * 1000 + microseconds // 1000 - 1}-0"
+
+
+def is_expired(redis_client: Redis, cursor: str) -> bool:
+    """Whether entries after the cursor may already have been trimmed"""
+    seconds, _ = redis_client.time()
+    return _cursor_ms(cursor) < (seconds - settings.JOB_CHANGES_RETENTION_SECONDS) * 1000
+
+
+def read_changes(redis_client: Redis, cursor: str, count: int) -> list[JobChange]:
+    """Up to count entries after the cursor, oldest first"""
+    entries = redis_client.xrange(STREAM_KEY, min=f"({cursor}", count=count)
+    return [JobChange(_text(entry_id), fields) for entry_id, fields in entries]
+
+
+class JobChangeWatcher:
+    """
+    Wakes long-polling requests when the change log grows
+
+    One background task per process blocks on XREAD and resolves the futures
+    of all waiting requests, so idle long-polls hold no Redis connection or
+    thread of their own.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._waiters: set[asyncio.Future] = set()
+        self.generation = 0  # Bumped on every wake-up
+
+    async def wait(self, generation: int, timeout: float) -> bool:
+        """
+        Wait up to timeout seconds for a new entry; True if one arrived
+
+        Pass the generation read before checking the log, so an entry that
+        arrives between the check and the wait is not missed.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+        if self.generation != generation:
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiters.discard(waiter)
+
+    def _wake(self):
+        self.generation += 1
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def _watch(self):
+        client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        last_id = "$"
+        try:
+            while True:
+                try:
+                    result = await client.xread({STREAM_KEY: last_id}, block=WATCH_BLOCK_MS, count=100)
+                except RedisError as e:
+                    print(f"Warning: Job change watcher lost Redis: {e}")
+                    await asyncio.sleep(WATCH_RETRY_SECONDS)
+                    continue
+                if result:
+                    last_id = result[0][1][-1][0]
+                    self._wake()
+        finally:
+            await client.aclose()
+
+    async def stop(self):
+        """Stop the background task (called on application shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, RedisError):
+                pass
+            self._task = None
+
+
+job_change_watcher = JobChangeWatcher()
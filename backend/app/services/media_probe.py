@@ -0,0 +1,74 @@
+"""
+Header-only media probing
+
+Reads container/stream headers with PyAV (falling back to soundfile) to get
+duration, sample rate, channel count and codec without decoding audio. Fast
+enough to run inside the upload request, so jobs can be validated and
+rejected before they take a worker slot.
+"""
+from typing import BinaryIO, Optional, Union
+import av
+import soundfile as sf
+
+
+class MediaProbeError(Exception):
+    """Raised when a file has no readable audio stream"""
+
+
+def probe_media(source: Union[str, BinaryIO]) -> dict:
+    """
+    Probe an audio file's headers
+    
+    Args:
+        source: File path or seekable binary file object (left at position 0)
+        
+    Returns:
+        Dict with duration_seconds, sample_rate, channels and codec
+        
+    Raises:
+        MediaProbeError: If no audio stream can be read
+    """
+    try:
+        return _probe_with_av(source)
+    except Exception as av_error:
+        try:
+            return _probe_with_soundfile(source)
+        except Exception:
+            raise MediaProbeError(f"Could not read audio headers: {av_error}") from av_error
+    finally:
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+
+def _probe_with_av(source: Union[str, BinaryIO]) -> dict:
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with av.open(source, mode="r") as container:
+        if not container.streams.audio:
+            raise MediaProbeError("No audio stream found")
+        stream = container.streams.audio[0]
+        
+        duration: Optional[float] = None
+        if stream.duration is not None and stream.time_base is not None:
+            duration = float(stream.duration * stream.time_base)
+        elif container.duration is not None:
+            duration = container.duration / av.time_base
+        
+        return {
+            "duration_seconds": duration,
+            "sample_rate": stream.rate,
+            "channels": stream.channels,
+            "codec": stream.codec_context.name,
+        }
+
+
+def _probe_with_soundfile(source: Union[str, BinaryIO]) -> dict:
+    if hasattr(source, "seek"):
+        source.seek(0)
+    info = sf.info(source)
+    return {
+        "duration_seconds": info.duration,
+        "sample_rate": info.samplerate,
+        "channels": info.channels,
+        "codec": info.subtype.lower(),
+    }
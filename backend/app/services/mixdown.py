@@ -0,0 +1,477 @@
+"""
+Server-side stem mixdown
+
+Renders a job's stems into one file:
+
+- a "practice mix" with per-stem gains and mutes (muted stems are never read)
+- a multitrack WAV with every stem's channels side by side, so the stem
+  mixer loads all stems sample-aligned in one request
+
+Stems are 24-bit PCM WAV; each is memory-mapped and read MIXDOWN_BLOCK_FRAMES
+frames at a time, so a whole song is rendered with constant memory regardless
+of its length.
+
+Renders run in the transcoding pool (see app.services.transcode):
+single-flight, and bounded by TRANSCODE_MAX_PENDING. They write a 24-bit
+WAV into the rendition cache, keyed by the stems and, for mixes, the gain
+vector. stream_mixdown and stream_multitrack stream that file while it is
+rendered, so the first request plays right away; later requests are served
+from the cache with Range support. get_cached_mixdown and
+get_cached_multitrack wait for the whole file, for when it is only an
+intermediate (for an Opus/MP3/FLAC rendition).
+"""
+import os
+import fcntl
+import struct
+import asyncio
+import hashlib
+import itertools
+from typing import AsyncIterator, Callable, Iterator, NamedTuple, Optional
+import numpy as np
+from app.core.config import settings
+from app.services.transcode import (
+    get_cache_dir, evict_renditions, run_single_flight, start_single_flight, touch_rendition
+)
+
+STEM_NAMES = ["vocals", "drums", "bass", "other"]
+MIN_GAIN_DB = -60.0
+MAX_GAIN_DB = 12.0
+PARTIAL_SUFFIX = ".partial"  # A render in progress, followed by streams
+STREAM_CHUNK_SIZE = 1024 * 1024
+FOLLOW_POLL_SECONDS = 0.05  # How often a stream checks a render for new output
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+PCM_SUBFORMAT_GUID = bytes.fromhex("0100000000001000800000aa00389b71")
+
+
+class MixdownError(ValueError):
+    """Raised for invalid mix parameters or stems that cannot be mixed"""
+
+
+class WavLayout(NamedTuple):
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def block_align(self) -> int:
+        return self.channels * self.bits_per_sample // 8
+
+    @property
+    def frames(self) -> int:
+        return self.data_size // self.block_align
+
+
+def read_wav_layout(path: str) -> WavLayout:
+    """
+    Locate the fmt and data chunks of a RIFF/WAVE file
+
+    Other chunks (LIST, id3 tags written by embed_tempo_metadata) are skipped.
+
+    Raises:
+        MixdownError: If the file is not a PCM or float WAV
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise MixdownError(f"Not a WAV file: {os.path.basename(path)}")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                format_tag, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                    format_tag = struct.unpack("<H", fmt[24:26])[0]  # First bytes of the subformat GUID
+                fmt = (format_tag, channels, sample_rate, bits)
+                f.seek(chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    break
+                data_offset = f.tell()
+                # Writers that stream may leave the size unset; use the rest of the file
+                data_size = min(chunk_size, file_size - data_offset)
+                layout = WavLayout(fmt[0], fmt[1], fmt[2], fmt[3], data_offset, data_size)
+                if (layout.format_tag, layout.bits_per_sample) not in SAMPLE_DECODERS:
+                    raise MixdownError(f"Unsupported WAV encoding in {os.path.basename(path)}")
+                return layout
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+    raise MixdownError(f"No audio data in {os.path.basename(path)}")
+
+
+def _decode_pcm16(raw: np.ndarray) -> np.ndarray:
+    return raw.view("<i2").astype(np.float32) / 32768.0
+
+
+def _decode_pcm24(raw: np.ndarray) -> np.ndarray:
+    triples = raw.reshape(-1, 3)
+    # The high byte is read as signed so the result is sign-extended
+    samples = (
+        triples[:, 0].astype(np.int32)
+        | (triples[:, 1].astype(np.int32) << 8)
+        | (triples[:, 2].view(np.int8).astype(np.int32) << 16)
+    )
+    return samples.astype(np.float32) / 8388608.0
+
+
+def _decode_pcm32(raw: np.ndarray) -> np.ndarray:
+    return (raw.view("<i4") / 2147483648.0).astype(np.float32)
+
+
+def _decode_float32(raw: np.ndarray) -> np.ndarray:
+    return raw.view("<f4")
+
+
+# (format tag, bits per sample) -> bytes to float32 samples
+SAMPLE_DECODERS = {
+    (WAVE_FORMAT_PCM, 16): _decode_pcm16,
+    (WAVE_FORMAT_PCM, 24): _decode_pcm24,
+    (WAVE_FORMAT_PCM, 32): _decode_pcm32,
+    (WAVE_FORMAT_IEEE_FLOAT, 32): _decode_float32,
+}
+
+
+def _encode_pcm24(samples: np.ndarray) -> bytes:
+    """Clip float samples to full scale and pack them as little-endian 24-bit"""
+    ints = np.clip(np.rint(samples * 8388608.0), -8388608, 8388607).astype("<i4")
+    return ints.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+
+
+def wav_header(channels: int, sample_rate: int, frames: int, bits: int = 24) -> bytes:
+    """
+    PCM WAV header
+
+    Mono and stereo get the canonical 44-byte header. More channels need
+    WAVE_FORMAT_EXTENSIBLE; the channel mask is left at 0 since the channels
+    are stems, not speaker positions.
+    """
+    block_align = channels * bits // 8
+    data_size = frames * block_align
+    fmt = struct.pack("<HHIIHH", WAVE_FORMAT_PCM, channels, sample_rate,
+                      sample_rate * block_align, block_align, bits)
+    if channels > 2:
+        fmt = (
+            struct.pack("<HHIIHH", WAVE_FORMAT_EXTENSIBLE, channels, sample_rate,
+                        sample_rate * block_align, block_align, bits)
+            + struct.pack("<HHI", 22, bits, 0)
+            + PCM_SUBFORMAT_GUID
+        )
+    return (
+        struct.pack("<4sI4s", b"RIFF", 4 + 8 + len(fmt) + 8 + data_size, b"WAVE")
+        + struct.pack("<4sI", b"fmt ", len(fmt)) + fmt
+        + struct.pack("<4sI", b"data", data_size)
+    )
+
+
+def resolve_gains(gains_db: dict[str, float], muted: list[str]) -> dict[str, float]:
+    """
+    Turn per-stem dB gains and mutes into linear gains
+
+    Gains are rounded to 0.1 dB, so near-identical slider positions share a
+    cached mix. Muted stems map to 0.
+
+    Raises:
+        MixdownError: For unknown stems, out-of-range gains or an all-muted mix
+    """
+    unknown = set(gains_db) - set(STEM_NAMES) | set(muted) - set(STEM_NAMES)
+    if unknown:
+        raise MixdownError(f"Unknown stems: {sorted(unknown)}. Must be among: {STEM_NAMES}")
+
+    gains = {}
+    for name in STEM_NAMES:
+        db = round(gains_db.get(name, 0.0), 1)
+        if not MIN_GAIN_DB <= db <= MAX_GAIN_DB:
+            raise MixdownError(f"Gain for {name} must be between {MIN_GAIN_DB} and {MAX_GAIN_DB} dB")
+        gains[name] = 0.0 if name in muted else 10 ** (db / 20)
+
+    if not any(gains.values()):
+        raise MixdownError("At least one stem must be unmuted")
+    return gains
+
+
+def _cache_path(stem_paths: dict[str, str], variant: str) -> str:
+    """Cache location for a rendering of the stems, changing whenever any stem does"""
+    identity = [variant]
+    for name in STEM_NAMES:
+        stat = os.stat(stem_paths[name])
+        identity.append(f"{name}:{os.path.abspath(stem_paths[name])}:{stat.st_size}:{stat.st_mtime_ns}")
+    key = hashlib.sha256("|".join(identity).encode()).hexdigest()
+    return os.path.join(get_cache_dir(), f"{variant.split(':')[0]}-{key}.wav")
+
+
+def mixdown_path(stem_paths: dict[str, str], gains: dict[str, float]) -> str:
+    """Cache location of a mix; keyed by the gain vector and the stems' identities"""
+    gain_vector = ",".join(f"{gains[name]:.6f}" for name in STEM_NAMES)
+    return _cache_path(stem_paths, f"mix:{gain_vector}")
+
+
+def multitrack_path(stem_paths: dict[str, str]) -> str:
+    """Cache location of the interleaved multitrack WAV"""
+    return _cache_path(stem_paths, "multitrack")
+
+
+def _open_stems(stem_paths: dict[str, str], names: list[str]) -> tuple[dict[str, WavLayout], int, int, int]:
+    """
+    Read stem headers and check they can be combined
+
+    Returns:
+        (layouts, sample rate, channels per stem, frames of the longest stem)
+
+    Raises:
+        MixdownError: If the stems differ in sample rate or channels
+    """
+    layouts = {name: read_wav_layout(stem_paths[name]) for name in names}
+    formats = {(layout.sample_rate, layout.channels) for layout in layouts.values()}
+    if len(formats) != 1:
+        raise MixdownError("Stems have different sample rates or channel counts")
+    sample_rate, channels = formats.pop()
+    # Stems normally have identical lengths; a shorter one is padded with silence
+    frames = max(layout.frames for layout in layouts.values())
+    return layouts, sample_rate, channels, frames
+
+
+def _memmap_stems(stem_paths: dict[str, str], layouts: dict[str, WavLayout]) -> dict[str, np.memmap]:
+    return {
+        name: np.memmap(
+            stem_paths[name], dtype=np.uint8, mode="r",
+            offset=layout.data_offset, shape=(layout.frames * layout.block_align,)
+        )
+        for name, layout in layouts.items()
+    }
+
+
+def _read_frames(samples: np.memmap, layout: WavLayout, start: int, count: int) -> np.ndarray:
+    """Frames [start, start + count) of a stem as float32 (count, channels); silence past its end"""
+    frames = np.zeros((count, layout.channels), dtype=np.float32)
+    end = min(start + count, layout.frames)
+    if end > start:
+        raw = samples[start * layout.block_align:end * layout.block_align]
+        decode = SAMPLE_DECODERS[(layout.format_tag, layout.bits_per_sample)]
+        frames[:end - start] = decode(raw).reshape(-1, layout.channels)
+    return frames
+
+
+def open_mixdown(stem_paths: dict[str, str], gains: dict[str, float]) -> tuple[bytes, Iterator[bytes], int]:
+    """
+    Prepare a mix for rendering
+
+    Stem headers are validated up front so errors surface before a response
+    starts.
+
+    Returns:
+        (header, iterator of PCM blocks, total size in bytes including the header)
+
+    Raises:
+        MixdownError: If the audible stems differ in sample rate or channels
+    """
+    audible = [name for name in STEM_NAMES if gains[name]]
+    layouts, sample_rate, channels, frames = _open_stems(stem_paths, audible)
+    header = wav_header(channels, sample_rate, frames)
+    total_size = len(header) + frames * channels * 3
+    return header, _render_mix(stem_paths, gains, layouts, frames), total_size
+
+
+def _render_mix(
+    stem_paths: dict[str, str],
+    gains: dict[str, float],
+    layouts: dict[str, WavLayout],
+    frames: int,
+) -> Iterator[bytes]:
+    """Sum memory-mapped stems block by block"""
+    maps = _memmap_stems(stem_paths, layouts)
+    block_frames = settings.MIXDOWN_BLOCK_FRAMES
+
+    for start in range(0, frames, block_frames):
+        count = min(block_frames, frames - start)
+        mix = None
+        for name, samples in maps.items():
+            block = _read_frames(samples, layouts[name], start, count)
+            block *= np.float32(gains[name])
+            mix = block if mix is None else np.add(mix, block, out=mix)
+        yield _encode_pcm24(mix)
+
+
+def open_multitrack(stem_paths: dict[str, str]) -> tuple[bytes, Iterator[bytes], int, int]:
+    """
+    Prepare a multichannel WAV holding every stem, in STEM_NAMES order
+
+    A stereo job gives 8 channels: vocals L/R, drums L/R, bass L/R, other L/R.
+    Samples are copied sample-aligned, so clients split the channels back
+    into stems without any resynchronisation.
+
+    Returns:
+        (header, iterator of PCM blocks, total size in bytes, channels per stem)
+
+    Raises:
+        MixdownError: If the stems differ in sample rate or channels
+    """
+    layouts, sample_rate, channels, frames = _open_stems(stem_paths, STEM_NAMES)
+    total_channels = channels * len(STEM_NAMES)
+    header = wav_header(total_channels, sample_rate, frames)
+    total_size = len(header) + frames * total_channels * 3
+    return header, _render_multitrack(stem_paths, layouts, frames), total_size, channels
+
+
+def _render_multitrack(stem_paths: dict[str, str], layouts: dict[str, WavLayout], frames: int) -> Iterator[bytes]:
+    """Interleave memory-mapped stems block by block (lossless for 24-bit stems)"""
+    maps = _memmap_stems(stem_paths, layouts)
+    block_frames = settings.MIXDOWN_BLOCK_FRAMES
+
+    for start in range(0, frames, block_frames):
+        count = min(block_frames, frames - start)
+        blocks = [_read_frames(maps[name], layouts[name], start, count) for name in STEM_NAMES]
+        yield _encode_pcm24(np.hstack(blocks))
+
+
+def render_to_cache(header: bytes, blocks: Iterator[bytes], dest_path: str) -> str:
+    """
+    Render into the cache (returns dest_path)
+
+    Written to dest_path + ".partial" first, which streams follow while it
+    grows; the file only enters the cache once it is complete.
+    """
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    partial_path = dest_path + PARTIAL_SUFFIX
+    # Always a new file, so a follower never reads into one a crashed render left
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+    try:
+        with open(partial_path, "xb") as f:
+            for chunk in itertools.chain([header], blocks):
+                f.write(chunk)
+        os.replace(partial_path, dest_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    evict_renditions(keep=dest_path)
+    return dest_path
+
+
+def render_mixdown(stem_paths: dict[str, str], gains: dict[str, float], dest_path: Optional[str] = None) -> str:
+    """Render a mix into the cache without streaming it (returns its path)"""
+    header, blocks, _ = open_mixdown(stem_paths, gains)
+    return render_to_cache(header, blocks, dest_path or mixdown_path(stem_paths, gains))
+
+
+def render_multitrack(stem_paths: dict[str, str], dest_path: Optional[str] = None) -> str:
+    """Render the multitrack WAV into the cache without streaming it (returns its path)"""
+    header, blocks, _, _ = open_multitrack(stem_paths)
+    return render_to_cache(header, blocks, dest_path or multitrack_path(stem_paths))
+
+
+def _render_once(dest_path: str, render: Callable, *args):
+    """Render into the cache unless another process already did (runs in the pool)"""
+    os.makedirs(get_cache_dir(), exist_ok=True)
+    with open(dest_path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if not os.path.exists(dest_path):
+                render(*args)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+async def _get_cached(dest_path: str, render: Callable, *args) -> str:
+    if os.path.exists(dest_path):
+        touch_rendition(dest_path)
+        return dest_path
+    await run_single_flight(dest_path, _render_once, dest_path, render, *args)
+    return dest_path
+
+
+async def get_cached_mixdown(stem_paths: dict[str, str], gains: dict[str, float]) -> str:
+    """
+    Get a cached mix, rendering it in the transcoding pool on first request
+
+    Raises:
+        MixdownError: If the audible stems differ in sample rate or channels
+        ServiceUnavailableError: If TRANSCODE_MAX_PENDING builds are already queued
+    """
+    dest_path = mixdown_path(stem_paths, gains)
+    return await _get_cached(dest_path, render_mixdown, stem_paths, gains, dest_path)
+
+
+async def get_cached_multitrack(stem_paths: dict[str, str]) -> str:
+    """
+    Get the cached multitrack WAV, rendering it in the transcoding pool on first request
+
+    Raises:
+        MixdownError: If the stems differ in sample rate or channels
+        ServiceUnavailableError: If TRANSCODE_MAX_PENDING builds are already queued
+    """
+    dest_path = multitrack_path(stem_paths)
+    return await _get_cached(dest_path, render_multitrack, stem_paths, dest_path)
+
+
+def stream_mixdown(stem_paths: dict[str, str], gains: dict[str, float]) -> AsyncIterator[bytes]:
+    """
+    Stream a mix while it is rendered into the cache in the transcoding pool
+
+    Raises:
+        ServiceUnavailableError: If TRANSCODE_MAX_PENDING builds are already queued
+    """
+    dest_path = mixdown_path(stem_paths, gains)
+    return _stream_render(dest_path, render_mixdown, stem_paths, gains, dest_path)
+
+
+def stream_multitrack(stem_paths: dict[str, str]) -> AsyncIterator[bytes]:
+    """
+    Stream the multitrack WAV while it is rendered into the cache in the transcoding pool
+
+    Raises:
+        ServiceUnavailableError: If TRANSCODE_MAX_PENDING builds are already queued
+    """
+    dest_path = multitrack_path(stem_paths)
+    return _stream_render(dest_path, render_multitrack, stem_paths, dest_path)
+
+
+def _stream_render(dest_path: str, render: Callable, *args) -> AsyncIterator[bytes]:
+    # Started (or joined) before the response, so a busy pool still gets a 503
+    future = start_single_flight(dest_path, _render_once, dest_path, render, *args)
+    return _follow_render(dest_path, future)
+
+
+async def _follow_render(dest_path: str, future: asyncio.Future) -> AsyncIterator[bytes]:
+    """
+    Read a render's partial file as it grows, then the rest from the cached file
+
+    Renders of the same file are byte-identical, so reading on from the
+    finished file (or a render restarted by another request) is seamless.
+    A client that disconnects stops reading; the render carries on and is
+    cached for the next request.
+    """
+    partial_path = dest_path + PARTIAL_SUFFIX
+    offset = 0
+    while True:
+        done = future.done()
+        chunk = await asyncio.to_thread(_read_at, dest_path if done else partial_path, offset)
+        if chunk:
+            offset += len(chunk)
+            yield chunk
+        elif done:
+            future.result()  # Raises if the render failed
+            return
+        else:
+            await asyncio.wait([future], timeout=FOLLOW_POLL_SECONDS)
+
+
+def _read_at(path: str, offset: int) -> bytes:
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read(STREAM_CHUNK_SIZE)
+    except FileNotFoundError:
+        return b""
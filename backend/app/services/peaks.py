@@ -0,0 +1,96 @@
+"""
+Waveform peak pyramids
+
+Min/max peaks are computed once per file at several zoom levels so the UI
+can draw waveforms without downloading and decoding the audio. Level 0 has
+one min/max pair per PEAKS_BASE_SAMPLES_PER_PIXEL samples; each following
+level halves the resolution.
+
+Files use the audiowaveform .dat (version 1) layout, which waveform-data.js
+and peaks.js read directly:
+
+    int32  version (1)
+    uint32 flags (0 = 16-bit, 1 = 8-bit)
+    int32  sample rate
+    int32  samples per pixel
+    uint32 length (number of min/max pairs)
+    int8/int16 min, max, min, max, ...   (little-endian)
+"""
+import os
+import struct
+import numpy as np
+import soundfile as sf
+from app.core.config import settings
+
+DAT_VERSION = 1
+BLOCK_PIXELS = 4096  # Pixels decoded per read, keeps memory flat for long files
+
+
+def peaks_filename(name: str, level: int) -> str:
+    """File name of one pyramid level, e.g. vocals.2.dat"""
+    return f"{name}.{level}.dat"
+
+
+def compute_peak_pyramid(wav_path: str, output_dir: str, name: str) -> list[str]:
+    """
+    Compute min/max peaks of an audio file at PEAKS_LEVELS zoom levels
+    
+    Args:
+        wav_path: Audio file readable by soundfile
+        output_dir: Directory for the .dat files
+        name: File name prefix (stem name or "source")
+        
+    Returns:
+        Paths of the level files, finest first
+    """
+    samples_per_pixel = settings.PEAKS_BASE_SAMPLES_PER_PIXEL
+    mins, maxs = [], []
+    
+    with sf.SoundFile(wav_path) as f:
+        sample_rate = f.samplerate
+        # Block size is a multiple of the pixel width, so only the last block is partial
+        for block in f.blocks(blocksize=samples_per_pixel * BLOCK_PIXELS, dtype="float32", always_2d=True):
+            # Collapse channels, then pixels: one vectorized reduction each
+            mins.append(_reduce(block.min(axis=1), samples_per_pixel, np.minimum))
+            maxs.append(_reduce(block.max(axis=1), samples_per_pixel, np.maximum))
+    
+    level_min = np.concatenate(mins) if mins else np.zeros(0, dtype=np.float32)
+    level_max = np.concatenate(maxs) if maxs else np.zeros(0, dtype=np.float32)
+    
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for level in range(settings.PEAKS_LEVELS):
+        if level:
+            level_min = _reduce(level_min, 2, np.minimum)
+            level_max = _reduce(level_max, 2, np.maximum)
+        path = os.path.join(output_dir, peaks_filename(name, level))
+        _write_dat(path, level_min, level_max, sample_rate, samples_per_pixel << level)
+        paths.append(path)
+    
+    return paths
+
+
+def _reduce(values: np.ndarray, factor: int, ufunc: np.ufunc) -> np.ndarray:
+    """Reduce groups of `factor` consecutive values (the last group may be short)"""
+    pad = -len(values) % factor
+    if pad:
+        values = np.pad(values, (0, pad), mode="edge")
+    return ufunc.reduce(values.reshape(-1, factor), axis=1)
+
+
+def _write_dat(path: str, mins: np.ndarray, maxs: np.ndarray, sample_rate: int, samples_per_pixel: int):
+    """Write interleaved min/max pairs in audiowaveform .dat format"""
+    bits = settings.PEAKS_BITS
+    dtype, scale = ("<i1", 127) if bits == 8 else ("<i2", 32767)
+    
+    interleaved = np.empty(len(mins) * 2, dtype=np.float32)
+    interleaved[0::2] = mins
+    interleaved[1::2] = maxs
+    data = np.clip(np.round(interleaved * scale), -scale - 1, scale).astype(dtype)
+    
+    header = struct.pack(
+        "<iIiiI", DAT_VERSION, 1 if bits == 8 else 0, sample_rate, samples_per_pixel, len(mins)
+    )
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(data.tobytes())
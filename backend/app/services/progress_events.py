@@ -0,0 +1,184 @@
+"""
+Server-Sent Events of job progress (GET /api/jobs/{id}/events)
+
+The worker appends every progress update to the `job:{id}:events` stream and
+publishes it on `job:{id}:progress`, tagged with the stream entry ID (see
+publish_job_progress). SSE clients get the latest entry as a snapshot, or
+the entries after their Last-Event-ID, and then live updates.
+
+Live updates come from one pattern subscription per API process
+(ProgressBroker), which hands each message to the queues of the streams
+following that job, so open streams hold no Redis connection of their own.
+"""
+import re
+import json
+import asyncio
+from typing import AsyncIterator, Optional
+from redis import Redis, RedisError
+from redis import asyncio as aioredis
+from app.core.config import settings
+from app.models.job import TERMINAL_STATUSES
+
+CHANNEL_PATTERN = "job:*:progress"
+EVENT_ID_RE = re.compile(r"^\d+-\d+$")
+TERMINAL_STATUS_VALUES = {status.value for status in TERMINAL_STATUSES}
+SUBSCRIBE_TIMEOUT_SECONDS = 2
+LISTEN_RETRY_SECONDS = 1
+RESYNC = None  # Queued to end a stream; the client resumes from its Last-Event-ID
+
+
+def _event_id_key(event_id: str) -> tuple[int, int]:
+    ms, seq = event_id.split("-")
+    return int(ms), int(seq)
+
+
+def read_history(redis_client: Redis, job_id, last_event_id: Optional[str]) -> list[tuple[str, dict]]:
+    """Updates after last_event_id, or just the latest one for new clients"""
+    stream_key = f"job:{job_id}:events"
+    try:
+        if last_event_id:
+            entries = redis_client.xrange(stream_key, min=f"({last_event_id}")
+        else:
+            entries = redis_client.xrevrange(stream_key, count=1)
+    except RedisError as e:
+        print(f"Warning: Could not read progress of job {job_id}: {e}")
+        return []
+    return [(entry_id, {**json.loads(fields["data"]), "event_id": entry_id}) for entry_id, fields in entries]
+
+
+def is_terminal(update: dict) -> bool:
+    return update.get("status") in TERMINAL_STATUS_VALUES
+
+
+def format_event(update: dict) -> str:
+    """One SSE message; the stream entry ID becomes the event ID"""
+    event_id = update.get("event_id")
+    prefix = f"id: {event_id}\n" if event_id else ""
+    return f"{prefix}data: {json.dumps(update)}\n\n"
+
+
+async def event_stream(
+    queue: Optional[asyncio.Queue],
+    history: list[tuple[str, dict]],
+    keepalive_seconds: float,
+) -> AsyncIterator[str]:
+    """
+    SSE body: history, then live updates from queue until the job finishes
+
+    Without a queue (finished jobs) only the history is sent. Live updates
+    already covered by the history are skipped. Comment lines are sent
+    while the job is quiet, so proxies don't close the connection.
+    """
+    last_seen = None
+    for event_id, update in history:
+        yield format_event(update)
+        last_seen = _event_id_key(event_id)
+        if is_terminal(update):
+            return
+    while queue is not None:
+        try:
+            message = await asyncio.wait_for(queue.get(), keepalive_seconds)
+        except asyncio.TimeoutError:
+            yield ": keepalive\n\n"
+            continue
+        if message is RESYNC:
+            return
+        update = json.loads(message)
+        event_id = update.get("event_id")
+        if event_id and last_seen and _event_id_key(event_id) <= last_seen:
+            continue
+        yield format_event(update)
+        if is_terminal(update):
+            return
+
+
+class ProgressBroker:
+    """
+    Fans out job progress messages to SSE streams in this process
+
+    A background task holds the process's only subscription to the progress
+    channels. Each stream has a bounded queue; a stream that falls behind is
+    ended instead of buffering without limit, and so is every stream when
+    the subscription drops, since messages may have been missed. Clients
+    then reconnect with Last-Event-ID and catch up from the job's stream.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._queues: dict[str, set[asyncio.Queue]] = {}
+
+    async def subscribe(self, job_id) -> asyncio.Queue:
+        """
+        Queue of the job's live progress messages (JSON strings)
+
+        Waits briefly for the subscription to be active, so history read
+        afterwards and live messages overlap rather than leave a gap.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+        queue = asyncio.Queue(maxsize=settings.JOB_EVENTS_STREAM_BUFFER)
+        self._queues.setdefault(str(job_id), set()).add(queue)
+        try:
+            await asyncio.wait_for(self._ready.wait(), SUBSCRIBE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            pass  # Redis is down; the history is all the stream gets until it reconnects
+        return queue
+
+    def unsubscribe(self, job_id, queue: asyncio.Queue):
+        queues = self._queues.get(str(job_id))
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._queues[str(job_id)]
+
+    def _resync(self, job_id: str, queue: asyncio.Queue):
+        self.unsubscribe(job_id, queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC)
+
+    def _dispatch(self, channel: str, message: str):
+        job_id = channel.split(":")[1]
+        for queue in list(self._queues.get(job_id, ())):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._resync(job_id, queue)
+
+    async def _listen(self):
+        client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        try:
+            while True:
+                pubsub = client.pubsub()
+                try:
+                    await pubsub.psubscribe(CHANNEL_PATTERN)
+                    self._ready.set()
+                    async for message in pubsub.listen():
+                        if message["type"] == "pmessage":
+                            self._dispatch(message["channel"], message["data"])
+                except RedisError as e:
+                    print(f"Warning: Progress subscription lost Redis: {e}")
+                    self._ready.clear()
+                    for job_id, queues in list(self._queues.items()):
+                        for queue in list(queues):
+                            self._resync(job_id, queue)
+                    await asyncio.sleep(LISTEN_RETRY_SECONDS)
+                finally:
+                    await pubsub.aclose()
+        finally:
+            self._ready.clear()
+            await client.aclose()
+
+    async def stop(self):
+        """Stop the background task (called on application shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, RedisError):
+                pass
+            self._task = None
+
+
+progress_broker = ProgressBroker()
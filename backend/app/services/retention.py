@@ -0,0 +1,214 @@
+"""
+Job retention (JOB_RETENTION_DAYS)
+
+Finished jobs older than the retention period are deleted with their files
+by a Celery beat task (app.tasks.retention). Each batch of
+JOB_RETENTION_BATCH_SIZE jobs is one transaction: rows are locked (SKIP
+LOCKED, so concurrent sweeps take different jobs), files removed, then rows
+deleted. A crash part way leaves rows whose files are partly gone, which the
+next sweep deletes again, rather than files nothing points at.
+
+A job's files:
+- its source upload. Reprocessed jobs share the original's source, so it
+  (and everything cached from it) is kept while another job references it
+- stems and peaks (stems/{job_id}) and the package ({job_id}.zip)
+- cached derivatives: pipelined ingest output, default renditions and HLS
+  segments of the stems and source, the multitrack WAV and, in GCS mode,
+  blob cache copies. Other cached renditions (custom bitrates, mixes) can't
+  be found from the job; they are left to the rendition cache's LRU bound
+
+DELETE /api/jobs/{id} removes files the same way.
+"""
+import os
+import asyncio
+import shutil
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+from uuid import UUID
+from google.api_core.exceptions import GoogleAPIError
+from redis import Redis
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.job import Job, TERMINAL_STATUSES
+from app.services.admin_stats import invalidate_admin_stats
+from app.services.hls import hls_rendition
+from app.services.ingest import get_ingest_dir
+from app.services.job_changes import record_job_change
+from app.services.mixdown import STEM_NAMES, multitrack_path
+from app.services.storage import StorageService
+from app.services.transcode import FORMATS, rendition_path, resolve_bitrate
+
+
+def _tree_size(path: str) -> int:
+    size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                size += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return size
+
+
+def _remove_local(path: str) -> int:
+    """Remove a local file or directory if it exists; returns bytes freed"""
+    if os.path.isdir(path):
+        size = _tree_size(path)
+        shutil.rmtree(path, ignore_errors=True)
+        return size
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except OSError:
+        return 0
+    return size
+
+
+def _cached_derivatives(audio_files: list[str], stem_files: dict[str, str]) -> list[str]:
+    """Rendition cache entries built from these files that can be found from their paths"""
+    paths = []
+    for audio_file in audio_files:
+        paths += [rendition_path(audio_file, fmt, resolve_bitrate(fmt, None)) for fmt in FORMATS]
+        paths.append(hls_rendition(audio_file).directory)
+    if len(stem_files) == len(STEM_NAMES):
+        paths.append(multitrack_path(stem_files))
+    return paths
+
+
+def _stored_paths(job: Job, storage: StorageService) -> tuple[str, str]:
+    """Stems folder and package of a job, including where a failed job may have left partial output"""
+    if storage.mode == "local":
+        stems, package = f"stems/{job.id}", f"{job.id}.zip"
+    else:
+        stems = f"gs://{settings.GCS_BUCKET_STEMS}/stems/{job.id}"
+        package = f"gs://{settings.GCS_BUCKET_PACKAGES}/{job.id}.zip"
+    return job.stems_folder_path or stems, job.package_path or package
+
+
+def remove_job_files(job: Job, storage: StorageService, keep_source: bool = False) -> int:
+    """
+    Delete a job's files and cached derivatives (blocking; run in a thread)
+
+    Args:
+        job: The job, before its row is deleted
+        storage: Storage the job's files are in
+        keep_source: Keep the source upload, because another job references it
+
+    Returns:
+        Bytes freed
+    """
+    stems_folder, package = _stored_paths(job, storage)
+    stem_files = {}
+    for name in STEM_NAMES:
+        cached = storage.get_cached_path(f"{stems_folder}/{name}.wav")
+        if cached:
+            stem_files[name] = cached
+    audio_files = list(stem_files.values())
+    source = job.source_file_path if not keep_source else None
+    if source and (cached_source := storage.get_cached_path(source)):
+        audio_files.append(cached_source)
+
+    # Cache keys are derived from the files, so find them before the files go
+    freed = 0
+    for path in _cached_derivatives(audio_files, stem_files):
+        freed += _remove_local(path)
+        _remove_local(path + ".lock")
+    freed += _remove_local(get_ingest_dir(str(job.id)))
+
+    freed += storage.delete_folder(stems_folder)
+    freed += storage.delete_file(package)
+    if source:
+        freed += storage.delete_file(source)
+    return freed
+
+
+async def referenced_sources(db: AsyncSession, sources: Iterable[str], excluding: list[UUID]) -> set[str]:
+    """Which of these source files jobs other than `excluding` still use"""
+    sources = {source for source in sources if source}
+    if not sources:
+        return set()
+    result = await db.execute(
+        select(Job.source_file_path)
+        .where(Job.source_file_path.in_(sources), Job.id.notin_(excluding))
+        .distinct()
+    )
+    return set(result.scalars())
+
+
+async def delete_expired_batch(
+    db: AsyncSession, storage: StorageService, cutoff: datetime, skip: Iterable[UUID] = ()
+) -> tuple[list[tuple[UUID, Optional[UUID]]], list[UUID], int]:
+    """
+    Delete up to JOB_RETENTION_BATCH_SIZE finished jobs created before cutoff
+
+    Jobs whose files can't be removed are logged and kept for the next sweep.
+
+    Args:
+        skip: Jobs not to select, because they already failed this sweep
+
+    Returns:
+        (job ID, owner ID) of the deleted jobs, IDs of the jobs that failed, and the bytes freed
+    """
+    query = select(Job).where(Job.status.in_(TERMINAL_STATUSES), Job.created_at < cutoff)
+    if skip := list(skip):
+        query = query.where(Job.id.notin_(skip))
+    result = await db.execute(
+        query
+        .order_by(Job.created_at, Job.id)
+        .limit(settings.JOB_RETENTION_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    jobs = result.scalars().all()
+    shared = await referenced_sources(db, (job.source_file_path for job in jobs), [job.id for job in jobs])
+    # Jobs of this batch still using each source: only the last one deleted removes it,
+    # so a source stays while a job sharing it failed and is kept
+    users = Counter(job.source_file_path for job in jobs)
+
+    deleted, failed, freed = [], [], 0
+    for job in jobs:
+        source = job.source_file_path
+        keep_source = source in shared or users[source] > 1
+        try:
+            freed += await asyncio.to_thread(remove_job_files, job, storage, keep_source)
+        except (OSError, GoogleAPIError) as e:
+            print(f"Warning: Could not delete files of job {job.id}: {e}")
+            failed.append(job.id)
+            continue
+        users[source] -= 1
+        deleted.append((job.id, job.user_id))
+
+    if deleted:
+        await db.execute(delete(Job).where(Job.id.in_([job_id for job_id, _ in deleted])))
+    await db.commit()
+    return deleted, failed, freed
+
+
+async def sweep_expired_jobs(db: AsyncSession, storage: StorageService, redis_client: Redis) -> dict:
+    """
+    Delete jobs past JOB_RETENTION_DAYS, at most JOB_RETENTION_MAX_BATCHES batches
+
+    Returns:
+        deleted_jobs and reclaimed_bytes
+    """
+    report = {"deleted_jobs": 0, "reclaimed_bytes": 0}
+    if settings.JOB_RETENTION_DAYS <= 0:
+        return report
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.JOB_RETENTION_DAYS)
+    # Jobs whose files couldn't be removed are retried next sweep, not next batch
+    failed: list[UUID] = []
+    for _ in range(settings.JOB_RETENTION_MAX_BATCHES):
+        deleted, batch_failed, freed = await delete_expired_batch(db, storage, cutoff, failed)
+        failed += batch_failed
+        for job_id, owner_id in deleted:
+            record_job_change(redis_client, job_id, owner_id, deleted=True)
+        report["deleted_jobs"] += len(deleted)
+        report["reclaimed_bytes"] += freed
+        if len(deleted) + len(batch_failed) < settings.JOB_RETENTION_BATCH_SIZE:
+            break  # Nothing left to select
+
+    if report["deleted_jobs"]:
+        invalidate_admin_stats(redis_client)
+    return report
@@ -1,20 +1,33 @@
 import os
+import math
+import shutil
+import asyncio
 import aiofiles
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 from uuid import UUID
 from fastapi import UploadFile
+from google.api_core.exceptions import NotFound
 from google.cloud import storage
+from google.cloud.storage.retry import DEFAULT_RETRY
 from app.core.config import settings
+from app.services.blob_cache import get_blob_cache
+
+if TYPE_CHECKING:
+    from app.services.ingest import IngestPipeline
 
 
 class StorageService:
     """Handle file storage operations (local or GCS)"""
     
-    def __init__(self):
+    # GCS allows at most 32 source objects per compose request
+    MAX_COMPOSE_PARTS = 32
+    
+    def __init__(self, gcs_client: Optional[storage.Client] = None):
         self.mode = settings.STORAGE_MODE
         if self.mode == "gcs":
-            self.gcs_client = storage.Client()
+            self.gcs_client = gcs_client or storage.Client()
         else:
             # Ensure local storage directory exists
             Path(settings.LOCAL_STORAGE_PATH).mkdir(parents=True, exist_ok=True)
@@ -57,8 +70,15 @@ class StorageService:
         # Convert relative to absolute
         return os.path.join(settings.LOCAL_STORAGE_PATH, relative_path)
     
-    async def save_upload(self, file: UploadFile, job_id: UUID) -> str:
-        """Save uploaded file. Returns RELATIVE path for local storage."""
+    async def save_upload(
+        self, file: UploadFile, job_id: UUID, ingest: Optional["IngestPipeline"] = None
+    ) -> str:
+        """Save uploaded file. Returns RELATIVE path for local storage.
+        
+        The file is streamed in UPLOAD_CHUNK_SIZE pieces so memory use stays
+        constant regardless of upload size. Each piece is also teed into the
+        ingest pipeline, if one is given, so decoding overlaps the write.
+        """
         # Preserve original file extension for proper processing
         file_ext = os.path.splitext(file.filename)[1]
         filename = f"{job_id}_source{file_ext}"
@@ -68,38 +88,148 @@ class StorageService:
             Path(file_path).parent.mkdir(parents=True, exist_ok=True)
             
             async with aiofiles.open(file_path, "wb") as f:
-                content = await file.read()
-                await f.write(content)
+                while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                    await f.write(chunk)
+                    if ingest:
+                        await ingest.feed(chunk)
             
             # Return relative path for database storage
             return self.to_relative_path(file_path)
         else:
-            # Upload to GCS
+            # Stream to GCS as a chunked resumable upload
             bucket = self.gcs_client.bucket(settings.GCS_BUCKET_UPLOADS)
-            blob = bucket.blob(filename)
+            blob = bucket.blob(filename, chunk_size=settings.UPLOAD_CHUNK_SIZE)
             
-            content = await file.read()
-            blob.upload_from_string(content)
+            gcs_file = blob.open("wb")
+            try:
+                while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                    await asyncio.to_thread(gcs_file.write, chunk)
+                    if ingest:
+                        await ingest.feed(chunk)
+            finally:
+                await asyncio.to_thread(gcs_file.close)
             
             return f"gs://{settings.GCS_BUCKET_UPLOADS}/{filename}"
     
+    def save_staged_upload(self, staged_path: str, job_id: UUID, file_ext: str) -> str:
+        """Move a fully received resumable upload into place. Returns RELATIVE path.
+        
+        Local storage only: in GCS mode uploads are staged in the bucket
+        and placed with copy_to_source.
+        """
+        filename = f"{job_id}_source{file_ext}"
+        file_path = os.path.join(settings.LOCAL_STORAGE_PATH, "uploads", filename)
+        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+        # Staging lives on the same volume, so this is a rename, not a copy
+        os.replace(staged_path, file_path)
+        return self.to_relative_path(file_path)
+    
+    def copy_to_source(self, path: str, job_id: UUID) -> str:
+        """Copy a stored file (e.g. a YouTube preview) into place as a job's source.
+        
+        Copied server-side in GCS mode. Returns RELATIVE path for local storage.
+        """
+        filename = f"{job_id}_source{os.path.splitext(path)[1]}"
+        
+        if self.mode == "local":
+            file_path = os.path.join(settings.LOCAL_STORAGE_PATH, "uploads", filename)
+            Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(self.to_absolute_path(path), file_path)
+            return self.to_relative_path(file_path)
+        else:
+            bucket_name, blob_name = path.removeprefix("gs://").split("/", 1)
+            source_bucket = self.gcs_client.bucket(bucket_name)
+            source_bucket.copy_blob(
+                source_bucket.blob(blob_name), self.gcs_client.bucket(settings.GCS_BUCKET_UPLOADS), filename
+            )
+            return f"gs://{settings.GCS_BUCKET_UPLOADS}/{filename}"
+    
     def save_file(self, source_path: str, destination: str, bucket_name: Optional[str] = None) -> str:
-        """Save a local file to storage. Returns RELATIVE path for local storage."""
+        """Save a local file to storage. Returns RELATIVE path for local storage.
+        
+        In GCS mode the file is sent as a chunked resumable upload, so a
+        transient failure resumes from the last committed chunk instead of
+        restarting. Files of GCS_COMPOSITE_UPLOAD_THRESHOLD bytes or more are
+        uploaded as parallel parts and composed server-side.
+        """
         if self.mode == "local":
             # Save to local storage path
             local_dest = os.path.join(settings.LOCAL_STORAGE_PATH, destination)
             Path(local_dest).parent.mkdir(parents=True, exist_ok=True)
             
             # Copy file to storage
-            import shutil
             shutil.copy2(source_path, local_dest)
             # Return relative path for database storage
             return self.to_relative_path(local_dest)
         else:
             bucket = self.gcs_client.bucket(bucket_name or settings.GCS_BUCKET_STEMS)
-            blob = bucket.blob(destination)
-            blob.upload_from_filename(source_path)
-            return f"gs://{bucket_name}/{destination}"
+            size = os.path.getsize(source_path)
+            threshold = settings.GCS_COMPOSITE_UPLOAD_THRESHOLD
+            
+            if threshold and size >= threshold:
+                self._composite_upload(bucket, source_path, destination, size)
+            else:
+                blob = bucket.blob(destination, chunk_size=settings.UPLOAD_CHUNK_SIZE)
+                # We are the only writer, so retrying without a generation precondition is safe
+                blob.upload_from_filename(source_path, retry=DEFAULT_RETRY)
+            return f"gs://{bucket.name}/{destination}"
+    
+    def save_files(self, files: list[tuple[str, str, Optional[str]]]) -> list[str]:
+        """Save several local files to storage concurrently.
+        
+        Args:
+            files: (source_path, destination, bucket_name) triples
+            
+        Returns:
+            Stored paths, in the same order as files
+        """
+        if self.mode == "local" or len(files) <= 1:
+            return [self.save_file(*file) for file in files]
+        
+        workers = min(settings.GCS_UPLOAD_CONCURRENCY, len(files))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gcs-upload") as pool:
+            futures = [pool.submit(self.save_file, *file) for file in files]
+            return [future.result() for future in futures]
+    
+    def compose_blobs(self, bucket_name: str, sources: list[str], destination: str) -> str:
+        """Concatenate blobs server-side, MAX_COMPOSE_PARTS at a time. Returns the gs:// path."""
+        bucket = self.gcs_client.bucket(bucket_name)
+        target = bucket.blob(destination)
+        parts = [bucket.blob(name) for name in sources]
+        target.compose(parts[:self.MAX_COMPOSE_PARTS], retry=DEFAULT_RETRY)
+        # Appending to the target is only safe to retry if it hasn't changed since
+        step = self.MAX_COMPOSE_PARTS - 1
+        for start in range(self.MAX_COMPOSE_PARTS, len(parts), step):
+            target.compose(
+                [target] + parts[start:start + step],
+                if_generation_match=target.generation,
+                retry=DEFAULT_RETRY,
+            )
+        return f"gs://{bucket_name}/{destination}"
+    
+    def _composite_upload(self, bucket, source_path: str, destination: str, size: int):
+        """Upload a large file as parallel parts, then compose them into one object"""
+        part_size = max(settings.GCS_COMPOSITE_PART_SIZE, math.ceil(size / self.MAX_COMPOSE_PARTS))
+        offsets = range(0, size, part_size)
+        parts = [bucket.blob(f"{destination}.part-{index:02d}") for index in range(len(offsets))]
+        
+        def upload_part(part, offset: int):
+            with open(source_path, "rb") as f:
+                f.seek(offset)
+                part.upload_from_file(f, size=min(part_size, size - offset), retry=DEFAULT_RETRY)
+        
+        try:
+            workers = min(settings.GCS_UPLOAD_CONCURRENCY, len(parts))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gcs-part") as pool:
+                for future in [pool.submit(upload_part, p, o) for p, o in zip(parts, offsets)]:
+                    future.result()
+            bucket.blob(destination).compose(parts, retry=DEFAULT_RETRY)
+        finally:
+            for part in parts:
+                try:
+                    part.delete()
+                except NotFound:
+                    pass  # Part was never uploaded
     
     async def get_download_url(self, path: str, expiration: int = 3600) -> str:
         """Get download URL (signed URL for GCS, or path for local)"""
@@ -115,14 +245,91 @@ class StorageService:
             bucket = self.gcs_client.bucket(bucket_name)
             blob = bucket.blob(blob_name)
             
-            url = blob.generate_signed_url(expiration=expiration)
-            return url
+            # Signing may call the IAM API (e.g. on Cloud Run)
+            return await asyncio.to_thread(blob.generate_signed_url, expiration=expiration)
     
+    def file_size(self, path: str) -> int:
+        """Size of a stored file in bytes (0 if it is missing)"""
+        if self.mode == "local":
+            try:
+                return os.path.getsize(self.to_absolute_path(path))
+            except FileNotFoundError:
+                return 0
+        bucket_name, blob_name = path.removeprefix("gs://").split("/", 1)
+        blob = self.gcs_client.bucket(bucket_name).get_blob(blob_name)
+        return (blob.size or 0) if blob is not None else 0
+
+    def delete_file(self, path: str) -> int:
+        """Delete a stored file, and its blob cache copy in GCS mode.
+
+        Missing files are skipped, so deleting twice is harmless.
+
+        Returns:
+            Bytes freed in storage, matching what file_size reported.
+            Blob cache copies are dropped too, but not counted.
+        """
+        if self.mode == "local":
+            abs_path = self.to_absolute_path(path)
+            try:
+                size = os.path.getsize(abs_path)
+                os.remove(abs_path)
+            except FileNotFoundError:
+                return 0
+            return size
+
+        bucket_name, blob_name = path.removeprefix("gs://").split("/", 1)
+        get_blob_cache().discard(bucket_name, blob_name)
+        blob = self.gcs_client.bucket(bucket_name).get_blob(blob_name)
+        if blob is None:
+            return 0
+        try:
+            blob.delete()
+        except NotFound:
+            return 0
+        return blob.size or 0
+
+    def delete_folder(self, path: str) -> int:
+        """Delete a stored folder (every blob under the prefix in GCS mode).
+
+        Returns bytes freed in storage, counted like delete_file.
+        """
+        if self.mode == "local":
+            abs_path = self.to_absolute_path(path)
+            freed = 0
+            for dirpath, _, filenames in os.walk(abs_path):
+                for filename in filenames:
+                    try:
+                        freed += os.path.getsize(os.path.join(dirpath, filename))
+                    except OSError:
+                        pass
+            shutil.rmtree(abs_path, ignore_errors=True)
+            return freed
+
+        bucket_name, prefix = path.removeprefix("gs://").split("/", 1)
+        freed = 0
+        for blob in self.gcs_client.list_blobs(bucket_name, prefix=prefix.rstrip("/") + "/"):
+            get_blob_cache().discard(bucket_name, blob.name)
+            try:
+                blob.delete()
+            except NotFound:
+                continue
+            freed += blob.size or 0
+        return freed
+
+    def get_cached_path(self, path: str) -> Optional[str]:
+        """Local copy of a stored file if there is one, without downloading it"""
+        if self.mode == "local":
+            abs_path = self.to_absolute_path(path)
+            return abs_path if os.path.exists(abs_path) else None
+        bucket_name, blob_name = path.removeprefix("gs://").split("/", 1)
+        return get_blob_cache().cached_path(bucket_name, blob_name)
+
     def get_local_path(self, path: str) -> str:
         """Get absolute local path for a file.
         
         For local storage: converts relative path to absolute.
-        For GCS: downloads file to temp and returns local path.
+        For GCS: returns a copy in the local blob cache, downloading it
+        only if the cached copy is missing or stale.
         """
         if self.mode == "local":
             # Convert relative to absolute if needed
@@ -137,8 +344,4 @@ class StorageService:
         bucket = self.gcs_client.bucket(bucket_name)
         blob = bucket.blob(blob_name)
         
-        local_path = f"/tmp/{blob_name}"
-        Path(local_path).parent.mkdir(parents=True, exist_ok=True)
-        blob.download_to_filename(local_path)
-        
-        return local_path
+        return get_blob_cache().fetch(blob)
@@ -0,0 +1,296 @@
+"""
+On-demand stem transcoding
+
+Stems are stored as 24-bit WAV. Compressed renditions (Opus, MP3, FLAC) are
+encoded with PyAV the first time they are requested and kept in an LRU disk
+cache under LOCAL_STORAGE_PATH/transcodes:
+
+- Single-flight: concurrent requests for the same rendition share one encode
+  (an in-process future, plus a file lock across API processes)
+- Bounded: encodes run in a small dedicated thread pool; when
+  TRANSCODE_MAX_PENDING encodes are queued, requests get a 503
+- Cache keys include the source's size and mtime, so a re-processed stem
+  never serves a stale rendition
+
+Mixdowns (app.services.mixdown) and HLS segments (app.services.hls) are
+cached in the same directory and share its size bound. HLS segments, and
+mixdowns rendered as the input of a rendition, are built in the same pool;
+a WAV mixdown streamed on first request renders as it is sent. Recency is tracked in each file's atime, leaving its mtime
+(and so its ETag) unchanged by cache hits.
+"""
+import os
+import time
+import fcntl
+import asyncio
+import hashlib
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple, Optional
+import av
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+
+
+class RenditionFormat(NamedTuple):
+    codec: str
+    container: str
+    extension: str
+    media_type: str
+    sample_format: str
+    default_bitrate: Optional[int]  # kbps; None for lossless
+
+
+FORMATS = {
+    "opus": RenditionFormat("libopus", "ogg", ".opus", "audio/ogg", "flt", 128),
+    "mp3": RenditionFormat("libmp3lame", "mp3", ".mp3", "audio/mpeg", "fltp", 192),
+    "flac": RenditionFormat("flac", "flac", ".flac", "audio/flac", "s32", None),
+}
+
+MIN_BITRATE = 32
+MAX_BITRATE = 320
+# Renditions, plus WAV mixdowns (app.services.mixdown) and HLS segment
+# directories (app.services.hls)
+CACHED_EXTENSIONS = {spec.extension for spec in FORMATS.values()} | {".wav", ".hls"}
+HLS_PLAYLIST = "playlist.m3u8"
+DEFAULT_LAYOUTS = {1: "mono", 2: "stereo"}
+EVICTION_GRACE_SECONDS = 60  # Never evict a rendition served this recently
+
+_transcode_executor: Optional[ThreadPoolExecutor] = None
+_transcode_lock = threading.Lock()
+_pending_transcodes = 0
+# Rendition path -> future of the encode producing it (single-flight)
+_inflight: dict[str, asyncio.Future] = {}
+
+
+class TranscodeError(ValueError):
+    """Raised for unsupported rendition parameters"""
+
+
+def get_transcode_executor() -> ThreadPoolExecutor:
+    """Get (lazily create) the thread pool dedicated to transcoding"""
+    global _transcode_executor
+    with _transcode_lock:
+        if _transcode_executor is None:
+            _transcode_executor = ThreadPoolExecutor(
+                max_workers=settings.TRANSCODE_WORKERS,
+                thread_name_prefix="transcode",
+            )
+        return _transcode_executor
+
+
+def shutdown_transcode_executor() -> None:
+    """Shut down the transcoding pool (called on application shutdown)"""
+    global _transcode_executor
+    with _transcode_lock:
+        executor, _transcode_executor = _transcode_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_cache_dir() -> str:
+    return os.path.join(settings.LOCAL_STORAGE_PATH, "transcodes")
+
+
+def resolve_bitrate(fmt: str, bitrate: Optional[int]) -> Optional[int]:
+    """
+    Validate a rendition request and fill in the default bitrate
+
+    Raises:
+        TranscodeError: For unknown formats or out-of-range bitrates
+    """
+    if fmt not in FORMATS:
+        raise TranscodeError(f"Unsupported format. Must be one of: {list(FORMATS)}")
+    spec = FORMATS[fmt]
+    if spec.default_bitrate is None:
+        return None  # Lossless, bitrate does not apply
+    bitrate = bitrate or spec.default_bitrate
+    if not MIN_BITRATE <= bitrate <= MAX_BITRATE:
+        raise TranscodeError(f"Bitrate must be between {MIN_BITRATE} and {MAX_BITRATE} kbps")
+    return bitrate
+
+
+def rendition_path(source_path: str, fmt: str, bitrate: Optional[int]) -> str:
+    """Cache location of a rendition; changes whenever the source file does"""
+    stat = os.stat(source_path)
+    identity = f"{os.path.abspath(source_path)}:{stat.st_size}:{stat.st_mtime_ns}:{fmt}:{bitrate}"
+    key = hashlib.sha256(identity.encode()).hexdigest()
+    return os.path.join(get_cache_dir(), key + FORMATS[fmt].extension)
+
+
+def transcode_audio(source_path: str, dest_path: str, fmt: str, bitrate: Optional[int]):
+    """Encode an audio file into a rendition format"""
+    spec = FORMATS[fmt]
+    with av.open(source_path, mode="r") as source:
+        in_stream = source.streams.audio[0]
+        with av.open(dest_path, mode="w", format=spec.container) as dest:
+            # WAVs without a channel mask decode as e.g. "2 channels", which
+            # some encoders reject; use the default layout for the count
+            layout = DEFAULT_LAYOUTS.get(in_stream.channels, in_stream.layout.name)
+            out_stream = dest.add_stream(spec.codec, rate=in_stream.rate, layout=layout)
+            out_stream.format = spec.sample_format
+            if bitrate:
+                out_stream.bit_rate = bitrate * 1000
+
+            # The encoder converts sample format and re-frames to its frame size
+            for frame in source.decode(in_stream):
+                frame.pts = None
+                for packet in out_stream.encode(frame):
+                    dest.mux(packet)
+            for packet in out_stream.encode(None):
+                dest.mux(packet)
+
+
+def _build_rendition(source_path: str, dest_path: str, fmt: str, bitrate: Optional[int]):
+    """Transcode into the cache unless another process already did (runs in the pool)"""
+    cache_dir = get_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+
+    with open(dest_path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(dest_path):
+                return
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".partial")
+            os.close(fd)
+            try:
+                transcode_audio(source_path, tmp_path, fmt, bitrate)
+                os.replace(tmp_path, dest_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    evict_renditions(keep=dest_path)
+
+
+def _entry_usage(path: str) -> Optional[tuple[float, int]]:
+    """(last used, size) of a cache entry; directories (HLS) are used via their playlist"""
+    try:
+        if os.path.isdir(path):
+            names = os.listdir(path)
+            size = sum(os.path.getsize(os.path.join(path, name)) for name in names)
+            return os.stat(os.path.join(path, HLS_PLAYLIST)).st_atime, size
+        stat = os.stat(path)
+        return stat.st_atime, stat.st_size
+    except OSError:
+        return None
+
+
+def evict_renditions(keep: Optional[str] = None):
+    """Remove least recently used renditions until the cache fits TRANSCODE_CACHE_MAX_BYTES"""
+    cache_dir = get_cache_dir()
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if os.path.splitext(name)[1] not in CACHED_EXTENSIONS:
+            continue
+        usage = _entry_usage(path)
+        if usage:
+            entries.append((*usage, path))
+
+    total = sum(size for _, size, _ in entries)
+    now = time.time()
+    for last_used, size, path in sorted(entries):
+        if total <= settings.TRANSCODE_CACHE_MAX_BYTES:
+            break
+        # Keep recently served files, so a path just handed out is not deleted under a response
+        if path == keep or now - last_used < EVICTION_GRACE_SECONDS:
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        for stale in (path, path + ".lock"):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+        total -= size
+
+
+def touch_rendition(path: str):
+    """Mark a rendition as recently used without changing its mtime"""
+    stat = os.stat(path)
+    os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+
+
+async def get_rendition(source_path: str, fmt: str, bitrate: Optional[int] = None) -> str:
+    """
+    Get a cached rendition of an audio file, transcoding it on first request
+
+    Args:
+        source_path: Local audio file (a stem WAV)
+        fmt: Key of FORMATS
+        bitrate: kbps, or None for the format default
+
+    Returns:
+        Path of the rendition in the cache
+
+    Raises:
+        TranscodeError: For unsupported parameters
+        ServiceUnavailableError: If TRANSCODE_MAX_PENDING encodes are already queued
+    """
+    bitrate = resolve_bitrate(fmt, bitrate)
+    dest_path = rendition_path(source_path, fmt, bitrate)
+
+    if os.path.exists(dest_path):
+        touch_rendition(dest_path)
+        return dest_path
+
+    await run_single_flight(dest_path, _build_rendition, source_path, dest_path, fmt, bitrate)
+    return dest_path
+
+
+async def run_single_flight(dest_path: str, build: Callable, *args):
+    """
+    Run build(*args) in the transcoding pool to produce dest_path
+
+    Callers that ask for the same dest_path while a build is running wait for
+    that build instead of starting another.
+
+    Raises:
+        ServiceUnavailableError: If TRANSCODE_MAX_PENDING builds are already queued
+    """
+    # Shielded, so a client disconnect doesn't cancel the encode for other waiters
+    await asyncio.shield(start_single_flight(dest_path, build, *args))
+
+
+def start_single_flight(dest_path: str, build: Callable, *args) -> asyncio.Future:
+    """
+    Start build(*args) in the transcoding pool, or join the running build of dest_path
+
+    For callers that follow the build's output while it runs; the returned
+    future must not be cancelled.
+
+    Raises:
+        ServiceUnavailableError: If TRANSCODE_MAX_PENDING builds are already queued
+    """
+    global _pending_transcodes
+
+    # Join an encode of the same rendition that is already running
+    inflight = _inflight.get(dest_path)
+    if inflight is not None:
+        return inflight
+
+    with _transcode_lock:
+        if _pending_transcodes >= settings.TRANSCODE_MAX_PENDING:
+            raise ServiceUnavailableError(
+                detail="Transcoding service is busy, please retry shortly",
+                retry_after=5
+            )
+        _pending_transcodes += 1
+
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_transcode_executor(), build, *args)
+    _inflight[dest_path] = future
+    future.add_done_callback(lambda _: _finish_transcode(dest_path))
+    return future
+
+
+def _finish_transcode(dest_path: str):
+    """Release single-flight and pool bookkeeping once an encode ends"""
+    global _pending_transcodes
+    _inflight.pop(dest_path, None)
+    with _transcode_lock:
+        _pending_transcodes -= 1
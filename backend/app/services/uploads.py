@@ -0,0 +1,344 @@
+import os
+import json
+import time
+import asyncio
+import aiofiles
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from uuid import UUID, uuid4
+from google.api_core.exceptions import GoogleAPIError
+from redis import Redis
+from app.core.config import settings
+from app.services.storage import StorageService
+from app.services.ingest import IngestPipeline, start_ingest, get_ingest_dir, ingest_last_written, discard_ingest
+from app.services.media_probe import probe_media, MediaProbeError
+
+# Support MP3, WAV, and FLAC formats
+SUPPORTED_FORMATS = ['.flac', '.mp3', '.wav']
+
+# Decoders for in-flight uploads, keyed by upload ID. They only exist in the
+# process that saw the first chunk; if another process serves a chunk, the
+# byte counts stop matching and pipelined ingest is dropped for that upload.
+# Pipelines of uploads that stopped arriving are reaped on the next chunk.
+_ingest_pipelines: dict[str, IngestPipeline] = {}
+
+
+class UploadError(Exception):
+    """Raised when a resumable upload request cannot be applied"""
+
+    def __init__(self, message: str, status_code: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+class ResumableUploadService:
+    """
+    Resumable, chunked uploads
+
+    Protocol:
+      1. init_upload(filename, total_size)          -> upload_id, offset 0
+      2. append_chunk(upload_id, offset, stream)   -> new offset (repeat)
+      3. finalize(upload_id, job_id)               -> storage path for the job
+
+    A client that lost its connection asks for the upload (get_upload) and
+    resumes from its offset. Session metadata lives in Redis under
+    upload:{id} with a TTL.
+
+    Local mode stages the upload in one file under uploads/.partial on the
+    API's disk, and the offset is that file's size. This only works when
+    every request of an upload reaches the same disk: a single API instance,
+    or instances sharing LOCAL_STORAGE_PATH.
+
+    GCS mode stages each chunk as its own object under .partial/{id}/ in
+    the uploads bucket, and keeps the offset in the session, so any API
+    instance can take the next chunk. A chunk only counts once all of it
+    has arrived; an interrupted chunk is resent whole. The parts are
+    composed into one object when the last chunk lands.
+    """
+
+    def __init__(self, redis_client: Redis):
+        self.redis = redis_client
+        self.storage = StorageService()
+        self.staging_dir = os.path.join(settings.LOCAL_STORAGE_PATH, "uploads", ".partial")
+        if self.storage.mode == "local":
+            Path(self.staging_dir).mkdir(parents=True, exist_ok=True)
+
+    def _key(self, upload_id: str) -> str:
+        return f"upload:{upload_id}"
+
+    def _staged_path(self, upload_id: str) -> str:
+        return os.path.join(self.staging_dir, f"{upload_id}.part")
+
+    def _staging_prefix(self, upload_id: str) -> str:
+        """Folder of an upload's staged objects in the uploads bucket (GCS mode)"""
+        return f".partial/{upload_id}"
+
+    def _assembled_name(self, upload_id: str, file_ext: str) -> str:
+        """Blob holding the composed upload (GCS mode)"""
+        return f"{self._staging_prefix(upload_id)}/source{file_ext}"
+
+    def _save_session(self, upload_id: str, metadata: dict):
+        self.redis.setex(self._key(upload_id), settings.UPLOAD_SESSION_TTL, json.dumps(metadata))
+
+    def init_upload(self, filename: str, total_size: int) -> dict:
+        """Start a new upload session"""
+        file_ext = os.path.splitext(filename)[1].lower()
+        if file_ext not in SUPPORTED_FORMATS:
+            raise UploadError(f"Unsupported format. Supported formats: {', '.join(SUPPORTED_FORMATS)}")
+        if total_size <= 0 or total_size > settings.UPLOAD_MAX_SIZE:
+            raise UploadError(f"Upload size must be between 1 byte and {settings.UPLOAD_MAX_SIZE} bytes", 413)
+
+        upload_id = str(uuid4())
+        metadata = {
+            'filename': filename,
+            'file_ext': file_ext,
+            'total_size': total_size,
+            'offset': 0,  # GCS mode; local mode uses the staged file's size
+        }
+        self._save_session(upload_id, metadata)
+        if self.storage.mode == "local":
+            # Create the empty staging file so offset 0 is well defined
+            open(self._staged_path(upload_id), "wb").close()
+
+        pipeline = start_ingest(f"upload-{upload_id}")
+        if pipeline:
+            _ingest_pipelines[upload_id] = pipeline
+
+        return self.get_upload(upload_id)
+
+    def get_upload(self, upload_id: str) -> Optional[dict]:
+        """Get an upload session with its current offset"""
+        data = self.redis.get(self._key(upload_id))
+        if not data:
+            return None
+        metadata = json.loads(data)
+
+        if self.storage.mode == "local":
+            staged_path = self._staged_path(upload_id)
+            if not os.path.exists(staged_path):
+                return None
+            offset = os.path.getsize(staged_path)
+        else:
+            offset = metadata['offset']
+        return {
+            'upload_id': upload_id,
+            'filename': metadata['filename'],
+            'file_ext': metadata['file_ext'],
+            'total_size': metadata['total_size'],
+            'offset': offset,
+            'complete': offset == metadata['total_size'],
+            'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+        }
+
+    async def append_chunk(self, upload_id: str, offset: int, stream: AsyncIterator[bytes]) -> dict:
+        """
+        Append a chunk received as a byte stream at the given offset
+
+        The chunk is written as it arrives; nothing is buffered in memory.
+        A mismatching offset is rejected with 409 and the current offset.
+        """
+        await self._reap_pipelines()
+        upload = self.get_upload(upload_id)
+        if not upload:
+            raise UploadError("Upload not found or expired", 404)
+
+        # Only one writer per upload; a parallel request gets a 409 and retries
+        lock_key = f"{self._key(upload_id)}:lock"
+        if not self.redis.set(lock_key, "1", nx=True, ex=600):
+            raise UploadError("Another chunk is being written for this upload", 409, upload['offset'])
+
+        try:
+            if offset != upload['offset']:
+                raise UploadError("Offset does not match received bytes", 409, upload['offset'])
+
+            if self.storage.mode != "local":
+                return await self._append_gcs_chunk(upload, offset, stream)
+
+            pipeline = _ingest_pipelines.get(upload_id)
+            if pipeline and pipeline.bytes_fed != offset:
+                await self._drop_pipeline(upload_id)
+                pipeline = None
+
+            written = offset
+            async with aiofiles.open(self._staged_path(upload_id), "ab") as f:
+                async for chunk in stream:
+                    written += len(chunk)
+                    if written > upload['total_size']:
+                        await f.truncate(offset)
+                        await self._drop_pipeline(upload_id)
+                        raise UploadError("Chunk exceeds declared upload size", 413, offset)
+                    await f.write(chunk)
+                    if pipeline:
+                        # Decode while the rest of the upload is still arriving
+                        await pipeline.feed(chunk)
+
+            # Keep an active upload's session alive
+            self.redis.expire(self._key(upload_id), settings.UPLOAD_SESSION_TTL)
+        finally:
+            self.redis.delete(lock_key)
+
+        return self.get_upload(upload_id)
+
+    async def _append_gcs_chunk(self, upload: dict, offset: int, stream: AsyncIterator[bytes]) -> dict:
+        """Stage a chunk as its own object, named by offset so a resent chunk replaces it"""
+        upload_id = upload['upload_id']
+        bucket = self.storage.gcs_client.bucket(settings.GCS_BUCKET_UPLOADS)
+        blob = bucket.blob(f"{self._staging_prefix(upload_id)}/part-{offset:015d}", chunk_size=settings.UPLOAD_CHUNK_SIZE)
+
+        writer = await asyncio.to_thread(blob.open, "wb")
+        written = offset
+        try:
+            async for chunk in stream:
+                written += len(chunk)
+                if written > upload['total_size']:
+                    raise UploadError("Chunk exceeds declared upload size", 413, offset)
+                await asyncio.to_thread(writer.write, chunk)
+        except BaseException:
+            # A writer commits whatever it holds when closed (or collected),
+            # so close it now and drop the partial chunk
+            await asyncio.to_thread(self._discard_part, writer, blob)
+            raise
+        await asyncio.to_thread(writer.close)
+        if written == offset:
+            await asyncio.to_thread(self._discard_part, writer, blob)
+            return upload
+
+        if written == upload['total_size']:
+            await asyncio.to_thread(self._assemble, upload_id, upload['file_ext'])
+        metadata = {field: upload[field] for field in ('filename', 'file_ext', 'total_size')}
+        self._save_session(upload_id, {**metadata, 'offset': written})
+        return self.get_upload(upload_id)
+
+    @staticmethod
+    def _discard_part(writer, blob):
+        try:
+            writer.close()
+            blob.delete()
+        except (GoogleAPIError, ValueError):
+            pass  # Nothing was committed
+
+    def _assemble(self, upload_id: str, file_ext: str):
+        """Compose the staged chunks, in offset order, into one object and drop the parts"""
+        prefix = f"{self._staging_prefix(upload_id)}/part-"
+        parts = [
+            blob.name for blob in self.storage.gcs_client.list_blobs(settings.GCS_BUCKET_UPLOADS, prefix=prefix)
+        ]
+        self.storage.compose_blobs(settings.GCS_BUCKET_UPLOADS, sorted(parts), self._assembled_name(upload_id, file_ext))
+        bucket = self.storage.gcs_client.bucket(settings.GCS_BUCKET_UPLOADS)
+        for name in parts:
+            bucket.blob(name).delete()
+
+    def probe(self, upload_id: str) -> dict:
+        """Read media info from the headers of a staged upload"""
+        try:
+            if self.storage.mode == "local":
+                return probe_media(self._staged_path(upload_id))
+            blob_name = self._assembled_name(upload_id, self.get_upload(upload_id)['file_ext'])
+            # Ranged reads: only the headers are fetched
+            with self.storage.gcs_client.bucket(settings.GCS_BUCKET_UPLOADS).blob(blob_name).open("rb") as f:
+                return probe_media(f)
+        except (MediaProbeError, OSError):
+            raise UploadError("Could not read audio file", 400)
+
+    async def finalize(self, upload_id: str, job_id: UUID) -> str:
+        """Move a completed upload into permanent storage for a job"""
+        upload = self.get_upload(upload_id)
+        if not upload:
+            raise UploadError("Upload not found or expired", 404)
+        if not upload['complete']:
+            raise UploadError("Upload is incomplete", 409, upload['offset'])
+
+        if self.storage.mode == "local":
+            file_path = self.storage.save_staged_upload(self._staged_path(upload_id), job_id, upload['file_ext'])
+        else:
+            staging = f"gs://{settings.GCS_BUCKET_UPLOADS}/{self._staging_prefix(upload_id)}"
+            assembled = f"gs://{settings.GCS_BUCKET_UPLOADS}/{self._assembled_name(upload_id, upload['file_ext'])}"
+            file_path = await asyncio.to_thread(self.storage.copy_to_source, assembled, job_id)
+            await asyncio.to_thread(self.storage.delete_folder, staging)
+        self.redis.delete(self._key(upload_id))
+
+        pipeline = _ingest_pipelines.pop(upload_id, None)
+        if pipeline:
+            if pipeline.bytes_fed == upload['total_size']:
+                pipeline.finish_later(str(job_id))
+            else:
+                await pipeline.abort()
+
+        return file_path
+
+    async def abort(self, upload_id: str):
+        """Discard an upload session and its staged bytes"""
+        if self.storage.mode == "local":
+            staged_path = self._staged_path(upload_id)
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+        else:
+            gcs_prefix = f"gs://{settings.GCS_BUCKET_UPLOADS}/{self._staging_prefix(upload_id)}"
+            await asyncio.to_thread(self.storage.delete_folder, gcs_prefix)
+        self.redis.delete(self._key(upload_id))
+        await self._drop_pipeline(upload_id)
+
+    def remove_stale_uploads(self) -> tuple[int, int]:
+        """
+        Delete staged bytes and ingest output of uploads whose session has expired (blocking)
+
+        An upload the client walked away from is never finalized or
+        aborted, so its staging file (or objects) would stay forever. The
+        session outlives the last chunk by UPLOAD_SESSION_TTL, so anything
+        staged without a session is abandoned. Ingest output is discarded
+        with its pipeline, except when the API process holding the pipeline
+        went away.
+
+        Returns:
+            Uploads removed, and the bytes freed
+        """
+        removed, freed = set(), 0
+        if self.storage.mode == "local":
+            for entry in os.scandir(self.staging_dir):
+                upload_id = entry.name.removesuffix(".part")
+                if upload_id == entry.name or self.redis.exists(self._key(upload_id)):
+                    continue
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue  # Finalized or aborted meanwhile
+                removed.add(upload_id)
+                freed += size
+        else:
+            staged = set()
+            for blob in self.storage.gcs_client.list_blobs(settings.GCS_BUCKET_UPLOADS, prefix=".partial/"):
+                staged.add(blob.name.split("/")[1])
+            for upload_id in staged:
+                if self.redis.exists(self._key(upload_id)):
+                    continue
+                freed += self.storage.delete_folder(f"gs://{settings.GCS_BUCKET_UPLOADS}/{self._staging_prefix(upload_id)}")
+                removed.add(upload_id)
+
+        ingest_root = get_ingest_dir("")
+        if os.path.isdir(ingest_root):
+            cutoff = time.time() - settings.UPLOAD_SESSION_TTL
+            for entry in os.scandir(ingest_root):
+                upload_id = entry.name.removeprefix("upload-")
+                if upload_id == entry.name or self.redis.exists(self._key(upload_id)):
+                    continue
+                # finalize ends the session before it moves the output to the job
+                if ingest_last_written(entry.name) > cutoff:
+                    continue
+                freed += discard_ingest(entry.name)
+                removed.add(upload_id)
+        return len(removed), freed
+
+    async def _reap_pipelines(self):
+        """Abort decoders not fed for UPLOAD_SESSION_TTL; their sessions have expired"""
+        cutoff = time.monotonic() - settings.UPLOAD_SESSION_TTL
+        for upload_id, pipeline in list(_ingest_pipelines.items()):
+            if pipeline.last_fed < cutoff:
+                await self._drop_pipeline(upload_id)
+
+    async def _drop_pipeline(self, upload_id: str):
+        """Stop pipelined ingest for an upload; the worker will convert normally"""
+        pipeline = _ingest_pipelines.pop(upload_id, None)
+        if pipeline:
+            await pipeline.abort()
@@ -1,30 +1,83 @@
 import os
 import json
+import shutil
 import tempfile
 import yt_dlp
 from uuid import uuid4
 from redis import Redis
+from app.core.config import settings
 from app.services.audio import AudioService
+from app.services.media_probe import probe_media, MediaProbeError
+from app.services.peaks import compute_peak_pyramid, peaks_filename
+from app.services.storage import StorageService
+
+
+class PreviewStatus:
+    """Lifecycle states of a YouTube preview"""
+    QUEUED = "queued"
+    DOWNLOADING = "downloading"
+    CONVERTING = "converting"
+    READY = "ready"
+    FAILED = "failed"
 
 
 class YouTubePreviewService:
     """Handle YouTube preview downloads and temporary storage"""
+
+    DOWNLOAD_SLOT_KEY = "youtube_preview:download_slot:{}"
     
     def __init__(self, redis_client: Redis):
         self.redis = redis_client
         self.audio_service = AudioService()
         self.preview_ttl = 3600  # 1 hour
     
-    def download_and_preview(self, youtube_url: str) -> dict:
+    def create_preview(self, youtube_url: str) -> dict:
+        """
+        Register a new preview in the QUEUED state
+
+        The download itself runs in the create_youtube_preview Celery task.
+        Returns the initial preview status.
+        """
+        preview_id = str(uuid4())
+        self._set_state(
+            preview_id,
+            status=PreviewStatus.QUEUED,
+            progress_percent=0,
+            original_url=youtube_url,
+        )
+        return self.get_status(preview_id)
+
+    def download_and_preview(self, youtube_url: str, preview_id: str | None = None) -> dict:
         """
         Download YouTube audio, convert to WAV, and store temporarily
         
+        The WAV and its peaks are kept in storage under previews/{id} (the
+        uploads bucket in GCS mode), so the API can serve them whichever
+        worker downloaded them. Progress is published to the
+        youtube_preview:{id}:progress channel.
         Returns preview metadata
         """
-        preview_id = str(uuid4())
-        temp_dir = tempfile.mkdtemp(prefix=f"yt_preview_{preview_id}_")
+        preview_id = preview_id or str(uuid4())
+        storage = StorageService()
+        preview_dir = f"previews/{preview_id}"
+        if storage.mode == "local":
+            # Written in place on the shared volume
+            work_dir = os.path.join(settings.LOCAL_STORAGE_PATH, preview_dir)
+            storage_dir = preview_dir
+        else:
+            work_dir = tempfile.mkdtemp(prefix=f"preview-{preview_id}-")
+            storage_dir = f"gs://{settings.GCS_BUCKET_UPLOADS}/{preview_dir}"
+        os.makedirs(work_dir, exist_ok=True)
         
         try:
+            self._set_state(
+                preview_id,
+                status=PreviewStatus.DOWNLOADING,
+                progress_percent=5,
+                original_url=youtube_url,
+                storage_dir=storage_dir,
+            )
+
             # Extract video info first (fast, no download)
             with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
                 info = ydl.extract_info(youtube_url, download=False)
@@ -32,26 +85,48 @@ class YouTubePreviewService:
                 duration = info.get('duration', 0)
                 thumbnail = info.get('thumbnail')
             
+            self._set_state(
+                preview_id,
+                progress_percent=10,
+                title=title,
+                duration=duration,
+                thumbnail=thumbnail,
+            )
+
             # Download audio
-            audio_path = self.audio_service.download_youtube(youtube_url, temp_dir)
+            audio_path = self.audio_service.download_youtube(youtube_url, work_dir)
+
+            # Probe the downloaded source so a job created from this preview
+            # gets its media info without touching the file again
+            try:
+                media = probe_media(audio_path)
+            except MediaProbeError:
+                media = None
             
             # Convert to WAV for waveform
-            wav_path = self.audio_service.convert_to_wav(audio_path, temp_dir)
+            self._set_state(preview_id, status=PreviewStatus.CONVERTING, progress_percent=70)
+            wav_path = self.audio_service.convert_to_wav(audio_path, work_dir)
+            peak_files = compute_peak_pyramid(wav_path, os.path.join(work_dir, "peaks"), "source")
             
-            # Store preview metadata in Redis
-            preview_data = {
-                'file_path': wav_path,
-                'title': title,
-                'duration': duration,
-                'thumbnail': thumbnail,
-                'original_url': youtube_url,
-                'temp_dir': temp_dir
-            }
+            if storage.mode == "local":
+                file_path = storage.to_relative_path(wav_path)
+            else:
+                saved_paths = storage.save_files(
+                    [(wav_path, f"{preview_dir}/{os.path.basename(wav_path)}", settings.GCS_BUCKET_UPLOADS)]
+                    + [
+                        (peak_file, f"{preview_dir}/peaks/{os.path.basename(peak_file)}", settings.GCS_BUCKET_UPLOADS)
+                        for peak_file in peak_files
+                    ]
+                )
+                file_path = saved_paths[0]
+                shutil.rmtree(work_dir, ignore_errors=True)
             
-            self.redis.setex(
-                f"youtube_preview:{preview_id}",
-                self.preview_ttl,
-                json.dumps(preview_data)
+            self._set_state(
+                preview_id,
+                status=PreviewStatus.READY,
+                progress_percent=100,
+                file_path=file_path,
+                media=media,
             )
             
             return {
@@ -63,11 +138,85 @@ class YouTubePreviewService:
             }
             
         except Exception as e:
-            # Cleanup on error
-            import shutil
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
+            # Cleanup on error, keep the failed state so clients can report it
+            shutil.rmtree(work_dir, ignore_errors=True)
+            if storage.mode != "local":
+                storage.delete_folder(storage_dir)
+            self._set_state(
+                preview_id,
+                status=PreviewStatus.FAILED,
+                error_message=str(e),
+                storage_dir=None,
+            )
             raise e
+
+    def mark_failed(self, preview_id: str, error_message: str):
+        """Record that a preview will not be downloaded"""
+        self._set_state(preview_id, status=PreviewStatus.FAILED, error_message=error_message)
+
+    def _set_state(self, preview_id: str, **fields) -> dict:
+        """Merge fields into the stored preview record and publish progress"""
+        preview_data = self.get_preview(preview_id) or {}
+        preview_data.update(fields)
+
+        self.redis.setex(
+            f"youtube_preview:{preview_id}",
+            self.preview_ttl,
+            json.dumps(preview_data)
+        )
+
+        # Publish to Redis for WebSocket (same pattern as job:{id}:progress)
+        self.redis.publish(
+            f"youtube_preview:{preview_id}:progress",
+            json.dumps(self._to_status(preview_id, preview_data))
+        )
+        return preview_data
+
+    def _to_status(self, preview_id: str, preview_data: dict) -> dict:
+        """Build the public status payload from a stored preview record"""
+        status = preview_data.get('status', PreviewStatus.READY)
+        return {
+            'preview_id': preview_id,
+            'status': status,
+            'progress_percent': preview_data.get('progress_percent', 100),
+            'title': preview_data.get('title'),
+            'duration': preview_data.get('duration'),
+            'thumbnail': preview_data.get('thumbnail'),
+            'error_message': preview_data.get('error_message'),
+            'preview_url': (
+                f"/api/youtube/preview/{preview_id}/audio"
+                if status == PreviewStatus.READY else None
+            ),
+        }
+
+    def get_status(self, preview_id: str) -> dict | None:
+        """Get the public status of a preview"""
+        preview_data = self.get_preview(preview_id)
+        if preview_data is None:
+            return None
+        return self._to_status(preview_id, preview_data)
+
+    def acquire_download_slot(self, holder: str) -> str | None:
+        """
+        Reserve one of YOUTUBE_PREVIEW_MAX_CONCURRENT download slots
+
+        Each slot is its own key holding the holder's ID, set only when free
+        and expiring after YOUTUBE_PREVIEW_SLOT_TTL, so a slot leaked by a
+        crashed worker is reclaimed. Rejected attempts write nothing.
+
+        Returns:
+            The slot's key, or None if all slots are taken
+        """
+        for slot in range(settings.YOUTUBE_PREVIEW_MAX_CONCURRENT):
+            key = self.DOWNLOAD_SLOT_KEY.format(slot)
+            if self.redis.set(key, holder, nx=True, ex=settings.YOUTUBE_PREVIEW_SLOT_TTL):
+                return key
+        return None
+
+    def release_download_slot(self, slot: str, holder: str):
+        """Release a slot from acquire_download_slot, unless it expired and was taken by another holder"""
+        if self.redis.get(slot) == holder:
+            self.redis.delete(slot)
     
     def get_preview(self, preview_id: str) -> dict | None:
         """Get preview metadata from Redis"""
@@ -76,22 +225,72 @@ class YouTubePreviewService:
             return json.loads(data)
         return None
     
-    def get_preview_file_path(self, preview_id: str) -> str | None:
-        """Get the file path for a preview"""
+    def get_preview_storage_path(self, preview_id: str) -> str | None:
+        """Get the stored path of a preview's WAV (relative locally, gs:// in GCS mode)"""
         preview_data = self.get_preview(preview_id)
         if preview_data:
             return preview_data.get('file_path')
         return None
     
+    def get_preview_file_path(self, preview_id: str) -> str | None:
+        """Get a local copy of a preview's WAV (from the blob cache in GCS mode)"""
+        return self._local_file(self.get_preview_storage_path(preview_id))
+
+    def get_preview_peaks_path(self, preview_id: str, level: int) -> str | None:
+        """Get the waveform peaks file for a preview at a zoom level"""
+        preview_data = self.get_preview(preview_id)
+        if preview_data and preview_data.get('storage_dir'):
+            return self._local_file(f"{preview_data['storage_dir']}/peaks/{peaks_filename('source', level)}")
+        return None
+
+    def _local_file(self, path: str | None) -> str | None:
+        if not path:
+            return None
+        try:
+            local_path = StorageService().get_local_path(path)
+        except FileNotFoundError:
+            return None
+        return local_path if os.path.exists(local_path) else None
+
+    def remove_expired_previews(self) -> tuple[int, int]:
+        """
+        Delete stored previews whose record has expired (blocking)
+
+        A preview that never becomes a job is only dropped from Redis after
+        its TTL, so its files would stay forever. Records are set before
+        anything is written and refreshed on every progress update, so
+        files without a record are orphaned.
+
+        Returns:
+            Previews removed, and the bytes freed
+        """
+        storage = StorageService()
+        if storage.mode == "local":
+            previews_root = os.path.join(settings.LOCAL_STORAGE_PATH, "previews")
+            preview_ids = set(os.listdir(previews_root)) if os.path.isdir(previews_root) else set()
+        else:
+            preview_ids = {
+                blob.name.split("/")[1]
+                for blob in storage.gcs_client.list_blobs(settings.GCS_BUCKET_UPLOADS, prefix="previews/")
+            }
+
+        removed, freed = 0, 0
+        for preview_id in preview_ids:
+            if self.redis.exists(f"youtube_preview:{preview_id}"):
+                continue
+            if storage.mode == "local":
+                freed += storage.delete_folder(f"previews/{preview_id}")
+            else:
+                freed += storage.delete_folder(f"gs://{settings.GCS_BUCKET_UPLOADS}/previews/{preview_id}")
+            removed += 1
+        return removed, freed
+
     def cleanup_preview(self, preview_id: str):
-        """Delete preview from Redis and filesystem"""
-        import shutil
-        
+        """Delete preview from Redis and storage"""
         preview_data = self.get_preview(preview_id)
         if preview_data:
-            temp_dir = preview_data.get('temp_dir')
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
+            storage_dir = preview_data.get('storage_dir')
+            if storage_dir:
+                StorageService().delete_folder(storage_dir)
             
             self.redis.delete(f"youtube_preview:{preview_id}")
-
@@ -10,6 +10,10 @@ from app.core.config import settings
 from app.services.storage import StorageService
 from app.services.audio import AudioService
 from app.services.cubase import CubaseProjectGenerator
+from app.services.ingest import load_ingest_manifest, discard_ingest
+from app.services.media_probe import probe_media, MediaProbeError
+from app.services.peaks import compute_peak_pyramid
+from app.services.job_changes import record_job_change
 import json
 
 
@@ -28,7 +32,7 @@ class DatabaseTask(Task):
 
 
 def update_job_status(job_id: str, status: str, progress: int, redis_client: Redis):
-    """Update job status and publish to Redis pub/sub"""
+    """Update job status, record it in the job change log and publish to Redis pub/sub"""
     from sqlalchemy import update
     from app.models.job import Job, JobStatus
     from app.core.database import AsyncSessionLocal
@@ -39,23 +43,56 @@ def update_job_status(job_id: str, status: str, progress: int, redis_client: Red
             stmt = update(Job).where(Job.id == UUID(job_id)).values(
                 status=JobStatus(status),
                 progress_percent=progress
-            )
-            await db.execute(stmt)
+            ).returning(Job.user_id)
+            result = await db.execute(stmt)
+            user_id = result.scalar_one_or_none()
             await db.commit()
+            return user_id
     
     # Execute async update
     loop = asyncio.get_event_loop()
-    loop.run_until_complete(_update())
+    user_id = loop.run_until_complete(_update())
+    
+    # Delta sync for job lists (GET /api/jobs/changes)
+    record_job_change(redis_client, job_id, user_id)
     
     # Publish to Redis for WebSocket
-    redis_client.publish(
-        f"job:{job_id}:progress",
-        json.dumps({
-            "job_id": job_id,
-            "status": status,
-            "progress_percent": progress
-        })
+    publish_job_progress(redis_client, job_id, {
+        "job_id": job_id,
+        "status": status,
+        "progress_percent": progress
+    }, user_id=user_id)
+
+
+def publish_job_progress(redis_client: Redis, job_id: str, update: dict, user_id=None):
+    """
+    Append a progress update to the job's event stream and publish it
+    
+    The capped stream `job:{job_id}:events` keeps the latest updates, so the
+    WebSocket service can send a snapshot to clients that connect late and
+    replay what a reconnecting client missed (by `event_id`). Pub/sub still
+    delivers updates live; both carry the same stream entry ID as `event_id`.
+    
+    Updates of a user's jobs also go to `user:{user_id}:job-events` and
+    `user:{user_id}:jobs`, which carry all of the user's jobs for
+    /ws/users/me/jobs; their `event_id`s come from the user's stream.
+    """
+    _stream_and_publish(redis_client, f"job:{job_id}:events", f"job:{job_id}:progress", update)
+    if user_id:
+        _stream_and_publish(redis_client, f"user:{user_id}:job-events", f"user:{user_id}:jobs", update)
+
+
+def _stream_and_publish(redis_client: Redis, stream_key: str, channel: str, update: dict):
+    event_id = redis_client.xadd(
+        stream_key,
+        {"data": json.dumps(update)},
+        maxlen=settings.JOB_EVENTS_MAX_LENGTH,
+        approximate=True,
     )
+    redis_client.expire(stream_key, settings.JOB_EVENTS_TTL)
+    
+    event_id = event_id.decode() if isinstance(event_id, bytes) else event_id
+    redis_client.publish(channel, json.dumps({**update, "event_id": event_id}))
 
 
 @celery_app.task(bind=True)
@@ -93,9 +130,14 @@ def process_audio_job(self, job_id: str):
         loop = asyncio.get_event_loop()
         job = loop.run_until_complete(get_job())
         
+        # Decoded PCM and onset envelope produced while the upload arrived
+        ingest = load_ingest_manifest(job_id)
+        
         # 1. Acquire audio
         # Use storage.get_local_path() to resolve relative paths to absolute
-        if job.source_file_path:
+        if ingest:
+            source_path = ingest["wav_path"]
+        elif job.source_file_path:
             abs_source_path = storage.get_local_path(job.source_file_path)
             if os.path.exists(abs_source_path):
                 source_path = abs_source_path
@@ -112,12 +154,34 @@ def process_audio_job(self, job_id: str):
         else:
             raise ValueError("No source file or YouTube URL provided")
         
-        # 2. Convert to WAV
+        # Fill in media info for jobs created without an upload-time probe
+        # (e.g. direct YouTube URLs)
+        if job.duration_seconds is None and not ingest:
+            try:
+                media = probe_media(source_path)
+            except MediaProbeError:
+                media = None
+            
+            if media:
+                async def update_media():
+                    async with AsyncSessionLocal() as db:
+                        from sqlalchemy import update
+                        stmt = update(Job).where(Job.id == UUID(job_id)).values(**media)
+                        await db.execute(stmt)
+                        await db.commit()
+                
+                loop.run_until_complete(update_media())
+        
+        # 2. Convert to WAV (already done by pipelined ingest)
         update_job_status(job_id, "CONVERTING", 10, redis_client)
-        wav_path = audio_service.convert_to_wav(source_path, temp_dir)
+        if ingest:
+            wav_path = source_path
+        else:
+            wav_path = audio_service.convert_to_wav(source_path, temp_dir)
         
         # 2.5. Trim audio if trim parameters are provided
-        if job.trim_start is not None and job.trim_end is not None:
+        trimmed = job.trim_start is not None and job.trim_end is not None
+        if trimmed:
             update_job_status(job_id, "CONVERTING", 15, redis_client)
             wav_path = audio_service.trim_audio(
                 wav_path,
@@ -128,7 +192,13 @@ def process_audio_job(self, job_id: str):
         
         # 3. Detect tempo
         update_job_status(job_id, "ANALYZING", 25, redis_client)
-        detected_bpm = audio_service.detect_tempo(wav_path)
+        if ingest and not trimmed:
+            detected_bpm = audio_service.detect_tempo_from_onset_envelope(
+                ingest["onset_envelope_path"],
+                ingest["analysis_sample_rate"]
+            )
+        else:
+            detected_bpm = audio_service.detect_tempo(wav_path)
         
         # Update job with BPM
         async def update_bpm():
@@ -169,34 +239,39 @@ def process_audio_job(self, job_id: str):
             final_bpm
         )
         
-        # 7. Save stems to permanent storage
+        # 7. Create final package
         update_job_status(job_id, "PACKAGING", 88, redis_client)
-        permanent_stems_dir = os.path.join(
-            settings.LOCAL_STORAGE_PATH,
-            "stems",
-            str(job_id)
-        )
-        os.makedirs(permanent_stems_dir, exist_ok=True)
-        
-        # Copy stems to permanent location
-        import shutil
-        for stem_file in Path(stems_dir).glob("*.wav"):
-            shutil.copy2(stem_file, os.path.join(permanent_stems_dir, stem_file.name))
-        
-        # Convert stems path to relative for database storage
-        relative_stems_path = storage.to_relative_path(permanent_stems_dir)
-        
-        # 8. Create final package and upload
-        update_job_status(job_id, "PACKAGING", 92, redis_client)
         package_path = os.path.join(temp_dir, f"{job.project_name}_RehearseKit.zip")
         audio_service.create_package(stems_dir, dawproject_path, package_path, final_bpm)
         
-        # Upload to storage - save_file now returns relative path
-        final_package_path = storage.save_file(
-            package_path,
-            f"{job_id}.zip",
-            settings.GCS_BUCKET_PACKAGES
+        # 7.5. Waveform peaks for the stems and the (trimmed) source, so the UI
+        # can draw waveforms without downloading audio
+        stem_files = sorted(Path(stems_dir).glob("*.wav"))
+        peaks_dir = os.path.join(temp_dir, "peaks")
+        peak_files = compute_peak_pyramid(wav_path, peaks_dir, "source")
+        for stem_file in stem_files:
+            peak_files += compute_peak_pyramid(str(stem_file), peaks_dir, stem_file.stem)
+        
+        # 8. Save stems, peaks and package to permanent storage (uploaded concurrently in GCS mode)
+        update_job_status(job_id, "PACKAGING", 92, redis_client)
+        outputs = (
+            [
+                (str(stem_file), f"stems/{job_id}/{stem_file.name}", settings.GCS_BUCKET_STEMS)
+                for stem_file in stem_files
+            ]
+            + [
+                (peak_file, f"stems/{job_id}/peaks/{os.path.basename(peak_file)}", settings.GCS_BUCKET_STEMS)
+                for peak_file in peak_files
+            ]
+            + [(package_path, f"{job_id}.zip", settings.GCS_BUCKET_PACKAGES)]
         )
+        storage_bytes = sum(os.path.getsize(local_path) for local_path, _, _ in outputs)
+        if job.source_file_path:
+            storage_bytes += storage.file_size(job.source_file_path)
+        saved_paths = storage.save_files(outputs)
+        final_package_path = saved_paths[-1]
+        # Relative folder locally, gs://bucket/stems/{job_id} in GCS mode
+        relative_stems_path = os.path.dirname(saved_paths[0]) if stem_files else None
         
         # Update job as completed with relative paths
         async def complete_job():
@@ -208,6 +283,7 @@ def process_audio_job(self, job_id: str):
                     progress_percent=100,
                     package_path=final_package_path,  # Now relative path
                     stems_folder_path=relative_stems_path,  # Now relative path
+                    storage_bytes=storage_bytes,
                     completed_at=datetime.utcnow()
                 )
                 await db.execute(stmt)
@@ -239,6 +315,7 @@ def process_audio_job(self, job_id: str):
         raise
     
     finally:
-        # Cleanup temp directory
+        # Cleanup temp directory and pipelined ingest artifacts
         shutil.rmtree(temp_dir, ignore_errors=True)
+        discard_ingest(job_id)
         redis_client.close()
@@ -0,0 +1,44 @@
+import asyncio
+from redis import Redis
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.retention import sweep_expired_jobs as sweep
+from app.services.storage import StorageService
+from app.services.uploads import ResumableUploadService
+from app.services.youtube_preview import YouTubePreviewService
+
+
+@celery_app.task
+def sweep_expired_jobs():
+    """
+    Delete jobs older than JOB_RETENTION_DAYS with their files, and
+    staged bytes of abandoned resumable uploads and files of expired
+    YouTube previews
+    
+    Scheduled by Celery beat every JOB_RETENTION_SWEEP_INTERVAL seconds.
+    Returns the number of jobs, uploads and previews deleted and the bytes reclaimed.
+    """
+    redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    
+    async def _sweep():
+        async with AsyncSessionLocal() as db:
+            return await sweep(db, StorageService(), redis_client)
+    
+    try:
+        report = asyncio.get_event_loop().run_until_complete(_sweep())
+        stale_uploads, freed = ResumableUploadService(redis_client).remove_stale_uploads()
+        expired_previews, preview_bytes = YouTubePreviewService(redis_client).remove_expired_previews()
+    finally:
+        redis_client.close()
+    report["stale_uploads"] = stale_uploads
+    report["expired_previews"] = expired_previews
+    report["reclaimed_bytes"] += freed + preview_bytes
+    
+    print(
+        f"Retention sweep: deleted {report['deleted_jobs']} jobs older than "
+        f"{settings.JOB_RETENTION_DAYS} days, {stale_uploads} abandoned uploads and "
+        f"{expired_previews} expired previews, "
+        f"reclaimed {report['reclaimed_bytes']} bytes"
+    )
+    return report
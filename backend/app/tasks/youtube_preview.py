@@ -0,0 +1,37 @@
+from celery.exceptions import MaxRetriesExceededError
+from redis import Redis
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.services.youtube_preview import YouTubePreviewService
+
+
+@celery_app.task(bind=True, max_retries=settings.YOUTUBE_PREVIEW_MAX_RETRIES)
+def create_youtube_preview(self, preview_id: str, youtube_url: str):
+    """
+    Download and convert a YouTube preview on the I/O queue
+    
+    At most YOUTUBE_PREVIEW_MAX_CONCURRENT previews download at once across
+    all workers; extra tasks are retried until a slot frees up, and the
+    preview fails after YOUTUBE_PREVIEW_MAX_RETRIES attempts.
+    """
+    redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    youtube_service = YouTubePreviewService(redis_client)
+    
+    try:
+        slot = youtube_service.acquire_download_slot(preview_id)
+        if slot is None:
+            try:
+                raise self.retry(countdown=settings.YOUTUBE_PREVIEW_RETRY_DELAY)
+            except MaxRetriesExceededError:
+                youtube_service.mark_failed(preview_id, "Timed out waiting for a download slot")
+                return
+        
+        try:
+            # Failures are recorded on the preview itself, no need to re-raise
+            youtube_service.download_and_preview(youtube_url, preview_id=preview_id)
+        except Exception:
+            pass
+        finally:
+            youtube_service.release_download_slot(slot, preview_id)
+    finally:
+        redis_client.close()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark GCS artifact uploads: serial vs StorageService.save_files
+
+Runs against a local fake GCS server, e.g.:
+    docker run -d -p 4443:4443 fsouza/fake-gcs-server -scheme http
+    STORAGE_EMULATOR_HOST=http://localhost:4443 python scripts/benchmark_gcs_uploads.py
+
+Usage: python scripts/benchmark_gcs_uploads.py [--stem-mb 50] [--package-mb 200] [--runs 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import storage
+from app.core.config import settings
+from app.services.storage import StorageService
+
+BUCKET = "benchmark-artifacts"
+STEMS = ["vocals", "drums", "bass", "other"]
+
+
+def make_artifacts(directory: str, stem_mb: int, package_mb: int) -> list[tuple[str, str, str]]:
+    """Write four stems and a package of random bytes"""
+    files = []
+    for name, size_mb in [(f"{stem}.wav", stem_mb) for stem in STEMS] + [("package.zip", package_mb)]:
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+        files.append((path, f"bench/{name}", BUCKET))
+    return files
+
+
+def upload_serial(client: storage.Client, files: list[tuple[str, str, str]]):
+    """The previous behaviour: one single-shot upload at a time"""
+    for source, destination, bucket_name in files:
+        client.bucket(bucket_name).blob(destination).upload_from_filename(source)
+
+
+def time_runs(label: str, runs: int, total_mb: int, upload):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        upload()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{label:<28} best {best:6.2f}s  {total_mb / best:8.1f} MB/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--stem-mb", type=int, default=50)
+    parser.add_argument("--package-mb", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if not os.environ.get("STORAGE_EMULATOR_HOST"):
+        sys.exit("Set STORAGE_EMULATOR_HOST to a fake GCS server (see module docstring)")
+
+    settings.STORAGE_MODE = "gcs"
+
+    client = storage.Client(project="benchmark", credentials=AnonymousCredentials())
+    if not client.lookup_bucket(BUCKET):
+        client.create_bucket(BUCKET)
+    service = StorageService(gcs_client=client)
+
+    total_mb = args.stem_mb * len(STEMS) + args.package_mb
+    print(f"Uploading {len(STEMS)} x {args.stem_mb} MB stems + {args.package_mb} MB package "
+          f"({total_mb} MB) to {os.environ['STORAGE_EMULATOR_HOST']}")
+    print(f"concurrency={settings.GCS_UPLOAD_CONCURRENCY} "
+          f"composite_threshold={settings.GCS_COMPOSITE_UPLOAD_THRESHOLD // (1024 * 1024)} MB\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = make_artifacts(directory, args.stem_mb, args.package_mb)
+        serial = time_runs("serial upload_from_filename", args.runs, total_mb,
+                           lambda: upload_serial(client, files))
+        parallel = time_runs("StorageService.save_files", args.runs, total_mb,
+                             lambda: service.save_files(files))
+
+    print(f"\nspeedup: {serial / parallel:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,27 @@
 """
 Pytest configuration and fixtures for RehearseKit backend tests
 """
+import io
+import time
+import base64
+import hashlib
+import threading
 import pytest
 import asyncio
+import json
+import google_crc32c
+import numpy as np
+import soundfile as sf
 from typing import AsyncGenerator, Generator
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 from httpx import AsyncClient
 from fastapi import FastAPI
-from unittest.mock import Mock, AsyncMock
+from unittest.mock import Mock, AsyncMock, patch
+from google.api_core.exceptions import NotFound
 
 from app.main import app
-from app.core.database import get_db, Base
+from app.core.database import get_db, get_redis, Base
 from app.core.config import settings
 from app.models.user import User
 from app.core.security import create_access_token, create_refresh_token
@@ -154,3 +164,251 @@ def mock_google_oauth():
     mock_oauth = Mock()
     mock_oauth.verify_id_token = AsyncMock()
     return mock_oauth
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the synchronous Redis commands the API uses"""
+    
+    def __init__(self):
+        self.data = {}
+        self.published = []
+    
+    def get(self, key):
+        return self.data.get(key)
+    
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+    
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+        return True
+    
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+    
+    def exists(self, key):
+        return int(key in self.data)
+    
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+    
+    def decr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) - 1
+        return self.data[key]
+    
+    def expire(self, key, ttl):
+        return key in self.data
+    
+    def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+        return 0
+    
+    def time(self):
+        now = time.time()
+        return int(now), int(now % 1 * 1_000_000)
+    
+    def xadd(self, key, fields, maxlen=None, minid=None, approximate=True):
+        entries = self.data.setdefault(key, [])
+        seconds, microseconds = self.time()
+        ms = seconds * 1000 + microseconds // 1000
+        last_ms, last_seq = map(int, entries[-1][0].split("-")) if entries else (0, -1)
+        entry_id = f"{last_ms}-{last_seq + 1}" if ms <= last_ms else f"{ms}-0"
+        entries.append((entry_id, {name: str(value) for name, value in fields.items()}))
+        if minid is not None:
+            entries[:] = [entry for entry in entries if _stream_id(entry[0]) >= (minid, 0)]
+        if maxlen is not None:
+            del entries[:-maxlen]
+        return entry_id
+    
+    def xrange(self, key, min="-", max="+", count=None):
+        exclusive = min.startswith("(")
+        start = _stream_id(min.lstrip("(")) if min != "-" else (-1, -1)
+        entries = [
+            entry for entry in self.data.get(key, [])
+            if _stream_id(entry[0]) > start or (not exclusive and _stream_id(entry[0]) == start)
+        ]
+        return entries[:count] if count else entries
+    
+    def xrevrange(self, key, max="+", min="-", count=None):
+        entries = list(reversed(self.data.get(key, [])))
+        return entries[:count] if count else entries
+    
+    def close(self):
+        pass
+
+
+def _stream_id(entry_id: str) -> tuple[int, int]:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+@pytest.fixture
+def fake_redis():
+    """In-memory Redis wired into the get_redis dependency."""
+    redis_client = FakeRedis()
+    app.dependency_overrides[get_redis] = lambda: redis_client
+    yield redis_client
+    app.dependency_overrides.pop(get_redis, None)
+
+
+@pytest.fixture
+def storage_path(tmp_path):
+    """Point local storage at a temporary directory."""
+    with patch.object(settings, "LOCAL_STORAGE_PATH", str(tmp_path)):
+        yield tmp_path
+
+
+def make_flac(seconds: float = 3.0, sample_rate: int = 44100) -> bytes:
+    """Encode a stereo FLAC with clicks at 120 BPM."""
+    audio = np.zeros((int(sample_rate * seconds), 2), dtype=np.float32)
+    audio[::sample_rate // 2] = 0.8
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sample_rate, format="FLAC")
+    return buffer.getvalue()
+
+
+class FakeGCSBlob:
+    """In-process stand-in for google.cloud.storage.Blob"""
+    
+    def __init__(self, bucket: "FakeGCSBucket", name: str, chunk_size=None):
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = chunk_size
+        self.generation = None
+        self.size = None
+        self.md5_hash = None
+        self.crc32c = None
+    
+    def reload(self):
+        self.bucket.client.reloads.append(self.name)
+        obj = self.bucket.objects.get(self.name)
+        if obj is None:
+            raise NotFound(f"gs://{self.bucket.name}/{self.name}")
+        self.generation = obj["generation"]
+        self.size = len(obj["data"])
+        self.md5_hash = base64.b64encode(hashlib.md5(obj["data"]).digest()).decode()
+        self.crc32c = base64.b64encode(google_crc32c.Checksum(obj["data"]).digest()).decode()
+    
+    def download_to_filename(self, filename: str):
+        client = self.bucket.client
+        with client.lock:
+            client.downloads.append(self.name)
+        time.sleep(client.download_delay)
+        data = b"corrupt" if client.corrupt_downloads else self.bucket.objects[self.name]["data"]
+        with open(filename, "wb") as f:
+            f.write(data)
+    
+    def upload_from_filename(self, filename: str, retry=None):
+        with open(filename, "rb") as f:
+            self.upload_from_file(f, retry=retry)
+    
+    def upload_from_file(self, file_obj, size=None, retry=None):
+        client = self.bucket.client
+        with client.lock:
+            client.uploads.append(self)
+            client.active_uploads += 1
+            client.max_active_uploads = max(client.max_active_uploads, client.active_uploads)
+        try:
+            time.sleep(client.upload_delay)
+            self.bucket.put(self.name, file_obj.read(size if size is not None else -1))
+        finally:
+            with client.lock:
+                client.active_uploads -= 1
+    
+    def compose(self, sources, if_generation_match=None, retry=None):
+        self.bucket.put(self.name, b"".join(self.bucket.objects[s.name]["data"] for s in sources))
+        self.generation = self.bucket.objects[self.name]["generation"]
+    
+    def open(self, mode: str = "rb"):
+        if mode == "rb":
+            return io.BytesIO(self.bucket.objects[self.name]["data"])
+        return FakeGCSWriter(self)
+    
+    def delete(self):
+        with self.bucket.client.lock:
+            if self.bucket.objects.pop(self.name, None) is None:
+                raise NotFound(f"gs://{self.bucket.name}/{self.name}")
+
+
+class FakeGCSWriter(io.BytesIO):
+    """Blob writer that only creates the object when closed, like a GCS resumable upload"""
+    
+    def __init__(self, blob: FakeGCSBlob):
+        super().__init__()
+        self.blob = blob
+    
+    def close(self):
+        if not self.closed:
+            self.blob.bucket.put(self.blob.name, self.getvalue())
+        super().close()
+
+
+class FakeGCSBucket:
+    """In-process stand-in for google.cloud.storage.Bucket"""
+    
+    def __init__(self, client: "FakeGCSClient", name: str):
+        self.client = client
+        self.name = name
+        self.objects = {}
+    
+    def blob(self, name: str, chunk_size=None) -> FakeGCSBlob:
+        return FakeGCSBlob(self, name, chunk_size)
+    
+    def get_blob(self, name: str):
+        blob = self.blob(name)
+        try:
+            blob.reload()
+        except NotFound:
+            return None
+        return blob
+    
+    def copy_blob(self, blob: FakeGCSBlob, destination_bucket: "FakeGCSBucket", new_name: str):
+        destination_bucket.put(new_name, self.objects[blob.name]["data"])
+        return destination_bucket.blob(new_name)
+    
+    def put(self, name: str, data: bytes):
+        """Store an object, bumping its generation like GCS does on overwrite"""
+        with self.client.lock:
+            generation = self.objects.get(name, {}).get("generation", 0) + 1
+            self.objects[name] = {"data": data, "generation": generation}
+
+
+class FakeGCSClient:
+    """In-process stand-in for google.cloud.storage.Client"""
+    
+    def __init__(self):
+        self.buckets = {}
+        self.downloads = []
+        self.reloads = []
+        self.uploads = []
+        self.download_delay = 0.0
+        self.upload_delay = 0.0
+        self.active_uploads = 0
+        self.max_active_uploads = 0
+        self.corrupt_downloads = False
+        self.lock = threading.Lock()
+    
+    def bucket(self, name: str) -> FakeGCSBucket:
+        with self.lock:
+            return self.buckets.setdefault(name, FakeGCSBucket(self, name))
+    
+    def list_blobs(self, bucket_name: str, prefix: str = ""):
+        bucket = self.bucket(bucket_name)
+        return [bucket.get_blob(name) for name in sorted(bucket.objects) if name.startswith(prefix)]
+
+
+@pytest.fixture
+def fake_gcs(tmp_path):
+    """GCS-mode StorageService backed by an in-process fake and a fresh blob cache."""
+    from app.services import blob_cache
+    
+    client = FakeGCSClient()
+    with patch.object(settings, "STORAGE_MODE", "gcs"), \
+            patch.object(settings, "GCS_CACHE_DIR", str(tmp_path / "blob-cache")), \
+            patch.object(blob_cache, "_blob_cache", None), \
+            patch("app.services.storage.storage.Client", return_value=client):
+        yield client
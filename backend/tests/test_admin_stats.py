@@ -0,0 +1,81 @@
+"""
+Tests for admin dashboard statistics (GET /api/admin/stats)
+"""
+import pytest
+from datetime import datetime, timedelta
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.job import Job, JobStatus, InputType
+from app.services.admin_stats import CACHE_KEY
+
+
+@pytest.fixture
+async def jobs(db_session: AsyncSession) -> list[Job]:
+    """Two completed jobs (RTF 0.5 and 1.5), a failed and a running one"""
+    now = datetime.utcnow()
+    jobs = [
+        Job(project_name="fast", input_type=InputType.upload, status=JobStatus.COMPLETED,
+            duration_seconds=120, storage_bytes=1000, created_at=now - timedelta(seconds=60), completed_at=now),
+        Job(project_name="slow", input_type=InputType.upload, status=JobStatus.COMPLETED,
+            duration_seconds=60, storage_bytes=500, created_at=now - timedelta(seconds=90), completed_at=now),
+        Job(project_name="failed", input_type=InputType.youtube, status=JobStatus.FAILED,
+            created_at=now - timedelta(days=2), completed_at=now),
+        Job(project_name="running", input_type=InputType.upload, status=JobStatus.SEPARATING),
+    ]
+    db_session.add_all(jobs)
+    await db_session.commit()
+    return jobs
+
+
+class TestAdminStats:
+    """Test the admin statistics endpoint"""
+
+    @pytest.mark.asyncio
+    async def test_user_and_job_statistics(
+        self, client: AsyncClient, fake_redis, jobs, test_user, test_google_user, admin_access_token
+    ):
+        """Test counts, jobs per day, real-time factor and storage"""
+        response = await client.get("/api/admin/stats", headers={"Authorization": f"Bearer {admin_access_token}"})
+
+        assert response.status_code == status.HTTP_200_OK
+        stats = response.json()
+        assert (stats["total_users"], stats["active_users"], stats["admin_users"], stats["google_oauth_users"]) == \
+            (3, 3, 1, 1)
+        job_stats = stats["jobs"]
+        assert job_stats["total_jobs"] == 4
+        assert job_stats["by_status"] == {"COMPLETED": 2, "FAILED": 1, "SEPARATING": 1}
+        assert job_stats["avg_real_time_factor"] == pytest.approx(1.0)
+        assert job_stats["storage_bytes"] == 1500
+        assert len(job_stats["per_day"]) == 30
+        assert job_stats["per_day"][-1]["count"] == 3
+        assert job_stats["per_day"][-3]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_results_are_cached_until_users_change(
+        self, client: AsyncClient, fake_redis, db_session: AsyncSession, test_user, admin_access_token
+    ):
+        """Test that stats are served from Redis and dropped when a user is approved"""
+        headers = {"Authorization": f"Bearer {admin_access_token}"}
+        test_user.is_active = False
+        await db_session.commit()
+
+        first = (await client.get("/api/admin/stats", headers=headers)).json()
+        db_session.add(Job(project_name="new", input_type=InputType.upload))
+        await db_session.commit()
+        cached = (await client.get("/api/admin/stats", headers=headers)).json()
+
+        await client.patch(f"/api/admin/users/{test_user.id}/approve", headers=headers)
+        assert not fake_redis.exists(CACHE_KEY)
+        fresh = (await client.get("/api/admin/stats", headers=headers)).json()
+
+        assert first["pending_users"] == 1 and cached == first
+        assert fresh["pending_users"] == 0 and fresh["jobs"]["total_jobs"] == 1
+
+    @pytest.mark.asyncio
+    async def test_admin_only(self, client: AsyncClient, fake_redis, access_token):
+        """Test that regular users are refused"""
+        response = await client.get("/api/admin/stats", headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,215 @@
+"""
+Tests for byte-range streaming of source and stem audio
+"""
+import os
+import time
+import asyncio
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job, JobStatus, InputType
+from tests.conftest import FakeGCSClient
+
+
+@pytest.fixture
+async def completed_job(db_session: AsyncSession, storage_path) -> Job:
+    """A completed job with a source file and a vocals stem on disk."""
+    job = Job(
+        project_name="Streaming",
+        input_type=InputType.upload,
+        status=JobStatus.COMPLETED,
+    )
+    db_session.add(job)
+    await db_session.commit()
+    
+    stems_dir = storage_path / "stems" / str(job.id)
+    stems_dir.mkdir(parents=True)
+    (stems_dir / "vocals.wav").write_bytes(os.urandom(10_000))
+    (storage_path / "uploads").mkdir()
+    (storage_path / "uploads" / f"{job.id}_source.flac").write_bytes(os.urandom(4_000))
+    
+    job.stems_folder_path = f"stems/{job.id}"
+    job.source_file_path = f"uploads/{job.id}_source.flac"
+    await db_session.commit()
+    return job
+
+
+def read_stem(storage_path, job: Job) -> bytes:
+    return (storage_path / "stems" / str(job.id) / "vocals.wav").read_bytes()
+
+
+class TestRangeRequests:
+    """Test 206 Partial Content handling on audio endpoints"""
+    
+    @pytest.mark.asyncio
+    async def test_full_response_advertises_ranges(self, client: AsyncClient, completed_job: Job):
+        """Test that a plain GET returns validators and range support"""
+        response = await client.get(f"/api/jobs/{completed_job.id}/stems/vocals")
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["etag"]
+        assert response.headers["cache-control"].startswith("public")
+        assert len(response.content) == 10_000
+    
+    @pytest.mark.asyncio
+    async def test_single_range(self, client: AsyncClient, completed_job: Job, storage_path):
+        """Test that a byte range returns 206 with the requested slice"""
+        response = await client.get(
+            f"/api/jobs/{completed_job.id}/stems/vocals", headers={"Range": "bytes=100-199"}
+        )
+        
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert response.headers["content-range"] == "bytes 100-199/10000"
+        assert response.content == read_stem(storage_path, completed_job)[100:200]
+    
+    @pytest.mark.asyncio
+    async def test_suffix_range(self, client: AsyncClient, completed_job: Job, storage_path):
+        """Test that bytes=-N returns the last N bytes"""
+        response = await client.get(
+            f"/api/jobs/{completed_job.id}/stems/vocals", headers={"Range": "bytes=-500"}
+        )
+        
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert response.headers["content-range"] == "bytes 9500-9999/10000"
+        assert response.content == read_stem(storage_path, completed_job)[-500:]
+    
+    @pytest.mark.asyncio
+    async def test_multiple_ranges(self, client: AsyncClient, completed_job: Job, storage_path):
+        """Test that several ranges come back as multipart/byteranges"""
+        response = await client.get(
+            f"/api/jobs/{completed_job.id}/stems/vocals", headers={"Range": "bytes=0-9, -10"}
+        )
+        
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        content_type = response.headers["content-type"]
+        assert content_type.startswith("multipart/byteranges; boundary=")
+        boundary = content_type.split("boundary=")[1].encode()
+        
+        parts = response.content.split(b"--" + boundary)
+        assert parts[-1] == b"--"
+        bodies = [part.split(b"\r\n\r\n", 1) for part in parts[1:-1]]
+        stem = read_stem(storage_path, completed_job)
+        assert b"Content-Range: bytes 0-9/10000" in bodies[0][0]
+        assert bodies[0][1] == stem[:10] + b"\r\n"
+        assert b"Content-Range: bytes 9990-9999/10000" in bodies[1][0]
+        assert bodies[1][1] == stem[-10:] + b"\r\n"
+        assert int(response.headers["content-length"]) == len(response.content)
+    
+    @pytest.mark.asyncio
+    async def test_unsatisfiable_range(self, client: AsyncClient, completed_job: Job):
+        """Test that a range past the end returns 416 with the file size"""
+        response = await client.get(
+            f"/api/jobs/{completed_job.id}/stems/vocals", headers={"Range": "bytes=20000-"}
+        )
+        
+        assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        assert response.headers["content-range"] == "bytes */10000"
+    
+    @pytest.mark.asyncio
+    async def test_if_range(self, client: AsyncClient, completed_job: Job):
+        """Test that a stale If-Range validator falls back to the full file"""
+        url = f"/api/jobs/{completed_job.id}/stems/vocals"
+        etag = (await client.head(url)).headers["etag"]
+        
+        response = await client.get(url, headers={"Range": "bytes=0-99", "If-Range": etag})
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        
+        response = await client.get(url, headers={"Range": "bytes=0-99", "If-Range": '"stale"'})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.content) == 10_000
+    
+    @pytest.mark.asyncio
+    async def test_if_none_match(self, client: AsyncClient, completed_job: Job):
+        """Test that a matching ETag revalidates with 304"""
+        url = f"/api/jobs/{completed_job.id}/stems/vocals"
+        etag = (await client.get(url)).headers["etag"]
+        
+        response = await client.get(url, headers={"If-None-Match": f'"other", {etag}'})
+        
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+    
+    @pytest.mark.asyncio
+    async def test_source_range_and_head(self, client: AsyncClient, completed_job: Job):
+        """Test that the source endpoint supports HEAD and ranges with its real type"""
+        url = f"/api/jobs/{completed_job.id}/source"
+        
+        head = await client.head(url)
+        assert head.status_code == status.HTTP_200_OK
+        assert head.headers["content-length"] == "4000"
+        assert head.headers["content-type"] == "audio/flac"
+        assert head.content == b""
+        
+        response = await client.get(url, headers={"Range": "bytes=0-0"})
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert len(response.content) == 1
+
+
+class TestGCSReads:
+    """Test serving audio that has to be fetched from GCS first"""
+    
+    @pytest.mark.asyncio
+    async def test_slow_fetch_does_not_block_the_event_loop(
+        self, 
+        client: AsyncClient, 
+        db_session: AsyncSession, 
+        fake_gcs: FakeGCSClient
+    ):
+        """Test that other work keeps running while a stem is downloaded into the blob cache"""
+        job = Job(project_name="GCS", input_type=InputType.upload, status=JobStatus.COMPLETED)
+        db_session.add(job)
+        await db_session.commit()
+        fake_gcs.bucket(settings.GCS_BUCKET_STEMS).put(f"stems/{job.id}/vocals.wav", os.urandom(10_000))
+        job.stems_folder_path = f"gs://{settings.GCS_BUCKET_STEMS}/stems/{job.id}"
+        await db_session.commit()
+        fake_gcs.download_delay = 0.3
+        
+        ticks = []
+        
+        async def tick():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+        
+        ticker = asyncio.ensure_future(tick())
+        try:
+            response = await client.get(f"/api/jobs/{job.id}/stems/vocals")
+        finally:
+            ticker.cancel()
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.content) == 10_000
+        # A fetch on the event loop would stall the ticker for the whole download
+        assert max(later - earlier for earlier, later in zip(ticks, ticks[1:])) < 0.15
+    
+    @pytest.mark.asyncio
+    async def test_reprocess_checks_the_source_without_fetching_it(
+        self, 
+        client: AsyncClient, 
+        db_session: AsyncSession, 
+        fake_gcs: FakeGCSClient
+    ):
+        """Test that reprocessing only looks the source up instead of downloading it"""
+        job = Job(project_name="GCS", input_type=InputType.upload, status=JobStatus.COMPLETED)
+        db_session.add(job)
+        await db_session.commit()
+        fake_gcs.bucket(settings.GCS_BUCKET_UPLOADS).put(f"{job.id}_source.flac", os.urandom(4_000))
+        job.source_file_path = f"gs://{settings.GCS_BUCKET_UPLOADS}/{job.id}_source.flac"
+        await db_session.commit()
+        
+        with patch('app.tasks.audio_processing.process_audio_job') as mock_task:
+            response = await client.post(f"/api/jobs/{job.id}/reprocess")
+        
+        assert response.status_code == status.HTTP_200_OK
+        mock_task.delay.assert_called_once()
+        assert fake_gcs.downloads == []
+        
+        fake_gcs.bucket(settings.GCS_BUCKET_UPLOADS).objects.clear()
+        response = await client.post(f"/api/jobs/{job.id}/reprocess")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -1,6 +1,8 @@
 """
 Comprehensive tests for authentication system
 """
+import asyncio
+import time
 import pytest
 from httpx import AsyncClient
 from unittest.mock import patch, Mock
@@ -9,7 +11,10 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import User
-from app.core.security import decode_token, verify_token_type
+from app.core.config import settings
+from app.core.security import (
+    decode_token, verify_token_type, get_password_hash, verify_password_async
+)
 from app.core.exceptions import AuthenticationError, TokenError, GoogleAuthError
 
 
@@ -325,6 +330,95 @@ class TestEmailPasswordAuthentication:
     ):
         """Test login with invalid credentials"""
         pytest.skip("Email/password authentication not fully implemented")
+    
+    @pytest.mark.asyncio
+    async def test_login_rehashes_outdated_cost_factor(
+        self, 
+        client: AsyncClient, 
+        db_session: AsyncSession
+    ):
+        """Test that login upgrades hashes created with a different bcrypt cost"""
+        from app.api.auth import limiter
+        
+        with patch.object(settings, "BCRYPT_ROUNDS", 4):
+            old_hash = get_password_hash("correct_password")
+        
+        user = User(
+            email="rehash@example.com",
+            hashed_password=old_hash,
+            oauth_provider="email",
+            is_active=True
+        )
+        db_session.add(user)
+        await db_session.commit()
+        
+        with patch.object(settings, "BCRYPT_ROUNDS", 5), patch.object(limiter, "enabled", False):
+            response = await client.post(
+                "/api/auth/login",
+                json={"email": "rehash@example.com", "password": "correct_password"}
+            )
+        
+        assert response.status_code == status.HTTP_200_OK
+        await db_session.refresh(user)
+        assert user.hashed_password != old_hash
+        assert user.hashed_password.split("$")[2] == "05"
+    
+    @pytest.mark.asyncio
+    async def test_inactive_login_skips_rehash(
+        self, 
+        client: AsyncClient, 
+        db_session: AsyncSession
+    ):
+        """Test that inactive users are refused before their hash is upgraded"""
+        from app.api.auth import limiter
+        
+        with patch.object(settings, "BCRYPT_ROUNDS", 4):
+            old_hash = get_password_hash("correct_password")
+        
+        user = User(
+            email="inactive-rehash@example.com",
+            hashed_password=old_hash,
+            oauth_provider="email",
+            is_active=False
+        )
+        db_session.add(user)
+        await db_session.commit()
+        
+        with patch.object(settings, "BCRYPT_ROUNDS", 5), patch.object(limiter, "enabled", False), \
+                patch.object(User, "set_password_async") as set_password:
+            response = await client.post(
+                "/api/auth/login",
+                json={"email": "inactive-rehash@example.com", "password": "correct_password"}
+            )
+        
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        set_password.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_logins_do_not_block_other_endpoints(
+        self, 
+        client: AsyncClient
+    ):
+        """Test that other endpoints stay responsive while many passwords are verified"""
+        hashed = get_password_hash("correct_password")
+        
+        finished = []
+        
+        async def check():
+            verified = await verify_password_async("correct_password", hashed)
+            finished.append(time.perf_counter())
+            return verified
+        
+        hashes = asyncio.gather(*[check() for _ in range(8)])
+        await asyncio.sleep(0)  # Let every check start
+        
+        response = await client.get("/")
+        served = time.perf_counter()
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert all(await hashes)
+        # Checks run on the event loop would all have finished before the request was served
+        assert served < min(finished)
 
 
 class TestTokenRefresh:
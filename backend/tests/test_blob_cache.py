@@ -0,0 +1,138 @@
+"""
+Tests for the local GCS blob cache behind StorageService.get_local_path
+"""
+import os
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.services.blob_cache import BlobCache, BlobChecksumError, get_blob_cache
+from app.services.storage import StorageService
+from tests.conftest import FakeGCSClient
+
+
+class TestBlobCache:
+    """Test reuse, invalidation, eviction and de-duplication of GCS downloads"""
+    
+    def test_repeated_reads_download_once(self, fake_gcs: FakeGCSClient):
+        """Test that a second read is served from the cache"""
+        fake_gcs.bucket("stems").put("job1/vocals.wav", b"v" * 1000)
+        storage = StorageService()
+        
+        first = storage.get_local_path("gs://stems/job1/vocals.wav")
+        second = storage.get_local_path("gs://stems/job1/vocals.wav")
+        
+        assert first == second
+        assert first.endswith(".wav")
+        with open(first, "rb") as f:
+            assert f.read() == b"v" * 1000
+        assert fake_gcs.downloads == ["job1/vocals.wav"]
+        stats = get_blob_cache().stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    
+    def test_recent_hit_skips_metadata_request(self, fake_gcs: FakeGCSClient):
+        """Test that a copy validated within GCS_CACHE_REVALIDATE_SECONDS is served without asking GCS"""
+        fake_gcs.bucket("stems").put("job1/bass.wav", b"b" * 1000)
+        storage = StorageService()
+        
+        for _ in range(3):
+            storage.get_local_path("gs://stems/job1/bass.wav")
+        
+        assert fake_gcs.reloads == ["job1/bass.wav"]
+        assert fake_gcs.downloads == ["job1/bass.wav"]
+    
+    def test_overwritten_blob_is_refetched(self, fake_gcs: FakeGCSClient):
+        """Test that a new generation invalidates the cached copy once it is revalidated"""
+        bucket = fake_gcs.bucket("uploads")
+        bucket.put("song.flac", b"old")
+        storage = StorageService()
+        
+        with patch.object(settings, "GCS_CACHE_REVALIDATE_SECONDS", 0):
+            storage.get_local_path("gs://uploads/song.flac")
+            storage.get_local_path("gs://uploads/song.flac")
+            assert len(fake_gcs.downloads) == 1  # Same generation, still a hit
+            
+            bucket.put("song.flac", b"new contents")
+            path = storage.get_local_path("gs://uploads/song.flac")
+        
+        with open(path, "rb") as f:
+            assert f.read() == b"new contents"
+        assert len(fake_gcs.downloads) == 2
+    
+    def test_lock_files_are_removed_with_entries(self, fake_gcs: FakeGCSClient, tmp_path):
+        """Test that evicted and discarded entries leave no lock file behind"""
+        bucket = fake_gcs.bucket("stems")
+        for name in ("a.wav", "b.wav", "c.wav"):
+            bucket.put(name, b"x" * 400)
+        cache = BlobCache(str(tmp_path / "locks"), max_bytes=1000, eviction_grace=0)
+        
+        for name in ("a.wav", "b.wav", "c.wav"):
+            cache.fetch(bucket.blob(name))
+        cache.discard("stems", "c.wav")
+        
+        lock_files = [name for name in os.listdir(cache.root) if name.endswith(".lock")]
+        assert len(lock_files) == cache.stats()["entries"] == 1
+    
+    def test_deletes_report_stored_bytes(self, fake_gcs: FakeGCSClient):
+        """Test that deleting counts the blobs' size, not their cached copies, and drops the copies"""
+        bucket = fake_gcs.bucket("stems")
+        bucket.put("job1/vocals.wav", b"v" * 1000)
+        bucket.put("job1/drums.wav", b"d" * 500)
+        storage = StorageService()
+        storage.get_local_path("gs://stems/job1/vocals.wav")
+        storage.get_local_path("gs://stems/job1/drums.wav")
+        
+        assert storage.file_size("gs://stems/job1/vocals.wav") == 1000
+        assert storage.delete_file("gs://stems/job1/vocals.wav") == 1000
+        assert storage.delete_folder("gs://stems/job1") == 500
+        assert storage.file_size("gs://stems/job1/vocals.wav") == 0
+        assert get_blob_cache().stats()["entries"] == 0
+    
+    def test_corrupt_download_is_not_cached(self, fake_gcs: FakeGCSClient):
+        """Test that a checksum mismatch raises and leaves nothing behind"""
+        fake_gcs.bucket("uploads").put("song.flac", b"audio")
+        fake_gcs.corrupt_downloads = True
+        
+        with pytest.raises(BlobChecksumError):
+            StorageService().get_local_path("gs://uploads/song.flac")
+        
+        cache_files = os.listdir(settings.GCS_CACHE_DIR)
+        assert [name for name in cache_files if not name.endswith(".lock")] == []
+    
+    def test_least_recently_used_is_evicted(self, fake_gcs: FakeGCSClient, tmp_path):
+        """Test that the cache stays within its size bound, evicting the LRU entry"""
+        bucket = fake_gcs.bucket("stems")
+        for name in ("a.wav", "b.wav", "c.wav"):
+            bucket.put(name, b"x" * 400)
+        cache = BlobCache(str(tmp_path / "lru"), max_bytes=1000, eviction_grace=0)
+        
+        path_a = cache.fetch(bucket.blob("a.wav"))
+        path_b = cache.fetch(bucket.blob("b.wav"))
+        for path, last_used in ((path_a, 0), (path_b, 1)):
+            os.utime(os.path.splitext(path)[0] + ".json", (last_used, last_used))
+        cache.fetch(bucket.blob("a.wav"))  # Hit makes a.wav most recently used
+        path_c = cache.fetch(bucket.blob("c.wav"))
+        
+        assert os.path.exists(path_a)
+        assert not os.path.exists(path_b)
+        assert os.path.exists(path_c)
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["size_bytes"] == 800
+    
+    def test_parallel_reads_share_one_download(self, fake_gcs: FakeGCSClient):
+        """Test that concurrent requests for the same blob trigger a single fetch"""
+        fake_gcs.bucket("stems").put("drums.wav", b"d" * 5000)
+        fake_gcs.download_delay = 0.2
+        
+        def read():
+            return StorageService().get_local_path("gs://stems/drums.wav")
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            paths = list(pool.map(lambda _: read(), range(8)))
+        
+        assert len(set(paths)) == 1
+        assert fake_gcs.downloads == ["drums.wav"]
+        stats = get_blob_cache().stats()
+        assert (stats["hits"], stats["misses"]) == (7, 1)
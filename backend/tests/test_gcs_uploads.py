@@ -0,0 +1,146 @@
+"""
+Tests for concurrent, resumable and composite GCS uploads
+"""
+import os
+import pytest
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.services.storage import StorageService
+from app.services.uploads import ResumableUploadService
+from tests.conftest import FakeGCSClient, make_flac
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    """Four stems and a package on local disk."""
+    files = []
+    for name in ("bass.wav", "drums.wav", "other.wav", "vocals.wav", "package.zip"):
+        path = tmp_path / name
+        path.write_bytes(os.urandom(2048))
+        files.append(str(path))
+    return files
+
+
+class TestSaveFiles:
+    """Test StorageService.save_files"""
+    
+    def test_artifacts_upload_concurrently(self, fake_gcs: FakeGCSClient, artifacts):
+        """Test that stems and package are in flight at the same time"""
+        fake_gcs.upload_delay = 0.1
+        files = [(path, f"stems/job1/{os.path.basename(path)}", "stems") for path in artifacts[:4]]
+        files.append((artifacts[4], "job1.zip", "packages"))
+        
+        paths = StorageService().save_files(files)
+        
+        assert paths == [
+            "gs://stems/stems/job1/bass.wav",
+            "gs://stems/stems/job1/drums.wav",
+            "gs://stems/stems/job1/other.wav",
+            "gs://stems/stems/job1/vocals.wav",
+            "gs://packages/job1.zip",
+        ]
+        assert fake_gcs.max_active_uploads == 5
+        with open(artifacts[4], "rb") as f:
+            assert fake_gcs.bucket("packages").objects["job1.zip"]["data"] == f.read()
+    
+    def test_uploads_are_chunked_resumable(self, fake_gcs: FakeGCSClient, artifacts):
+        """Test that regular uploads set a chunk size, making them resumable"""
+        StorageService().save_file(artifacts[0], "job1/bass.wav", "stems")
+        
+        [blob] = fake_gcs.uploads
+        assert blob.chunk_size == settings.UPLOAD_CHUNK_SIZE
+    
+    def test_large_file_uses_composite_upload(self, fake_gcs: FakeGCSClient, tmp_path):
+        """Test that large files are uploaded as parallel parts and composed"""
+        payload = os.urandom(10_000)
+        source = tmp_path / "big.zip"
+        source.write_bytes(payload)
+        
+        with patch.object(settings, "GCS_COMPOSITE_UPLOAD_THRESHOLD", 4096), \
+                patch.object(settings, "GCS_COMPOSITE_PART_SIZE", 4096):
+            path = StorageService().save_file(str(source), "job1.zip", "packages")
+        
+        bucket = fake_gcs.bucket("packages")
+        assert path == "gs://packages/job1.zip"
+        assert bucket.objects["job1.zip"]["data"] == payload
+        assert sorted(blob.name for blob in fake_gcs.uploads) == [f"job1.zip.part-0{i}" for i in range(3)]
+        # Parts are cleaned up after composing
+        assert list(bucket.objects) == ["job1.zip"]
+    
+    def test_local_mode_copies_files(self, storage_path, artifacts):
+        """Test that local mode keeps returning relative paths"""
+        paths = StorageService().save_files(
+            [(artifacts[0], "stems/job1/bass.wav", None), (artifacts[4], "job1.zip", None)]
+        )
+        
+        assert paths == ["stems/job1/bass.wav", "job1.zip"]
+        assert os.path.exists(storage_path / "stems" / "job1" / "bass.wav")
+    
+    def test_compose_more_than_32_blobs(self, fake_gcs: FakeGCSClient):
+        """Test that compose_blobs chains composes past the 32-source limit"""
+        bucket = fake_gcs.bucket("uploads")
+        for i in range(70):
+            bucket.put(f"part-{i:03d}", bytes([i]))
+        
+        path = StorageService().compose_blobs("uploads", [f"part-{i:03d}" for i in range(70)], "whole")
+        
+        assert path == "gs://uploads/whole"
+        assert bucket.objects["whole"]["data"] == bytes(range(70))
+
+
+class TestGCSResumableUploads:
+    """Test resumable uploads staged in GCS, which any API instance can continue"""
+    
+    @pytest.mark.asyncio
+    async def test_chunks_are_staged_and_composed(self, client, fake_redis, fake_gcs: FakeGCSClient):
+        """Test that chunks become objects, composed into the job's source on completion"""
+        payload = make_flac()
+        bucket = fake_gcs.bucket(settings.GCS_BUCKET_UPLOADS)
+        
+        response = await client.post("/api/uploads", json={"filename": "song.flac", "total_size": len(payload)})
+        upload_id = response.json()["upload_id"]
+        for offset in range(0, len(payload), 100_000):
+            response = await client.put(
+                f"/api/uploads/{upload_id}?offset={offset}", content=payload[offset:offset + 100_000]
+            )
+            assert response.json()["offset"] == min(offset + 100_000, len(payload))
+        assert response.json()["complete"] is True
+        assert list(bucket.objects) == [f".partial/{upload_id}/source.flac"]
+        
+        with patch('app.api.jobs.process_audio_job'):
+            response = await client.post("/api/jobs/create", data={"project_name": "GCS", "upload_id": upload_id})
+        
+        job = response.json()
+        assert response.status_code == 200
+        assert job["source_file_path"] == f"gs://{bucket.name}/{job['id']}_source.flac"
+        assert job["duration_seconds"] == pytest.approx(3.0)
+        assert list(bucket.objects) == [f"{job['id']}_source.flac"]
+        assert bucket.objects[f"{job['id']}_source.flac"]["data"] == payload
+    
+    @pytest.mark.asyncio
+    async def test_oversized_chunk_is_not_staged(self, client, fake_redis, fake_gcs: FakeGCSClient):
+        """Test that a rejected chunk leaves no object and the offset unchanged"""
+        response = await client.post("/api/uploads", json={"filename": "song.mp3", "total_size": 4})
+        upload_id = response.json()["upload_id"]
+        
+        response = await client.put(f"/api/uploads/{upload_id}?offset=0", content=b"123456")
+        
+        assert response.status_code == 413
+        assert (await client.get(f"/api/uploads/{upload_id}")).json()["offset"] == 0
+        assert fake_gcs.bucket(settings.GCS_BUCKET_UPLOADS).objects == {}
+    
+    @pytest.mark.asyncio
+    async def test_abandoned_upload_is_removed(self, client, fake_redis, fake_gcs: FakeGCSClient):
+        """Test that staged parts go once the session has expired, and live uploads stay"""
+        upload_ids = []
+        for _ in range(2):
+            response = await client.post("/api/uploads", json={"filename": "song.wav", "total_size": 10})
+            upload_ids.append(response.json()["upload_id"])
+            await client.put(f"/api/uploads/{upload_ids[-1]}?offset=0", content=b"12345")
+        abandoned, live = upload_ids
+        fake_redis.delete(f"upload:{abandoned}")
+        
+        assert ResumableUploadService(fake_redis).remove_stale_uploads() == (1, 5)
+        
+        assert list(fake_gcs.bucket(settings.GCS_BUCKET_UPLOADS).objects) == [f".partial/{live}/part-{0:015d}"]
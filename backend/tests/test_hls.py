@@ -0,0 +1,104 @@
+"""
+Tests for segmented (HLS) streaming
+"""
+import shutil
+import asyncio
+import numpy as np
+import soundfile as sf
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.job import Job, JobStatus, InputType
+from app.services import hls
+
+
+@pytest.fixture
+async def source_job(db_session: AsyncSession, storage_path) -> Job:
+    """A job still processing, with a 13-second source"""
+    job = Job(project_name="HLS", input_type=InputType.upload, status=JobStatus.SEPARATING)
+    db_session.add(job)
+    await db_session.commit()
+    
+    uploads = storage_path / "uploads"
+    uploads.mkdir(parents=True, exist_ok=True)
+    tone = 0.3 * np.sin(np.arange(13 * 48000) * 2 * np.pi * 440 / 48000)
+    sf.write(uploads / f"{job.id}_source.wav", np.column_stack([tone, tone]), 48000, subtype="PCM_24")
+    
+    job.source_file_path = f"uploads/{job.id}_source.wav"
+    await db_session.commit()
+    return job
+
+
+def segment_urls(playlist: str) -> list[str]:
+    return [line for line in playlist.splitlines() if line and not line.startswith("#")]
+
+
+class TestHLSStreaming:
+    """Test /api/jobs/{id}/hls/{name}/..."""
+    
+    @pytest.mark.asyncio
+    async def test_playlist_and_segments(self, client: AsyncClient, source_job: Job):
+        """Test that the source is cut into versioned, cacheable segments"""
+        base = f"/api/jobs/{source_job.id}/hls/source"
+        
+        response = await client.get(f"{base}/playlist.m3u8")
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/vnd.apple.mpegurl"
+        assert response.headers["cache-control"] == "no-cache"
+        assert "#EXT-X-PLAYLIST-TYPE:VOD" in response.text
+        assert "#EXT-X-ENDLIST" in response.text
+        
+        urls = segment_urls(response.text)
+        assert len(urls) == 3  # 6 + 6 + 1 seconds
+        version = urls[0].split("/")[0]
+        assert all(url.startswith(f"{version}/seg-") for url in urls)
+        
+        segment = await client.get(f"{base}/{urls[0]}")
+        assert segment.status_code == status.HTTP_200_OK
+        assert segment.headers["content-type"] == "video/mp2t"
+        assert segment.headers["cache-control"] == "public, max-age=31536000"
+        assert segment.content[0] == 0x47  # MPEG-TS sync byte
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_segment_once(self, source_job: Job, storage_path):
+        """Test that simultaneous first requests share one encode"""
+        source = str(storage_path / "uploads" / f"{source_job.id}_source.wav")
+        
+        with patch.object(hls, "segment_audio", wraps=hls.segment_audio) as segment:
+            renditions = await asyncio.gather(*[hls.get_hls_rendition(source) for _ in range(4)])
+        
+        assert len(set(renditions)) == 1
+        assert segment.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_evicted_segments_are_rebuilt(self, client: AsyncClient, source_job: Job, storage_path):
+        """Test that a segment request after eviction rebuilds the segments"""
+        base = f"/api/jobs/{source_job.id}/hls/source"
+        playlist = await client.get(f"{base}/playlist.m3u8")
+        
+        source = storage_path / "uploads" / f"{source_job.id}_source.wav"
+        shutil.rmtree(hls.hls_rendition(str(source)).directory)
+        
+        response = await client.get(f"{base}/{segment_urls(playlist.text)[-1]}")
+        
+        assert response.status_code == status.HTTP_200_OK
+    
+    @pytest.mark.asyncio
+    async def test_stale_or_invalid_segments(self, client: AsyncClient, source_job: Job):
+        """Test that unknown versions and segment names are not served"""
+        base = f"/api/jobs/{source_job.id}/hls/source"
+        
+        assert (await client.get(f"{base}/0123456789abcdef/seg-00000.ts")).status_code == status.HTTP_404_NOT_FOUND
+        assert (await client.get(f"{base}/0123456789abcdef/source.wav")).status_code == status.HTTP_404_NOT_FOUND
+    
+    @pytest.mark.asyncio
+    async def test_unavailable_streams(self, client: AsyncClient, source_job: Job):
+        """Test invalid stream names and stems of an unfinished job"""
+        base = f"/api/jobs/{source_job.id}/hls"
+        
+        assert (await client.get(f"{base}/piano/playlist.m3u8")).status_code == status.HTTP_400_BAD_REQUEST
+        assert (await client.get(f"{base}/vocals/playlist.m3u8")).status_code == status.HTTP_404_NOT_FOUND
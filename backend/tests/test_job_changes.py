@@ -0,0 +1,140 @@
+"""
+Tests for the job change feed (GET /api/jobs/changes)
+"""
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job, JobStatus, InputType
+from app.services.job_changes import record_job_change, job_change_watcher
+
+
+@pytest.fixture
+async def running_jobs(db_session: AsyncSession, test_user) -> dict:
+    """A running job of test_user and an anonymous one"""
+    jobs = {
+        "user": Job(project_name="user job", input_type=InputType.upload,
+                    status=JobStatus.SEPARATING, user_id=test_user.id),
+        "anonymous": Job(project_name="anonymous job", input_type=InputType.upload,
+                         status=JobStatus.SEPARATING),
+    }
+    db_session.add_all(jobs.values())
+    await db_session.commit()
+    return jobs
+
+
+async def start_cursor(client: AsyncClient, **kwargs) -> str:
+    response = await client.get("/api/jobs/changes", **kwargs)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["jobs"] == []
+    return response.json()["cursor"]
+
+
+class TestJobChanges:
+    """Test delta sync of job lists"""
+
+    @pytest.mark.asyncio
+    async def test_returns_only_changed_jobs(self, client: AsyncClient, fake_redis, running_jobs):
+        """Test that a cancelled job is reported once, with its new state"""
+        cursor = await start_cursor(client)
+
+        await client.post(f"/api/jobs/{running_jobs['anonymous'].id}/cancel")
+        changes = (await client.get(f"/api/jobs/changes?since={cursor}")).json()
+        again = (await client.get(f"/api/jobs/changes?since={changes['cursor']}")).json()
+
+        assert [(job["id"], job["status"]) for job in changes["jobs"]] == [
+            (str(running_jobs["anonymous"].id), "CANCELLED")
+        ]
+        assert changes["cursor"] != cursor
+        assert again["jobs"] == [] and again["cursor"] == changes["cursor"]
+
+    @pytest.mark.asyncio
+    async def test_repeated_changes_are_collapsed(self, client: AsyncClient, fake_redis, running_jobs):
+        """Test that a job changed several times appears once"""
+        cursor = await start_cursor(client)
+        job = running_jobs["anonymous"]
+        for _ in range(3):
+            record_job_change(fake_redis, job.id)
+
+        changes = (await client.get(f"/api/jobs/changes?since={cursor}")).json()
+
+        assert [item["id"] for item in changes["jobs"]] == [str(job.id)]
+
+    @pytest.mark.asyncio
+    async def test_reports_deleted_jobs(self, client: AsyncClient, fake_redis, running_jobs):
+        """Test that deleted jobs are listed by id"""
+        cursor = await start_cursor(client)
+        job_id = running_jobs["anonymous"].id
+
+        await client.post(f"/api/jobs/{job_id}/cancel")  # Running jobs can't be deleted
+        await client.delete(f"/api/jobs/{job_id}")
+        changes = (await client.get(f"/api/jobs/changes?since={cursor}")).json()
+
+        assert changes["jobs"] == []
+        assert changes["deleted"] == [str(job_id)]
+
+    @pytest.mark.asyncio
+    async def test_changes_are_scoped_to_the_caller(
+        self, client: AsyncClient, fake_redis, running_jobs, test_user, access_token
+    ):
+        """Test that callers only see changes of their own jobs"""
+        headers = {"Authorization": f"Bearer {access_token}"}
+        cursor = await start_cursor(client)
+        record_job_change(fake_redis, running_jobs["user"].id, test_user.id)
+        record_job_change(fake_redis, running_jobs["anonymous"].id)
+
+        anonymous = (await client.get(f"/api/jobs/changes?since={cursor}")).json()
+        owner = (await client.get(f"/api/jobs/changes?since={cursor}", headers=headers)).json()
+
+        assert [job["project_name"] for job in anonymous["jobs"]] == ["anonymous job"]
+        assert [job["project_name"] for job in owner["jobs"]] == ["user job"]
+
+    @pytest.mark.asyncio
+    async def test_long_poll_returns_when_a_job_changes(self, client: AsyncClient, fake_redis, running_jobs):
+        """Test that wait holds the request until a change is recorded"""
+        cursor = await start_cursor(client)
+        job = running_jobs["anonymous"]
+
+        async def change_while_waiting(generation, timeout):
+            record_job_change(fake_redis, job.id)
+            return True
+
+        with patch.object(job_change_watcher, "wait", side_effect=change_while_waiting) as wait:
+            changes = (await client.get(f"/api/jobs/changes?since={cursor}&wait=30")).json()
+
+        assert wait.call_count == 1
+        assert [item["id"] for item in changes["jobs"]] == [str(job.id)]
+
+    @pytest.mark.asyncio
+    async def test_long_poll_times_out_empty(self, client: AsyncClient, fake_redis, running_jobs):
+        """Test that an idle long-poll returns no jobs and the same cursor"""
+        cursor = await start_cursor(client)
+        # Another caller's job changing wakes the poll but isn't returned
+        record_job_change(fake_redis, running_jobs["user"].id, running_jobs["user"].user_id)
+
+        with patch.object(job_change_watcher, "wait", return_value=False):
+            changes = (await client.get(f"/api/jobs/changes?since={cursor}&wait=1")).json()
+
+        assert changes["jobs"] == [] and changes["deleted"] == []
+        assert changes["cursor"] > cursor
+
+    @pytest.mark.asyncio
+    async def test_expired_cursor_resets(self, client: AsyncClient, fake_redis):
+        """Test that cursors older than the retention window ask for a reload"""
+        stale = f"{(int(fake_redis.time()[0]) - settings.JOB_CHANGES_RETENTION_SECONDS - 60) * 1000}-0"
+
+        body = (await client.get(f"/api/jobs/changes?since={stale}")).json()
+
+        assert body["reset"] is True
+        assert body["cursor"] != stale
+
+    @pytest.mark.asyncio
+    async def test_invalid_parameters(self, client: AsyncClient, fake_redis):
+        """Test malformed cursors and too long waits"""
+        too_long = settings.JOB_CHANGES_MAX_WAIT_SECONDS + 1
+        assert (await client.get("/api/jobs/changes?since=yesterday")).status_code == status.HTTP_400_BAD_REQUEST
+        assert (await client.get(f"/api/jobs/changes?wait={too_long}")).status_code == \
+            status.HTTP_422_UNPROCESSABLE_ENTITY
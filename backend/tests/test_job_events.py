@@ -0,0 +1,203 @@
+"""
+Tests for job progress event streams (WebSocket snapshot and replay, SSE)
+"""
+import json
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job, JobStatus, InputType
+from app.tasks.audio_processing import publish_job_progress
+from app.services.progress_events import ProgressBroker, RESYNC, event_stream, progress_broker
+
+
+def sse_events(body: str) -> list[dict]:
+    """Parsed data of the SSE messages in a response body"""
+    return [
+        json.loads(line[len("data: "):])
+        for line in body.splitlines() if line.startswith("data: ")
+    ]
+
+
+async def collect(stream) -> list[str]:
+    return [chunk async for chunk in stream]
+
+
+@pytest.fixture
+async def running_job(db_session: AsyncSession) -> Job:
+    job = Job(project_name="running", input_type=InputType.upload, status=JobStatus.SEPARATING)
+    db_session.add(job)
+    await db_session.commit()
+    return job
+
+
+@pytest.fixture
+def live_queue():
+    """Queue handed to SSE streams instead of subscribing to Redis"""
+    queue = asyncio.Queue()
+    with patch.object(progress_broker, "subscribe", AsyncMock(return_value=queue)), \
+            patch.object(progress_broker, "unsubscribe") as unsubscribe:
+        queue.unsubscribe = unsubscribe
+        yield queue
+
+
+class TestPublishJobProgress:
+    """Test publish_job_progress"""
+    
+    def test_update_is_streamed_and_published_with_its_event_id(self, fake_redis):
+        """Test that pub/sub messages carry the ID of their stream entry"""
+        update = {"job_id": "job-1", "status": "SEPARATING", "progress_percent": 40}
+        
+        publish_job_progress(fake_redis, "job-1", update)
+        
+        [(event_id, fields)] = fake_redis.xrange("job:job-1:events")
+        assert json.loads(fields["data"]) == update
+        assert fake_redis.published == [("job:job-1:progress", {**update, "event_id": event_id})]
+    
+    def test_stream_keeps_only_the_latest_updates(self, fake_redis):
+        """Test that the stream is capped"""
+        with patch.object(settings, "JOB_EVENTS_MAX_LENGTH", 3):
+            for progress in range(10):
+                publish_job_progress(fake_redis, "job-1", {"progress_percent": progress})
+        
+        entries = fake_redis.xrange("job:job-1:events")
+        assert [json.loads(fields["data"])["progress_percent"] for _, fields in entries] == [7, 8, 9]
+    
+    def test_updates_of_a_users_jobs_go_to_the_user_channel(self, fake_redis):
+        """Test that a user's updates are also streamed and published per user"""
+        update = {"job_id": "job-1", "status": "COMPLETED", "progress_percent": 100}
+        
+        publish_job_progress(fake_redis, "job-1", update, user_id="user-1")
+        
+        [(event_id, _)] = fake_redis.xrange("user:user-1:job-events")
+        assert ("user:user-1:jobs", {**update, "event_id": event_id}) in fake_redis.published
+        assert len(fake_redis.published) == 2
+
+
+class TestJobEventStream:
+    """Test GET /api/jobs/{id}/events"""
+    
+    @pytest.mark.asyncio
+    async def test_new_stream_starts_with_the_latest_update(
+        self, client: AsyncClient, fake_redis, running_job, live_queue
+    ):
+        """Test the snapshot, followed by live updates until the job finishes"""
+        job_id = str(running_job.id)
+        publish_job_progress(fake_redis, job_id, {"job_id": job_id, "status": "SEPARATING", "progress_percent": 10})
+        publish_job_progress(fake_redis, job_id, {"job_id": job_id, "status": "SEPARATING", "progress_percent": 20})
+        live_queue.put_nowait(json.dumps({"job_id": job_id, "status": "COMPLETED", "progress_percent": 100}))
+        
+        response = await client.get(f"/api/jobs/{job_id}/events")
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert [(e["status"], e["progress_percent"]) for e in sse_events(response.text)] == [
+            ("SEPARATING", 20), ("COMPLETED", 100)
+        ]
+        live_queue.unsubscribe.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_last_event_id_replays_missed_updates(
+        self, client: AsyncClient, fake_redis, running_job, live_queue
+    ):
+        """Test resuming after Last-Event-ID, with event IDs on every message"""
+        job_id = str(running_job.id)
+        for progress in (10, 20, 30):
+            publish_job_progress(fake_redis, job_id, {"job_id": job_id, "status": "SEPARATING", "progress_percent": progress})
+        publish_job_progress(fake_redis, job_id, {"job_id": job_id, "status": "FAILED", "progress_percent": 30})
+        first_id = fake_redis.xrange(f"job:{job_id}:events")[0][0]
+        
+        response = await client.get(f"/api/jobs/{job_id}/events", headers={"Last-Event-ID": first_id})
+        
+        events = sse_events(response.text)
+        assert [e["progress_percent"] for e in events] == [20, 30, 30]
+        assert [line for line in response.text.splitlines() if line.startswith("id: ")] == [
+            f"id: {e['event_id']}" for e in events
+        ]
+    
+    @pytest.mark.asyncio
+    async def test_finished_job_with_nothing_new_returns_no_content(
+        self, client: AsyncClient, fake_redis, db_session: AsyncSession
+    ):
+        """Test that reconnects to finished jobs are told to stop"""
+        job = Job(project_name="done", input_type=InputType.upload, status=JobStatus.COMPLETED)
+        db_session.add(job)
+        await db_session.commit()
+        
+        response = await client.get(f"/api/jobs/{job.id}/events")
+        
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+    
+    @pytest.mark.asyncio
+    async def test_invalid_requests(self, client: AsyncClient, fake_redis, running_job):
+        """Test unknown jobs and malformed event IDs"""
+        missing = await client.get("/api/jobs/00000000-0000-0000-0000-000000000000/events")
+        malformed = await client.get(f"/api/jobs/{running_job.id}/events?last_event_id=latest")
+        
+        assert missing.status_code == status.HTTP_404_NOT_FOUND
+        assert malformed.status_code == status.HTTP_400_BAD_REQUEST
+    
+    @pytest.mark.asyncio
+    async def test_cancelling_a_job_ends_its_streams(self, client: AsyncClient, fake_redis, running_job):
+        """Test that cancellation is published as a terminal update"""
+        await client.post(f"/api/jobs/{running_job.id}/cancel")
+        
+        assert (f"job:{running_job.id}:progress", {
+            "job_id": str(running_job.id), "status": "CANCELLED", "progress_percent": 0,
+            "event_id": fake_redis.xrange(f"job:{running_job.id}:events")[-1][0],
+        }) in fake_redis.published
+
+
+class TestEventStreamBody:
+    """Test the SSE body generator"""
+    
+    @pytest.mark.asyncio
+    async def test_live_updates_covered_by_history_are_skipped(self):
+        queue = asyncio.Queue()
+        history = [("5-0", {"status": "SEPARATING", "progress_percent": 50, "event_id": "5-0"})]
+        for event_id, progress in (("4-0", 40), ("5-0", 50), ("6-0", 60)):
+            queue.put_nowait(json.dumps({"status": "SEPARATING", "progress_percent": progress, "event_id": event_id}))
+        queue.put_nowait(RESYNC)
+        
+        chunks = await collect(event_stream(queue, history, keepalive_seconds=5))
+        
+        assert [e["progress_percent"] for e in sse_events("".join(chunks))] == [50, 60]
+    
+    @pytest.mark.asyncio
+    async def test_quiet_streams_get_keepalives(self):
+        queue = asyncio.Queue()
+        stream = event_stream(queue, [], keepalive_seconds=0.01)
+        
+        assert await stream.__anext__() == ": keepalive\n\n"
+        await stream.aclose()
+
+
+class TestProgressBroker:
+    """Test fan-out of the shared subscription"""
+    
+    @pytest.mark.asyncio
+    async def test_messages_reach_only_streams_of_their_job(self):
+        broker = ProgressBroker()
+        first, second = asyncio.Queue(), asyncio.Queue()
+        broker._queues = {"job-1": {first}, "job-2": {second}}
+        
+        broker._dispatch("job:job-1:progress", '{"progress_percent": 10}')
+        
+        assert first.get_nowait() == '{"progress_percent": 10}'
+        assert second.empty()
+    
+    @pytest.mark.asyncio
+    async def test_streams_that_fall_behind_are_ended(self):
+        broker = ProgressBroker()
+        slow = asyncio.Queue(maxsize=2)
+        broker._queues = {"job-1": {slow}}
+        
+        for progress in range(3):
+            broker._dispatch("job:job-1:progress", json.dumps({"progress_percent": progress}))
+        
+        assert slow.get_nowait() is RESYNC and slow.empty()
+        assert broker._queues == {}
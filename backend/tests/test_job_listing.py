@@ -0,0 +1,182 @@
+"""
+Tests for job listing and pagination
+"""
+import uuid
+import pytest
+from datetime import datetime, timedelta, timezone
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job, JobStatus, InputType
+
+
+@pytest.fixture
+async def many_jobs(db_session: AsyncSession) -> list[Job]:
+    """25 jobs, several sharing a created_at timestamp; newest first"""
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    jobs = [
+        Job(
+            project_name=f"Job {i}",
+            input_type=InputType.upload,
+            status=JobStatus.COMPLETED,
+            created_at=start + timedelta(minutes=i // 3),  # Three jobs per minute
+        )
+        for i in range(25)
+    ]
+    db_session.add_all(jobs)
+    await db_session.commit()
+    return sorted(jobs, key=lambda job: (job.created_at, job.id.hex), reverse=True)
+
+
+class TestListJobs:
+    """Test GET /api/jobs"""
+    
+    @pytest.mark.asyncio
+    async def test_cursor_pages_cover_every_job_once(self, client: AsyncClient, many_jobs):
+        """Test that following next_cursor walks all jobs newest first without overlap"""
+        seen = []
+        response = await client.get("/api/jobs?page_size=10")
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            body = response.json()
+            seen.extend(job["id"] for job in body["jobs"])
+            if not body["next_cursor"]:
+                break
+            response = await client.get(f"/api/jobs?page_size=10&cursor={body['next_cursor']}")
+        
+        assert seen == [str(job.id) for job in many_jobs]
+    
+    @pytest.mark.asyncio
+    async def test_page_numbers_match_cursor_pages(self, client: AsyncClient, many_jobs):
+        """Test that page-number and cursor pagination return the same pages"""
+        first = (await client.get("/api/jobs?page_size=10")).json()
+        by_cursor = (await client.get(f"/api/jobs?page_size=10&cursor={first['next_cursor']}")).json()
+        by_number = (await client.get("/api/jobs?page_size=10&page=2")).json()
+        
+        assert first["total"] == 25
+        assert [job["id"] for job in by_cursor["jobs"]] == [job["id"] for job in by_number["jobs"]]
+    
+    @pytest.mark.asyncio
+    async def test_last_page_has_no_cursor(self, client: AsyncClient, many_jobs):
+        """Test that the final page ends pagination"""
+        body = (await client.get("/api/jobs?page_size=25")).json()
+        
+        assert len(body["jobs"]) == 25
+        assert body["next_cursor"] is None
+    
+    @pytest.mark.asyncio
+    async def test_total_can_be_skipped(self, client: AsyncClient, many_jobs):
+        """Test that include_total=false skips the count"""
+        body = (await client.get("/api/jobs?include_total=false")).json()
+        
+        assert body["total"] is None
+        assert len(body["jobs"]) == 20
+    
+    @pytest.mark.asyncio
+    async def test_invalid_parameters(self, client: AsyncClient):
+        """Test malformed cursors and out-of-range page sizes"""
+        assert (await client.get("/api/jobs?cursor=not-a-cursor")).status_code == status.HTTP_400_BAD_REQUEST
+        assert (await client.get("/api/jobs?page_size=1000")).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.fixture
+async def owned_jobs(db_session: AsyncSession, test_user, test_admin_user) -> dict:
+    """Active and finished jobs for a user, another user and nobody"""
+    jobs = {}
+    for owner, user in [("user", test_user), ("admin", test_admin_user), ("anonymous", None)]:
+        for state in [JobStatus.SEPARATING, JobStatus.COMPLETED, JobStatus.FAILED]:
+            job = Job(
+                project_name=f"{owner} {state.value}",
+                input_type=InputType.upload,
+                status=state,
+                user_id=user.id if user else None,
+            )
+            db_session.add(job)
+            jobs[(owner, state)] = job
+    await db_session.commit()
+    return jobs
+
+
+def project_names(response) -> set[str]:
+    return {job["project_name"] for job in response.json()["jobs"]}
+
+
+class TestScopedListJobs:
+    """Test user scoping and status filters of GET /api/jobs"""
+    
+    @pytest.mark.asyncio
+    async def test_users_see_only_their_jobs(self, client: AsyncClient, owned_jobs, access_token):
+        """Test that an authenticated user lists only their own jobs"""
+        response = await client.get("/api/jobs", headers={"Authorization": f"Bearer {access_token}"})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert project_names(response) == {"user SEPARATING", "user COMPLETED", "user FAILED"}
+        assert response.json()["total"] == 3
+    
+    @pytest.mark.asyncio
+    async def test_anonymous_callers_see_anonymous_jobs(self, client: AsyncClient, owned_jobs):
+        """Test that unauthenticated callers only list jobs without an owner"""
+        response = await client.get("/api/jobs")
+        
+        assert project_names(response) == {"anonymous SEPARATING", "anonymous COMPLETED", "anonymous FAILED"}
+    
+    @pytest.mark.asyncio
+    async def test_status_filters(self, client: AsyncClient, owned_jobs, access_token):
+        """Test active vs finished filtering"""
+        headers = {"Authorization": f"Bearer {access_token}"}
+        
+        active = await client.get("/api/jobs?status=active", headers=headers)
+        finished = await client.get("/api/jobs?status=finished", headers=headers)
+        invalid = await client.get("/api/jobs?status=running", headers=headers)
+        
+        assert project_names(active) == {"user SEPARATING"}
+        assert project_names(finished) == {"user COMPLETED", "user FAILED"}
+        assert finished.json()["total"] == 2
+        assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+    
+    @pytest.mark.asyncio
+    async def test_all_scope_is_admin_only(self, client: AsyncClient, owned_jobs, access_token, admin_access_token):
+        """Test that only admins can list every job"""
+        denied = await client.get("/api/jobs?scope=all", headers={"Authorization": f"Bearer {access_token}"})
+        anonymous = await client.get("/api/jobs?scope=all")
+        allowed = await client.get(
+            "/api/jobs?scope=all&status=active", headers={"Authorization": f"Bearer {admin_access_token}"}
+        )
+        
+        assert denied.status_code == status.HTTP_403_FORBIDDEN
+        assert anonymous.status_code == status.HTTP_403_FORBIDDEN
+        assert project_names(allowed) == {"user SEPARATING", "admin SEPARATING", "anonymous SEPARATING"}
+
+
+class TestJobStatusBatch:
+    """Test POST /api/jobs/status:batch"""
+    
+    @pytest.mark.asyncio
+    async def test_returns_status_and_progress(self, client: AsyncClient, owned_jobs):
+        """Test that statuses of several jobs come back in one response"""
+        running = owned_jobs[("user", JobStatus.SEPARATING)]
+        done = owned_jobs[("anonymous", JobStatus.COMPLETED)]
+        unknown = "00000000-0000-4000-8000-000000000000"
+        
+        response = await client.post(
+            "/api/jobs/status:batch", json={"job_ids": [str(running.id), str(done.id), unknown, str(done.id)]}
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "jobs": {str(running.id): ["SEPARATING", 0], str(done.id): ["COMPLETED", 0]},
+            "missing": [unknown],
+        }
+    
+    @pytest.mark.asyncio
+    async def test_batch_size_is_limited(self, client: AsyncClient):
+        """Test that empty and oversized batches are rejected"""
+        too_many = [str(uuid.uuid4()) for _ in range(settings.JOB_STATUS_BATCH_MAX_IDS + 1)]
+        
+        empty = await client.post("/api/jobs/status:batch", json={"job_ids": []})
+        oversized = await client.post("/api/jobs/status:batch", json={"job_ids": too_many})
+        
+        assert empty.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert oversized.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
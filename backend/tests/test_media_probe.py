@@ -0,0 +1,117 @@
+"""
+Tests for upload-time media probing and admission control
+"""
+import io
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+from fastapi import status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job
+from app.services.media_probe import probe_media, MediaProbeError
+from tests.conftest import make_flac
+
+
+class TestProbeMedia:
+    """Test header-only probing"""
+    
+    def test_probe_flac_file_object(self):
+        """Test that duration, format and codec come from the headers"""
+        source = io.BytesIO(make_flac(seconds=2.0, sample_rate=48000))
+        source.seek(100)
+        
+        media = probe_media(source)
+        
+        assert media == {
+            "duration_seconds": pytest.approx(2.0),
+            "sample_rate": 48000,
+            "channels": 2,
+            "codec": "flac",
+        }
+        assert source.tell() == 0  # Left rewound for the storage write
+    
+    def test_probe_rejects_non_audio(self):
+        """Test that unreadable data raises MediaProbeError"""
+        with pytest.raises(MediaProbeError):
+            probe_media(io.BytesIO(b"not audio" * 100))
+
+
+class TestCreateJobProbe:
+    """Test that job creation records media info and enforces limits"""
+    
+    @pytest.mark.asyncio
+    async def test_upload_stores_media_info(
+        self, 
+        client: AsyncClient, 
+        db_session: AsyncSession, 
+        storage_path
+    ):
+        """Test that probed media info is stored on the job"""
+        with patch('app.api.jobs.process_audio_job'):
+            response = await client.post(
+                "/api/jobs/create",
+                data={"project_name": "Probed"},
+                files={"file": ("song.flac", make_flac(), "audio/flac")}
+            )
+        
+        assert response.status_code == status.HTTP_200_OK
+        job = response.json()
+        assert job["duration_seconds"] == pytest.approx(3.0)
+        assert (job["sample_rate"], job["channels"], job["codec"]) == (44100, 2, "flac")
+    
+    @pytest.mark.asyncio
+    async def test_too_long_upload_rejected(
+        self, 
+        client: AsyncClient, 
+        db_session: AsyncSession, 
+        storage_path
+    ):
+        """Test that sources over the duration limit never create a job"""
+        with patch('app.api.jobs.process_audio_job') as mock_task, \
+                patch.object(settings, "MAX_SOURCE_DURATION_SECONDS", 2):
+            response = await client.post(
+                "/api/jobs/create",
+                data={"project_name": "Too long"},
+                files={"file": ("song.flac", make_flac(), "audio/flac")}
+            )
+        
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        mock_task.delay.assert_not_called()
+        result = await db_session.execute(select(Job))
+        assert result.scalars().all() == []
+    
+    @pytest.mark.asyncio
+    async def test_trimmed_section_is_admitted(
+        self, 
+        client: AsyncClient, 
+        storage_path
+    ):
+        """Test that a long source whose trimmed section fits the limit is accepted"""
+        with patch('app.api.jobs.process_audio_job'), \
+                patch.object(settings, "MAX_SOURCE_DURATION_SECONDS", 2):
+            response = await client.post(
+                "/api/jobs/create",
+                data={"project_name": "Trimmed", "trim_start": "0.5", "trim_end": "2.0"},
+                files={"file": ("song.flac", make_flac(), "audio/flac")}
+            )
+        
+        assert response.status_code == status.HTTP_200_OK
+    
+    @pytest.mark.asyncio
+    async def test_unreadable_upload_rejected(
+        self, 
+        client: AsyncClient, 
+        storage_path
+    ):
+        """Test that files without readable audio headers are rejected"""
+        with patch('app.api.jobs.process_audio_job'):
+            response = await client.post(
+                "/api/jobs/create",
+                data={"project_name": "Broken"},
+                files={"file": ("song.mp3", b"not audio" * 100, "audio/mpeg")}
+            )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
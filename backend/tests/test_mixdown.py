@@ -0,0 +1,300 @@
+"""
+Tests for server-side stem mixdowns
+"""
+import io
+import os
+import time
+import asyncio
+import numpy as np
+import soundfile as sf
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+from fastapi import status
+from mutagen.wave import WAVE
+from mutagen.id3 import TBPM
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job, JobStatus, InputType
+from app.services import mixdown
+
+STEMS = ["vocals", "drums", "bass", "other"]
+FRAMES = 10000
+
+
+def write_stems(directory, frames: int = FRAMES) -> dict:
+    """Write four 24-bit stereo stems of noise; returns their float samples"""
+    rng = np.random.default_rng(0)
+    samples = {}
+    for stem in STEMS:
+        data = rng.uniform(-0.4, 0.4, size=(frames, 2))
+        sf.write(directory / f"{stem}.wav", data, 48000, subtype="PCM_24")
+        samples[stem], _ = sf.read(directory / f"{stem}.wav")
+    return samples
+
+
+def reference_mix(samples: dict, gains: dict) -> np.ndarray:
+    mix = sum(samples[stem] * gains[stem] for stem in STEMS)
+    return np.clip(mix, -1.0, 1.0 - 2 ** -23)
+
+
+@pytest.fixture
+async def mix_job(db_session: AsyncSession, storage_path):
+    """A completed job with four stems"""
+    job = Job(project_name="Mix", input_type=InputType.upload, status=JobStatus.COMPLETED)
+    db_session.add(job)
+    await db_session.commit()
+    
+    stems_dir = storage_path / "stems" / str(job.id)
+    stems_dir.mkdir(parents=True)
+    samples = write_stems(stems_dir)
+    
+    job.stems_folder_path = f"stems/{job.id}"
+    await db_session.commit()
+    return job, samples
+
+
+class TestMixdownRendering:
+    """Test the block-wise mixer"""
+    
+    def test_matches_reference_mix(self, tmp_path, storage_path):
+        """Test that the memory-mapped mix equals a plain NumPy sum"""
+        samples = write_stems(tmp_path)
+        paths = {stem: str(tmp_path / f"{stem}.wav") for stem in STEMS}
+        gains = mixdown.resolve_gains({"vocals": -12.0, "bass": 3.0}, muted=["other"])
+        
+        # Small blocks so the mix spans several, with a partial last block
+        with patch.object(settings, "MIXDOWN_BLOCK_FRAMES", 4096):
+            dest = mixdown.render_mixdown(paths, gains)
+        
+        mixed, rate = sf.read(dest)
+        assert rate == 48000
+        assert sf.info(dest).subtype == "PCM_24"
+        assert mixed.shape == (FRAMES, 2)
+        np.testing.assert_allclose(mixed, reference_mix(samples, gains), atol=2 ** -22)
+    
+    def test_skips_non_audio_chunks(self, tmp_path):
+        """Test that stems tagged by embed_tempo_metadata are still readable"""
+        write_stems(tmp_path)
+        path = tmp_path / "vocals.wav"
+        audio = WAVE(path)
+        audio.add_tags()
+        audio.tags.add(TBPM(encoding=3, text=["120"]))
+        audio.save()
+        
+        layout = mixdown.read_wav_layout(str(path))
+        
+        assert (layout.channels, layout.sample_rate, layout.bits_per_sample) == (2, 48000, 24)
+        assert layout.frames == FRAMES
+    
+    def test_gain_validation(self):
+        """Test that unknown stems, out-of-range gains and all-muted mixes are rejected"""
+        with pytest.raises(mixdown.MixdownError):
+            mixdown.resolve_gains({}, muted=["piano"])
+        with pytest.raises(mixdown.MixdownError):
+            mixdown.resolve_gains({"drums": 20.0}, muted=[])
+        with pytest.raises(mixdown.MixdownError):
+            mixdown.resolve_gains({}, muted=STEMS)
+    
+    def test_cache_key_is_the_gain_vector(self, tmp_path, storage_path):
+        """Test that equal gains share a cache entry and different gains don't"""
+        write_stems(tmp_path)
+        paths = {stem: str(tmp_path / f"{stem}.wav") for stem in STEMS}
+        
+        quiet_vocals = mixdown.mixdown_path(paths, mixdown.resolve_gains({"vocals": -12.0}, []))
+        rounded = mixdown.mixdown_path(paths, mixdown.resolve_gains({"vocals": -12.01}, []))
+        muted = mixdown.mixdown_path(paths, mixdown.resolve_gains({}, ["vocals"]))
+        
+        assert quiet_vocals == rounded
+        assert quiet_vocals != muted
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_renders_share_one(self, tmp_path, storage_path):
+        """Test that simultaneous requests for a cached mix render it once, in the pool"""
+        write_stems(tmp_path)
+        paths = {stem: str(tmp_path / f"{stem}.wav") for stem in STEMS}
+        gains = mixdown.resolve_gains({"bass": -3.0}, [])
+        
+        with patch.object(mixdown, "render_mixdown", wraps=mixdown.render_mixdown) as render:
+            dests = await asyncio.gather(*[mixdown.get_cached_mixdown(paths, gains) for _ in range(4)])
+        
+        assert set(dests) == {mixdown.mixdown_path(paths, gains)}
+        assert render.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_streams_follow_one_render(self, tmp_path, storage_path):
+        """Test that simultaneous first requests stream from a single render in the pool"""
+        write_stems(tmp_path)
+        paths = {stem: str(tmp_path / f"{stem}.wav") for stem in STEMS}
+        gains = mixdown.resolve_gains({"drums": -6.0}, [])
+        
+        async def collect(stream):
+            return b"".join([chunk async for chunk in stream])
+        
+        with patch.object(mixdown, "render_mixdown", wraps=mixdown.render_mixdown) as render:
+            bodies = await asyncio.gather(*[collect(mixdown.stream_mixdown(paths, gains)) for _ in range(4)])
+        
+        assert render.call_count == 1
+        with open(mixdown.mixdown_path(paths, gains), "rb") as f:
+            assert set(bodies) == {f.read()}
+    
+    @pytest.mark.asyncio
+    async def test_stream_starts_before_the_render_ends(self, tmp_path, storage_path):
+        """Test that a stream yields audio while the mix is still being rendered"""
+        write_stems(tmp_path)
+        paths = {stem: str(tmp_path / f"{stem}.wav") for stem in STEMS}
+        gains = mixdown.resolve_gains({}, [])
+        encode = mixdown._encode_pcm24
+        
+        def slow_encode(samples):
+            time.sleep(0.02)
+            return encode(samples)
+        
+        with patch.object(settings, "MIXDOWN_BLOCK_FRAMES", 1000), \
+                patch.object(mixdown, "_encode_pcm24", slow_encode):
+            stream = mixdown.stream_mixdown(paths, gains)
+            first = await stream.__anext__()
+            assert not os.path.exists(mixdown.mixdown_path(paths, gains))
+            rest = b"".join([chunk async for chunk in stream])
+        
+        with open(mixdown.mixdown_path(paths, gains), "rb") as f:
+            assert first + rest == f.read()
+
+
+class TestMixdownEndpoint:
+    """Test GET /api/jobs/{id}/mixdown"""
+    
+    @pytest.mark.asyncio
+    async def test_streams_then_serves_from_cache(self, client: AsyncClient, mix_job):
+        """Test that the first request streams the mix and the next one is cached"""
+        job, samples = mix_job
+        url = f"/api/jobs/{job.id}/mixdown?vocals=-12&mute=other"
+        
+        first = await client.get(url)
+        second = await client.get(url, headers={"Range": "bytes=0-43"})
+        
+        assert first.status_code == status.HTTP_200_OK
+        assert first.headers["content-type"] == "audio/wav"
+        assert int(first.headers["content-length"]) == len(first.content)
+        assert "etag" not in first.headers
+        
+        assert second.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert second.content == first.content[:44]
+        
+        mixed, _ = sf.read(io.BytesIO(first.content))
+        gains = {"vocals": 10 ** (-12 / 20), "drums": 1.0, "bass": 1.0, "other": 0.0}
+        np.testing.assert_allclose(mixed, reference_mix(samples, gains), atol=2 ** -22)
+    
+    @pytest.mark.asyncio
+    async def test_compressed_mix(self, client: AsyncClient, mix_job):
+        """Test that a mix can be requested as a compressed rendition"""
+        job, _ = mix_job
+        
+        response = await client.get(f"/api/jobs/{job.id}/mixdown?drums=-6&format=mp3")
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.headers["content-disposition"].endswith('filename="Mix_mix.mp3"')
+    
+    @pytest.mark.asyncio
+    async def test_saturated_pool_returns_503(self, client: AsyncClient, mix_job):
+        """Test that mix renders count against TRANSCODE_MAX_PENDING"""
+        job, _ = mix_job
+        
+        with patch.object(settings, "TRANSCODE_MAX_PENDING", 0):
+            response = await client.get(f"/api/jobs/{job.id}/mixdown?format=mp3")
+        
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    
+    @pytest.mark.asyncio
+    async def test_saturated_pool_rejects_streamed_mix(self, client: AsyncClient, mix_job):
+        """Test that streaming the first render of a WAV mix counts against TRANSCODE_MAX_PENDING"""
+        job, _ = mix_job
+        
+        with patch.object(settings, "TRANSCODE_MAX_PENDING", 0):
+            response = await client.get(f"/api/jobs/{job.id}/mixdown?bass=-3")
+        
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    
+    @pytest.mark.asyncio
+    async def test_invalid_mix(self, client: AsyncClient, mix_job):
+        """Test that invalid gains and mutes are rejected"""
+        job, _ = mix_job
+        base = f"/api/jobs/{job.id}/mixdown"
+        
+        all_muted = "&".join(f"mute={stem}" for stem in STEMS)
+        assert (await client.get(f"{base}?{all_muted}")).status_code == status.HTTP_400_BAD_REQUEST
+        assert (await client.get(f"{base}?vocals=-100")).status_code == status.HTTP_400_BAD_REQUEST
+        assert (await client.get(f"{base}?mute=piano")).status_code == status.HTTP_400_BAD_REQUEST
+    
+    @pytest.mark.asyncio
+    async def test_missing_stem(self, client: AsyncClient, mix_job, storage_path):
+        """Test that a job with a missing stem returns 404"""
+        job, _ = mix_job
+        (storage_path / "stems" / str(job.id) / "bass.wav").unlink()
+        
+        response = await client.get(f"/api/jobs/{job.id}/mixdown")
+        
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestMultitrackEndpoint:
+    """Test GET /api/jobs/{id}/stems"""
+    
+    @pytest.mark.asyncio
+    async def test_flac_holds_every_stem_losslessly(self, client: AsyncClient, mix_job):
+        """Test that the FLAC variant interleaves all stems sample-exactly"""
+        job, samples = mix_job
+        
+        response = await client.get(f"/api/jobs/{job.id}/stems?format=flac")
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "audio/flac"
+        assert response.headers["x-stem-order"] == "vocals,drums,bass,other"
+        assert response.headers["x-stem-channels"] == "2"
+        
+        multitrack, rate = sf.read(io.BytesIO(response.content))
+        assert rate == 48000
+        assert multitrack.shape == (FRAMES, 8)
+        for index, stem in enumerate(STEMS):
+            np.testing.assert_array_equal(multitrack[:, 2 * index:2 * index + 2], samples[stem])
+    
+    @pytest.mark.asyncio
+    async def test_wav_streams_then_serves_from_cache(self, client: AsyncClient, mix_job):
+        """Test that the default WAV streams on first request and supports ranges after"""
+        job, samples = mix_job
+        url = f"/api/jobs/{job.id}/stems"
+        
+        first = await client.get(url)
+        second = await client.get(url, headers={"Range": "bytes=-100"})
+        
+        assert first.status_code == status.HTTP_200_OK
+        assert first.headers["content-type"] == "audio/wav"
+        assert first.headers["x-stem-channels"] == "2"
+        assert int(first.headers["content-length"]) == len(first.content)
+        assert second.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert second.headers["x-stem-order"] == "vocals,drums,bass,other"
+        assert second.content == first.content[-100:]
+        
+        multitrack, _ = sf.read(io.BytesIO(first.content))
+        np.testing.assert_array_equal(multitrack[:, 6:8], samples["other"])
+    
+    @pytest.mark.asyncio
+    async def test_saturated_pool_returns_503(self, client: AsyncClient, mix_job):
+        """Test that multitrack renders count against TRANSCODE_MAX_PENDING"""
+        job, _ = mix_job
+        
+        with patch.object(settings, "TRANSCODE_MAX_PENDING", 0):
+            response = await client.get(f"/api/jobs/{job.id}/stems")
+        
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    
+    @pytest.mark.asyncio
+    async def test_unsupported_format(self, client: AsyncClient, mix_job):
+        """Test that only lossless multitrack formats are offered"""
+        job, _ = mix_job
+        
+        response = await client.get(f"/api/jobs/{job.id}/stems?format=opus")
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,94 @@
+"""
+Tests for waveform peak pyramids
+"""
+import struct
+import numpy as np
+import soundfile as sf
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job, JobStatus, InputType
+from app.services.peaks import compute_peak_pyramid
+
+
+def read_dat(path) -> tuple[tuple, np.ndarray]:
+    """Parse an audiowaveform .dat file into (header, interleaved min/max)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    header = struct.unpack("<iIiiI", data[:20])
+    dtype = "<i1" if header[1] == 1 else "<i2"
+    return header, np.frombuffer(data[20:], dtype=dtype)
+
+
+class TestPeakPyramid:
+    """Test peak computation"""
+    
+    def test_levels_halve_resolution(self, tmp_path):
+        """Test min/max values and the size of each level"""
+        sample_rate = 8000
+        audio = np.zeros((1000, 2), dtype=np.float32)
+        audio[10, 0] = 0.5     # Pixel 0 (left channel)
+        audio[300, 1] = -1.0   # Pixel 1 (right channel)
+        sf.write(tmp_path / "stem.wav", audio, sample_rate, subtype="FLOAT")
+        
+        with patch.object(settings, "PEAKS_BASE_SAMPLES_PER_PIXEL", 256), \
+                patch.object(settings, "PEAKS_LEVELS", 3):
+            paths = compute_peak_pyramid(str(tmp_path / "stem.wav"), str(tmp_path / "peaks"), "vocals")
+        
+        assert [p.rsplit("/", 1)[1] for p in paths] == ["vocals.0.dat", "vocals.1.dat", "vocals.2.dat"]
+        
+        header, peaks = read_dat(paths[0])
+        assert header == (1, 1, sample_rate, 256, 4)  # 1000 samples -> 4 pixels
+        assert peaks.tolist() == [0, 64, -127, 0, 0, 0, 0, 0]
+        
+        header, peaks = read_dat(paths[1])
+        assert header[3:] == (512, 2)
+        assert peaks.tolist() == [-127, 64, 0, 0]
+        
+        header, peaks = read_dat(paths[2])
+        assert header[3:] == (1024, 1)
+        assert peaks.tolist() == [-127, 64]
+    
+    def test_16_bit_peaks(self, tmp_path):
+        """Test that PEAKS_BITS=16 writes int16 values"""
+        sf.write(tmp_path / "stem.wav", np.full((512, 1), 0.5, dtype=np.float32), 8000, subtype="FLOAT")
+        
+        with patch.object(settings, "PEAKS_BITS", 16):
+            paths = compute_peak_pyramid(str(tmp_path / "stem.wav"), str(tmp_path / "peaks"), "bass")
+        
+        header, peaks = read_dat(paths[0])
+        assert header[1] == 0
+        assert peaks.tolist() == [16384, 16384, 16384, 16384]
+
+
+class TestPeaksEndpoint:
+    """Test serving peaks for completed jobs"""
+    
+    @pytest.mark.asyncio
+    async def test_get_peaks(self, client: AsyncClient, db_session: AsyncSession, storage_path):
+        """Test that a stored level is served and bad levels are rejected"""
+        job = Job(project_name="Peaks", input_type=InputType.upload, status=JobStatus.COMPLETED)
+        db_session.add(job)
+        await db_session.commit()
+        job.stems_folder_path = f"stems/{job.id}"
+        await db_session.commit()
+        
+        sf.write(storage_path / "drums.wav", np.zeros((4096, 2), dtype=np.float32), 48000)
+        compute_peak_pyramid(
+            str(storage_path / "drums.wav"), str(storage_path / "stems" / str(job.id) / "peaks"), "drums"
+        )
+        
+        response = await client.get(f"/api/jobs/{job.id}/peaks/drums?level=1")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/octet-stream"
+        assert struct.unpack("<iIiiI", response.content[:20])[3] == 512
+        
+        response = await client.get(f"/api/jobs/{job.id}/peaks/drums?level={settings.PEAKS_LEVELS}")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        
+        response = await client.get(f"/api/jobs/{job.id}/peaks/vocals")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
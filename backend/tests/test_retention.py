@@ -0,0 +1,219 @@
+"""
+Tests for job retention (sweeper and DELETE /api/jobs/{id})
+"""
+import os
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job, JobStatus, InputType
+from app.services.job_changes import read_changes
+from app.services.retention import remove_job_files, sweep_expired_jobs
+from app.services.storage import StorageService
+from app.services.transcode import rendition_path
+
+
+def write(path, size: int):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\0" * size)
+
+
+async def make_job(
+    db_session: AsyncSession, storage_path, age_days: float,
+    status: JobStatus = JobStatus.COMPLETED, source: str = None,
+) -> Job:
+    """A job with a 100-byte source, two 10-byte stems, a 5-byte peaks file and a 1000-byte package"""
+    job = Job(
+        project_name="Retention", input_type=InputType.upload, status=status,
+        created_at=datetime.utcnow() - timedelta(days=age_days),
+    )
+    db_session.add(job)
+    await db_session.commit()
+
+    if source is None:
+        source = f"uploads/{job.id}_source.wav"
+        write(storage_path / source, 100)
+    for name in ("vocals.wav", "drums.wav"):
+        write(storage_path / "stems" / str(job.id) / name, 10)
+    write(storage_path / "stems" / str(job.id) / "peaks" / "vocals.peaks", 5)
+    write(storage_path / f"{job.id}.zip", 1000)
+
+    job.source_file_path = source
+    job.stems_folder_path = f"stems/{job.id}"
+    job.package_path = f"{job.id}.zip"
+    await db_session.commit()
+    return job
+
+
+async def remaining(db_session: AsyncSession) -> set:
+    return set((await db_session.execute(select(Job.id))).scalars())
+
+
+class TestRetentionSweep:
+    """Test sweep_expired_jobs"""
+
+    @pytest.mark.asyncio
+    async def test_deletes_expired_jobs_and_their_files(
+        self, db_session: AsyncSession, storage_path, fake_redis
+    ):
+        """Test that finished jobs past retention go, with files, derivatives and a change log entry"""
+        expired = await make_job(db_session, storage_path, age_days=10)
+        recent = await make_job(db_session, storage_path, age_days=1)
+        running = await make_job(db_session, storage_path, age_days=10, status=JobStatus.SEPARATING)
+        rendition = rendition_path(str(storage_path / expired.source_file_path), "opus", 128)
+        os.makedirs(os.path.dirname(rendition), exist_ok=True)
+        with open(rendition, "wb") as f:
+            f.write(b"\0" * 50)
+
+        report = await sweep_expired_jobs(db_session, StorageService(), fake_redis)
+
+        assert report == {"deleted_jobs": 1, "reclaimed_bytes": 100 + 25 + 1000 + 50}
+        assert await remaining(db_session) == {recent.id, running.id}
+        assert not (storage_path / "stems" / str(expired.id)).exists()
+        assert not (storage_path / expired.package_path).exists()
+        assert not (storage_path / expired.source_file_path).exists()
+        assert not os.path.exists(rendition)
+        assert (storage_path / recent.package_path).exists()
+        changes = read_changes(fake_redis, "0-0", 10)
+        assert [(change.job_id, change.deleted) for change in changes] == [(expired.id, True)]
+
+    @pytest.mark.asyncio
+    async def test_shared_source_is_kept_while_referenced(
+        self, db_session: AsyncSession, storage_path, fake_redis
+    ):
+        """Test that a source shared with a reprocessed job outlives the original"""
+        original = await make_job(db_session, storage_path, age_days=10)
+        reprocessed = await make_job(db_session, storage_path, age_days=5, source=original.source_file_path)
+        source = storage_path / original.source_file_path
+
+        first = await sweep_expired_jobs(db_session, StorageService(), fake_redis)
+        assert first["reclaimed_bytes"] == 1025 and source.exists()
+
+        with patch.object(settings, "JOB_RETENTION_DAYS", 3):
+            second = await sweep_expired_jobs(db_session, StorageService(), fake_redis)
+        assert second["reclaimed_bytes"] == 1125 and not source.exists()
+        assert reprocessed.id not in await remaining(db_session)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("failing", [0, 1])
+    async def test_shared_source_is_kept_for_a_job_that_failed(
+        self, db_session: AsyncSession, storage_path, fake_redis, failing
+    ):
+        """Test that a source shared within a batch stays while the job that couldn't be deleted uses it"""
+        original = await make_job(db_session, storage_path, age_days=10)
+        reprocessed = await make_job(db_session, storage_path, age_days=9, source=original.source_file_path)
+        source = storage_path / original.source_file_path
+        stuck = (original, reprocessed)[failing]
+
+        def remove_or_fail(job, storage, keep_source=False):
+            if job.id == stuck.id:
+                raise OSError("Permission denied")
+            return remove_job_files(job, storage, keep_source)
+
+        with patch("app.services.retention.remove_job_files", side_effect=remove_or_fail):
+            report = await sweep_expired_jobs(db_session, StorageService(), fake_redis)
+
+        assert report["deleted_jobs"] == 1
+        assert source.exists()
+        assert await remaining(db_session) == {stuck.id}
+
+        report = await sweep_expired_jobs(db_session, StorageService(), fake_redis)
+        assert report["deleted_jobs"] == 1 and not source.exists()
+
+    @pytest.mark.asyncio
+    async def test_shared_source_deleted_with_its_last_job_in_a_batch(
+        self, db_session: AsyncSession, storage_path, fake_redis
+    ):
+        """Test that a source used only by jobs of one batch goes once, counted once"""
+        original = await make_job(db_session, storage_path, age_days=10)
+        await make_job(db_session, storage_path, age_days=9, source=original.source_file_path)
+        source = storage_path / original.source_file_path
+
+        report = await sweep_expired_jobs(db_session, StorageService(), fake_redis)
+
+        assert report["deleted_jobs"] == 2 and not source.exists()
+        assert report["reclaimed_bytes"] == 1025 + 1125
+        assert await remaining(db_session) == set()
+
+    @pytest.mark.asyncio
+    async def test_sweeps_in_bounded_batches(self, db_session: AsyncSession, storage_path, fake_redis):
+        """Test that a sweep deletes at most JOB_RETENTION_MAX_BATCHES batches"""
+        for _ in range(5):
+            await make_job(db_session, storage_path, age_days=10)
+
+        with patch.object(settings, "JOB_RETENTION_BATCH_SIZE", 2), \
+                patch.object(settings, "JOB_RETENTION_MAX_BATCHES", 2):
+            first = await sweep_expired_jobs(db_session, StorageService(), fake_redis)
+            second = await sweep_expired_jobs(db_session, StorageService(), fake_redis)
+
+        assert (first["deleted_jobs"], second["deleted_jobs"]) == (4, 1)
+        assert await remaining(db_session) == set()
+
+    @pytest.mark.asyncio
+    async def test_failed_jobs_do_not_stall_the_sweep(
+        self, db_session: AsyncSession, storage_path, fake_redis
+    ):
+        """Test that a batch of jobs whose files can't be removed doesn't keep later jobs from going"""
+        stuck = [await make_job(db_session, storage_path, age_days=20) for _ in range(2)]
+        later = [await make_job(db_session, storage_path, age_days=8) for _ in range(3)]
+        stuck_ids = {job.id for job in stuck}
+
+        def remove_or_fail(job, storage, keep_source=False):
+            if job.id in stuck_ids:
+                raise OSError("Permission denied")
+            return remove_job_files(job, storage, keep_source)
+
+        with patch.object(settings, "JOB_RETENTION_BATCH_SIZE", 2), \
+                patch.object(settings, "JOB_RETENTION_MAX_BATCHES", 5), \
+                patch("app.services.retention.remove_job_files", side_effect=remove_or_fail):
+            report = await sweep_expired_jobs(db_session, StorageService(), fake_redis)
+
+        assert report["deleted_jobs"] == len(later)
+        assert await remaining(db_session) == stuck_ids
+
+    @pytest.mark.asyncio
+    async def test_zero_days_keeps_everything(self, db_session: AsyncSession, storage_path, fake_redis):
+        """Test that JOB_RETENTION_DAYS=0 disables the sweep"""
+        job = await make_job(db_session, storage_path, age_days=400)
+
+        with patch.object(settings, "JOB_RETENTION_DAYS", 0):
+            report = await sweep_expired_jobs(db_session, StorageService(), fake_redis)
+
+        assert report == {"deleted_jobs": 0, "reclaimed_bytes": 0}
+        assert await remaining(db_session) == {job.id}
+
+
+class TestDeleteJob:
+    """Test DELETE /api/jobs/{id}"""
+
+    @pytest.mark.asyncio
+    async def test_deletes_files(self, client: AsyncClient, db_session: AsyncSession, storage_path, fake_redis):
+        """Test that deleting a job removes its files but not a source another job uses"""
+        original = await make_job(db_session, storage_path, age_days=0)
+        reprocessed = await make_job(db_session, storage_path, age_days=0, source=original.source_file_path)
+
+        response = await client.delete(f"/api/jobs/{original.id}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not (storage_path / "stems" / str(original.id)).exists()
+        assert not (storage_path / original.package_path).exists()
+        assert (storage_path / original.source_file_path).exists()
+
+        await client.delete(f"/api/jobs/{reprocessed.id}")
+        assert not (storage_path / original.source_file_path).exists()
+    
+    @pytest.mark.asyncio
+    async def test_running_job_is_not_deleted(self, client: AsyncClient, db_session: AsyncSession, storage_path, fake_redis):
+        """Test that a job a worker may still be writing to is refused with 409"""
+        job = await make_job(db_session, storage_path, age_days=0, status=JobStatus.SEPARATING)
+        
+        response = await client.delete(f"/api/jobs/{job.id}")
+        
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert (storage_path / "stems" / str(job.id)).exists()
+        assert await remaining(db_session) == {job.id}
@@ -1,6 +1,7 @@
 """
 Tests for security utilities and JWT token management
 """
+import asyncio
 import pytest
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch
@@ -9,8 +10,10 @@ from jose import jwt
 from app.core.security import (
     create_access_token, create_refresh_token, decode_token, verify_token_type,
     blacklist_token, is_token_blacklisted, revoke_user_tokens, is_user_revoked,
-    verify_password, get_password_hash
+    verify_password, get_password_hash, verify_password_async, get_password_hash_async,
+    password_needs_rehash
 )
+from app.core.exceptions import ServiceUnavailableError
 from app.core.config import settings
 
 
@@ -145,6 +148,47 @@ class TestPasswordHashing:
         assert verify_password(password, hash2)
 
 
+class TestAsyncPasswordHashing:
+    """Test bcrypt hashing in the dedicated thread pool"""
+    
+    @pytest.mark.asyncio
+    async def test_async_hash_and_verify(self):
+        """Test hashing and verifying without blocking the event loop"""
+        hashed = await get_password_hash_async("test_password_123")
+        
+        assert await verify_password_async("test_password_123", hashed)
+        assert not await verify_password_async("wrong_password", hashed)
+    
+    def test_password_needs_rehash(self):
+        """Test detection of hashes with a different cost factor"""
+        with patch.object(settings, "BCRYPT_ROUNDS", 5):
+            current = get_password_hash("test_password_123")
+            assert not password_needs_rehash(current)
+        
+        with patch.object(settings, "BCRYPT_ROUNDS", 6):
+            assert password_needs_rehash(current)
+        
+        # Unparseable hashes are left alone
+        assert not password_needs_rehash("not-a-bcrypt-hash")
+    
+    @pytest.mark.asyncio
+    async def test_saturated_pool_returns_503(self):
+        """Test that hashes beyond the queue limit are rejected with 503"""
+        hashed = get_password_hash("test_password_123")
+        
+        with patch.object(settings, "PASSWORD_HASH_MAX_PENDING", 2):
+            results = await asyncio.gather(
+                *[verify_password_async("test_password_123", hashed) for _ in range(4)],
+                return_exceptions=True
+            )
+        
+        rejected = [r for r in results if isinstance(r, ServiceUnavailableError)]
+        assert len(rejected) == 2
+        assert rejected[0].status_code == 503
+        assert rejected[0].headers["Retry-After"] == "1"
+        assert [r for r in results if r is True] == [True, True]
+
+
 class TestTokenBlacklisting:
     """Test JWT token blacklisting functionality"""
     
@@ -329,3 +373,19 @@ class TestTokenBlacklistingWithExpiration:
         # Should return False for expired tokens
         assert result is False
         mock_redis.setex.assert_not_called()
+
+
+class TestUserInactiveStatus:
+    """Test that user status changes are recorded for the WebSocket service"""
+    
+    @pytest.mark.asyncio
+    async def test_deactivate_and_approve_update_marker(self, client, fake_redis, test_user, admin_access_token):
+        """Test that user_inactive:{id} follows deactivation and approval"""
+        headers = {"Authorization": f"Bearer {admin_access_token}"}
+        key = f"user_inactive:{test_user.id}"
+        
+        await client.patch(f"/api/admin/users/{test_user.id}/deactivate", headers=headers)
+        assert fake_redis.exists(key)
+        
+        await client.patch(f"/api/admin/users/{test_user.id}/approve", headers=headers)
+        assert not fake_redis.exists(key)
@@ -0,0 +1,100 @@
+"""
+Tests for on-demand stem transcoding
+"""
+import os
+import asyncio
+import av
+import numpy as np
+import soundfile as sf
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job, JobStatus, InputType
+from app.services import transcode
+
+
+@pytest.fixture
+async def stem_job(db_session: AsyncSession, storage_path) -> Job:
+    """A completed job with a one-second 24-bit vocals stem."""
+    job = Job(project_name="Transcode", input_type=InputType.upload, status=JobStatus.COMPLETED)
+    db_session.add(job)
+    await db_session.commit()
+    
+    stems_dir = storage_path / "stems" / str(job.id)
+    stems_dir.mkdir(parents=True)
+    tone = 0.3 * np.sin(np.arange(48000) * 2 * np.pi * 440 / 48000)
+    sf.write(stems_dir / "vocals.wav", np.column_stack([tone, tone]), 48000, subtype="PCM_24")
+    
+    job.stems_folder_path = f"stems/{job.id}"
+    await db_session.commit()
+    return job
+
+
+class TestStemTranscoding:
+    """Test GET /api/jobs/{id}/stems/{stem}?format="""
+    
+    @pytest.mark.asyncio
+    async def test_opus_rendition_is_cached(self, client: AsyncClient, stem_job: Job, tmp_path):
+        """Test that the first request transcodes and later requests hit the cache"""
+        url = f"/api/jobs/{stem_job.id}/stems/vocals?format=opus&bitrate=64"
+        
+        with patch.object(transcode, "transcode_audio", wraps=transcode.transcode_audio) as encode:
+            first = await client.get(url)
+            second = await client.get(url)
+        
+        assert first.status_code == status.HTTP_200_OK
+        assert first.headers["content-type"] == "audio/ogg"
+        assert first.content == second.content
+        assert first.headers["etag"] == second.headers["etag"]
+        assert encode.call_count == 1
+        
+        (tmp_path / "vocals.opus").write_bytes(first.content)
+        with av.open(str(tmp_path / "vocals.opus")) as container:
+            stream = container.streams.audio[0]
+            assert (stream.codec_context.name, stream.channels) == ("opus", 2)
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_encode(self, client: AsyncClient, stem_job: Job):
+        """Test that simultaneous requests for a rendition are single-flighted"""
+        url = f"/api/jobs/{stem_job.id}/stems/vocals?format=mp3"
+        
+        with patch.object(transcode, "transcode_audio", wraps=transcode.transcode_audio) as encode:
+            responses = await asyncio.gather(*[client.get(url) for _ in range(5)])
+        
+        assert [r.status_code for r in responses] == [status.HTTP_200_OK] * 5
+        assert len({r.content for r in responses}) == 1
+        assert encode.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_invalid_parameters(self, client: AsyncClient, stem_job: Job):
+        """Test that unknown formats and out-of-range bitrates are rejected"""
+        base = f"/api/jobs/{stem_job.id}/stems/vocals"
+        
+        assert (await client.get(f"{base}?format=aac")).status_code == status.HTTP_400_BAD_REQUEST
+        assert (await client.get(f"{base}?format=mp3&bitrate=8")).status_code == status.HTTP_400_BAD_REQUEST
+    
+    @pytest.mark.asyncio
+    async def test_saturated_pool_returns_503(self, client: AsyncClient, stem_job: Job):
+        """Test that encodes beyond TRANSCODE_MAX_PENDING are refused"""
+        with patch.object(settings, "TRANSCODE_MAX_PENDING", 0):
+            response = await client.get(f"/api/jobs/{stem_job.id}/stems/vocals?format=flac")
+        
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["retry-after"] == "5"
+    
+    @pytest.mark.asyncio
+    async def test_least_recently_used_rendition_is_evicted(self, stem_job: Job, storage_path):
+        """Test that the cache is trimmed to its size bound, oldest first"""
+        stem = str(storage_path / "stems" / str(stem_job.id) / "vocals.wav")
+        old = await transcode.get_rendition(stem, "opus", 64)
+        os.utime(old, (0, os.stat(old).st_mtime))  # Last used long ago
+        
+        with patch.object(settings, "TRANSCODE_CACHE_MAX_BYTES", os.path.getsize(old) + 1):
+            new = await transcode.get_rendition(stem, "opus", 96)
+        
+        assert not os.path.exists(old)
+        assert os.path.exists(new)
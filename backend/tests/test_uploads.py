@@ -0,0 +1,358 @@
+"""
+Tests for streaming and resumable uploads
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+import soundfile as sf
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+from fastapi import status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.job import Job
+from app.services import ingest
+from app.services.ingest import load_ingest_manifest, get_ingest_dir, start_ingest
+from app.services import uploads
+from app.services.uploads import ResumableUploadService
+from tests.conftest import FakeRedis, make_flac
+
+
+class TestResumableUploads:
+    """Test the init / append / finalize upload protocol"""
+    
+    @pytest.mark.asyncio
+    async def test_resume_after_interrupted_chunk(
+        self, 
+        client: AsyncClient, 
+        fake_redis: FakeRedis, 
+        storage_path
+    ):
+        """Test that a client can query the offset and resume an upload"""
+        payload = make_flac()
+        
+        response = await client.post(
+            "/api/uploads", json={"filename": "song.flac", "total_size": len(payload)}
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        upload_id = response.json()["upload_id"]
+        assert response.json()["offset"] == 0
+        
+        response = await client.put(
+            f"/api/uploads/{upload_id}?offset=0", content=payload[:1000]
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["offset"] == 1000
+        
+        # A retried chunk at a stale offset is rejected with the resume point
+        response = await client.put(
+            f"/api/uploads/{upload_id}?offset=0", content=payload[:1000]
+        )
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.headers["Upload-Offset"] == "1000"
+        
+        # After a "disconnect" the client asks where to continue
+        response = await client.get(f"/api/uploads/{upload_id}")
+        offset = response.json()["offset"]
+        
+        response = await client.put(
+            f"/api/uploads/{upload_id}?offset={offset}", content=payload[offset:]
+        )
+        assert response.json()["complete"] is True
+        
+        with patch('app.api.jobs.process_audio_job') as mock_task:
+            response = await client.post(
+                "/api/jobs/create",
+                data={"project_name": "Resumed", "upload_id": upload_id}
+            )
+        
+        assert response.status_code == status.HTTP_200_OK
+        job = response.json()
+        assert job["source_file_path"] == f"uploads/{job['id']}_source.flac"
+        with open(storage_path / job["source_file_path"], "rb") as f:
+            assert f.read() == payload
+        mock_task.delay.assert_called_once_with(job["id"])
+    
+    @pytest.mark.asyncio
+    async def test_incomplete_upload_cannot_create_job(
+        self, 
+        client: AsyncClient, 
+        db_session: AsyncSession, 
+        fake_redis: FakeRedis, 
+        storage_path
+    ):
+        """Test that finalizing before all bytes arrive fails without creating a job"""
+        response = await client.post(
+            "/api/uploads", json={"filename": "song.wav", "total_size": 10}
+        )
+        upload_id = response.json()["upload_id"]
+        await client.put(f"/api/uploads/{upload_id}?offset=0", content=b"12345")
+        
+        with patch('app.api.jobs.process_audio_job'):
+            response = await client.post(
+                "/api/jobs/create",
+                data={"project_name": "Partial", "upload_id": upload_id}
+            )
+        
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.headers["Upload-Offset"] == "5"
+        result = await db_session.execute(select(Job))
+        assert result.scalars().all() == []
+    
+    @pytest.mark.asyncio
+    async def test_chunk_beyond_declared_size_rejected(
+        self, 
+        client: AsyncClient, 
+        fake_redis: FakeRedis, 
+        storage_path
+    ):
+        """Test that bytes past total_size are rejected and discarded"""
+        response = await client.post(
+            "/api/uploads", json={"filename": "song.mp3", "total_size": 4}
+        )
+        upload_id = response.json()["upload_id"]
+        
+        response = await client.put(f"/api/uploads/{upload_id}?offset=0", content=b"123456")
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        
+        response = await client.get(f"/api/uploads/{upload_id}")
+        assert response.json()["offset"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_unsupported_format_rejected(
+        self, 
+        client: AsyncClient, 
+        fake_redis: FakeRedis, 
+        storage_path
+    ):
+        """Test that unsupported extensions are rejected at init"""
+        response = await client.post(
+            "/api/uploads", json={"filename": "video.mp4", "total_size": 100}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    @pytest.mark.asyncio
+    async def test_abandoned_upload_is_removed(
+        self, 
+        client: AsyncClient, 
+        fake_redis: FakeRedis, 
+        storage_path
+    ):
+        """Test that staged bytes go once the session has expired, and live uploads stay"""
+        upload_ids = []
+        for _ in range(2):
+            response = await client.post(
+                "/api/uploads", json={"filename": "song.wav", "total_size": 10}
+            )
+            upload_ids.append(response.json()["upload_id"])
+            await client.put(f"/api/uploads/{upload_ids[-1]}?offset=0", content=b"12345")
+        abandoned, live = upload_ids
+        fake_redis.delete(f"upload:{abandoned}")
+        
+        assert ResumableUploadService(fake_redis).remove_stale_uploads() == (1, 5)
+        
+        staging = storage_path / "uploads" / ".partial"
+        assert not (staging / f"{abandoned}.part").exists()
+        assert (await client.get(f"/api/uploads/{live}")).json()["offset"] == 5
+
+
+class TestStreamingUpload:
+    """Test that multipart uploads are written in chunks"""
+    
+    @pytest.mark.asyncio
+    async def test_save_upload_reads_in_chunks(self, storage_path):
+        """Test that save_upload never reads the whole file at once"""
+        from io import BytesIO
+        from uuid import uuid4
+        from fastapi import UploadFile
+        from app.services.storage import StorageService
+        
+        payload = os.urandom(10_000)
+        upload = UploadFile(file=BytesIO(payload), filename="song.wav")
+        read_sizes = []
+        original_read = upload.read
+        
+        async def tracking_read(size=-1):
+            read_sizes.append(size)
+            return await original_read(size)
+        
+        upload.read = tracking_read
+        
+        with patch.object(settings, "UPLOAD_CHUNK_SIZE", 4096):
+            path = await StorageService().save_upload(upload, uuid4())
+        
+        assert set(read_sizes) == {4096}
+        with open(storage_path / path, "rb") as f:
+            assert f.read() == payload
+
+
+class TestPipelinedIngest:
+    """Test decoding uploads while they arrive"""
+    
+    async def _upload_and_create_job(self, client, fake_redis, payload, chunk_size):
+        response = await client.post(
+            "/api/uploads", json={"filename": "song.flac", "total_size": len(payload)}
+        )
+        upload_id = response.json()["upload_id"]
+        for offset in range(0, len(payload), chunk_size):
+            await client.put(
+                f"/api/uploads/{upload_id}?offset={offset}",
+                content=payload[offset:offset + chunk_size]
+            )
+        
+        with patch('app.api.jobs.process_audio_job'):
+            response = await client.post(
+                "/api/jobs/create",
+                data={"project_name": "Pipelined", "upload_id": upload_id}
+            )
+        assert response.status_code == status.HTTP_200_OK
+        await asyncio.gather(*ingest._finishing)
+        return response.json()
+    
+    @pytest.mark.asyncio
+    async def test_resumable_upload_is_decoded_while_arriving(
+        self, 
+        client: AsyncClient, 
+        fake_redis: FakeRedis, 
+        storage_path
+    ):
+        """Test that normalized PCM and tempo analysis are ready when the job is created"""
+        with patch.object(settings, "PIPELINED_INGEST", True):
+            job = await self._upload_and_create_job(client, fake_redis, make_flac(), 4096)
+        
+        manifest = load_ingest_manifest(job["id"])
+        assert manifest is not None
+        assert manifest["duration"] == pytest.approx(3.0)
+        assert manifest["sample_rate"] == 48000
+        info = sf.info(manifest["wav_path"])
+        assert (info.samplerate, info.channels, info.subtype) == (48000, 2, "PCM_24")
+        assert os.path.exists(manifest["onset_envelope_path"])
+        
+        # Stored relative to LOCAL_STORAGE_PATH, so the volume can be mounted elsewhere
+        with open(os.path.join(get_ingest_dir(job["id"]), "ingest.json")) as f:
+            stored = json.load(f)
+        assert stored["wav_path"] == os.path.join("ingest", job["id"], "converted_48k.wav")
+    
+    @pytest.mark.asyncio
+    async def test_analysis_runs_after_the_job_is_returned(
+        self, 
+        client: AsyncClient, 
+        fake_redis: FakeRedis, 
+        storage_path
+    ):
+        """Test that create_job doesn't wait for analysis, and the worker waits for the manifest"""
+        analyzing = threading.Event()
+        analyze = ingest.IngestPipeline._analyze
+        
+        def slow_analyze(pipeline):
+            analyzing.wait(10)
+            return analyze(pipeline)
+        
+        with patch.object(settings, "PIPELINED_INGEST", True), \
+                patch.object(ingest.IngestPipeline, "_analyze", slow_analyze), \
+                patch('app.api.jobs.process_audio_job'):
+            response = await client.post(
+                "/api/jobs/create",
+                data={"project_name": "Multipart"},
+                files={"file": ("song.flac", make_flac(), "audio/flac")}
+            )
+            assert response.status_code == status.HTTP_200_OK
+            job_id = response.json()["id"]
+            assert not os.path.exists(os.path.join(get_ingest_dir(job_id), "ingest.json"))
+            
+            worker = asyncio.ensure_future(asyncio.to_thread(load_ingest_manifest, job_id))
+            analyzing.set()
+            await asyncio.gather(*ingest._finishing)
+            manifest = await worker
+        
+        assert manifest is not None
+        assert manifest["duration"] == pytest.approx(3.0)
+    
+    def test_decoders_are_bounded(self, storage_path):
+        """Test that uploads beyond INGEST_MAX_DECODERS are left to the worker"""
+        with patch.object(settings, "PIPELINED_INGEST", True), \
+                patch.object(settings, "INGEST_MAX_DECODERS", 1):
+            first = start_ingest("upload-first")
+            assert first is not None
+            assert start_ingest("upload-second") is None
+            
+            asyncio.run(first.abort())
+            second = start_ingest("upload-second")
+            assert second is not None
+            asyncio.run(second.abort())
+    
+    @pytest.mark.asyncio
+    async def test_undecodable_upload_falls_back(
+        self, 
+        client: AsyncClient, 
+        fake_redis: FakeRedis, 
+        storage_path
+    ):
+        """Test that a decoder failure leaves the upload intact and skips ingest"""
+        payload = os.urandom(20_000)
+        media = {"duration_seconds": 1.0, "sample_rate": 44100, "channels": 2, "codec": "flac"}
+        
+        # Headers are readable, but the stream is not
+        with patch.object(settings, "PIPELINED_INGEST", True), \
+                patch('app.services.uploads.probe_media', return_value=media):
+            job = await self._upload_and_create_job(client, fake_redis, payload, 4096)
+        
+        assert load_ingest_manifest(job["id"]) is None
+        with open(storage_path / job["source_file_path"], "rb") as f:
+            assert f.read() == payload
+    
+    @pytest.mark.asyncio
+    async def test_abandoned_pipeline_is_reaped(
+        self, 
+        client: AsyncClient, 
+        fake_redis: FakeRedis, 
+        storage_path
+    ):
+        """Test that a decoder no chunk has reached for the session TTL is stopped and discarded"""
+        payload = make_flac()
+        with patch.object(settings, "PIPELINED_INGEST", True):
+            response = await client.post(
+                "/api/uploads", json={"filename": "song.flac", "total_size": len(payload)}
+            )
+            abandoned = response.json()["upload_id"]
+            await client.put(f"/api/uploads/{abandoned}?offset=0", content=payload[:4096])
+            pipeline = uploads._ingest_pipelines[abandoned]
+            pipeline.last_fed -= settings.UPLOAD_SESSION_TTL + 1
+            
+            response = await client.post(
+                "/api/uploads", json={"filename": "song.flac", "total_size": len(payload)}
+            )
+            live = response.json()["upload_id"]
+            await client.put(f"/api/uploads/{live}?offset=0", content=payload[:4096])
+        
+        assert abandoned not in uploads._ingest_pipelines
+        assert pipeline.failed and not pipeline._thread.is_alive()
+        assert not os.path.exists(pipeline.output_dir)
+        assert live in uploads._ingest_pipelines
+        await uploads._ingest_pipelines.pop(live).abort()
+    
+    def test_orphaned_ingest_output_is_removed(self, fake_redis: FakeRedis, storage_path):
+        """Test that ingest output left by a gone API process is removed once its session expired"""
+        def ingest_output(key: str, age: float):
+            os.makedirs(get_ingest_dir(key))
+            path = os.path.join(get_ingest_dir(key), "converted_48k.wav")
+            with open(path, "wb") as f:
+                f.write(b"\0" * 100)
+            written = time.time() - age
+            os.utime(path, (written, written))
+        
+        ingest_output("upload-orphaned", settings.UPLOAD_SESSION_TTL + 60)
+        ingest_output("upload-finalizing", 1)
+        ingest_output("upload-live", settings.UPLOAD_SESSION_TTL + 60)
+        ingest_output("job-output", settings.UPLOAD_SESSION_TTL + 60)
+        fake_redis.set("upload:live", "{}")
+        
+        assert ResumableUploadService(fake_redis).remove_stale_uploads() == (1, 100)
+        
+        remaining = sorted(os.listdir(storage_path / "ingest"))
+        assert remaining == ["job-output", "upload-finalizing", "upload-live"]
@@ -0,0 +1,204 @@
+"""
+Tests for background YouTube preview creation
+"""
+import os
+import numpy as np
+import soundfile as sf
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch, Mock
+from fastapi import status
+
+from app.core.config import settings
+from app.services.youtube_preview import YouTubePreviewService, PreviewStatus
+from tests.conftest import FakeRedis
+
+
+class TestYouTubePreviewAPI:
+    """Test the asynchronous preview endpoints"""
+    
+    @pytest.mark.asyncio
+    async def test_create_preview_returns_immediately(
+        self, 
+        client: AsyncClient, 
+        fake_redis: FakeRedis
+    ):
+        """Test that creating a preview only queues the download task"""
+        with patch('app.api.youtube.create_youtube_preview_task') as mock_task:
+            response = await client.post(
+                "/api/youtube/preview",
+                json={"url": "https://www.youtube.com/watch?v=test"}
+            )
+        
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        data = response.json()
+        assert data["status"] == PreviewStatus.QUEUED
+        assert data["preview_url"] is None
+        mock_task.delay.assert_called_once_with(
+            data["preview_id"], "https://www.youtube.com/watch?v=test"
+        )
+        
+        response = await client.get(f"/api/youtube/preview/{data['preview_id']}")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] == PreviewStatus.QUEUED
+    
+    @pytest.mark.asyncio
+    async def test_preview_status_not_found(
+        self, 
+        client: AsyncClient, 
+        fake_redis: FakeRedis
+    ):
+        """Test status of an unknown preview"""
+        response = await client.get("/api/youtube/preview/missing")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestYouTubePreviewService:
+    """Test preview progress publishing and download slots"""
+    
+    def _mock_download(self, service: YouTubePreviewService, tmp_path):
+        """Stub yt-dlp and conversion; returns the patch for YoutubeDL"""
+        service.audio_service = Mock()
+        service.audio_service.download_youtube.return_value = str(tmp_path / "audio.webm")
+        wav_path = tmp_path / "converted_48k.wav"
+        sf.write(wav_path, np.zeros((48000, 2), dtype=np.float32), 48000)
+        service.audio_service.convert_to_wav.return_value = str(wav_path)
+        
+        mock_ydl = Mock()
+        mock_ydl.__enter__ = Mock(return_value=mock_ydl)
+        mock_ydl.__exit__ = Mock(return_value=False)
+        mock_ydl.extract_info.return_value = {"title": "Song", "duration": 200}
+        return patch('app.services.youtube_preview.yt_dlp.YoutubeDL', return_value=mock_ydl)
+    
+    def test_download_publishes_progress(self, fake_redis: FakeRedis, tmp_path):
+        """Test that each stage is published on the preview progress channel"""
+        service = YouTubePreviewService(fake_redis)
+        
+        with patch.object(settings, "LOCAL_STORAGE_PATH", str(tmp_path)), self._mock_download(service, tmp_path):
+            service.download_and_preview("https://www.youtube.com/watch?v=test", preview_id="p1")
+            
+            channels = {channel for channel, _ in fake_redis.published}
+            statuses = [message["status"] for _, message in fake_redis.published]
+            assert channels == {"youtube_preview:p1:progress"}
+            assert statuses[0] == PreviewStatus.DOWNLOADING
+            assert statuses[-1] == PreviewStatus.READY
+            assert service.get_status("p1")["preview_url"] == "/api/youtube/preview/p1/audio"
+            assert service.get_preview_file_path("p1") == str(tmp_path / "converted_48k.wav")
+            assert os.path.exists(service.get_preview_peaks_path("p1", 0))
+    
+    def test_gcs_previews_are_stored_in_the_uploads_bucket(self, fake_redis: FakeRedis, fake_gcs, tmp_path):
+        """Test that an API instance can serve a preview another worker downloaded, and turn it into a source"""
+        from app.services.storage import StorageService
+        
+        service = YouTubePreviewService(fake_redis)
+        with self._mock_download(service, tmp_path):
+            service.download_and_preview("https://www.youtube.com/watch?v=test", preview_id="p1")
+        
+        uploads = fake_gcs.bucket(settings.GCS_BUCKET_UPLOADS)
+        assert "previews/p1/converted_48k.wav" in uploads.objects
+        assert any(name.startswith("previews/p1/peaks/") for name in uploads.objects)
+        assert service.get_preview_storage_path("p1") == f"gs://{uploads.name}/previews/p1/converted_48k.wav"
+        assert os.path.exists(service.get_preview_file_path("p1"))
+        assert os.path.exists(service.get_preview_peaks_path("p1", 0))
+        
+        source = StorageService().copy_to_source(service.get_preview_storage_path("p1"), "job1")
+        service.cleanup_preview("p1")
+        
+        assert source == f"gs://{uploads.name}/job1_source.wav"
+        assert list(uploads.objects) == ["job1_source.wav"]
+    
+    @pytest.mark.asyncio
+    async def test_gcs_preview_audio_is_served(
+        self, 
+        client: AsyncClient, 
+        fake_redis: FakeRedis, 
+        fake_gcs, 
+        tmp_path
+    ):
+        """Test that the API serves a preview from the uploads bucket, and deletes it"""
+        service = YouTubePreviewService(fake_redis)
+        with self._mock_download(service, tmp_path):
+            service.download_and_preview("https://www.youtube.com/watch?v=test", preview_id="p1")
+        uploads = fake_gcs.bucket(settings.GCS_BUCKET_UPLOADS)
+        
+        response = await client.get("/api/youtube/preview/p1/audio")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == uploads.objects["previews/p1/converted_48k.wav"]["data"]
+        response = await client.get("/api/youtube/preview/p1/peaks?level=0")
+        assert response.status_code == status.HTTP_200_OK
+        
+        await client.delete("/api/youtube/preview/p1")
+        assert not uploads.objects
+        response = await client.get("/api/youtube/preview/p1/audio")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_download_slots_are_bounded(self, fake_redis: FakeRedis):
+        """Test that no more than YOUTUBE_PREVIEW_MAX_CONCURRENT slots are handed out"""
+        service = YouTubePreviewService(fake_redis)
+        
+        with patch.object(settings, "YOUTUBE_PREVIEW_MAX_CONCURRENT", 2):
+            first = service.acquire_download_slot("a")
+            assert first and service.acquire_download_slot("b")
+            keys = set(fake_redis.data)
+            assert service.acquire_download_slot("c") is None
+            assert set(fake_redis.data) == keys  # Rejected attempts write nothing
+            
+            service.release_download_slot(first, "a")
+            assert service.acquire_download_slot("c") == first
+    
+    def test_expired_slot_is_not_released_by_its_old_holder(self, fake_redis: FakeRedis):
+        """Test that a slot reclaimed after its TTL stays with the new holder"""
+        service = YouTubePreviewService(fake_redis)
+        
+        with patch.object(settings, "YOUTUBE_PREVIEW_MAX_CONCURRENT", 1):
+            slot = service.acquire_download_slot("crashed")
+            fake_redis.delete(slot)  # TTL expired
+            assert service.acquire_download_slot("next") == slot
+            
+            service.release_download_slot(slot, "crashed")
+            assert service.acquire_download_slot("other") is None
+    
+    def test_preview_fails_when_no_slot_frees_up(self, fake_redis: FakeRedis):
+        """Test that a task waiting for a slot gives up after YOUTUBE_PREVIEW_MAX_RETRIES"""
+        from app.tasks.youtube_preview import create_youtube_preview
+        
+        service = YouTubePreviewService(fake_redis)
+        preview_id = service.create_preview("https://www.youtube.com/watch?v=test")["preview_id"]
+        
+        with patch.object(settings, "YOUTUBE_PREVIEW_MAX_CONCURRENT", 0), \
+                patch.object(create_youtube_preview, "max_retries", 2), \
+                patch('app.tasks.youtube_preview.Redis.from_url', return_value=fake_redis):
+            create_youtube_preview.apply(args=(preview_id, "https://www.youtube.com/watch?v=test"))
+        
+        preview_status = service.get_status(preview_id)
+        assert preview_status["status"] == PreviewStatus.FAILED
+        assert "download slot" in preview_status["error_message"]
+    
+    def test_expired_previews_are_removed(self, fake_redis: FakeRedis, tmp_path):
+        """Test that preview files are deleted once their record has expired"""
+        service = YouTubePreviewService(fake_redis)
+        
+        with patch.object(settings, "LOCAL_STORAGE_PATH", str(tmp_path)):
+            with self._mock_download(service, tmp_path):
+                service.download_and_preview("https://www.youtube.com/watch?v=test", preview_id="kept")
+            expired = tmp_path / "previews" / "expired"
+            expired.mkdir(parents=True)
+            (expired / "converted_48k.wav").write_bytes(b"x" * 10)
+            
+            assert service.remove_expired_previews() == (1, 10)
+            assert not expired.exists()
+            assert (tmp_path / "previews" / "kept").exists()
+    
+    def test_expired_gcs_previews_are_removed(self, fake_redis: FakeRedis, fake_gcs, tmp_path):
+        """Test that expired previews are deleted from the uploads bucket"""
+        service = YouTubePreviewService(fake_redis)
+        with self._mock_download(service, tmp_path):
+            service.download_and_preview("https://www.youtube.com/watch?v=test", preview_id="p1")
+        uploads = fake_gcs.bucket(settings.GCS_BUCKET_UPLOADS)
+        
+        assert service.remove_expired_previews() == (0, 0)
+        fake_redis.delete("youtube_preview:p1")  # TTL expired
+        removed, freed = service.remove_expired_previews()
+        
+        assert removed == 1 and freed > 0
+        assert not any(name.startswith("previews/") for name in uploads.objects)
@@ -33,6 +33,6 @@ if __name__ == '__main__':
     health_thread = threading.Thread(target=run_health_server, daemon=True)
     health_thread.start()
     
-    # Run Celery worker
-    os.execvp('celery', ['celery', '-A', 'app.celery_app', 'worker', '--loglevel=info', '--concurrency=2'])
+    # Run Celery worker (default queue for processing, "io" for YouTube previews)
+    os.execvp('celery', ['celery', '-A', 'app.celery_app', 'worker', '--loglevel=info', '--concurrency=2', '-Q', 'celery,io'])
 
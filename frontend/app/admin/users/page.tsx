@@ -41,10 +41,15 @@ import {
   XCircle,
   Shield,
   ShieldOff,
-  Clock
+  Clock,
+  ListMusic,
+  Loader2,
+  Gauge,
+  HardDrive
 } from 'lucide-react';
 import { useToast } from '@/hooks/use-toast';
 import { getApiUrl } from '@/utils/api';
+import { formatBytes } from '@/utils/utils';
 import { getAccessToken } from '@/utils/auth';
 import { User } from '@/utils/auth';
 
@@ -55,8 +60,17 @@ interface UserStats {
   admin_users: number;
   google_oauth_users: number;
   email_users: number;
+  jobs: {
+    total_jobs: number;
+    by_status: Record<string, number>;
+    per_day: { date: string; count: number }[];
+    avg_real_time_factor: number | null;
+    storage_bytes: number;
+  };
 }
 
+const FINISHED_STATUSES = ['COMPLETED', 'FAILED', 'CANCELLED'];
+
 /**
  * Admin Dashboard - User Management
  * Only accessible by admin users
@@ -288,6 +302,63 @@ export default function AdminUsersPage() {
         </Card>
       </div>
 
+      {/* Job Stats Cards */}
+      <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4 mb-8">
+        <Card>
+          <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
+            <CardTitle className="text-sm font-medium">Total Jobs</CardTitle>
+            <ListMusic className="h-4 w-4 text-muted-foreground" />
+          </CardHeader>
+          <CardContent>
+            <div className="text-2xl font-bold">
+              {isLoadingStats ? '...' : stats?.jobs.total_jobs || 0}
+            </div>
+          </CardContent>
+        </Card>
+
+        <Card>
+          <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
+            <CardTitle className="text-sm font-medium">Processing</CardTitle>
+            <Loader2 className="h-4 w-4 text-muted-foreground" />
+          </CardHeader>
+          <CardContent>
+            <div className="text-2xl font-bold">
+              {isLoadingStats
+                ? '...'
+                : Object.entries(stats?.jobs.by_status || {})
+                    .filter(([jobStatus]) => !FINISHED_STATUSES.includes(jobStatus))
+                    .reduce((total, [, count]) => total + count, 0)}
+            </div>
+          </CardContent>
+        </Card>
+
+        <Card>
+          <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
+            <CardTitle className="text-sm font-medium">Avg Real-Time Factor</CardTitle>
+            <Gauge className="h-4 w-4 text-muted-foreground" />
+          </CardHeader>
+          <CardContent>
+            <div className="text-2xl font-bold">
+              {isLoadingStats || stats?.jobs.avg_real_time_factor == null
+                ? '...'
+                : `${stats.jobs.avg_real_time_factor.toFixed(2)}x`}
+            </div>
+          </CardContent>
+        </Card>
+
+        <Card>
+          <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
+            <CardTitle className="text-sm font-medium">Storage Used</CardTitle>
+            <HardDrive className="h-4 w-4 text-muted-foreground" />
+          </CardHeader>
+          <CardContent>
+            <div className="text-2xl font-bold">
+              {isLoadingStats ? '...' : formatBytes(stats?.jobs.storage_bytes || 0)}
+            </div>
+          </CardContent>
+        </Card>
+      </div>
+
       {/* Users Table Card */}
       <Card>
         <CardHeader>
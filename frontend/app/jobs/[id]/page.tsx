@@ -301,6 +301,13 @@ export default function JobDetailPage() {
               <div>
                 <AudioWaveform 
                   audioUrl={`${getApiUrl()}/api/jobs/${job.id}/source`}
+                  peaksPath={
+                    // Source peaks are of the processed (trimmed) audio, so only use them untrimmed
+                    job.status === "COMPLETED" && job.trim_start == null
+                      ? `/api/jobs/${job.id}/peaks/source`
+                      : undefined
+                  }
+                  hlsUrl={`${getApiUrl()}/api/jobs/${job.id}/hls/source/playlist.m3u8`}
                   showControls={true}
                 />
                 <p className="text-xs text-muted-foreground mt-2 text-center">
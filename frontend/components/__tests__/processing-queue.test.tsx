@@ -1,7 +1,7 @@
 /* eslint-disable @typescript-eslint/no-unused-vars, @typescript-eslint/no-require-imports */
 /**
  * Unit tests for ProcessingQueue component
- * Tests job list rendering, polling, React Query integration, loading and error states
+ * Tests job list rendering, change feed, React Query integration, loading and error states
  */
 import React from 'react';
 import { render, screen, waitFor } from '@testing-library/react';
@@ -17,6 +17,14 @@ jest.mock('@/utils/api', () => ({
   },
 }));
 
+jest.mock('@/hooks/use-job-changes', () => ({
+  useJobChanges: jest.fn(),
+}));
+
+jest.mock('@/hooks/use-user-job-progress', () => ({
+  useUserJobProgress: jest.fn(() => false),
+}));
+
 // Mock JobCard component
 jest.mock('../job-card', () => ({
   JobCard: ({ job }: { job: Job }) => (
@@ -453,7 +461,8 @@ describe('ProcessingQueue', () => {
       );
     });
 
-    it('should configure polling with 5 second interval', () => {
+    it('should follow the change feed instead of polling the list', () => {
+      const { useJobChanges } = require('@/hooks/use-job-changes');
       (useQuery as jest.Mock).mockReturnValue({
         data: mockJobListResponse,
         isLoading: false,
@@ -462,11 +471,8 @@ describe('ProcessingQueue', () => {
 
       render(<ProcessingQueue />);
 
-      expect(useQuery).toHaveBeenCalledWith(
-        expect.objectContaining({
-          refetchInterval: 5000,
-        })
-      );
+      expect(useJobChanges).toHaveBeenCalled();
+      expect((useQuery as jest.Mock).mock.calls[0][0].refetchInterval).toBeUndefined();
     });
 
     it('should call apiClient.getJobs with correct parameters in queryFn', async () => {
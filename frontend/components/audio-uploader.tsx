@@ -320,6 +320,11 @@ export function AudioUploader() {
           </div>
           <AudioWaveform 
             audioUrl={audioPreviewUrl} 
+            peaksPath={
+              inputType === "youtube" && youtubePreviewId
+                ? `/api/youtube/preview/${youtubePreviewId}/peaks`
+                : undefined
+            }
             showControls={true} 
             enableTrimming={true}
             onTrimChange={(start, end) => {
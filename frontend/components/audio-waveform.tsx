@@ -6,9 +6,22 @@ import RegionsPlugin from "wavesurfer.js/dist/plugins/regions.esm.js";
 import { Play, Pause, Volume2, Scissors, X } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent } from "@/components/ui/card";
+import { apiClient } from "@/utils/api";
+
+// 1024 samples per min/max pair: enough detail for a full-width waveform
+const PEAKS_LEVEL = 2;
+
+const supportsNativeHls = () =>
+  typeof document !== 'undefined' &&
+  document.createElement('audio').canPlayType('application/vnd.apple.mpegurl') !== '';
 
 interface AudioWaveformProps {
   audioUrl: string;
+  /** Peaks endpoint path; draws instantly instead of decoding the whole file */
+  peaksPath?: string;
+  /** HLS playlist of the same audio; played instead of audioUrl when peaks are
+   *  loaded and the browser plays HLS natively (starts after one segment) */
+  hlsUrl?: string;
   onReady?: () => void;
   showControls?: boolean;
   enableTrimming?: boolean;
@@ -24,7 +37,7 @@ interface Region {
   color: string;
 }
 
-export function AudioWaveform({ audioUrl, onReady, showControls = true, enableTrimming = false, onTrimChange }: AudioWaveformProps) {
+export function AudioWaveform({ audioUrl, peaksPath, hlsUrl, onReady, showControls = true, enableTrimming = false, onTrimChange }: AudioWaveformProps) {
   const waveformRef = useRef<HTMLDivElement>(null);
   const wavesurfer = useRef<WaveSurfer | null>(null);
   // eslint-disable-next-line @typescript-eslint/no-explicit-any
@@ -102,8 +115,21 @@ export function AudioWaveform({ audioUrl, onReady, showControls = true, enableTr
       plugins: [regionsPlugin.current],
     });
 
+    // Render from precomputed peaks when available; audio then streams on demand
+    const instance = wavesurfer.current;
+    const loadAudio = async () => {
+      const peaks = peaksPath
+        ? await apiClient.getWaveformPeaks(peaksPath, PEAKS_LEVEL).catch(() => null)
+        : null;
+      if (wavesurfer.current !== instance) return;  // Replaced while fetching peaks
+      if (!peaks) return instance.load(audioUrl);
+      // With peaks nothing needs decoding, so the media element can stream segments
+      const mediaUrl = hlsUrl && supportsNativeHls() ? hlsUrl : audioUrl;
+      return instance.load(mediaUrl, [peaks.data], peaks.duration);
+    };
+
     // Load audio with error handling for AbortError
-    const loadPromise = wavesurfer.current.load(audioUrl);
+    const loadPromise = loadAudio();
     
     // Catch AbortError silently (happens in React StrictMode dev)
     if (loadPromise && typeof loadPromise.catch === 'function') {
@@ -177,7 +203,7 @@ export function AudioWaveform({ audioUrl, onReady, showControls = true, enableTr
       }
     };
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [audioUrl, onReady]);
+  }, [audioUrl, peaksPath, hlsUrl, onReady]);
 
   const handlePlayPause = () => {
     if (wavesurfer.current && isReady) {
@@ -68,9 +68,10 @@ function getStatusDetails(status: string): string {
 
 interface JobCardProps {
   job: Job;
+  live?: boolean;  // Progress already arrives through the user's jobs socket
 }
 
-export function JobCard({ job: initialJob }: JobCardProps) {
+export function JobCard({ job: initialJob, live = false }: JobCardProps) {
   const [job, setJob] = useState(initialJob);
   const [showCancelDialog, setShowCancelDialog] = useState(false);
   const [showDeleteDialog, setShowDeleteDialog] = useState(false);
@@ -82,7 +83,7 @@ export function JobCard({ job: initialJob }: JobCardProps) {
 
   useEffect(() => {
     // Only connect WebSocket for active jobs
-    if (["COMPLETED", "FAILED", "CANCELLED"].includes(job.status)) {
+    if (live || ["COMPLETED", "FAILED", "CANCELLED"].includes(job.status)) {
       return;
     }
 
@@ -110,7 +111,7 @@ export function JobCard({ job: initialJob }: JobCardProps) {
     return () => {
       socket.disconnect();
     };
-  }, [job.id, job.status, queryClient]);
+  }, [job.id, job.status, live, queryClient]);
 
   const handleDownload = async () => {
     // Download from backend API
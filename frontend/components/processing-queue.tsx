@@ -2,6 +2,8 @@
 
 import { useQuery } from "@tanstack/react-query";
 import { apiClient } from "@/utils/api";
+import { useJobChanges } from "@/hooks/use-job-changes";
+import { useUserJobProgress } from "@/hooks/use-user-job-progress";
 import { JobCard } from "./job-card";
 import { Loader2 } from "lucide-react";
 
@@ -9,8 +11,11 @@ export function ProcessingQueue() {
   const { data, isLoading, error } = useQuery({
     queryKey: ["jobs"],
     queryFn: () => apiClient.getJobs(1, 20),
-    refetchInterval: 5000, // Poll every 5 seconds
   });
+  // Changed jobs are merged in from the long-polled change feed instead of refetching the list
+  useJobChanges();
+  // Signed-in users get progress of all their jobs over one socket instead of one per card
+  const live = useUserJobProgress();
 
   if (isLoading) {
     return (
@@ -51,7 +56,7 @@ export function ProcessingQueue() {
           <h2 className="text-2xl font-semibold">Active Jobs</h2>
           <div className="grid gap-4">
             {activeJobs.map((job) => (
-              <JobCard key={job.id} job={job} />
+              <JobCard key={job.id} job={job} live={live} />
             ))}
           </div>
         </div>
@@ -62,7 +67,7 @@ export function ProcessingQueue() {
           <h2 className="text-2xl font-semibold">Completed Jobs</h2>
           <div className="grid gap-4">
             {completedJobs.map((job) => (
-              <JobCard key={job.id} job={job} />
+              <JobCard key={job.id} job={job} live={live} />
             ))}
           </div>
         </div>
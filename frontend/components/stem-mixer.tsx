@@ -2,10 +2,11 @@
 
 import { useEffect, useRef, useState } from "react";
 import WaveSurfer from "wavesurfer.js";
-import { Play, Pause, RotateCcw } from "lucide-react";
+import { Play, Pause, RotateCcw, Download } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card";
 import { Slider } from "@/components/ui/slider";
+import { readMultitrackWav } from "@/utils/api";
 
 interface StemMixerProps {
   jobId: string;
@@ -36,6 +37,9 @@ const volumeToDB = (volume: number): string => {
   return db >= 0 ? `+${db.toFixed(1)}` : db.toFixed(1);
 };
 
+// Quietest gain the mixdown endpoint accepts; anything lower is sent as a mute
+const MIXDOWN_MIN_DB = -60;
+
 export function StemMixer({ jobId, apiUrl }: StemMixerProps) {
   const masterWaveformRef = useRef<HTMLDivElement>(null);
   const masterWavesurfer = useRef<WaveSurfer | null>(null);
@@ -92,6 +96,48 @@ export function StemMixer({ jobId, apiUrl }: StemMixerProps) {
 
   // Initialize Audio Context and load stems
   useEffect(() => {
+    // All stems in one streamed multichannel WAV (one request, sample-aligned),
+    // decoded as it downloads and split back into one buffer per stem. Falls
+    // back to one request per stem.
+    const loadStemBuffers = async (
+      ctx: AudioContext,
+      stemTypes: StemType[]
+    ): Promise<Partial<Record<StemType, AudioBuffer>>> => {
+      try {
+        const response = await fetch(`${apiUrl}/api/jobs/${jobId}/stems`);
+        if (!response.ok || !response.body) throw new Error(`Multitrack request failed: ${response.status}`);
+
+        const order = (response.headers.get("X-Stem-Order") ?? stemTypes.join(",")).split(",") as StemType[];
+        const multitrack = await readMultitrackWav(response.body.getReader());
+        const channelsPerStem = multitrack.channels.length / order.length;
+        const length = multitrack.channels[0]?.length ?? 0;
+
+        const buffers: Partial<Record<StemType, AudioBuffer>> = {};
+        order.forEach((stemType, index) => {
+          const buffer = ctx.createBuffer(channelsPerStem, length, multitrack.sampleRate);
+          for (let channel = 0; channel < channelsPerStem; channel++) {
+            buffer.copyToChannel(multitrack.channels[index * channelsPerStem + channel], channel);
+          }
+          buffers[stemType] = buffer;
+        });
+        return buffers;
+      } catch (error) {
+        console.warn("Multitrack load failed, loading stems individually:", error);
+      }
+
+      const buffers: Partial<Record<StemType, AudioBuffer>> = {};
+      for (const stemType of stemTypes) {
+        try {
+          const response = await fetch(`${apiUrl}/api/jobs/${jobId}/stems/${stemType}`);
+          if (!response.ok) throw new Error(`Failed to load ${stemType}`);
+          buffers[stemType] = await ctx.decodeAudioData(await response.arrayBuffer());
+        } catch (error) {
+          console.error(`Error loading ${stemType}:`, error);
+        }
+      }
+      return buffers;
+    };
+
     const initAudio = async () => {
       try {
         // Check if we're in the browser
@@ -121,13 +167,12 @@ export function StemMixer({ jobId, apiUrl }: StemMixerProps) {
         const stemTypes: StemType[] = ["vocals", "drums", "bass", "other"];
         let longestDuration = 0;
 
+        const stemBuffers = await loadStemBuffers(ctx, stemTypes);
+
         for (const stemType of stemTypes) {
           try {
-            const response = await fetch(`${apiUrl}/api/jobs/${jobId}/stems/${stemType}`);
-            if (!response.ok) throw new Error(`Failed to load ${stemType}`);
-
-            const arrayBuffer = await response.arrayBuffer();
-            const audioBuffer = await ctx.decodeAudioData(arrayBuffer);
+            const audioBuffer = stemBuffers[stemType];
+            if (!audioBuffer) throw new Error(`Failed to load ${stemType}`);
 
             // Track longest duration
             if (audioBuffer.duration > longestDuration) {
@@ -292,6 +337,26 @@ export function StemMixer({ jobId, apiUrl }: StemMixerProps) {
     }
   };
 
+  // Server-rendered mix of the current fader/mute/solo settings; null when
+  // every stem is silent, which the endpoint rejects
+  const getMixdownUrl = (): string | null => {
+    const params = new URLSearchParams();
+    let audible = 0;
+    (["vocals", "drums", "bass", "other"] as StemType[]).forEach((stemType) => {
+      const isMuted = muted[stemType] || (soloed !== null && soloed !== stemType);
+      const gain = (volumes[stemType] / 100) * (volumes.master / 100);
+      const db = gain > 0 ? 20 * Math.log10(gain) : -Infinity;
+      if (isMuted || db < MIXDOWN_MIN_DB) {
+        params.append("mute", stemType);
+      } else {
+        params.set(stemType, db.toFixed(1));
+        audible++;
+      }
+    });
+    return audible > 0 ? `${apiUrl}/api/jobs/${jobId}/mixdown?${params.toString()}` : null;
+  };
+  const mixdownUrl = getMixdownUrl();
+
   const handleReset = () => {
     if (isPlaying) {
       handlePlayPause(); // Stop playback
@@ -461,6 +526,30 @@ export function StemMixer({ jobId, apiUrl }: StemMixerProps) {
               </>
             )}
           </Button>
+
+          {/* A link can't be disabled, so a silent mix gets a plain disabled button */}
+          {mixdownUrl && !isLoading ? (
+            <Button
+              variant="outline"
+              asChild
+              className="bg-slate-800 border-slate-700 hover:bg-slate-700 text-slate-200"
+            >
+              <a href={mixdownUrl} download>
+                <Download className="h-4 w-4 mr-2" />
+                Download Mix
+              </a>
+            </Button>
+          ) : (
+            <Button
+              variant="outline"
+              disabled
+              title={isLoading ? undefined : "Unmute a stem to download a mix"}
+              className="bg-slate-800 border-slate-700 hover:bg-slate-700 text-slate-200"
+            >
+              <Download className="h-4 w-4 mr-2" />
+              Download Mix
+            </Button>
+          )}
         </div>
 
         {/* Mixer Channels - DAW Style */}
@@ -675,7 +764,7 @@ export function StemMixer({ jobId, apiUrl }: StemMixerProps) {
               <strong className="text-slate-400">TIP:</strong> Click channel to view waveform • S=Solo • M=Mute • Click master to return
             </p>
             <p className="text-center">
-              Mix settings are for preview only • Download contains original stems
+              Download Mix renders the current settings • The package contains original stems
             </p>
           </div>
         )}
@@ -80,6 +80,7 @@ test.describe('Admin Dashboard', () => {
           admin_users: 1,
           google_oauth_users: 9,
           email_users: 1,
+          jobs: { total_jobs: 5, by_status: { COMPLETED: 4, SEPARATING: 1 }, per_day: [], avg_real_time_factor: 0.42, storage_bytes: 1048576 },
         }),
       });
     });
@@ -149,7 +150,7 @@ test.describe('Admin Dashboard', () => {
 
     // Verify the stats numbers are present (use more specific selectors)
     const statsCards = page.locator('.text-2xl.font-bold');
-    await expect(statsCards).toHaveCount(4); // Total, Active, Pending, Admins
+    await expect(statsCards).toHaveCount(8); // Total, Active, Pending, Admins + 4 job stats
   });
 
   test('should display user list in table', async ({ page }) => {
@@ -182,6 +183,7 @@ test.describe('Admin Dashboard', () => {
           admin_users: 1,
           google_oauth_users: 2,
           email_users: 0,
+          jobs: { total_jobs: 5, by_status: { COMPLETED: 4, SEPARATING: 1 }, per_day: [], avg_real_time_factor: 0.42, storage_bytes: 1048576 },
         }),
       });
     });
@@ -290,6 +292,7 @@ test.describe('Admin Dashboard', () => {
           admin_users: 1,
           google_oauth_users: 1,
           email_users: 0,
+          jobs: { total_jobs: 5, by_status: { COMPLETED: 4, SEPARATING: 1 }, per_day: [], avg_real_time_factor: 0.42, storage_bytes: 1048576 },
         }),
       });
     });
@@ -392,6 +395,7 @@ test.describe('Admin Dashboard', () => {
           admin_users: 1,
           google_oauth_users: 1,
           email_users: 0,
+          jobs: { total_jobs: 5, by_status: { COMPLETED: 4, SEPARATING: 1 }, per_day: [], avg_real_time_factor: 0.42, storage_bytes: 1048576 },
         }),
       });
     });
@@ -494,6 +498,7 @@ test.describe('Admin Dashboard', () => {
           admin_users: 1,
           google_oauth_users: 2,
           email_users: 0,
+          jobs: { total_jobs: 5, by_status: { COMPLETED: 4, SEPARATING: 1 }, per_day: [], avg_real_time_factor: 0.42, storage_bytes: 1048576 },
         }),
       });
     });
@@ -0,0 +1,58 @@
+import { applyJobChanges } from '../use-job-changes';
+import { Job, JobListResponse } from '@/utils/api';
+
+jest.mock('@/utils/api', () => ({
+  apiClient: {
+    getJobChanges: jest.fn(),
+  },
+}));
+
+const job = (id: string, createdAt: string, status: Job['status'] = 'SEPARATING'): Job => ({
+  id,
+  status,
+  input_type: 'upload',
+  project_name: id,
+  quality_mode: 'fast',
+  progress_percent: 0,
+  created_at: createdAt,
+});
+
+describe('applyJobChanges', () => {
+  const list: JobListResponse = {
+    jobs: [job('b', '2024-01-02T00:00:00Z'), job('a', '2024-01-01T00:00:00Z')],
+    total: null,
+    page: 1,
+    page_size: 2,
+  };
+
+  it('should replace changed jobs in place', () => {
+    const merged = applyJobChanges(list, {
+      jobs: [job('a', '2024-01-01T00:00:00Z', 'COMPLETED')],
+      deleted: [],
+      cursor: '1-0',
+      reset: false,
+    });
+
+    expect(merged.jobs.map((j) => [j.id, j.status])).toEqual([
+      ['b', 'SEPARATING'],
+      ['a', 'COMPLETED'],
+    ]);
+  });
+
+  it('should add new jobs newest first within the page size', () => {
+    const merged = applyJobChanges(list, {
+      jobs: [job('c', '2024-01-03T00:00:00Z', 'PENDING')],
+      deleted: [],
+      cursor: '1-0',
+      reset: false,
+    });
+
+    expect(merged.jobs.map((j) => j.id)).toEqual(['c', 'b']);
+  });
+
+  it('should drop deleted jobs', () => {
+    const merged = applyJobChanges(list, { jobs: [], deleted: ['b'], cursor: '1-0', reset: false });
+
+    expect(merged.jobs.map((j) => j.id)).toEqual(['a']);
+  });
+});
@@ -0,0 +1,38 @@
+import { applyProgressUpdate } from '../use-user-job-progress';
+import { Job, JobListResponse } from '@/utils/api';
+
+jest.mock('@/utils/websocket', () => ({
+  UserJobsSocket: jest.fn(),
+}));
+
+const job = (id: string, status: Job['status'] = 'SEPARATING'): Job => ({
+  id,
+  status,
+  input_type: 'upload',
+  project_name: id,
+  quality_mode: 'fast',
+  progress_percent: 0,
+  created_at: '2024-01-01T00:00:00Z',
+});
+
+describe('applyProgressUpdate', () => {
+  const list: JobListResponse = {
+    jobs: [job('b'), job('a')],
+    total: null,
+    page: 1,
+    page_size: 20,
+  };
+
+  it('should update status and progress of the job', () => {
+    const updated = applyProgressUpdate(list, { job_id: 'a', status: 'FINALIZING', progress_percent: 90 });
+
+    expect(updated.jobs.map((j) => [j.id, j.status, j.progress_percent])).toEqual([
+      ['b', 'SEPARATING', 0],
+      ['a', 'FINALIZING', 90],
+    ]);
+  });
+
+  it('should leave the list alone for jobs not on the page', () => {
+    expect(applyProgressUpdate(list, { job_id: 'z', status: 'SEPARATING', progress_percent: 5 })).toBe(list);
+  });
+});
@@ -0,0 +1,70 @@
+"use client";
+
+import { useEffect } from "react";
+import { useQueryClient } from "@tanstack/react-query";
+import { apiClient, JobChangesResponse, JobListResponse } from "@/utils/api";
+
+const LONG_POLL_SECONDS = 55;
+const RETRY_DELAY_MS = 5000;
+
+/**
+ * Merge a change feed response into a cached job list page
+ */
+export function applyJobChanges(
+  list: JobListResponse,
+  changes: JobChangesResponse
+): JobListResponse {
+  const changedIds = new Set(changes.jobs.map((job) => job.id));
+  const deletedIds = new Set(changes.deleted);
+  const unchanged = list.jobs.filter(
+    (job) => !changedIds.has(job.id) && !deletedIds.has(job.id)
+  );
+  const jobs = [...changes.jobs, ...unchanged]
+    .sort((a, b) => b.created_at.localeCompare(a.created_at))
+    .slice(0, list.page_size);
+  return { ...list, jobs };
+}
+
+/**
+ * Keep the cached ["jobs"] list in sync through GET /api/jobs/changes
+ *
+ * Long-polls the change feed, so updates arrive as soon as a job changes
+ * while an idle list costs about one request per minute.
+ */
+export function useJobChanges() {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    const controller = new AbortController();
+    const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+    async function follow() {
+      let cursor: string | null = null;
+      while (!controller.signal.aborted) {
+        try {
+          const changes = await apiClient.getJobChanges(
+            cursor ?? undefined,
+            cursor ? LONG_POLL_SECONDS : 0,
+            controller.signal
+          );
+          if (cursor === null || changes.reset) {
+            // (Re)load the list after taking the cursor, so no change falls in between
+            await queryClient.invalidateQueries({ queryKey: ["jobs"] });
+          } else if (changes.jobs.length > 0 || changes.deleted.length > 0) {
+            queryClient.setQueryData<JobListResponse>(
+              ["jobs"],
+              (list) => list && applyJobChanges(list, changes)
+            );
+          }
+          cursor = changes.cursor;
+        } catch {
+          if (controller.signal.aborted) return;
+          await sleep(RETRY_DELAY_MS);
+        }
+      }
+    }
+
+    follow();
+    return () => controller.abort();
+  }, [queryClient]);
+}
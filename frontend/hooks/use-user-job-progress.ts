@@ -0,0 +1,64 @@
+"use client";
+
+import { useEffect, useState } from "react";
+import { useQueryClient } from "@tanstack/react-query";
+import { Job, JobListResponse } from "@/utils/api";
+import { getAccessToken } from "@/utils/auth";
+import { UserJobsSocket, type JobProgressUpdate } from "@/utils/websocket";
+
+/**
+ * Apply a progress update to a cached job list page
+ *
+ * Jobs not on the page are left to the change feed (useJobChanges).
+ */
+export function applyProgressUpdate(
+  list: JobListResponse,
+  update: JobProgressUpdate
+): JobListResponse {
+  if (!list.jobs.some((job) => job.id === update.job_id)) return list;
+  const jobs = list.jobs.map((job) =>
+    job.id === update.job_id
+      ? {
+          ...job,
+          status: update.status as Job["status"],
+          progress_percent: update.progress_percent,
+        }
+      : job
+  );
+  return { ...list, jobs };
+}
+
+/**
+ * Follow progress of all of the signed-in user's jobs over one WebSocket
+ *
+ * Updates are written into the cached ["jobs"] list. Returns whether the
+ * socket is open, so job cards can skip opening one socket per job. Until
+ * it opens, and if the server refuses it, job cards use their own sockets.
+ */
+export function useUserJobProgress(): boolean {
+  const queryClient = useQueryClient();
+  const [live, setLive] = useState(false);
+
+  useEffect(() => {
+    if (!getAccessToken()) return;
+
+    const socket = new UserJobsSocket(
+      (update) => {
+        queryClient.setQueryData<JobListResponse>(
+          ["jobs"],
+          (list) => list && applyProgressUpdate(list, update)
+        );
+      },
+      undefined,
+      setLive
+    );
+    socket.connect();
+
+    return () => {
+      socket.disconnect();
+      setLive(false);
+    };
+  }, [queryClient]);
+
+  return live;
+}
@@ -4,7 +4,7 @@
  * Tests ApiClient class, methods, error handling, and URL detection
  */
 
-import { getApiUrl, apiClient, Job, JobStatus, JobListResponse, YouTubePreviewResponse } from '../api';
+import { getApiUrl, apiClient, Job, JobStatus, JobListResponse, YouTubePreviewResponse, readMultitrackWav } from '../api';
 import * as auth from '../auth';
 
 // Access the unexported ApiClient class for testing
@@ -789,3 +789,50 @@ describe('apiClient singleton', () => {
     expect(callUrl).toMatch(/^https?:\/\/.+\/api\/jobs\?page=1&page_size=20$/);
   });
 });
+
+describe('readMultitrackWav', () => {
+  // 2 channels, 24-bit, 3 frames
+  const wav = (() => {
+    const samples = [[0, 4194304], [-8388608, 8388607], [1, -1]];
+    const bytes = new Uint8Array(44 + samples.length * 6);
+    const view = new DataView(bytes.buffer);
+    bytes.set([82, 73, 70, 70], 0);  // RIFF
+    view.setUint32(4, bytes.length - 8, true);
+    bytes.set([87, 65, 86, 69, 102, 109, 116, 32], 8);  // WAVEfmt
+    view.setUint32(16, 16, true);
+    view.setUint16(20, 1, true);
+    view.setUint16(22, 2, true);
+    view.setUint32(24, 44100, true);
+    view.setUint32(28, 44100 * 6, true);
+    view.setUint16(32, 6, true);
+    view.setUint16(34, 24, true);
+    bytes.set([100, 97, 116, 97], 36);  // data
+    view.setUint32(40, samples.length * 6, true);
+    samples.flat().forEach((sample, index) => {
+      const value = sample & 0xffffff;
+      bytes.set([value & 0xff, (value >> 8) & 0xff, (value >> 16) & 0xff], 44 + index * 3);
+    });
+    return bytes;
+  })();
+
+  const reader = (chunks: Uint8Array[]) => ({
+    read: async () => {
+      const value = chunks.shift();
+      return value ? { done: false, value } : { done: true };
+    },
+  });
+
+  it('decodes chunks split mid-header and mid-frame', async () => {
+    const chunks = [wav.slice(0, 20), wav.slice(20, 50), wav.slice(50)];
+    const audio = await readMultitrackWav(reader(chunks));
+
+    expect(audio.sampleRate).toBe(44100);
+    expect(audio.channels).toHaveLength(2);
+    expect(Array.from(audio.channels[0])).toEqual([0, -1, 1 / 8388608]);
+    expect(Array.from(audio.channels[1])).toEqual([0.5, 8388607 / 8388608, -1 / 8388608]);
+  });
+
+  it('rejects a truncated stream', async () => {
+    await expect(readMultitrackWav(reader([wav.slice(0, 50)]))).rejects.toThrow('ended early');
+  });
+});
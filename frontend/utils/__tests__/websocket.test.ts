@@ -3,7 +3,11 @@
  * Unit tests for WebSocket utility
  * Tests WebSocket connection, reconnection logic, message handling, and callbacks
  */
-import { JobProgressSocket, JobProgressUpdate } from '../websocket';
+import { JobProgressSocket, JobProgressUpdate, UserJobsSocket } from '../websocket';
+
+jest.mock('../auth', () => ({
+  getAccessToken: jest.fn(() => 'access-token'),
+}));
 
 // Mock WebSocket
 class MockWebSocket {
@@ -296,6 +300,20 @@ describe('JobProgressSocket', () => {
       expect(mockOnUpdate).toHaveBeenCalledWith(mockUpdate);
     });
 
+    it('should answer heartbeat messages without reporting them', () => {
+      socket = new JobProgressSocket('job-123', mockOnUpdate);
+      socket.connect();
+
+      jest.runAllTimers();
+
+      const mockWs = (socket as any).ws as MockWebSocket;
+      const send = jest.spyOn(mockWs, 'send');
+      mockWs.onmessage!(new MessageEvent('message', { data: JSON.stringify({ type: 'heartbeat' }) }));
+
+      expect(mockOnUpdate).not.toHaveBeenCalled();
+      expect(send).toHaveBeenCalledWith(JSON.stringify({ type: 'pong' }));
+    });
+
     it('should handle invalid JSON gracefully', () => {
       socket = new JobProgressSocket('job-123', mockOnUpdate);
       socket.connect();
@@ -355,6 +373,23 @@ describe('JobProgressSocket', () => {
       expect(console.log).toHaveBeenCalledWith('Attempting to reconnect (1/5)...');
     });
 
+    it('should resume after the last received event on reconnect', () => {
+      socket = new JobProgressSocket('job-123', mockOnUpdate);
+      socket.connect();
+
+      jest.runAllTimers();
+
+      let mockWs = (socket as any).ws as MockWebSocket;
+      mockWs.onmessage!(new MessageEvent('message', {
+        data: JSON.stringify({ job_id: 'job-123', status: 'SEPARATING', progress_percent: 40, event_id: '1700000000000-3' }),
+      }));
+      mockWs.close();
+      jest.advanceTimersByTime(1000);
+
+      mockWs = (socket as any).ws as MockWebSocket;
+      expect(mockWs.url).toBe('ws://localhost:8001/ws/jobs/job-123/progress?last_event_id=1700000000000-3');
+    });
+
     it('should increase reconnect delay exponentially', () => {
       socket = new JobProgressSocket('job-123', mockOnUpdate);
       socket.connect();
@@ -834,4 +869,122 @@ describe('JobProgressSocket', () => {
       expect(mockOnError).toHaveBeenCalledTimes(1);
     });
   });
+
+  describe('Server-Sent Events fallback', () => {
+    class MockEventSource {
+      static instances: MockEventSource[] = [];
+      public onmessage: ((event: MessageEvent) => void) | null = null;
+      public closed = false;
+
+      constructor(public url: string) {
+        MockEventSource.instances.push(this);
+      }
+
+      close() {
+        this.closed = true;
+      }
+    }
+
+    beforeEach(() => {
+      MockEventSource.instances = [];
+      (global as any).EventSource = MockEventSource;
+    });
+
+    afterEach(() => {
+      delete (global as any).EventSource;
+    });
+
+    const exhaustReconnects = (target: JobProgressSocket) => {
+      (target as any).reconnectAttempts = 5;
+      ((target as any).ws as MockWebSocket).close();
+    };
+
+    it('should follow the job over SSE once WebSocket reconnects are exhausted', () => {
+      socket = new JobProgressSocket('job-123', mockOnUpdate);
+      socket.connect();
+      jest.runAllTimers();
+      ((socket as any).ws as MockWebSocket).onmessage!(new MessageEvent('message', {
+        data: JSON.stringify({ job_id: 'job-123', status: 'SEPARATING', progress_percent: 40, event_id: '1700000000000-3' }),
+      }));
+
+      exhaustReconnects(socket);
+
+      const [events] = MockEventSource.instances;
+      expect(events.url).toBe('http://localhost:8000/api/jobs/job-123/events?last_event_id=1700000000000-3');
+      events.onmessage!(new MessageEvent('message', {
+        data: JSON.stringify({ job_id: 'job-123', status: 'COMPLETED', progress_percent: 100, event_id: '1700000000000-4' }),
+      }));
+      expect(mockOnUpdate).toHaveBeenLastCalledWith(expect.objectContaining({ status: 'COMPLETED' }));
+
+      socket.disconnect();
+      expect(events.closed).toBe(true);
+    });
+
+    it('should not fall back for the user jobs socket', () => {
+      const userSocket = new UserJobsSocket(mockOnUpdate);
+      userSocket.connect();
+      jest.runAllTimers();
+
+      exhaustReconnects(userSocket);
+
+      expect(MockEventSource.instances).toHaveLength(0);
+    });
+  });
+
+  describe('UserJobsSocket', () => {
+    it('should connect to the user endpoint with the access token', () => {
+      const userSocket = new UserJobsSocket(mockOnUpdate);
+      userSocket.connect();
+
+      const mockWs = (userSocket as any).ws as MockWebSocket;
+      expect(mockWs.url).toBe('ws://localhost:8001/ws/users/me/jobs?token=access-token');
+      expect(console.log).not.toHaveBeenCalledWith(expect.stringContaining('access-token'));
+      userSocket.disconnect();
+    });
+
+    it('should keep the token when resuming', () => {
+      const userSocket = new UserJobsSocket(mockOnUpdate);
+      userSocket.connect();
+      jest.runAllTimers();
+
+      let mockWs = (userSocket as any).ws as MockWebSocket;
+      mockWs.onmessage!(new MessageEvent('message', {
+        data: JSON.stringify({ job_id: 'job-9', status: 'SEPARATING', progress_percent: 10, event_id: '1700000000000-0' }),
+      }));
+      mockWs.close();
+      jest.advanceTimersByTime(1000);
+
+      mockWs = (userSocket as any).ws as MockWebSocket;
+      expect(mockWs.url).toBe(
+        'ws://localhost:8001/ws/users/me/jobs?token=access-token&last_event_id=1700000000000-0'
+      );
+      expect(mockOnUpdate).toHaveBeenCalledWith(expect.objectContaining({ job_id: 'job-9' }));
+    });
+
+    it('should report live only once the socket is open', () => {
+      const onLiveChange = jest.fn();
+      const userSocket = new UserJobsSocket(mockOnUpdate, undefined, onLiveChange);
+      userSocket.connect();
+
+      expect(onLiveChange).not.toHaveBeenCalled();
+      jest.runAllTimers();
+      expect(onLiveChange).toHaveBeenLastCalledWith(true);
+      userSocket.disconnect();
+    });
+
+    it('should stop and report not live when the token is refused', () => {
+      const onLiveChange = jest.fn();
+      const userSocket = new UserJobsSocket(mockOnUpdate, undefined, onLiveChange);
+      userSocket.connect();
+      jest.runAllTimers();
+
+      const mockWs = (userSocket as any).ws as MockWebSocket;
+      mockWs.onclose!(new CloseEvent('close', { code: 1008 }));
+      jest.runAllTimers();
+
+      expect(onLiveChange).toHaveBeenLastCalledWith(false);
+      expect((userSocket as any).ws).toBe(mockWs);
+      expect(console.log).not.toHaveBeenCalledWith(expect.stringContaining('Attempting to reconnect'));
+    });
+  });
 });
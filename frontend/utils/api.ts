@@ -45,6 +45,10 @@ export interface Job {
   input_url?: string;
   project_name: string;
   quality_mode: "fast" | "high";
+  duration_seconds?: number;
+  sample_rate?: number;
+  channels?: number;
+  codec?: string;
   detected_bpm?: number;
   manual_bpm?: number;
   trim_start?: number;
@@ -92,11 +96,166 @@ export interface YouTubePreviewResponse {
   thumbnail?: string;
 }
 
+export type YouTubePreviewState =
+  | "queued"
+  | "downloading"
+  | "converting"
+  | "ready"
+  | "failed";
+
+export interface YouTubePreviewStatus {
+  preview_id: string;
+  status: YouTubePreviewState;
+  progress_percent: number;
+  preview_url?: string | null;
+  title?: string | null;
+  duration?: number | null;
+  thumbnail?: string | null;
+  error_message?: string | null;
+}
+
+export interface UploadStatus {
+  upload_id: string;
+  filename: string;
+  total_size: number;
+  offset: number;
+  complete: boolean;
+  chunk_size: number;
+}
+
+export interface WaveformPeaks {
+  sampleRate: number;
+  samplesPerPixel: number;
+  /** Interleaved min/max pairs, normalized to -1..1 */
+  data: Float32Array;
+  duration: number;
+}
+
+/** Parse an audiowaveform .dat (version 1) file served by the peaks endpoints */
+export function parseWaveformPeaks(buffer: ArrayBuffer): WaveformPeaks {
+  const view = new DataView(buffer);
+  const is8Bit = (view.getUint32(4, true) & 1) === 1;
+  const sampleRate = view.getInt32(8, true);
+  const samplesPerPixel = view.getInt32(12, true);
+  const length = view.getUint32(16, true);
+  const values = is8Bit
+    ? new Int8Array(buffer, 20, length * 2)
+    : new Int16Array(buffer.slice(20, 20 + length * 4));
+  const scale = is8Bit ? 128 : 32768;
+  return {
+    sampleRate,
+    samplesPerPixel,
+    data: Float32Array.from(values, (value) => value / scale),
+    duration: (length * samplesPerPixel) / sampleRate,
+  };
+}
+
+export interface MultitrackAudio {
+  sampleRate: number;
+  channels: Float32Array[];  // Every channel of every stem, in file order
+}
+
+/**
+ * Decode a 24-bit PCM WAV (the /stems multitrack) while it downloads
+ *
+ * Samples are converted chunk by chunk as they arrive, so decoding overlaps
+ * the download and the file is never buffered whole.
+ */
+export async function readMultitrackWav(
+  reader: { read(): Promise<{ done: boolean; value?: Uint8Array }> }
+): Promise<MultitrackAudio> {
+  let pending = new Uint8Array(0);
+  let header: { channels: number; sampleRate: number; frames: number } | null = null;
+  let channels: Float32Array[] = [];
+  let frame = 0;
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (value?.length) {
+      const joined = new Uint8Array(pending.length + value.length);
+      joined.set(pending);
+      joined.set(value, pending.length);
+      pending = joined;
+    }
+
+    if (!header) {
+      const parsed = parseWavHeader(pending);
+      if (!parsed) {
+        if (done) throw new Error("Incomplete WAV header");
+        continue;
+      }
+      header = parsed;
+      channels = Array.from({ length: parsed.channels }, () => new Float32Array(parsed.frames));
+      pending = pending.subarray(parsed.dataOffset);
+    }
+
+    // Whole frames only; a split frame waits for the next chunk
+    const blockAlign = header.channels * 3;
+    const frames = Math.min(Math.floor(pending.length / blockAlign), header.frames - frame);
+    for (let i = 0; i < frames; i++, frame++) {
+      for (let channel = 0; channel < header.channels; channel++) {
+        const offset = i * blockAlign + channel * 3;
+        const sample = (pending[offset] | (pending[offset + 1] << 8) | (pending[offset + 2] << 16)) << 8 >> 8;
+        channels[channel][frame] = sample / 8388608;
+      }
+    }
+    pending = pending.subarray(frames * blockAlign);
+
+    if (done) break;
+  }
+
+  if (!header || frame < header.frames) throw new Error("Multitrack stream ended early");
+  return { sampleRate: header.sampleRate, channels };
+}
+
+function parseWavHeader(bytes: Uint8Array) {
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  if (bytes.length < 12) return null;
+  let offset = 12;  // RIFF header
+  let format: { channels: number; sampleRate: number; bits: number } | null = null;
+  while (offset + 8 <= bytes.length) {
+    const id = String.fromCharCode(...bytes.subarray(offset, offset + 4));
+    const size = view.getUint32(offset + 4, true);
+    if (id === "data") {
+      if (!format) throw new Error("WAV data before its format");
+      if (format.bits !== 24) throw new Error(`Unsupported WAV sample size: ${format.bits} bits`);
+      const frames = Math.floor(size / (format.channels * 3));
+      return { channels: format.channels, sampleRate: format.sampleRate, frames, dataOffset: offset + 8 };
+    }
+    if (offset + 8 + size > bytes.length) return null;
+    if (id === "fmt ") {
+      format = {
+        channels: view.getUint16(offset + 10, true),
+        sampleRate: view.getUint32(offset + 12, true),
+        bits: view.getUint16(offset + 22, true),
+      };
+    }
+    offset += 8 + size + (size % 2);  // Chunks are word-aligned
+  }
+  return null;
+}
+
+// Files above this size go through the resumable /api/uploads protocol
+export const RESUMABLE_UPLOAD_THRESHOLD = 64 * 1024 * 1024;
+
 export interface JobListResponse {
   jobs: Job[];
-  total: number;
+  total: number | null;  // null when requested with includeTotal: false
   page: number;
   page_size: number;
+  next_cursor?: string | null;  // Pass as `cursor` to fetch the next page
+}
+
+export interface JobStatusBatchResponse {
+  jobs: Record<string, [Job["status"], number]>;  // Job ID -> [status, progress_percent]
+  missing: string[];
+}
+
+export interface JobChangesResponse {
+  jobs: Job[];  // Current state of the jobs that changed
+  deleted: string[];
+  cursor: string;  // Pass as `since` for the next call
+  reset: boolean;  // `since` expired: reload the job list, then continue from `cursor`
 }
 
 class ApiClient {
@@ -175,7 +334,12 @@ class ApiClient {
     formData.append("quality_mode", data.quality_mode);
     
     if (data.input_type === "upload" && file) {
-      formData.append("file", file);
+      if (file.size > RESUMABLE_UPLOAD_THRESHOLD) {
+        const upload = await this.uploadFileResumable(file);
+        formData.append("upload_id", upload.upload_id);
+      } else {
+        formData.append("file", file);
+      }
     } else if (data.input_type === "youtube") {
       if (data.input_url) {
         formData.append("input_url", data.input_url);
@@ -243,10 +407,76 @@ class ApiClient {
     return response.json();
   }
 
-  async getJobs(page = 1, pageSize = 20): Promise<JobListResponse> {
-    return this.request<JobListResponse>(
-      `/api/jobs?page=${page}&page_size=${pageSize}`
-    );
+  async uploadFileResumable(
+    file: File,
+    onProgress?: (sentBytes: number, totalBytes: number) => void,
+    maxRetries = 5
+  ): Promise<UploadStatus> {
+    let upload = await this.request<UploadStatus>("/api/uploads", {
+      method: "POST",
+      body: JSON.stringify({ filename: file.name, total_size: file.size }),
+    });
+
+    let retries = 0;
+    while (!upload.complete) {
+      const chunk = file.slice(upload.offset, upload.offset + upload.chunk_size);
+      try {
+        upload = await this.request<UploadStatus>(
+          `/api/uploads/${upload.upload_id}?offset=${upload.offset}`,
+          {
+            method: "PUT",
+            body: chunk,
+            headers: { "Content-Type": "application/octet-stream" },
+          }
+        );
+        retries = 0;
+        onProgress?.(upload.offset, upload.total_size);
+      } catch (error) {
+        if (++retries > maxRetries) {
+          throw error;
+        }
+        // Resume from whatever the server actually received
+        await new Promise((resolve) => setTimeout(resolve, 1000 * retries));
+        upload = await this.request<UploadStatus>(`/api/uploads/${upload.upload_id}`);
+      }
+    }
+
+    return upload;
+  }
+
+  async getJobs(
+    page = 1,
+    pageSize = 20,
+    options: {
+      cursor?: string;
+      includeTotal?: boolean;
+      status?: "active" | "finished";
+      scope?: "mine" | "all";  // "all" is admin-only; the default is the caller's own jobs
+    } = {}
+  ): Promise<JobListResponse> {
+    let query = `page=${page}&page_size=${pageSize}`;
+    if (options.cursor) query += `&cursor=${encodeURIComponent(options.cursor)}`;
+    if (options.status) query += `&status=${options.status}`;
+    if (options.scope) query += `&scope=${options.scope}`;
+    if (options.includeTotal === false) query += "&include_total=false";
+    return this.request<JobListResponse>(`/api/jobs?${query}`);
+  }
+
+  async getJobChanges(
+    since?: string,
+    waitSeconds = 0,
+    signal?: AbortSignal
+  ): Promise<JobChangesResponse> {
+    let query = `wait=${waitSeconds}`;
+    if (since) query += `&since=${encodeURIComponent(since)}`;
+    return this.request<JobChangesResponse>(`/api/jobs/changes?${query}`, { signal });
+  }
+
+  async getJobStatuses(jobIds: string[]): Promise<JobStatusBatchResponse> {
+    return this.request<JobStatusBatchResponse>("/api/jobs/status:batch", {
+      method: "POST",
+      body: JSON.stringify({ job_ids: jobIds }),
+    });
   }
 
   async getJob(jobId: string): Promise<Job> {
@@ -267,11 +497,43 @@ class ApiClient {
     return this.request<{ status: string; [key: string]: string }>("/api/health");
   }
 
-  async createYouTubePreview(url: string): Promise<YouTubePreviewResponse> {
-    return this.request<YouTubePreviewResponse>("/api/youtube/preview", {
+  async createYouTubePreview(
+    url: string,
+    onProgress?: (status: YouTubePreviewStatus) => void,
+    pollIntervalMs = 1000
+  ): Promise<YouTubePreviewResponse> {
+    // The download runs in the background; poll until the preview is ready
+    let preview = await this.request<YouTubePreviewStatus>("/api/youtube/preview", {
       method: "POST",
       body: JSON.stringify({ url }),
     });
+
+    while (preview.status && preview.status !== "ready") {
+      if (preview.status === "failed") {
+        throw new Error(preview.error_message || "Failed to download YouTube audio");
+      }
+      onProgress?.(preview);
+      await new Promise((resolve) => setTimeout(resolve, pollIntervalMs));
+      preview = await this.getYouTubePreviewStatus(preview.preview_id);
+    }
+
+    return preview as YouTubePreviewResponse;
+  }
+
+  async getYouTubePreviewStatus(previewId: string): Promise<YouTubePreviewStatus> {
+    return this.request<YouTubePreviewStatus>(`/api/youtube/preview/${previewId}`);
+  }
+
+  /**
+   * Fetch precomputed waveform peaks, e.g. `/api/jobs/{id}/peaks/vocals`.
+   * Returns null when none exist (older jobs), so callers can decode audio instead.
+   */
+  async getWaveformPeaks(peaksPath: string, level = 0): Promise<WaveformPeaks | null> {
+    const response = await fetch(`${this.baseUrl}${peaksPath}?level=${level}`);
+    if (!response.ok) {
+      return null;
+    }
+    return parseWaveformPeaks(await response.arrayBuffer());
   }
 }
 
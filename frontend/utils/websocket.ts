@@ -1,5 +1,11 @@
 "use client";
 
+import { getApiUrl } from "./api";
+import { getAccessToken } from "./auth";
+
+// Close code the server uses to refuse a connection (e.g. an invalid token)
+const POLICY_VIOLATION_CLOSE_CODE = 1008;
+
 // Smart WebSocket URL - uses wss:// for HTTPS, ws:// for HTTP
 const getWsUrl = () => {
   if (typeof window !== 'undefined') {
@@ -17,16 +23,19 @@ export interface JobProgressUpdate {
   status: string;
   progress_percent: number;
   message?: string;
+  event_id?: string;  // Sent back as last_event_id on reconnect to replay missed updates
 }
 
 export class JobProgressSocket {
   private ws: WebSocket | null = null;
-  private jobId: string;
+  private events: EventSource | null = null;
+  protected jobId: string;
   private onUpdate: (update: JobProgressUpdate) => void;
   private onError?: (error: Event) => void;
   private reconnectAttempts = 0;
   private maxReconnectAttempts = 5;
   private reconnectDelay = 1000;
+  private lastEventId: string | null = null;
 
   constructor(
     jobId: string,
@@ -42,34 +51,38 @@ export class JobProgressSocket {
     try {
       // Recalculate WS_URL in case it's dynamic
       const wsUrl = getWsUrl();
-      // Use /ws/ path for Cloudflare tunnel compatibility (avoids conflict with /jobs pages)
-      const url = `${wsUrl}/ws/jobs/${this.jobId}/progress`;
-      console.log(`WebSocket connecting to: ${url}`);
+      // New connections get the latest update first; reconnects resume after the last one seen
+      const params = this.params();
+      if (this.lastEventId) params.set("last_event_id", this.lastEventId);
+      const query = params.toString();
+      const url = `${wsUrl}${this.path()}${query ? `?${query}` : ""}`;
+      console.log(`WebSocket connecting to: ${wsUrl}${this.path()}`);
       this.ws = new WebSocket(url);
 
       this.ws.onopen = () => {
-        console.log(`WebSocket connected for job ${this.jobId}`);
+        console.log(`WebSocket connected for ${this.label()}`);
         this.reconnectAttempts = 0;
+        this.opened();
       };
 
       this.ws.onmessage = (event) => {
-        try {
-          const update = JSON.parse(event.data) as JobProgressUpdate;
-          this.onUpdate(update);
-        } catch (error) {
-          console.error("Failed to parse WebSocket message:", error);
-        }
+        this.handleMessage(event.data);
       };
 
       this.ws.onerror = (error) => {
-        console.error(`WebSocket error for job ${this.jobId}:`, error);
+        console.error(`WebSocket error for ${this.label()}:`, error);
         if (this.onError) {
           this.onError(error);
         }
       };
 
-      this.ws.onclose = () => {
-        console.log(`WebSocket closed for job ${this.jobId}`);
+      this.ws.onclose = (event) => {
+        console.log(`WebSocket closed for ${this.label()}`);
+        if (event.code === POLICY_VIOLATION_CLOSE_CODE) {
+          // Refused by the server; retrying won't help
+          this.fallBack();
+          return;
+        }
         this.attemptReconnect();
       };
     } catch (error) {
@@ -80,6 +93,61 @@ export class JobProgressSocket {
     }
   }
 
+  private handleMessage(data: string) {
+    try {
+      const message = JSON.parse(data);
+      if (message.type === "heartbeat") {
+        // Answered so the server knows this client is still reading
+        this.ws?.send(JSON.stringify({ type: "pong" }));
+        return;
+      }
+      const update = message as JobProgressUpdate;
+      if (update.event_id) this.lastEventId = update.event_id;
+      this.onUpdate(update);
+    } catch (error) {
+      console.error("Failed to parse WebSocket message:", error);
+    }
+  }
+
+  protected opened() {}
+
+  protected path(): string {
+    // Use /ws/ path for Cloudflare tunnel compatibility (avoids conflict with /jobs pages)
+    return `/ws/jobs/${this.jobId}/progress`;
+  }
+
+  protected params(): URLSearchParams {
+    return new URLSearchParams();
+  }
+
+  protected label(): string {
+    return `job ${this.jobId}`;
+  }
+
+  // Server-Sent Events endpoint on the API, for networks that drop WebSockets
+  protected eventsUrl(): string | null {
+    const resume = this.lastEventId ? `?last_event_id=${encodeURIComponent(this.lastEventId)}` : "";
+    return `${getApiUrl()}/api/jobs/${this.jobId}/events${resume}`;
+  }
+
+  // Called once WebSocket reconnects are exhausted, or the server refused the connection
+  protected fallBack() {
+    const url = this.eventsUrl();
+    if (url && typeof EventSource !== "undefined") {
+      this.openEventStream(url);
+    }
+  }
+
+  private openEventStream(url: string) {
+    console.log(`Falling back to Server-Sent Events for ${this.label()}`);
+    // EventSource reconnects by itself and resumes with Last-Event-ID;
+    // the API ends the stream for good once the job is finished
+    this.events = new EventSource(url);
+    this.events.onmessage = (event) => {
+      this.handleMessage(event.data);
+    };
+  }
+
   private attemptReconnect() {
     if (this.reconnectAttempts < this.maxReconnectAttempts) {
       this.reconnectAttempts++;
@@ -91,6 +159,10 @@ export class JobProgressSocket {
       }, this.reconnectDelay * this.reconnectAttempts);
     } else {
       console.log("Max reconnection attempts reached");
+      // ws is null once disconnect() was called
+      if (this.ws !== null) {
+        this.fallBack();
+      }
     }
   }
 
@@ -99,6 +171,10 @@ export class JobProgressSocket {
       this.ws.close();
       this.ws = null;
     }
+    if (this.events) {
+      this.events.close();
+      this.events = null;
+    }
   }
 
   isConnected(): boolean {
@@ -106,3 +182,46 @@ export class JobProgressSocket {
   }
 }
 
+/**
+ * Progress of all of the signed-in user's jobs over one connection
+ *
+ * Updates have the same shape as on the per-job socket; use job_id to
+ * tell them apart. onLiveChange reports true once the socket is open, and
+ * false when the server refuses it or reconnects are exhausted, so callers
+ * can fall back to per-job sockets.
+ */
+export class UserJobsSocket extends JobProgressSocket {
+  private onLiveChange?: (live: boolean) => void;
+
+  constructor(
+    onUpdate: (update: JobProgressUpdate) => void,
+    onError?: (error: Event) => void,
+    onLiveChange?: (live: boolean) => void
+  ) {
+    super("me", onUpdate, onError);
+    this.onLiveChange = onLiveChange;
+  }
+
+  protected opened() {
+    this.onLiveChange?.(true);
+  }
+
+  // The job list's change feed and per-job sockets cover users whose WebSockets fail
+  protected fallBack() {
+    this.onLiveChange?.(false);
+  }
+
+  protected path(): string {
+    return "/ws/users/me/jobs";
+  }
+
+  protected params(): URLSearchParams {
+    // Browsers can't set headers on WebSockets; read on every (re)connect to pick up refreshed tokens
+    return new URLSearchParams({ token: getAccessToken() ?? "" });
+  }
+
+  protected label(): string {
+    return "your jobs";
+  }
+}
+
@@ -1,84 +1,408 @@
 import os
 import json
+import time
 import asyncio
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import itertools
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query
+from fastapi.responses import PlainTextResponse
+from jose import JWTError, jwt
 from redis import asyncio as aioredis
-from typing import Dict
+from redis.exceptions import RedisError
+from typing import Dict, Optional
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="RehearseKit WebSocket Service")
-
 # Redis connection
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+RESUBSCRIBE_DELAY = 1.0  # Seconds before reconnecting after Redis drops
+
+# Access tokens are issued by the API; same secret and algorithm
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+POLICY_VIOLATION_CLOSE_CODE = 1008
+USER_SNAPSHOT_EVENTS = 100  # Recent updates replayed (latest per job) when a user connects
+
+# Per-connection delivery
+MAX_PENDING = int(os.getenv("WS_MAX_PENDING", "100"))  # Queued messages before a slow client is dropped
+SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))  # Seconds a client may take to accept a message
+HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", "20"))  # Seconds between heartbeats
+IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "60"))  # Seconds without a frame (e.g. a pong) from the client
+HEARTBEAT = json.dumps({"type": "heartbeat"})
+SLOW_CONSUMER_CLOSE_CODE = 1013  # "Try again later"; the client reconnects and resumes
+
+# Updates after which a job (or YouTube preview) doesn't change again
+TERMINAL_STATUSES = {"COMPLETED", "FAILED", "CANCELLED", "ready", "failed"}
+
+# Progress channels, and the connection key their messages are delivered to.
+# One pattern subscription per process covers every job and preview, so the
+# number of Redis connections doesn't grow with the number of WebSockets.
+CHANNEL_PATTERNS = {
+    "job:*:progress": lambda channel: channel.split(":")[1],
+    "youtube_preview:*:progress": lambda channel: f"preview:{channel.split(':')[1]}",
+    "user:*:jobs": lambda channel: f"user:{channel.split(':')[1]}",
+}
+
+
+def job_events_stream(job_id: str) -> str:
+    """Capped stream of a job's progress updates, written by the worker next to each publish"""
+    return f"job:{job_id}:events"
+
+
+def user_events_stream(user_id: str) -> str:
+    """Capped stream of the progress updates of all of a user's jobs"""
+    return f"user:{user_id}:job-events"
+
+
+def parse_event_id(event_id: str) -> tuple[int, int]:
+    """Stream entry IDs ("<ms>-<seq>") as comparable tuples"""
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class SlowConsumerError(Exception):
+    """A client isn't reading fast enough to keep up with its messages"""
+
+
+class Subscriber:
+    """
+    A connected WebSocket with its own bounded outbound buffer
+
+    Messages are queued without blocking the Redis listener and sent by the
+    connection's own sender task (run), so a slow client only delays itself.
+    The buffer keeps the latest progress message per job: a newer update
+    replaces a queued one in place. Terminal updates (completed, failed,
+    cancelled) are never replaced or dropped. A client that still falls
+    more than MAX_PENDING messages behind, or can't take a message within
+    SEND_TIMEOUT, is disconnected and can resume with last_event_id.
+
+    Sends into the socket's buffers can succeed long after a client stopped
+    reading, so clients answer each heartbeat: one that sends nothing for
+    IDLE_TIMEOUT is disconnected too.
+
+    While the stream history is being replayed, live messages are held
+    back and then queued in order, skipping any the replay already covered.
+    """
+
+    def __init__(self, websocket: WebSocket, key: str):
+        self.websocket = websocket
+        self.key = key
+        self.id = next(_subscriber_ids)
+        self.last_event_id: Optional[tuple[int, int]] = None
+        self.replaying = True
+        self.held: list[tuple[str, dict]] = []
+        # Coalescing slot (job ID, or a unique slot for terminal updates) -> (message, queued at)
+        self.pending: OrderedDict = OrderedDict()
+        self.overflowed = False
+        self.wakeup = asyncio.Event()
+        self.last_activity = time.monotonic()  # Last frame received from the client
+        # Lag metrics: how long messages waited in the buffer before they were sent
+        self.sent = 0
+        self.coalesced = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def publish(self, data: str, message: dict):
+        """Queue a live message (called by the Redis listener; never blocks)"""
+        if self.replaying:
+            self.held.append((data, message))
+        else:
+            self.enqueue(data, message)
+
+    def enqueue(self, data: str, message: dict):
+        event_id = message.get("event_id")
+        if event_id:
+            parsed = parse_event_id(event_id)
+            if self.last_event_id and parsed <= self.last_event_id:
+                return  # Already sent by the replay
+            self.last_event_id = parsed
+
+        job = message.get("job_id") or message.get("preview_id") or self.key
+        queued_at = time.monotonic()
+        if message.get("status") in TERMINAL_STATUSES:
+            # Supersedes any queued progress of the job, and is itself never replaced
+            if job in self.pending:
+                queued_at = self.pending.pop(job)[1]
+                self.coalesced += 1
+            slot = (job, next(_terminal_slots))
+        else:
+            slot = job
+            if slot in self.pending:
+                # Replaced in place; lag counts from the oldest unsent update
+                queued_at = self.pending[slot][1]
+                self.coalesced += 1
+        self.pending[slot] = (data, queued_at)
+
+        if len(self.pending) > MAX_PENDING:
+            self.overflowed = True
+        self.wakeup.set()
+
+    def replay(self, events: list[tuple[str, dict]]):
+        """Queue stream entries, then whatever was published meanwhile"""
+        for event_id, fields in events:
+            message = {**json.loads(fields["data"]), "event_id": event_id}
+            self.enqueue(json.dumps(message), message)
+        while self.held:
+            self.enqueue(*self.held.pop(0))
+        self.replaying = False
+
+    def received(self):
+        """Note a frame from the client (a pong or any other message)"""
+        self.last_activity = time.monotonic()
+
+    async def run(self):
+        """
+        Send queued messages, and a heartbeat every HEARTBEAT_INTERVAL
+
+        Raises:
+            SlowConsumerError: If the buffer overflowed, a send timed out or
+                the client sent nothing for IDLE_TIMEOUT
+        """
+        next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+        while True:
+            if time.monotonic() - self.last_activity > IDLE_TIMEOUT:
+                raise SlowConsumerError(f"no reply for {IDLE_TIMEOUT}s")
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), max(0.0, next_heartbeat - time.monotonic()))
+            except asyncio.TimeoutError:
+                await self.send(HEARTBEAT)
+                next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+                continue
+            self.wakeup.clear()
+            if self.overflowed:
+                raise SlowConsumerError(f"more than {MAX_PENDING} messages behind")
+            while self.pending:
+                _, (data, queued_at) = self.pending.popitem(last=False)
+                await self.send(data)
+                self.sent += 1
+                self.last_lag = time.monotonic() - queued_at
+                self.max_lag = max(self.max_lag, self.last_lag)
+
+    async def send(self, data: str):
+        try:
+            await asyncio.wait_for(self.websocket.send_text(data), SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise SlowConsumerError(f"send took longer than {SEND_TIMEOUT}s")
+
+
+_subscriber_ids = itertools.count(1)
+_terminal_slots = itertools.count()
 
 # Store active connections
-active_connections: Dict[str, list[WebSocket]] = {}
+active_connections: Dict[str, list[Subscriber]] = {}
+reaped_connections = 0  # Disconnected as slow consumers since startup
+
+# Shared by every WebSocket of this process (created on startup)
+redis_client: Optional[aioredis.Redis] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global redis_client
+    redis_client = aioredis.from_url(REDIS_URL, decode_responses=True)
+    listener = asyncio.create_task(listen_for_progress())
+
+    yield
+
+    listener.cancel()
+    try:
+        await listener
+    except asyncio.CancelledError:
+        pass
+    await redis_client.aclose()
+
+
+app = FastAPI(title="RehearseKit WebSocket Service", lifespan=lifespan)
 
 
 @app.websocket("/ws/jobs/{job_id}/progress")
-async def job_progress_websocket(websocket: WebSocket, job_id: str):
-    """WebSocket endpoint for job progress updates"""
-    await websocket.accept()
-    logger.info(f"WebSocket connection established for job {job_id}")
+async def job_progress_websocket(websocket: WebSocket, job_id: str, last_event_id: Optional[str] = Query(None)):
+    """WebSocket endpoint for job progress updates
     
-    # Add to active connections
-    if job_id not in active_connections:
-        active_connections[job_id] = []
-    active_connections[job_id].append(websocket)
+    New connections first get the job's latest update (a snapshot); with
+    `last_event_id` (the `event_id` of the last message received), every
+    update after it is replayed instead.
+    """
+    await relay_channel(websocket, job_id, job_events_stream(job_id), last_event_id)
+
+
+@app.websocket("/ws/users/me/jobs")
+async def user_jobs_websocket(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None),
+    last_event_id: Optional[str] = Query(None),
+):
+    """WebSocket endpoint for progress of all of the authenticated user's jobs
     
+    Browsers can't set headers on WebSockets, so the API access token is
+    passed as `token`. Messages have the same format as on the per-job
+    endpoint and are told apart by `job_id`. New connections first get
+    the latest update of each recently updated job; `last_event_id`
+    resumes as on the per-job endpoint.
+    """
+    user_id = await authenticate(token)
+    if not user_id:
+        await websocket.close(code=POLICY_VIOLATION_CLOSE_CODE)
+        return
+    await relay_channel(
+        websocket, f"user:{user_id}", user_events_stream(user_id), last_event_id,
+        snapshot_events=USER_SNAPSHOT_EVENTS,
+    )
+
+
+@app.websocket("/ws/youtube/previews/{preview_id}/progress")
+async def youtube_preview_progress_websocket(websocket: WebSocket, preview_id: str):
+    """WebSocket endpoint for YouTube preview download progress"""
+    await relay_channel(websocket, f"preview:{preview_id}")
+
+
+async def relay_channel(
+    websocket: WebSocket,
+    key: str,
+    stream: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+    snapshot_events: int = 1,
+):
+    """Register a WebSocket client for the messages delivered to key until it disconnects"""
+    global reaped_connections
+    await websocket.accept()
+    logger.info(f"WebSocket connection established for {key}")
+
+    # Add to active connections before reading the stream, so nothing published in between is lost
+    subscriber = Subscriber(websocket, key)
+    if key not in active_connections:
+        active_connections[key] = []
+    active_connections[key].append(subscriber)
+
+    sender = receiver = None
     try:
-        # Connect to Redis
-        redis_client = aioredis.from_url(REDIS_URL, decode_responses=True)
-        pubsub = redis_client.pubsub()
-        
-        # Subscribe to job progress channel
-        channel = f"job:{job_id}:progress"
-        await pubsub.subscribe(channel)
-        logger.info(f"Subscribed to Redis channel: {channel}")
-        
-        # Listen for messages
-        async for message in pubsub.listen():
-            if message["type"] == "message":
-                data = message["data"]
-                logger.info(f"Received message for job {job_id}: {data}")
-                
-                try:
-                    # Send to WebSocket client
-                    await websocket.send_text(data)
-                except Exception as e:
-                    logger.error(f"Error sending message to WebSocket: {e}")
-                    break
+        subscriber.replay(await read_history(stream, last_event_id, snapshot_events) if stream else [])
         
+        # Messages are sent by the subscriber; the receiver notices when the client leaves
+        sender = asyncio.create_task(subscriber.run())
+        receiver = asyncio.create_task(receive_until_disconnect(websocket, subscriber))
+        done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        if sender in done:
+            sender.result()
+        logger.info(f"WebSocket disconnected for {key}")
+    except SlowConsumerError as e:
+        reaped_connections += 1
+        logger.warning(f"Dropping slow WebSocket client for {key}: {e}")
+        await close_quietly(websocket, SLOW_CONSUMER_CLOSE_CODE)
     except WebSocketDisconnect:
-        logger.info(f"WebSocket disconnected for job {job_id}")
+        logger.info(f"WebSocket disconnected for {key}")
     except Exception as e:
-        logger.error(f"WebSocket error for job {job_id}: {e}")
+        logger.error(f"WebSocket error for {key}: {e}")
     finally:
-        # Clean up
-        if job_id in active_connections:
-            active_connections[job_id].remove(websocket)
-            if not active_connections[job_id]:
-                del active_connections[job_id]
-        
+        for task in (sender, receiver):
+            if task:
+                task.cancel()
+        unregister(key, subscriber)
+        logger.info(f"Cleaned up WebSocket connection for {key}")
+
+
+async def receive_until_disconnect(websocket: WebSocket, subscriber: Subscriber):
+    try:
+        while True:
+            await websocket.receive_text()
+            subscriber.received()
+    except WebSocketDisconnect:
+        pass
+
+
+async def close_quietly(websocket: WebSocket, code: int):
+    try:
+        await asyncio.wait_for(websocket.close(code=code), SEND_TIMEOUT)
+    except Exception:
+        pass
+
+
+def unregister(key: str, subscriber: Subscriber):
+    connections = active_connections.get(key)
+    if connections and subscriber in connections:
+        connections.remove(subscriber)
+        if not connections:
+            del active_connections[key]
+
+
+async def read_history(stream: str, last_event_id: Optional[str], snapshot_events: int) -> list[tuple[str, dict]]:
+    """Entries after last_event_id, or the latest snapshot_events (the snapshot) for new clients"""
+    try:
+        if last_event_id:
+            parse_event_id(last_event_id)  # Validate before passing it to Redis
+            return await redis_client.xrange(stream, min=f"({last_event_id}")
+        return list(reversed(await redis_client.xrevrange(stream, count=snapshot_events)))
+    except (RedisError, ValueError) as e:
+        logger.error(f"Could not read {stream}: {e}")
+        return []
+
+
+async def authenticate(token: Optional[str]) -> Optional[str]:
+    """User ID of a valid, unrevoked API access token of an active user
+
+    Applies the API's checks: logged-out tokens are blacklisted, tokens
+    issued before a user's "revoke all" are rejected, and so are users
+    pending approval or deactivated (recorded by the API as user_inactive).
+    """
+    if not token or not JWT_SECRET_KEY:
+        return None
+    try:
+        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return None
+    user_id = payload.get("sub")
+    if payload.get("type") != "access" or not user_id:
+        return None
+    blacklisted, revoked_at, inactive = await redis_client.mget(
+        f"blacklist:{token}", f"user_revoked:{user_id}", f"user_inactive:{user_id}"
+    )
+    if blacklisted or inactive:
+        return None
+    if revoked_at and int(revoked_at) > payload.get("iat", 0):
+        return None
+    return user_id
+
+
+async def listen_for_progress():
+    """Receive all progress channels on one pubsub connection and fan messages out"""
+    while True:
+        pubsub = redis_client.pubsub()
         try:
-            await pubsub.unsubscribe(channel)
-            await redis_client.close()
-        except:
-            pass
-        
-        logger.info(f"Cleaned up WebSocket connection for job {job_id}")
+            await pubsub.psubscribe(*CHANNEL_PATTERNS)
+            logger.info(f"Subscribed to Redis channels: {', '.join(CHANNEL_PATTERNS)}")
+            async for message in pubsub.listen():
+                if message["type"] == "pmessage":
+                    key = CHANNEL_PATTERNS[message["pattern"]](message["channel"])
+                    broadcast(key, message["data"])
+        except RedisError as e:
+            logger.error(f"Redis subscription lost, resubscribing: {e}")
+            await asyncio.sleep(RESUBSCRIBE_DELAY)
+        finally:
+            await pubsub.aclose()
+
+
+def broadcast(key: str, data: str):
+    """Queue a message for every WebSocket registered for key"""
+    connections = active_connections.get(key)
+    if not connections:
+        return
+    try:
+        message = json.loads(data)
+    except ValueError as e:
+        logger.error(f"Dropping malformed message for {key}: {e}")
+        return
+    for subscriber in connections:
+        subscriber.publish(data, message)
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     try:
-        redis_client = aioredis.from_url(REDIS_URL)
         await redis_client.ping()
-        await redis_client.close()
         return {"status": "healthy", "active_connections": len(active_connections)}
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
@@ -92,3 +416,51 @@ async def root():
         "total_connections": sum(len(conns) for conns in active_connections.values())
     }
 
+
+def resident_memory_bytes() -> Optional[int]:
+    """Current RSS of this process (Linux only)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics, including the send lag and buffer depth of each connection"""
+    subscribers = [subscriber for conns in active_connections.values() for subscriber in conns]
+    lines = [
+        "# HELP websocket_connections Open WebSocket connections",
+        "# TYPE websocket_connections gauge",
+        f"websocket_connections {len(subscribers)}",
+        "# HELP websocket_reaped_connections_total Connections dropped as slow consumers",
+        "# TYPE websocket_reaped_connections_total counter",
+        f"websocket_reaped_connections_total {reaped_connections}",
+    ]
+    resident_memory = resident_memory_bytes()
+    if resident_memory is not None:
+        lines += [
+            "# HELP process_resident_memory_bytes Resident memory size in bytes",
+            "# TYPE process_resident_memory_bytes gauge",
+            f"process_resident_memory_bytes {resident_memory}",
+        ]
+    per_connection = [
+        ("websocket_send_lag_seconds", "gauge", "Time the last sent message waited in the buffer",
+         lambda s: s.last_lag),
+        ("websocket_send_lag_max_seconds", "gauge", "Longest time a message waited in the buffer",
+         lambda s: s.max_lag),
+        ("websocket_pending_messages", "gauge", "Messages queued for the connection",
+         lambda s: len(s.pending)),
+        ("websocket_sent_messages_total", "counter", "Messages sent to the connection",
+         lambda s: s.sent),
+        ("websocket_coalesced_messages_total", "counter", "Queued updates replaced by newer ones",
+         lambda s: s.coalesced),
+    ]
+    for name, kind, description, value in per_connection:
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+        lines += [
+            f'{name}{{connection="{subscriber.id}",key="{subscriber.key}"}} {value(subscriber):g}'
+            for subscriber in subscribers
+        ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark WebSocket fan-out of job progress
+
+Opens N WebSockets to a running WebSocket service, spread over --jobs job
+channels, publishes progress messages to Redis and reports, per socket
+count: the Redis clients connected while the sockets are open, and the
+publish-to-receive latency of the messages.
+
+With one shared pattern subscription per process, Redis clients stay flat
+as sockets grow; with a subscription per socket they grow one for one.
+
+Needs a disposable Redis and the service running against it, e.g.:
+    docker run -d -p 6380:6379 redis:7
+    REDIS_URL=redis://localhost:6380/0 uvicorn app.main:app --port 8001
+    ulimit -n 65536  # 10k sockets need as many file descriptors
+    python scripts/benchmark_fanout.py --redis-url redis://localhost:6380/0
+
+Usage: python scripts/benchmark_fanout.py [--ws-url URL] [--redis-url URL] [--sockets 1000,10000]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import websockets
+from redis import asyncio as aioredis
+
+CONNECT_CONCURRENCY = 200
+PONG = json.dumps({"type": "pong"})  # Answers heartbeats, so the service keeps idle clients
+
+
+class Client:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.latencies: list[float] = []
+
+
+async def open_socket(ws_url: str, client: Client, ready: asyncio.Semaphore, sockets: list):
+    async with ready:
+        socket = await websockets.connect(f"{ws_url}/ws/jobs/{client.job_id}/progress", max_queue=None)
+    sockets.append(socket)
+    async for message in socket:
+        received = time.time()
+        update = json.loads(message)
+        if update.get("type") == "heartbeat":
+            await socket.send(PONG)
+        elif "sent_at" in update:
+            client.latencies.append((received - update["sent_at"]) * 1000)
+
+
+async def connected_clients(redis_client) -> int:
+    return (await redis_client.info("clients"))["connected_clients"]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(args, redis_client, count: int):
+    clients = [Client(f"bench-{i % args.jobs}") for i in range(count)]
+    ready = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    sockets: list = []
+    baseline = await connected_clients(redis_client)
+    readers = [asyncio.create_task(open_socket(args.ws_url, client, ready, sockets)) for client in clients]
+
+    while len(sockets) < count:
+        failed = next((reader for reader in readers if reader.done()), None)
+        if failed:
+            raise RuntimeError(f"Only {len(sockets)} of {count} sockets connected") from failed.exception()
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(args.settle)
+    redis_connections = await connected_clients(redis_client) - baseline
+
+    for progress in range(args.messages):
+        for job in range(args.jobs):
+            await redis_client.publish(
+                f"job:bench-{job}:progress",
+                json.dumps({"job_id": f"bench-{job}", "status": "SEPARATING",
+                            "progress_percent": progress, "sent_at": time.time()}),
+            )
+        await asyncio.sleep(args.interval)
+    await asyncio.sleep(args.settle)
+
+    for socket in sockets:
+        await socket.close()
+    for reader in readers:
+        reader.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    delivered = len(latencies) / (count * args.messages)
+    print(
+        f"{count:>7} | {redis_connections:>17} | {delivered:>9.1%} | "
+        f"{statistics.median(latencies):>7.1f} | {percentile(latencies, 0.95):>7.1f} | "
+        f"{percentile(latencies, 0.99):>7.1f}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ws-url", default="ws://localhost:8001")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--sockets", default="1000,10000")
+    parser.add_argument("--jobs", type=int, default=100, help="Job channels the sockets are spread over")
+    parser.add_argument("--messages", type=int, default=20, help="Messages published per job")
+    parser.add_argument("--interval", type=float, default=0.25, help="Seconds between rounds of messages")
+    parser.add_argument("--settle", type=float, default=2.0)
+    args = parser.parse_args()
+
+    redis_client = aioredis.from_url(args.redis_url, decode_responses=True)
+    print(f"{'sockets':>7} | {'redis connections':>17} | {'delivered':>9} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7}")
+    for count in (int(s) for s in args.sockets.split(",")):
+        await run(args, redis_client, count)
+    await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
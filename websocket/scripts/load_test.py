@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Load test the WebSocket progress service
+
+Opens N simulated clients against /ws/jobs/{id}/progress, spread over --jobs
+jobs, and publishes synthetic progress the way the worker does (XADD to
+job:{id}:events, then PUBLISH with the entry's event_id) at --rate updates
+per second per job for --duration seconds. Reports, per client count:
+
+- connection setup time (TCP + WebSocket handshake) and the total ramp time
+- publish-to-receive latency percentiles
+- service memory per connection (RSS growth from /metrics over the idle sockets)
+- dropped updates: published but never received. The service coalesces
+  updates for clients that fall behind and closes slow consumers; the
+  "coalesced" and "reaped" columns (from /metrics) tell those apart from loss
+
+Against a disposable Redis and a running service:
+    docker run -d -p 6380:6379 redis:7
+    REDIS_URL=redis://localhost:6380/0 uvicorn app.main:app --port 8001
+    ulimit -n 65536  # 10k sockets need as many file descriptors
+    python scripts/load_test.py --redis-url redis://localhost:6380/0 --clients 1000,10000
+
+Or with an in-process fake Redis (pip install fakeredis), which also starts
+the service from this directory:
+    python scripts/load_test.py --fake-redis --clients 100,1000
+
+The clients, and the fake Redis, share one Python process; at high client
+counts or rates that process saturates before the service does, so check
+its CPU before reading latencies as the service's.
+
+Usage: python scripts/load_test.py [--ws-url URL] [--redis-url URL | --fake-redis] [--clients 1000,10000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+import websockets
+from redis import asyncio as aioredis
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICE_START_TIMEOUT = 30
+PONG = json.dumps({"type": "pong"})  # Answers heartbeats, so the service keeps idle clients
+
+
+class Client:
+    """One simulated browser tab following a job"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.setup_seconds: float = 0.0
+        self.sequences: set[int] = set()
+        self.latencies: list[float] = []
+
+
+async def follow(ws_url: str, client: Client, slots: asyncio.Semaphore, connected: list):
+    async with slots:
+        started = time.perf_counter()
+        connection = await websockets.connect(f"{ws_url}/ws/jobs/{client.job_id}/progress", max_queue=None)
+        client.setup_seconds = time.perf_counter() - started
+    connected.append(connection)
+    try:
+        async for message in connection:
+            received = time.time()
+            update = json.loads(message)
+            if update.get("type") == "heartbeat":
+                await connection.send(PONG)
+            elif "seq" in update:
+                client.sequences.add(update["seq"])
+                client.latencies.append((received - update["sent_at"]) * 1000)
+    except websockets.ConnectionClosed:
+        pass
+
+
+async def publish(redis_client, job_ids: list[str], rate: float, duration: float) -> int:
+    """Publish `rate` updates per second to every job; returns updates per job"""
+    interval = 1 / rate
+    rounds = max(1, int(duration * rate))
+    next_round = time.perf_counter()
+    for seq in range(rounds):
+        updates = [
+            {"job_id": job_id, "status": "SEPARATING", "progress_percent": seq % 100,
+             "seq": seq, "sent_at": time.time()}
+            for job_id in job_ids
+        ]
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for update in updates:
+                pipe.xadd(f"job:{update['job_id']}:events", {"data": json.dumps(update)}, maxlen=100)
+            event_ids = await pipe.execute()
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for update, event_id in zip(updates, event_ids):
+                pipe.publish(f"job:{update['job_id']}:progress", json.dumps({**update, "event_id": event_id}))
+            await pipe.execute()
+        next_round += interval
+        await asyncio.sleep(max(0.0, next_round - time.perf_counter()))
+    return rounds
+
+
+async def scrape(http_url: str) -> dict[str, float]:
+    """Service metrics, summed over connections"""
+    def fetch():
+        with urllib.request.urlopen(f"{http_url}/metrics", timeout=30) as response:
+            return response.read().decode()
+
+    totals: dict[str, float] = {}
+    for line in (await asyncio.to_thread(fetch)).splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            name = name.split("{")[0]
+            totals[name] = totals.get(name, 0.0) + float(value)
+    return totals
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return float("nan")
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(args, redis_client, count: int):
+    run_id = uuid.uuid4().hex[:8]
+    job_ids = [f"load-{run_id}-{i}" for i in range(min(args.jobs, count))]
+    clients = [Client(job_ids[i % len(job_ids)]) for i in range(count)]
+    slots = asyncio.Semaphore(args.connect_concurrency)
+    connected: list = []
+
+    before = await scrape(args.http_url)
+    ramp_started = time.perf_counter()
+    readers = [asyncio.create_task(follow(args.ws_url, client, slots, connected)) for client in clients]
+    while len(connected) < count:
+        failed = next((reader for reader in readers if reader.done()), None)
+        if failed:
+            raise RuntimeError(f"Only {len(connected)} of {count} clients connected") from failed.exception()
+        await asyncio.sleep(0.05)
+    ramp_seconds = time.perf_counter() - ramp_started
+    await asyncio.sleep(args.settle)
+    idle = await scrape(args.http_url)
+
+    per_job = await publish(redis_client, job_ids, args.rate, args.duration)
+    await asyncio.sleep(args.settle)
+    loaded = await scrape(args.http_url)
+
+    for connection in connected:
+        await connection.close()
+    await asyncio.gather(*readers, return_exceptions=True)
+    await redis_client.delete(*(f"job:{job_id}:events" for job_id in job_ids))
+
+    setup_ms = [client.setup_seconds * 1000 for client in clients]
+    latencies = [latency for client in clients for latency in client.latencies]
+    expected = count * per_job
+    dropped = expected - sum(len(client.sequences) for client in clients)
+    memory = idle.get("process_resident_memory_bytes", 0) - before.get("process_resident_memory_bytes", 0)
+    # Counters accumulate over the service's life; report this run's share
+    coalesced, reaped = (
+        loaded.get(name, 0) - before.get(name, 0)
+        for name in ("websocket_coalesced_messages_total", "websocket_reaped_connections_total")
+    )
+    print(
+        f"{count:>7} | {ramp_seconds:>6.1f} | {percentile(setup_ms, 0.5):>8.1f} | {percentile(setup_ms, 0.99):>8.1f} | "
+        f"{memory / count / 1024:>9.1f} | {len(latencies) / args.duration:>9.0f} | "
+        f"{percentile(latencies, 0.5):>7.1f} | {percentile(latencies, 0.95):>7.1f} | {percentile(latencies, 0.99):>7.1f} | "
+        f"{dropped / expected:>7.2%} | {coalesced:>9.0f} | {reaped:>6.0f}"
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_fake_redis() -> str:
+    """Serve an in-memory Redis from a thread of this process"""
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        sys.exit("--fake-redis needs fakeredis>=2.23 (pip install fakeredis)")
+    port = free_port()
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}/0"
+
+
+def start_service(redis_url: str) -> tuple[subprocess.Popen, str]:
+    """Run the service from this checkout against redis_url; returns it and its base URL"""
+    port = free_port()
+    service = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVICE_DIR,
+        env={**os.environ, "REDIS_URL": redis_url},
+        # The service logs every connection; run it by hand to see its output
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVICE_START_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://{base_url}/health", timeout=1)
+            return service, base_url
+        except OSError:
+            time.sleep(0.2)
+    service.terminate()
+    sys.exit(f"Service did not start within {SERVICE_START_TIMEOUT} s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ws-url", default="ws://localhost:8001")
+    parser.add_argument("--http-url", help="Service URL for /metrics (default: from --ws-url)")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--fake-redis", action="store_true",
+                        help="Use an in-process fake Redis and start the service against it")
+    parser.add_argument("--clients", default="1000,10000", help="Comma-separated client counts, one run each")
+    parser.add_argument("--jobs", type=int, default=100, help="Jobs the clients are spread over")
+    parser.add_argument("--rate", type=float, default=2.0, help="Updates per second per job")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of publishing per run")
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="Handshakes in flight")
+    parser.add_argument("--settle", type=float, default=2.0, help="Seconds to wait after connecting and publishing")
+    args = parser.parse_args()
+
+    service = None
+    if args.fake_redis:
+        args.redis_url = start_fake_redis()
+        service, base_url = start_service(args.redis_url)
+        args.ws_url = f"ws://{base_url}"
+    args.http_url = args.http_url or args.ws_url.replace("ws", "http", 1)
+
+    redis_client = aioredis.from_url(args.redis_url, decode_responses=True)
+    print(f"{args.jobs} jobs, {args.rate:g} updates/s per job for {args.duration:g} s")
+    print(
+        f"{'clients':>7} | {'ramp s':>6} | {'setup ms':>8} | {'p99 setup':>8} | {'KiB/conn':>9} | "
+        f"{'recv/s':>9} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | {'dropped':>7} | {'coalesced':>9} | {'reaped':>6}"
+    )
+    try:
+        for count in (int(s) for s in args.clients.split(",")):
+            await run(args, redis_client, count)
+    finally:
+        await redis_client.aclose()
+        if service is not None:
+            service.terminate()
+            service.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+"""
+Pytest configuration and fixtures for the RehearseKit WebSocket service tests
+"""
+import json
+import asyncio
+import pytest
+import fakeredis
+from fastapi import WebSocketDisconnect
+
+from app import main
+
+
+class FakeWebSocket:
+    """A client connection: records what is sent, and stalls sends while not reading"""
+
+    def __init__(self, reading: bool = True):
+        self.reading = asyncio.Event()
+        if reading:
+            self.reading.set()
+        self.sent: list[dict] = []
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.close_code = None
+        self.closed = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        await self.reading.wait()
+        self.sent.append(json.loads(data))
+
+    async def receive_text(self) -> str:
+        data = await self.incoming.get()
+        if data is None:
+            raise WebSocketDisconnect()
+        return data
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+        self.closed.set()
+
+    def disconnect(self):
+        self.incoming.put_nowait(None)
+
+
+@pytest.fixture
+async def redis_client():
+    """In-process Redis shared by the service's handlers"""
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    main.redis_client = client
+    main.active_connections.clear()
+    yield client
+    main.active_connections.clear()
+    await client.aclose()
@@ -0,0 +1,75 @@
+"""
+Tests for authenticating the per-user WebSocket with an API access token
+"""
+import time
+import pytest
+from unittest.mock import patch
+from jose import jwt
+
+from app import main
+from app.main import authenticate, user_jobs_websocket, POLICY_VIOLATION_CLOSE_CODE
+from tests.conftest import FakeWebSocket
+
+SECRET = "test-secret-key"
+
+
+def access_token(user_id: str = "user-1", issued_at: int = None, token_type: str = "access") -> str:
+    issued_at = int(time.time()) if issued_at is None else issued_at
+    claims = {"sub": user_id, "type": token_type, "iat": issued_at, "exp": issued_at + 1800}
+    return jwt.encode(claims, SECRET, algorithm="HS256")
+
+
+@pytest.fixture(autouse=True)
+def jwt_secret():
+    with patch.object(main, "JWT_SECRET_KEY", SECRET):
+        yield
+
+
+class TestAuthenticate:
+    """Test the token checks shared with the API"""
+
+    @pytest.mark.asyncio
+    async def test_valid_token(self, redis_client):
+        """Test that an access token of an active user gives its user ID"""
+        assert await authenticate(access_token()) == "user-1"
+
+    @pytest.mark.asyncio
+    async def test_refresh_token_rejected(self, redis_client):
+        """Test that only access tokens are accepted"""
+        assert await authenticate(access_token(token_type="refresh")) is None
+
+    @pytest.mark.asyncio
+    async def test_blacklisted_token_rejected(self, redis_client):
+        """Test that a logged-out token is rejected"""
+        token = access_token()
+        await redis_client.set(f"blacklist:{token}", "1")
+
+        assert await authenticate(token) is None
+
+    @pytest.mark.asyncio
+    async def test_tokens_issued_before_revocation_rejected(self, redis_client):
+        """Test that "revoke all tokens" rejects older tokens but not newer ones"""
+        now = int(time.time())
+        await redis_client.set("user_revoked:user-1", now)
+
+        assert await authenticate(access_token(issued_at=now - 60)) is None
+        assert await authenticate(access_token(issued_at=now + 1)) == "user-1"
+
+    @pytest.mark.asyncio
+    async def test_inactive_user_rejected(self, redis_client):
+        """Test that pending or deactivated users are rejected"""
+        await redis_client.set("user_inactive:user-1", 1)
+
+        assert await authenticate(access_token()) is None
+        assert await authenticate(access_token("user-2")) == "user-2"
+
+    @pytest.mark.asyncio
+    async def test_rejected_connection_closed_with_policy_violation(self, redis_client):
+        """Test that the endpoint closes connections of deactivated users without subscribing"""
+        await redis_client.set("user_inactive:user-1", 1)
+        websocket = FakeWebSocket()
+
+        await user_jobs_websocket(websocket, token=access_token(), last_event_id=None)
+
+        assert websocket.close_code == POLICY_VIOLATION_CLOSE_CODE
+        assert "user:user-1" not in main.active_connections
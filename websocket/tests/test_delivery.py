@@ -0,0 +1,178 @@
+"""
+Tests for per-connection delivery: coalescing, slow consumers and replay
+"""
+import json
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from app import main
+from app.main import Subscriber, SlowConsumerError, relay_channel, broadcast, job_events_stream, user_events_stream
+from tests.conftest import FakeWebSocket
+
+
+def update(job_id: str, status: str = "SEPARATING", progress: int = 0) -> str:
+    return json.dumps({"job_id": job_id, "status": status, "progress_percent": progress})
+
+
+async def connect(websocket: FakeWebSocket, key: str, **kwargs) -> asyncio.Task:
+    """Run relay_channel for a client until its sender is running"""
+    task = asyncio.create_task(relay_channel(websocket, key, **kwargs))
+    while not any(s.websocket is websocket and not s.replaying for s in main.active_connections.get(key, [])):
+        await asyncio.sleep(0.01)
+    return task
+
+
+async def wait_for_sent(websocket: FakeWebSocket, count: int):
+    while len(websocket.sent) < count:
+        await asyncio.sleep(0.01)
+
+
+class TestCoalescing:
+    """Test the bounded outbound buffer of a connection"""
+
+    @pytest.mark.asyncio
+    async def test_newer_progress_replaces_queued_update(self):
+        """Test that a client that falls behind gets each job's latest update once"""
+        websocket = FakeWebSocket(reading=False)
+        subscriber = Subscriber(websocket, "user:1")
+        subscriber.replay([])
+
+        for progress in (10, 20, 30):
+            subscriber.publish(update("a", progress=progress), json.loads(update("a", progress=progress)))
+        subscriber.publish(update("b", progress=5), json.loads(update("b", progress=5)))
+
+        sender = asyncio.create_task(subscriber.run())
+        websocket.reading.set()
+        await wait_for_sent(websocket, 2)
+        sender.cancel()
+
+        assert [(m["job_id"], m["progress_percent"]) for m in websocket.sent] == [("a", 30), ("b", 5)]
+        assert subscriber.coalesced == 2
+
+    @pytest.mark.asyncio
+    async def test_terminal_updates_are_never_replaced(self):
+        """Test that a terminal update supersedes queued progress and survives later updates"""
+        websocket = FakeWebSocket(reading=False)
+        subscriber = Subscriber(websocket, "user:1")
+        subscriber.replay([])
+
+        for data in (update("a", progress=50), update("a", "COMPLETED", 100), update("a", progress=99)):
+            subscriber.publish(data, json.loads(data))
+
+        sender = asyncio.create_task(subscriber.run())
+        websocket.reading.set()
+        await wait_for_sent(websocket, 2)
+        sender.cancel()
+
+        assert [m["status"] for m in websocket.sent] == ["COMPLETED", "SEPARATING"]
+
+    @pytest.mark.asyncio
+    async def test_overflow_raises(self):
+        """Test that more than MAX_PENDING queued jobs marks the client as slow"""
+        subscriber = Subscriber(FakeWebSocket(reading=False), "user:1")
+        subscriber.replay([])
+
+        with patch.object(main, "MAX_PENDING", 2):
+            for job in ("a", "b", "c"):
+                subscriber.publish(update(job), json.loads(update(job)))
+
+            with pytest.raises(SlowConsumerError):
+                await subscriber.run()
+
+
+class TestSlowConsumers:
+    """Test that clients that stop reading are disconnected"""
+
+    @pytest.mark.asyncio
+    async def test_stalled_send_drops_client(self, redis_client):
+        """Test that a client that can't take a message within SEND_TIMEOUT is closed with 1013"""
+        websocket = FakeWebSocket(reading=False)
+        reaped = main.reaped_connections
+
+        with patch.object(main, "SEND_TIMEOUT", 0.05):
+            task = await connect(websocket, "job-1")
+            broadcast("job-1", update("job-1"))
+            await asyncio.wait_for(task, 1)
+
+        assert websocket.close_code == main.SLOW_CONSUMER_CLOSE_CODE
+        assert main.reaped_connections == reaped + 1
+        assert "job-1" not in main.active_connections
+
+    @pytest.mark.asyncio
+    async def test_silent_client_is_dropped_after_idle_timeout(self, redis_client):
+        """Test that a client that never answers heartbeats is closed, even while sends succeed"""
+        websocket = FakeWebSocket()
+
+        with patch.object(main, "HEARTBEAT_INTERVAL", 0.02), patch.object(main, "IDLE_TIMEOUT", 0.1):
+            task = await connect(websocket, "job-1")
+            await asyncio.wait_for(task, 1)
+
+        assert {"type": "heartbeat"} in websocket.sent
+        assert websocket.close_code == main.SLOW_CONSUMER_CLOSE_CODE
+
+    @pytest.mark.asyncio
+    async def test_answering_client_stays_connected(self, redis_client):
+        """Test that pongs keep a client connected past the idle timeout"""
+        websocket = FakeWebSocket()
+
+        with patch.object(main, "HEARTBEAT_INTERVAL", 0.02), patch.object(main, "IDLE_TIMEOUT", 0.1):
+            task = await connect(websocket, "job-1")
+            for _ in range(15):
+                await asyncio.sleep(0.02)
+                websocket.incoming.put_nowait(json.dumps({"type": "pong"}))
+            assert not task.done()
+
+            websocket.disconnect()
+            await asyncio.wait_for(task, 1)
+
+        assert websocket.close_code is None
+
+
+class TestReplay:
+    """Test snapshots and resuming from last_event_id"""
+
+    @pytest.mark.asyncio
+    async def test_resume_replays_after_last_event_id(self, redis_client):
+        """Test that a reconnecting client gets every update after the one it last saw"""
+        stream = user_events_stream("1")
+        ids = [await redis_client.xadd(stream, {"data": update(job)}) for job in ("a", "b", "c")]
+        websocket = FakeWebSocket()
+
+        task = await connect(websocket, "user:1", stream=stream, last_event_id=ids[0])
+        await wait_for_sent(websocket, 2)
+        websocket.disconnect()
+        await asyncio.wait_for(task, 1)
+
+        assert [(m["event_id"], m["job_id"]) for m in websocket.sent] == [(ids[1], "b"), (ids[2], "c")]
+
+    @pytest.mark.asyncio
+    async def test_new_client_gets_snapshot(self, redis_client):
+        """Test that a new client gets only the latest update"""
+        stream = job_events_stream("job-1")
+        for progress in (10, 20, 30):
+            await redis_client.xadd(stream, {"data": update("job-1", progress=progress)})
+        websocket = FakeWebSocket()
+
+        task = await connect(websocket, "job-1", stream=stream)
+        await wait_for_sent(websocket, 1)
+        websocket.disconnect()
+        await asyncio.wait_for(task, 1)
+
+        assert [m["progress_percent"] for m in websocket.sent] == [30]
+
+    @pytest.mark.asyncio
+    async def test_live_updates_covered_by_replay_are_skipped(self, redis_client):
+        """Test that an update published during the replay is sent once, after it"""
+        stream = job_events_stream("job-1")
+        await redis_client.xadd(stream, {"data": update("job-1", progress=10)})
+        subscriber = Subscriber(FakeWebSocket(), "job-1")
+
+        # Published (and written to the stream) while the history was being read
+        second = await redis_client.xadd(stream, {"data": update("job-1", progress=20)})
+        live = {**json.loads(update("job-1", progress=20)), "event_id": second}
+        subscriber.publish(json.dumps(live), live)
+        subscriber.replay(await main.read_history(stream, None, 10))
+
+        assert [json.loads(data)["event_id"] for data, _ in subscriber.pending.values()] == [second]
+        assert subscriber.last_event_id == main.parse_event_id(second)